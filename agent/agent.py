@@ -306,16 +306,17 @@ class CogAgent():
         log.info(f"[Env {self.env_id} | Task {self.task_id}] {self.task_type}, Goal: {self.goal}, Max Steps: {self.max_steps}")
         try:
             self.client.initialize_task(task_type=self.task_type, task_idx=0)
-            time.sleep(2)  # 等待环境响应
+            # 等待界面稳定后再截图，替代固定的 sleep
+            screenshot_begin_time = time.time()
+            _screenshot = self.client.get_screenshot(wait_to_stabilize=True)
+            log.info(f"[Env {self.env_id} | Task {self.task_id}] Screenshot time: {time.time() - screenshot_begin_time:.2f}s")
             
             trace_start_time = time.time()
             for step_idx in range(self.max_steps):
                 log.info(f"[Env {self.env_id} | Task {self.task_id}] Step {step_idx+1}/{self.max_steps}")
                 
-                screenshot_begin_time = time.time()
-                _screenshot = self.client.get_screenshot().astype(np.uint8)
-                log.info(f"[Env {self.env_id} | Task {self.task_id}] Screenshot time: {time.time() - screenshot_begin_time:.2f}s")
-                img = Image.fromarray(_screenshot)
+                step_begin_time = time.time()
+                img = Image.fromarray(_screenshot.astype(np.uint8))
                 img_width, img_height = img.size
                 
                 current_step = {}
@@ -344,9 +345,13 @@ class CogAgent():
                 current_step['env_action'] = env_action
                 
                 execute_start_time = time.time()
-                res = self.client.execute_action(env_action_json) if env_action_json else {"status": "skipped", "error": "No valid action"}
+                # /step 在服务端执行动作、等待界面稳定，并直接返回下一帧截图
+                if env_action_json:
+                    step_result = self.client.step(env_action_json)
+                    _screenshot = step_result.pixels
+                else:
+                    _screenshot = self.client.get_screenshot()
                 log.info(f"[Env {self.env_id} | Task {self.task_id}] Execute time: {time.time() - execute_start_time:.2f}s")
-                time.sleep(2)  # 等待环境响应
                 
                 # 保存
                 os.makedirs(os.path.join(self.save_dir, f"{self.task_type}/step{step_idx}"), exist_ok=True)
@@ -366,7 +371,7 @@ class CogAgent():
                     }
                     f.write(json.dumps(output_dict, ensure_ascii=False, indent=4))
                 img.save(os.path.join(self.save_dir, f"{self.task_type}/step{step_idx}/img_step{step_idx}.png"))
-                log.info(f"[Env {self.env_id} | Task {self.task_id}] Step {step_idx+1}/{self.max_steps} completed in {time.time() - screenshot_begin_time:.2f}s")
+                log.info(f"[Env {self.env_id} | Task {self.task_id}] Step {step_idx+1}/{self.max_steps} completed in {time.time() - step_begin_time:.2f}s")
                 # 检查终止条件
                 if isinstance(env_action, dict) and env_action.get("action_type") == "status":
                     break
@@ -14,13 +14,12 @@
 
 """A Multimodal Autonomous Agent for Android (M3A)."""
 
-import time
-
 from absl import logging
 from android_world.agents import agent_utils
 from android_world.agents import base_agent
 from android_world.agents import infer
 from android_world.agents import m3a_utils
+from android_world.env import action_waits
 from android_world.env import interface
 from android_world.env import json_action
 from android_world.env import representation_utils
@@ -347,8 +346,8 @@ class M3A(base_agent.EnvironmentInteractingAgent):
       env: The environment.
       llm: The multimodal LLM wrapper.
       name: The agent name.
-      wait_after_action_seconds: Seconds to wait for the screen to stablize
-        after executing an action
+      wait_after_action_seconds: Maximum seconds to wait for the screen to
+        change after executing an action.
     """
     super().__init__(env, name)
     self.llm = llm
@@ -519,6 +518,7 @@ Action: {{"action_type": "status", "goal_status": "infeasible"}}"""
     if converted_action.action_type == 'answer':
       logging.info('Agent answered with: %s', converted_action.text)
 
+    screen_changed = action_waits.ui_changed(self.env.controller, before=state)
     try:
       self.env.execute_action(converted_action)
     except Exception as e:  # pylint: disable=broad-exception-caught
@@ -533,9 +533,15 @@ Action: {{"action_type": "status", "goal_status": "infeasible"}}"""
           step_data,
       )
 
-    time.sleep(self.wait_after_action_seconds)
-
-    state = self.env.get_state(wait_to_stabilize=False)
+    # The first change may be a ripple or a half-rendered screen, so let the
+    # screen settle before observing it.
+    action_waits.wait_until(
+        screen_changed,
+        self.wait_after_action_seconds,
+        stats=self.env.controller.wait_stats,
+        action_type=converted_action.action_type,
+    )
+    state = self.env.get_state(wait_to_stabilize=True)
     logical_screen_size = self.env.logical_screen_size
     orientation = self.env.orientation
     physical_frame_boundary = self.env.physical_frame_boundary
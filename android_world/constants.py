@@ -35,6 +35,8 @@ class EpisodeConstants:
     SEED: The random seed to initialize the current episode's task.
     AUX_DATA: Additional data which can be passed from the task to
       process_episodes.
+    ADB_TELEMETRY: Latency of the adb calls made in each phase of the episode;
+      see adb_telemetry.AdbTelemetry.as_dict.
   """
 
   EPISODE_DATA = 'episode_data'
@@ -51,3 +53,4 @@ class EpisodeConstants:
   FINISH_DTIME = 'finish_dtime'
   SEED = 'seed'
   AUX_DATA = 'aux_data'
+  ADB_TELEMETRY = 'adb_telemetry'
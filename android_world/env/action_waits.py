@@ -0,0 +1,263 @@
+# Copyright 2025 The android_world Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Waits for the effects of an action instead of sleeping a fixed time.
+
+A wait polls a condition, e.g. "the keyboard is shown" or "the UI changed",
+and returns as soon as it holds or when its deadline passes. The deadline is
+what used to be the fixed sleep, so a wait is never slower than the sleep it
+replaces.
+
+Conditions that compare against the screen before an action take their
+baseline when they are created, so create them before executing the action:
+
+  changed = action_waits.ui_changed(controller)
+  adb_utils.tap_screen(x, y, controller)
+  action_waits.wait_until(changed, timeout_sec=1.0)
+
+Where the caller already holds an observation of the screen before the action,
+pass it as the baseline instead of fetching the UI again. A change only shows
+that the action had an effect, not that the screen is done changing, so let
+the UI settle before observing it; see ui_stability.py.
+
+Time spent waiting is recorded per action type in a WaitStats, which makes the
+idle time of an episode visible; see AndroidWorldController.wait_stats.
+"""
+
+import dataclasses
+import threading
+import time
+from typing import Any, Callable, Optional, Sequence
+
+from android_env import env_interface
+from android_world.env import adb_utils
+from android_world.env import ui_stability
+
+Condition = Callable[[], bool]
+
+_DEFAULT_SCHEDULE = ui_stability.PollingSchedule(
+    initial_interval=0.05, max_interval=0.25
+)
+
+
+@dataclasses.dataclass(frozen=True)
+class WaitResult:
+  """Outcome of a wait.
+
+  Attributes:
+    satisfied: Whether the condition held before the deadline.
+    elapsed_sec: Time spent waiting.
+    num_polls: Number of times the condition was checked.
+  """
+
+  satisfied: bool
+  elapsed_sec: float
+  num_polls: int
+
+
+@dataclasses.dataclass
+class ActionWaitTimes:
+  """Wait time accumulated for one action type.
+
+  Attributes:
+    waits: Number of waits.
+    total_sec: Total time spent waiting.
+    timeouts: Waits whose condition did not hold before the deadline.
+  """
+
+  waits: int = 0
+  total_sec: float = 0.0
+  timeouts: int = 0
+
+
+class WaitStats:
+  """Wait time per action type; safe to update from several threads."""
+
+  def __init__(self):
+    self._lock = threading.Lock()
+    self._by_action: dict[str, ActionWaitTimes] = {}
+
+  def record(self, action_type: str, result: WaitResult) -> None:
+    with self._lock:
+      times = self._by_action.setdefault(action_type, ActionWaitTimes())
+      times.waits += 1
+      times.total_sec += result.elapsed_sec
+      if not result.satisfied:
+        times.timeouts += 1
+
+  @property
+  def total_sec(self) -> float:
+    with self._lock:
+      return sum(times.total_sec for times in self._by_action.values())
+
+  def reset(self) -> None:
+    with self._lock:
+      self._by_action.clear()
+
+  def as_dict(self) -> dict[str, dict[str, Any]]:
+    with self._lock:
+      return {
+          action_type: dataclasses.asdict(times)
+          for action_type, times in self._by_action.items()
+      }
+
+
+def wait_until(
+    condition: Condition,
+    timeout_sec: float,
+    schedule: ui_stability.PollingSchedule = _DEFAULT_SCHEDULE,
+    stats: Optional[WaitStats] = None,
+    action_type: str = '',
+    clock: Callable[[], float] = time.monotonic,
+    sleep: Callable[[float], None] = time.sleep,
+) -> WaitResult:
+  """Polls `condition` until it holds or `timeout_sec` passes.
+
+  Args:
+    condition: Returns whether the wait is over.
+    timeout_sec: The deadline, relative to now.
+    schedule: Intervals between checks.
+    stats: If given, the wait is recorded here under `action_type`.
+    action_type: The action whose effect is awaited.
+    clock: Monotonic clock; injectable for tests.
+    sleep: Sleep function; injectable for tests.
+
+  Returns:
+    Whether the condition held, and how long that took.
+  """
+  start = clock()
+  deadline = start + timeout_sec
+  intervals = schedule.intervals()
+  num_polls = 0
+  while True:
+    num_polls += 1
+    satisfied = condition()
+    now = clock()
+    if satisfied or now >= deadline:
+      break
+    sleep(min(next(intervals), deadline - now))
+  result = WaitResult(satisfied, clock() - start, num_polls)
+  if stats is not None:
+    stats.record(action_type, result)
+  return result
+
+
+def any_of(*conditions: Condition) -> Condition:
+  """Returns a condition that holds when any of `conditions` holds."""
+  return lambda: any(condition() for condition in conditions)
+
+
+def ime_shown(env: env_interface.AndroidEnvInterface) -> Condition:
+  """Returns a condition that holds while the soft keyboard is shown."""
+  return lambda: adb_utils.is_ime_shown(env)
+
+
+def text_field_focused(
+    controller: Any,
+    before: Optional[Sequence[Any]] = None,
+    target: Optional[Any] = None,
+) -> Condition:
+  """Returns a condition that holds once a tapped text field has focus.
+
+  That is when the focused element changed or, if the keyboard was hidden
+  before, when it is shown. If `target` already had focus and the keyboard is
+  shown, tapping it changes nothing, so the condition holds at once.
+
+  Args:
+    controller: An AndroidWorldController.
+    before: UI elements of the screen before the tap, e.g. those the agent
+      chose the action from; fetched now if not given.
+    target: The UI element that is tapped, if known.
+  """
+  if before is None:
+    before = controller.get_ui_elements()
+  changed = focus_changed(controller, before)
+  if not adb_utils.is_ime_shown(controller):
+    return any_of(changed, ime_shown(controller))
+  if target is not None and target.is_focused:
+    return lambda: True
+  return changed
+
+
+def activity_changed(env: env_interface.AndroidEnvInterface) -> Condition:
+  """Returns a condition that holds once the foreground activity changed."""
+  before = adb_utils.get_current_activity(env)[0]
+  return lambda: adb_utils.get_current_activity(env)[0] != before
+
+
+def ui_changed(controller: Any, before: Optional[Any] = None) -> Condition:
+  """Returns a condition that holds once the UI tree changed.
+
+  Args:
+    controller: An AndroidWorldController; its UI fingerprint is compared.
+    before: The interface.State the agent observed before the action, which
+      saves fetching the UI tree again; see
+      AndroidWorldController.get_state_fingerprint.
+  """
+  baseline = None
+  if before is not None:
+    baseline = controller.get_state_fingerprint(before)
+  if baseline is None:
+    baseline = controller.get_ui_fingerprint()
+  return lambda: controller.get_ui_fingerprint() != baseline
+
+
+def pixels_changed(controller: Any, max_distance: int = 0) -> Condition:
+  """Returns a condition that holds once the screenshot visibly changed.
+
+  Args:
+    controller: An AndroidWorldController; its screen captures are compared.
+    max_distance: Number of perceptual hash bits that may differ for the
+      screenshot to still count as unchanged.
+  """
+  before = ui_stability.perceptual_hash(controller.capture_screen())
+  return lambda: (
+      ui_stability.hamming_distance(
+          before, ui_stability.perceptual_hash(controller.capture_screen())
+      )
+      > max_distance
+  )
+
+
+def _focused_element(elements: Sequence[Any]) -> Optional[tuple[Any, ...]]:
+  for element in elements:
+    if element.is_focused:
+      return (
+          element.resource_name,
+          element.class_name,
+          element.bbox_pixels,
+      )
+  return None
+
+
+def focus_changed(
+    controller: Any, before: Optional[Sequence[Any]] = None
+) -> Condition:
+  """Returns a condition that holds once a different element has focus.
+
+  Args:
+    controller: An AndroidWorldController; its UI elements are inspected.
+    before: UI elements of the screen before the action; fetched now if not
+      given.
+  """
+  if before is None:
+    before = controller.get_ui_elements()
+  baseline = _focused_element(before)
+  return lambda: _focused_element(controller.get_ui_elements()) != baseline
+
+
+def stats_for(env: Any) -> Optional[WaitStats]:
+  """Returns the WaitStats of `env`, if it keeps any."""
+  stats = getattr(env, 'wait_stats', None)
+  return stats if isinstance(stats, WaitStats) else None
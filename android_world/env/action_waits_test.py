@@ -0,0 +1,177 @@
+# Copyright 2025 The android_world Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import dataclasses
+from unittest import mock
+
+from absl.testing import absltest
+from android_world.env import action_waits
+from android_world.env import adb_utils
+from android_world.env import representation_utils
+
+
+class _FakeClock:
+
+  def __init__(self):
+    self.now = 0.0
+
+  def __call__(self) -> float:
+    return self.now
+
+  def sleep(self, seconds: float) -> None:
+    self.now += seconds
+
+
+class WaitUntilTest(absltest.TestCase):
+
+  def setUp(self):
+    super().setUp()
+    self.clock = _FakeClock()
+
+  def _wait_until(self, condition, timeout_sec, **kwargs):
+    return action_waits.wait_until(
+        condition,
+        timeout_sec,
+        clock=self.clock,
+        sleep=self.clock.sleep,
+        **kwargs,
+    )
+
+  def test_returns_as_soon_as_condition_holds(self):
+    results = iter([False, False, True])
+
+    result = self._wait_until(lambda: next(results), 1.0)
+
+    self.assertTrue(result.satisfied)
+    self.assertEqual(result.num_polls, 3)
+    self.assertAlmostEqual(result.elapsed_sec, 0.15)
+
+  def test_gives_up_at_deadline(self):
+    result = self._wait_until(lambda: False, 1.0)
+
+    self.assertFalse(result.satisfied)
+    self.assertAlmostEqual(result.elapsed_sec, 1.0)
+
+  def test_records_wait_per_action_type(self):
+    stats = action_waits.WaitStats()
+
+    self._wait_until(lambda: True, 1.0, stats=stats, action_type='click')
+    self._wait_until(lambda: False, 1.0, stats=stats, action_type='wait')
+    self._wait_until(lambda: False, 0.5, stats=stats, action_type='wait')
+
+    self.assertEqual(
+        stats.as_dict(),
+        {
+            'click': {'waits': 1, 'total_sec': 0.0, 'timeouts': 0},
+            'wait': {'waits': 2, 'total_sec': 1.5, 'timeouts': 2},
+        },
+    )
+    self.assertAlmostEqual(stats.total_sec, 1.5)
+
+
+class ConditionsTest(absltest.TestCase):
+
+  def test_ui_changed(self):
+    controller = mock.MagicMock()
+    controller.get_ui_fingerprint.side_effect = [1, 1, 2]
+
+    changed = action_waits.ui_changed(controller)
+
+    self.assertFalse(changed())
+    self.assertTrue(changed())
+
+  def test_ui_changed_takes_baseline_from_observation(self):
+    controller = mock.MagicMock()
+    controller.get_state_fingerprint.return_value = 1
+    controller.get_ui_fingerprint.side_effect = [1, 2]
+    observed = mock.Mock()
+
+    changed = action_waits.ui_changed(controller, before=observed)
+
+    controller.get_state_fingerprint.assert_called_once_with(observed)
+    controller.get_ui_fingerprint.assert_not_called()
+    self.assertFalse(changed())
+    self.assertTrue(changed())
+
+  @mock.patch.object(adb_utils, 'is_ime_shown')
+  def test_text_field_focused_waits_for_keyboard(self, mock_is_ime_shown):
+    controller = mock.MagicMock()
+    controller.get_ui_elements.return_value = []
+    mock_is_ime_shown.side_effect = [False, False, True]
+
+    focused = action_waits.text_field_focused(controller)
+
+    self.assertFalse(focused())
+    self.assertTrue(focused())
+
+  @mock.patch.object(adb_utils, 'is_ime_shown', return_value=True)
+  def test_text_field_focused_with_keyboard_shown_waits_for_focus(
+      self, unused_mock_is_ime_shown
+  ):
+    controller = mock.MagicMock()
+    field = representation_utils.UIElement(
+        resource_name='field', is_focused=True
+    )
+    controller.get_ui_elements.side_effect = [[], [], [field]]
+
+    focused = action_waits.text_field_focused(controller)
+
+    self.assertFalse(focused())
+    self.assertTrue(focused())
+
+
+  @mock.patch.object(adb_utils, 'is_ime_shown', return_value=True)
+  def test_text_field_focused_on_focused_field_holds_at_once(
+      self, mock_is_ime_shown
+  ):
+    controller = mock.MagicMock()
+    field = representation_utils.UIElement(
+        resource_name='field', is_focused=True
+    )
+
+    focused = action_waits.text_field_focused(
+        controller, before=[field], target=field
+    )
+
+    self.assertTrue(focused())
+    controller.get_ui_elements.assert_not_called()
+    mock_is_ime_shown.assert_called_once()
+
+  @mock.patch.object(adb_utils, 'is_ime_shown', return_value=True)
+  def test_text_field_focused_waits_for_focus_to_move(
+      self, unused_mock_is_ime_shown
+  ):
+    controller = mock.MagicMock()
+    field = representation_utils.UIElement(
+        resource_name='field', is_focused=True
+    )
+    other = representation_utils.UIElement(resource_name='other')
+    controller.get_ui_elements.side_effect = [
+        [field, other],
+        [
+            dataclasses.replace(field, is_focused=False),
+            dataclasses.replace(other, is_focused=True),
+        ],
+    ]
+
+    focused = action_waits.text_field_focused(
+        controller, before=[field, other], target=other
+    )
+
+    self.assertFalse(focused())
+    self.assertTrue(focused())
+
+
+if __name__ == '__main__':
+  absltest.main()
@@ -14,15 +14,23 @@
 
 """Utilies for actuation."""
 
+from collections.abc import Sequence
 import copy
 import logging
 import time
-from typing import Any
+from typing import Any, Callable, Optional
 from android_env import env_interface
+from android_world.env import action_waits
 from android_world.env import adb_utils
 from android_world.env import android_world_controller
+from android_world.env import element_index
+from android_world.env import gestures
 from android_world.env import json_action
 from android_world.env import representation_utils
+from android_world.env import ui_stability
+
+# Timing of the `drag_and_drop` action's move, after the item is picked up.
+_DRAG_AND_DROP = gestures.FlingProfile.linear(4000)
 
 
 def execute_adb_action(
@@ -80,11 +88,24 @@ def execute_adb_action(
         # First focus on enter text UI element.
         click_action = copy.deepcopy(action)
         click_action.action_type = 'click'
+        idx = action.index
+        target = (
+            screen_elements[idx]
+            if idx is not None and 0 <= idx < len(screen_elements)
+            else None
+        )
+        focused = _observe(
+            env,
+            lambda c: action_waits.text_field_focused(
+                c, before=screen_elements, target=target
+            ),
+        )
         execute_adb_action(click_action, screen_elements, screen_size, env)
-        time.sleep(1.0)
+        _wait(env, action.action_type, focused, 1.0)
 
       if action.clear_text:
         # Select all existing text and delete it.
+        cleared = _observe(env, action_waits.ui_changed)
         adb_utils.issue_generic_request(
             [
                 'shell',
@@ -99,7 +120,7 @@ def execute_adb_action(
             ],
             env,
         )
-        time.sleep(1.0)
+        _wait(env, action.action_type, cleared, 1.0)
 
       adb_utils.type_text(text, env, timeout_sec=10)
       adb_utils.press_enter_button(env)
@@ -121,10 +142,14 @@ def execute_adb_action(
   elif action.action_type == 'press_keyboard':
     adb_utils.press_keyboard_generic(action.keycode, env)
   elif action.action_type == 'drag':
+    start = int(action.drag_start_x), int(action.drag_start_y)
+    end = int(action.drag_end_x), int(action.drag_end_y)
     command = adb_utils.generate_drag_and_drop_command(
-        int(action.drag_start_x), int(action.drag_start_y), int(action.drag_end_x), int(action.drag_end_y), duration_ms=2000
+        *start, *end, duration_ms=2000
+    )
+    _perform_gesture(
+        env, gestures.drag(start, end, gestures.SLOW_SWIPE), command
     )
-    adb_utils.issue_generic_request(command, env)
   elif action.action_type == 'drag_and_drop':
     if action.touch_xy is not None and action.lift_xy is not None:
       command = adb_utils.generate_drag_and_drop_command(
@@ -134,7 +159,13 @@ def execute_adb_action(
           action.lift_xy[1],
           4000,
       )
-      adb_utils.issue_generic_request(command, env)
+      _perform_gesture(
+          env,
+          gestures.drag(
+              tuple(action.touch_xy), tuple(action.lift_xy), _DRAG_AND_DROP
+          ),
+          command,
+      )
     else:
       logging.warning(
           'Drag and drop action indicated, but no coordinates provided. No '
@@ -166,10 +197,10 @@ def execute_adb_action(
     else:
       print('Invalid direction')
       return
-    command = adb_utils.generate_swipe_command(
-        int(start_x), int(start_y), int(end_x), int(end_y)
-    )
-    adb_utils.issue_generic_request(command, env)
+    start = int(start_x), int(start_y)
+    end = int(end_x), int(end_y)
+    command = adb_utils.generate_swipe_command(*start, *end)
+    _perform_gesture(env, gestures.line(start, end, gestures.SCROLL), command)
 
   elif action.action_type == 'swipe':  # Inverse of scroll.
     screen_width, screen_height = screen_size
@@ -182,8 +213,6 @@ def execute_adb_action(
       )
     else:
       x_min, y_min, x_max, y_max = (0, 0, screen_width, screen_height)
-    adb_utils.issue_generic_request(['shell', 'input', 'keyevent', '111'], env) # 全屏滚动，关闭软键盘
-    
     mid_x, mid_y = 0.5 * (x_min + x_max), 0.5 * (y_min + y_max)
     direction = action.direction
     if direction == 'down':
@@ -201,10 +230,16 @@ def execute_adb_action(
     else:
       print('Invalid direction')
       return
-    command = adb_utils.generate_swipe_command(
-        int(start_x), int(start_y), int(end_x), int(end_y), duration_ms=2000
+    start = int(start_x), int(start_y)
+    end = int(end_x), int(end_y)
+    command = adb_utils.generate_swipe_command(*start, *end, duration_ms=2000)
+    _perform_gesture(
+        env,
+        gestures.line(start, end, gestures.SLOW_SWIPE),
+        command,
+        # 全屏滚动，关闭软键盘
+        prelude=(['shell', 'input', 'keyevent', '111'],),
     )
-    adb_utils.issue_generic_request(command, env)
 
   elif action.action_type == 'open_app':
     app_name = action.app_name
@@ -214,17 +249,27 @@ def execute_adb_action(
       raise ValueError('No app name provided')
 
   elif action.action_type == 'wait':
-    time.sleep(1.0)
+    _wait(env, action.action_type, _observe(env, action_waits.ui_changed), 1.0)
 
   elif action.action_type == 'launch_adb_activity':
     if action.activity_nickname == 'app_drawer':
+      at_home = _observe(
+          env,
+          lambda c: action_waits.any_of(
+              action_waits.activity_changed(c), action_waits.ui_changed(c)
+          ),
+      )
       adb_utils.press_home_button(env)
-      time.sleep(1.0)
+      _wait(env, action.action_type, at_home, 1.0)
       start_x, start_y = int(screen_size[0] / 2), int(screen_size[1] * 0.9)
       end_x = start_x
       end_y = int(0.3 * screen_size[1])
       request = adb_utils.generate_swipe_command(start_x, start_y, end_x, end_y)
-      adb_utils.issue_generic_request(request, env)
+      _perform_gesture(
+          env,
+          gestures.line((start_x, start_y), (end_x, end_y), gestures.SCROLL),
+          request,
+      )
     elif action.activity_nickname == 'quick_settings':
       start_x, start_y = int(screen_size[0] / 2), 30
       end_x = start_x
@@ -232,7 +277,11 @@ def execute_adb_action(
       request = adb_utils.generate_swipe_command(
           start_x, start_y, end_x, end_y, duration_ms=10
       )
-      adb_utils.issue_generic_request(request, env)
+      _perform_gesture(
+          env,
+          gestures.line((start_x, start_y), (end_x, end_y), gestures.FLING),
+          request,
+      )
   elif action.action_type == 'change_orientation':
     adb_utils.change_orientation(action.orientation, env)
   elif action.action_type == json_action.UNKNOWN:
@@ -241,6 +290,73 @@ def execute_adb_action(
     print('Invalid action type')
 
 
+def _perform_gesture(
+    env: env_interface.AndroidEnvInterface,
+    stroke: gestures.Stroke,
+    command: list[str],
+    prelude: Sequence[list[str]] = (),
+) -> None:
+  """Performs a scroll, swipe or drag.
+
+  If `env` has a gesture backend, `stroke` is compiled into a script that also
+  runs `prelude`, in one round trip. Otherwise the `prelude` requests and
+  `command`, the equivalent `input` request, are issued one by one.
+
+  Args:
+    env: The environment.
+    stroke: The gesture.
+    command: adb arguments of the equivalent `input` request.
+    prelude: adb `shell` requests to issue before the gesture.
+  """
+  if gestures.backend_for(env) is None:
+    for request in prelude:
+      adb_utils.issue_generic_request(request, env)
+    adb_utils.issue_generic_request(command, env)
+    return
+  gestures.perform(
+      [stroke],
+      env,
+      prelude=[' '.join(request[1:]) for request in prelude],
+  )
+
+
+def _observe(
+    env: env_interface.AndroidEnvInterface,
+    make_condition: Callable[[Any], action_waits.Condition],
+) -> Optional[action_waits.Condition]:
+  """Takes the baseline of a condition before an action; see action_waits.
+
+  Args:
+    env: The environment the action is executed in.
+    make_condition: Creates the condition from a controller.
+
+  Returns:
+    The condition, or None if `env` cannot be observed and waits should fall
+    back to sleeping.
+  """
+  if not isinstance(env, android_world_controller.AndroidWorldController):
+    return None
+  return make_condition(env)
+
+
+def _wait(
+    env: env_interface.AndroidEnvInterface,
+    action_type: str,
+    condition: Optional[action_waits.Condition],
+    timeout_sec: float,
+) -> None:
+  """Waits until `condition` holds, for at most `timeout_sec`."""
+  if condition is None:
+    time.sleep(timeout_sec)
+    return
+  action_waits.wait_until(
+      condition,
+      timeout_sec,
+      stats=action_waits.stats_for(env),
+      action_type=action_type,
+  )
+
+
 def find_and_click_element(
     element_text: str,
     env: android_world_controller.AndroidWorldController,
@@ -255,76 +371,71 @@ def find_and_click_element(
       element to tap.
   """
   # Find text.
-  action = _wait_and_find_click_element(element_text, env, case_sensitive)
+  action, ui_elements = _wait_for_element(element_text, env, case_sensitive)
 
-  ui_elements = env.get_ui_elements()
   screen_size = (0, 0)  # Unused, but required.
   execute_adb_action(action, ui_elements, screen_size, env)
 
 
-def _wait_and_find_click_element(
+# Polling for an element starts fast and backs off while the screen loads.
+_FIND_ELEMENT_SCHEDULE = ui_stability.PollingSchedule(
+    initial_interval=0.05, max_interval=0.5
+)
+_FIND_ELEMENT_TIMEOUT_SEC = 10.0
+
+
+def _wait_for_element(
     target_text: str,
     env: android_world_controller.AndroidWorldController,
     case_sensitive: bool,
     dist_threshold: int = 1,  # Allow one character difference.
-) -> json_action.JSONAction:
-  """Wait for the screen to update until "element_text" appears."""
-  ui_elements = env.get_ui_elements()
-  element, distance = _find_target_element(
-      ui_elements, target_text, case_sensitive
-  )
-  start = time.time()
-  current = time.time()
-  while current - start < 10:
-    if distance <= dist_threshold:
-      return json_action.JSONAction(action_type='click', index=element)
+    timeout_sec: float = _FIND_ELEMENT_TIMEOUT_SEC,
+) -> tuple[json_action.JSONAction, list[representation_utils.UIElement]]:
+  """Waits until "element_text" appears; returns a click on it.
+
+  Args:
+    target_text: Text of the UI element to find.
+    env: The Android env instance.
+    case_sensitive: Whether matching is case sensitive.
+    dist_threshold: Maximum edit distance for text to match.
+    timeout_sec: How long to wait for the element to appear.
+
+  Returns:
+    The click action and the UI elements its index refers to.
+
+  Raises:
+    ValueError: If no matching element appeared in time.
+  """
+  found = []
+
+  def element_found() -> bool:
     ui_elements = env.get_ui_elements()
     element, distance = _find_target_element(
-        ui_elements, target_text, case_sensitive
+        ui_elements, target_text, case_sensitive, dist_threshold
     )
-    current = time.time()
-  raise ValueError(f'Target text "{target_text}" not found.')
+    if distance > dist_threshold:
+      return False
+    found.append((
+        json_action.JSONAction(action_type='click', index=element),
+        ui_elements,
+    ))
+    return True
+
+  action_waits.wait_until(
+      element_found, timeout_sec, schedule=_FIND_ELEMENT_SCHEDULE
+  )
+  if not found:
+    raise ValueError(f'Target text "{target_text}" not found.')
+  return found[0]
 
 
 def _find_target_element(
     ui_elements: list[representation_utils.UIElement],
     target_text: str,
     case_sensitive: bool,
+    max_distance: Optional[int] = None,
 ) -> tuple[int, int]:
   """Determine the UI element with the closest match to target_text, by looking at the `text` and `content_description` of each UI element."""
-  best_match_index = -1
-  lowest_distance = int(1e9)
-
-  for i, element in enumerate(ui_elements):
-    for attr in [element.text, element.content_description]:
-      if attr is not None:
-        if case_sensitive:
-          distance = _levenshtein_distance(target_text, attr)
-        else:
-          distance = _levenshtein_distance(target_text.lower(), attr.lower())
-        if distance < lowest_distance:
-          lowest_distance = distance
-          best_match_index = i
-
-  return (best_match_index, lowest_distance)
-
-
-def _levenshtein_distance(s1: str, s2: str) -> int:
-  """Compute the Levenshtein distance between two strings."""
-  if len(s1) < len(s2):
-    s1, s2 = s2, s1
-
-  if not s2:
-    return len(s1)
-
-  previous_row = range(len(s2) + 1)
-  for i, c1 in enumerate(s1):
-    current_row = [i + 1]
-    for j, c2 in enumerate(s2):
-      insertions = previous_row[j + 1] + 1
-      deletions = current_row[j] + 1
-      substitutions = previous_row[j] + (c1 != c2)
-      current_row.append(min(insertions, deletions, substitutions))
-    previous_row = current_row
-
-  return previous_row[-1]
+  return element_index.FuzzyElementIndex(ui_elements, case_sensitive).find(
+      target_text, max_distance
+  )
@@ -18,53 +18,45 @@ from unittest import mock
 
 from absl.testing import absltest
 from android_env import env_interface
+from android_world.env import action_waits
 from android_world.env import actuation
 from android_world.env import adb_utils
 from android_world.env import android_world_controller
+from android_world.env import element_index
+from android_world.env import gestures
 from android_world.env import json_action
 from android_world.env import representation_utils
 
 
 @mock.patch.object(time, 'sleep')
-@mock.patch.object(actuation, '_find_target_element')
-@mock.patch.object(android_world_controller, 'get_a11y_tree')
-@mock.patch.object(representation_utils, 'forest_to_ui_elements')
-class TestWaitAndFindClickElement(absltest.TestCase):
-
-  def test_element_found_immediately(
-      self,
-      unused_mock_representation_utils,
-      unused_mock_get_a11y_tree,
-      mock_create,
-      mock_sleep,
-  ):
+@mock.patch.object(element_index.FuzzyElementIndex, 'find')
+class TestWaitForElement(absltest.TestCase):
+
+  def test_element_found_immediately(self, mock_find, mock_sleep):
     """Test when the element is found immediately."""
-    mock_create.return_value = (0, 0)
-    mock_sleep.side_effect = [0, 1]
-    action = actuation._wait_and_find_click_element(
-        'target', mock.MagicMock(), case_sensitive=True
+    mock_find.return_value = (0, 0)
+    env = mock.MagicMock()
+    env.get_ui_elements.return_value = [representation_utils.UIElement()]
+    action, ui_elements = actuation._wait_for_element(
+        'target', env, case_sensitive=True
     )
     self.assertEqual(
         action, json_action.JSONAction(action_type='click', index=0)
     )
+    self.assertIs(ui_elements, env.get_ui_elements.return_value)
+    mock_sleep.assert_not_called()
 
-  def test_element_not_found_within_timeout(
-      self,
-      unused_mock_representation_utils,
-      unused_mock_get_a11y_tree,
-      mock_create,
-      mock_sleep,
-  ):
+  def test_element_not_found_within_timeout(self, mock_find, mock_sleep):
     """Test when the element is not found within the timeout period."""
-    mock_create.return_value = (-1, float('inf'))
-    mock_sleep.side_effect = (
-        0,
-        11,
-    )  # Simulating 11 seconds have passed
+    del mock_sleep  # Unused.
+    mock_find.return_value = (-1, float('inf'))
+    env = mock.MagicMock()
     with self.assertRaises(ValueError):
-      actuation._wait_and_find_click_element(
-          'target', mock.MagicMock(), case_sensitive=True
+      actuation._wait_for_element(
+          'target', env, case_sensitive=True, timeout_sec=0.3
       )
+    # Polling backs off instead of refetching the UI in a hot loop.
+    self.assertBetween(env.get_ui_elements.call_count, 2, 6)
 
 
 class TestCreateReferredClickAction(absltest.TestCase):
@@ -223,6 +215,26 @@ class ExecuteAdbActionTest(absltest.TestCase):
           'command', self.mock_env
       )
 
+  def test_scroll_with_gesture_backend_is_one_script(self):
+    controller = mock.create_autospec(
+        android_world_controller.AndroidWorldController, instance=True
+    )
+    controller.gesture_backend = gestures.GestureBackend.MOTIONEVENT
+    action = json_action.JSONAction(action_type='scroll', direction='down')
+
+    with mock.patch.object(
+        adb_utils, 'issue_generic_request'
+    ) as mock_issue_generic_request:
+      actuation.execute_adb_action(
+          action, self.screen_elements, self.screen_size, controller
+      )
+
+    mock_issue_generic_request.assert_called_once()
+    (args, _), _ = mock_issue_generic_request.call_args
+    self.assertEqual(args[0], 'shell')
+    self.assertStartsWith(args[1], 'input motionevent DOWN 50 50 && ')
+    self.assertEndsWith(args[1], 'input motionevent UP 50 0')
+
   def test_swipe(self):
     action = json_action.JSONAction(action_type='swipe', direction='up')
     with (
@@ -304,6 +316,22 @@ class ExecuteAdbActionTest(absltest.TestCase):
       )
       mock_sleep.assert_called_once_with(1.0)
 
+  def test_wait_returns_once_ui_changes(self):
+    controller = mock.create_autospec(
+        android_world_controller.AndroidWorldController, instance=True
+    )
+    controller.get_ui_fingerprint.side_effect = [1, 2]
+    controller.wait_stats = action_waits.WaitStats()
+    action = json_action.JSONAction(action_type='wait')
+
+    with mock.patch.object(time, 'sleep') as mock_sleep:
+      actuation.execute_adb_action(
+          action, self.screen_elements, self.screen_size, controller
+      )
+
+    mock_sleep.assert_not_called()
+    self.assertEqual(controller.wait_stats.as_dict()['wait']['timeouts'], 0)
+
   def test_unknown_action(self):
     action = json_action.JSONAction(action_type=json_action.UNKNOWN)
     actuation.execute_adb_action(
@@ -0,0 +1,191 @@
+# Copyright 2025 The android_world Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""An asyncio facade over adb_utils.
+
+adb_utils functions block until adb answers, so independent queries issued
+one after another take the sum of their latencies. AsyncAdb runs them in a
+thread pool owned by the device, so that they can be awaited concurrently and
+take the latency of the slowest one instead:
+
+  adb = AsyncAdb(controller)
+  activity, geometry = await asyncio.gather(
+      adb.get_current_activity(), adb.get_device_geometry()
+  )
+
+The pool's size bounds how many adb calls run against the device at once.
+Calls that time out raise TimeoutError and are cancelled if they have not
+started; a call that already started cannot be interrupted, and keeps its
+worker until adb returns, so the concurrency limit still holds.
+
+Coroutines never block the event loop, which makes them safe to use from the
+FastAPI server.
+"""
+
+import asyncio
+from collections.abc import Collection
+import concurrent.futures
+import functools
+from typing import Any, Callable, Optional, TypeVar
+
+from android_env import env_interface
+from android_env.proto import adb_pb2
+from android_world.env import adb_utils
+
+T = TypeVar('T')
+
+_DEFAULT_MAX_CONCURRENCY = 4
+_DEFAULT_TIMEOUT_SEC = 10.0
+
+
+class AsyncAdb:
+  """Runs adb_utils queries for one device without blocking the event loop."""
+
+  def __init__(
+      self,
+      env: env_interface.AndroidEnvInterface,
+      max_concurrency: int = _DEFAULT_MAX_CONCURRENCY,
+      timeout_sec: Optional[float] = _DEFAULT_TIMEOUT_SEC,
+  ):
+    """Initializes the facade.
+
+    Args:
+      env: The device's environment; usually an AndroidWorldController.
+      max_concurrency: Maximum number of calls running against the device at
+        once. Further calls wait for a free slot.
+      timeout_sec: Default timeout for a call, including the time it waits for
+        a slot. None waits indefinitely.
+    """
+    if max_concurrency < 1:
+      raise ValueError('max_concurrency must be at least 1.')
+    self._env = env
+    self._timeout_sec = timeout_sec
+    self._executor = concurrent.futures.ThreadPoolExecutor(
+        max_workers=max_concurrency, thread_name_prefix='adb-async'
+    )
+
+  @property
+  def env(self) -> env_interface.AndroidEnvInterface:
+    return self._env
+
+  async def run(
+      self,
+      fn: Callable[..., T],
+      *args: Any,
+      timeout_sec: Optional[float] = None,
+      **kwargs: Any,
+  ) -> T:
+    """Runs a blocking function in the device's thread pool.
+
+    Args:
+      fn: The function to run.
+      *args: Positional arguments for `fn`.
+      timeout_sec: Timeout for this call; defaults to the facade's timeout.
+      **kwargs: Keyword arguments for `fn`.
+
+    Returns:
+      What `fn` returns.
+
+    Raises:
+      TimeoutError: If the call did not finish in time.
+    """
+    if timeout_sec is None:
+      timeout_sec = self._timeout_sec
+    loop = asyncio.get_running_loop()
+    future = loop.run_in_executor(
+        self._executor, functools.partial(fn, *args, **kwargs)
+    )
+    return await asyncio.wait_for(future, timeout_sec)
+
+  async def call(
+      self, fn: Callable[..., T], *args: Any, **kwargs: Any
+  ) -> T:
+    """Runs an adb_utils function, passing the device as its `env` argument.
+
+    Example:
+      await adb.call(adb_utils.launch_app, 'clock')
+
+    Args:
+      fn: An adb_utils function with an `env` parameter.
+      *args: Positional arguments for `fn`, other than `env`.
+      **kwargs: Keyword arguments for `fn`, other than `env`.
+
+    Returns:
+      What `fn` returns.
+    """
+    return await self.run(fn, *args, env=self._env, **kwargs)
+
+  async def gather(self, **calls: Callable[..., Any]) -> dict[str, Any]:
+    """Runs several adb_utils queries concurrently.
+
+    Example:
+      await adb.gather(
+          activity=adb_utils.get_current_activity,
+          airplane_mode=adb_utils.check_airplane_mode,
+      )
+
+    Args:
+      **calls: adb_utils functions that take only the device as `env`.
+
+    Returns:
+      The result of each call, under the same name.
+    """
+    results = await asyncio.gather(*(self.call(fn) for fn in calls.values()))
+    return dict(zip(calls, results))
+
+  async def issue_generic_request(
+      self,
+      args: Collection[str] | str,
+      timeout_sec: Optional[float] = None,
+  ) -> adb_pb2.AdbResponse:
+    """See adb_utils.issue_generic_request."""
+    if timeout_sec is None:
+      timeout_sec = self._timeout_sec
+    return await self.run(
+        adb_utils.issue_generic_request,
+        args,
+        self._env,
+        timeout_sec,
+        timeout_sec=timeout_sec,
+    )
+
+  async def get_current_activity(self) -> Optional[str]:
+    """See adb_utils.get_current_activity; returns only the activity."""
+    activity, _ = await self.call(adb_utils.get_current_activity)
+    return activity
+
+  async def get_screen_size(self) -> tuple[int, int]:
+    return await self.call(adb_utils.get_screen_size)
+
+  async def get_logical_screen_size(self) -> tuple[int, int]:
+    return await self.call(adb_utils.get_logical_screen_size)
+
+  async def get_orientation(self) -> int:
+    return await self.call(adb_utils.get_orientation)
+
+  async def get_physical_frame_boundary(self) -> tuple[int, int, int, int]:
+    return await self.call(adb_utils.get_physical_frame_boundary)
+
+  async def get_device_geometry(self) -> adb_utils.DeviceGeometry:
+    return await self.call(adb_utils.get_device_geometry)
+
+  async def check_airplane_mode(self) -> bool:
+    return await self.call(adb_utils.check_airplane_mode)
+
+  async def get_all_settings(self) -> dict[str, Any]:
+    return await self.call(adb_utils.get_all_settings)
+
+  def close(self) -> None:
+    """Stops accepting calls; running calls are left to finish."""
+    self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,128 @@
+# Copyright 2025 The android_world Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+import threading
+import time
+from unittest import mock
+
+from absl.testing import absltest
+from android_env import env_interface
+from android_world.env import adb_async
+from android_world.env import adb_utils
+
+_LATENCY_SEC = 0.2
+
+
+class _SlowQueries:
+  """Blocking queries that each take _LATENCY_SEC."""
+
+  def __init__(self):
+    self._lock = threading.Lock()
+    self.running = 0
+    self.max_running = 0
+
+  def query(self, value, env=None):
+    del env
+    with self._lock:
+      self.running += 1
+      self.max_running = max(self.max_running, self.running)
+    time.sleep(_LATENCY_SEC)
+    with self._lock:
+      self.running -= 1
+    return value
+
+
+class AsyncAdbTest(absltest.TestCase):
+
+  def setUp(self):
+    super().setUp()
+    self.env = mock.create_autospec(env_interface.AndroidEnvInterface)
+    self.queries = _SlowQueries()
+
+  def _adb(self, **kwargs):
+    adb = adb_async.AsyncAdb(self.env, **kwargs)
+    self.addCleanup(adb.close)
+    return adb
+
+  def test_independent_queries_run_concurrently(self):
+    adb = self._adb(max_concurrency=4)
+
+    async def run():
+      return await asyncio.gather(
+          *(adb.run(self.queries.query, i) for i in range(4))
+      )
+
+    start = time.perf_counter()
+    results = asyncio.run(run())
+    elapsed = time.perf_counter() - start
+
+    self.assertEqual(results, [0, 1, 2, 3])
+    self.assertEqual(self.queries.max_running, 4)
+    self.assertLess(elapsed, 2 * _LATENCY_SEC)
+
+  def test_concurrency_is_limited_per_device(self):
+    adb = self._adb(max_concurrency=1)
+
+    async def run():
+      return await asyncio.gather(
+          *(adb.run(self.queries.query, i) for i in range(3))
+      )
+
+    start = time.perf_counter()
+    asyncio.run(run())
+
+    self.assertEqual(self.queries.max_running, 1)
+    self.assertGreaterEqual(time.perf_counter() - start, 3 * _LATENCY_SEC)
+
+  def test_timeout_raises(self):
+    adb = self._adb(timeout_sec=0.05)
+
+    with self.assertRaises(TimeoutError):
+      asyncio.run(adb.run(self.queries.query, 1))
+
+  def test_call_passes_env(self):
+    adb = self._adb()
+    query = mock.Mock(return_value='result')
+
+    result = asyncio.run(adb.call(query, 'arg'))
+
+    self.assertEqual(result, 'result')
+    query.assert_called_once_with('arg', env=self.env)
+
+  def test_gather_returns_results_by_name(self):
+    adb = self._adb()
+
+    result = asyncio.run(
+        adb.gather(
+            airplane_mode=mock.Mock(return_value=True),
+            rotation=mock.Mock(return_value=1),
+        )
+    )
+
+    self.assertEqual(result, {'airplane_mode': True, 'rotation': 1})
+
+  @mock.patch.object(adb_utils, 'get_current_activity')
+  def test_get_current_activity(self, mock_get_current_activity):
+    mock_get_current_activity.return_value = ('com.app/.Main', None)
+    adb = self._adb()
+
+    activity = asyncio.run(adb.get_current_activity())
+
+    self.assertEqual(activity, 'com.app/.Main')
+    mock_get_current_activity.assert_called_once_with(env=self.env)
+
+
+if __name__ == '__main__':
+  absltest.main()
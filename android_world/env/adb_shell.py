@@ -0,0 +1,282 @@
+# Copyright 2025 The android_world Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""A long-lived `adb shell` session that runs many commands.
+
+Each `adb shell <command>` call spawns an adb client process and a shell on the
+device, which usually costs more than the command itself. A PersistentShell
+keeps one `adb shell` process open and writes commands to its stdin. After each
+command it echoes a unique marker followed by the exit code, so the output of
+a command is everything read before its marker.
+
+If the session dies or a command times out, the process is killed and a new
+one is started for the next command. `execute` returns None when the command
+could not be sent to the session, and callers then use a regular adb call
+instead; see adb_utils.issue_generic_request. Once a command was sent, it may
+have run, so a timeout or a session dying raises instead of falling back,
+which would run commands such as `input text` twice.
+"""
+
+from collections.abc import Sequence
+import dataclasses
+import subprocess
+import threading
+import time
+from typing import Callable, Optional
+import uuid
+
+from absl import logging
+from android_env.components import errors
+from android_env.proto import adb_pb2
+
+_DEFAULT_TIMEOUT_SEC = 60.0
+
+_MARKER_PREFIX = '__android_world_'
+
+# After the session fails to start, wait this long before trying again.
+_RESTART_BACKOFF_SEC = 10.0
+
+
+@dataclasses.dataclass
+class ShellStats:
+  """Counters for a PersistentShell.
+
+  Attributes:
+    commands: Commands run in the session.
+    fallbacks: Commands that could not be sent to the session, left to the
+      caller.
+    starts: Times the adb shell process was started; more than one means the
+      session reconnected.
+    timeouts: Commands that timed out, which restarts the session.
+  """
+
+  commands: int = 0
+  fallbacks: int = 0
+  starts: int = 0
+  timeouts: int = 0
+
+
+class SessionError(Exception):
+  """The session died or timed out; the command's outcome is unknown."""
+
+
+class CommandNotSentError(SessionError):
+  """The session could not start or take the command, so it did not run."""
+
+
+class PersistentShell:
+  """Runs shell commands on a device through one `adb shell` process."""
+
+  def __init__(
+      self,
+      command: Sequence[str],
+      default_timeout_sec: float = _DEFAULT_TIMEOUT_SEC,
+      clock: Callable[[], float] = time.monotonic,
+  ):
+    """Initializes the shell; the process is started on first use.
+
+    Args:
+      command: Command that starts an interactive shell, e.g. `adb -s
+        emulator-5554 shell`.
+      default_timeout_sec: Timeout for commands issued without one.
+      clock: Monotonic clock; injectable for tests.
+    """
+    self._command = list(command)
+    self._default_timeout_sec = default_timeout_sec
+    self._clock = clock
+    self.stats = ShellStats()
+
+    self._lock = threading.Lock()
+    self._process: Optional[subprocess.Popen[bytes]] = None
+    self._output = bytearray()
+    self._eof = False
+    self._output_changed = threading.Condition()
+    self._next_start_time = float('-inf')
+
+  @classmethod
+  def for_adb(cls, adb_command_prefix: Sequence[str], **kwargs):
+    """Returns a shell for the device that `adb_command_prefix` addresses.
+
+    Args:
+      adb_command_prefix: The adb invocation, e.g. `adb -P 5037 -s
+        emulator-5554`.
+      **kwargs: Passed to the constructor.
+    """
+    return cls([*adb_command_prefix, 'shell'], **kwargs)
+
+  def execute(
+      self, args: Sequence[str], timeout_sec: Optional[float] = None
+  ) -> Optional[adb_pb2.AdbResponse]:
+    """Runs `adb shell <args>` in the session.
+
+    Args:
+      args: Arguments after `shell`; joined with spaces, as adb does.
+      timeout_sec: Timeout for the command.
+
+    Returns:
+      The response, as for a GenericRequest, or None if the command could not
+      be sent to the session and the caller should issue it some other way.
+
+    Raises:
+      errors.AdbControllerError: If the command exited with a non-zero status,
+        timed out, or the session died after the command was sent, as for a
+        GenericRequest.
+    """
+    command = ' '.join(args)
+    try:
+      exit_code, output = self.run(command, timeout_sec)
+    except CommandNotSentError as e:
+      logging.warning('Persistent adb shell failed (%s); falling back.', e)
+      self.stats.fallbacks += 1
+      return None
+    except SessionError as e:
+      raise errors.AdbControllerError(
+          f'Error executing adb command: [adb shell {command}]\n{e}'
+      ) from e
+    if exit_code != 0:
+      raise errors.AdbControllerError(
+          f'Error executing adb command: [adb shell {command}]\n'
+          f'Exit code: {exit_code}\n'
+          f'adb stdout: [{output}]'
+      )
+    return adb_pb2.AdbResponse(
+        status=adb_pb2.AdbResponse.Status.OK,
+        generic=adb_pb2.AdbResponse.GenericResponse(output=output),
+    )
+
+  def run(
+      self, command: str, timeout_sec: Optional[float] = None
+  ) -> tuple[int, bytes]:
+    """Runs a shell command and returns its exit code and combined output.
+
+    Args:
+      command: The command line.
+      timeout_sec: Timeout for the command.
+
+    Returns:
+      The exit code and the output, with stderr merged into stdout.
+
+    Raises:
+      CommandNotSentError: If the command could not be sent to the session.
+      SessionError: If the command timed out or the session died after it was
+        sent; the command may have run.
+    """
+    if timeout_sec is None:
+      timeout_sec = self._default_timeout_sec
+    token = uuid.uuid4().hex
+    marker = f'{_MARKER_PREFIX}{token}__:'.encode()
+    # The subshell keeps `exit` and `cd` from affecting the session, and stdin
+    # is closed so commands cannot read the following commands. The marker is
+    # split by quotes so that the script itself never contains it.
+    script = (
+        f'( {command}\n) </dev/null 2>&1;'
+        f' echo "{_MARKER_PREFIX}""{token}__:$?"\n'
+    )
+    with self._lock:
+      self._ensure_started()
+      self.stats.commands += 1
+      try:
+        self._process.stdin.write(script.encode())
+        self._process.stdin.flush()
+      except OSError as e:
+        self._stop()
+        raise CommandNotSentError(f'Could not write to adb shell: {e}') from e
+      return self._read_until(marker, self._clock() + timeout_sec)
+
+  def _read_until(self, marker: bytes, deadline: float) -> tuple[int, bytes]:
+    """Reads output up to and including `marker` and the exit code after it."""
+    with self._output_changed:
+      while True:
+        index = self._output.find(marker)
+        if index != -1:
+          end = self._output.find(b'\n', index)
+          if end != -1:
+            output = bytes(self._output[:index])
+            exit_code = int(self._output[index + len(marker) : end])
+            del self._output[: end + 1]
+            return exit_code, output
+        if self._eof:
+          self._stop()
+          raise SessionError('adb shell exited.')
+        remaining = deadline - self._clock()
+        if remaining <= 0:
+          self.stats.timeouts += 1
+          self._stop()
+          raise SessionError('Command timed out.')
+        self._output_changed.wait(remaining)
+
+  def _ensure_started(self) -> None:
+    if self._process is not None and self._process.poll() is None:
+      return
+    self._stop()
+    if self._clock() < self._next_start_time:
+      raise CommandNotSentError('adb shell failed to start recently.')
+    try:
+      self._process = subprocess.Popen(
+          self._command,
+          stdin=subprocess.PIPE,
+          stdout=subprocess.PIPE,
+          stderr=subprocess.STDOUT,
+      )
+    except OSError as e:
+      self._next_start_time = self._clock() + _RESTART_BACKOFF_SEC
+      raise CommandNotSentError(f'Could not start adb shell: {e}') from e
+    self.stats.starts += 1
+    with self._output_changed:
+      self._output.clear()
+      self._eof = False
+    threading.Thread(
+        target=self._read_output,
+        args=(self._process,),
+        name='adb-shell-reader',
+        daemon=True,
+    ).start()
+
+  def _read_output(self, process: subprocess.Popen[bytes]) -> None:
+    with process.stdout:
+      while True:
+        try:
+          chunk = process.stdout.read1(65536)
+        except (OSError, ValueError):
+          chunk = b''
+        with self._output_changed:
+          if process is not self._process:
+            return
+          if chunk:
+            self._output += chunk
+          else:
+            self._eof = True
+          self._output_changed.notify_all()
+        if not chunk:
+          return
+
+  def _stop(self) -> None:
+    process = self._process
+    if process is None:
+      return
+    with self._output_changed:
+      self._process = None
+      self._output.clear()
+      self._eof = False
+    if process.poll() is None:
+      process.kill()
+    process.wait()
+    try:
+      process.stdin.close()
+    except OSError:
+      pass
+
+  def close(self) -> None:
+    with self._lock:
+      self._stop()
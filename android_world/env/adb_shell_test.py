@@ -0,0 +1,122 @@
+# Copyright 2025 The android_world Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from unittest import mock
+
+from absl.testing import absltest
+from android_env.components import errors
+from android_world.env import adb_shell
+from android_world.env import adb_utils
+
+
+# A local shell stands in for `adb shell`; the protocol is the same.
+_LOCAL_SHELL = ['sh']
+
+
+class PersistentShellTest(absltest.TestCase):
+
+  def setUp(self):
+    super().setUp()
+    self.shell = adb_shell.PersistentShell(_LOCAL_SHELL)
+    self.addCleanup(self.shell.close)
+
+  def test_run_returns_exit_code_and_output(self):
+    self.assertEqual(
+        self.shell.run('echo out; echo err >&2'), (0, b'out\nerr\n')
+    )
+    self.assertEqual(self.shell.run('printf partial'), (0, b'partial'))
+    self.assertEqual(self.shell.run('exit 3'), (3, b''))
+    self.assertEqual(self.shell.stats.starts, 1)
+
+  def test_commands_do_not_affect_session(self):
+    cwd = self.shell.run('pwd')[1]
+    self.shell.run('cd /tmp; FOO=bar')
+
+    self.assertEqual(self.shell.run('echo "$FOO"; pwd')[1], b'\n' + cwd)
+
+  def test_execute(self):
+    response = self.shell.execute(['echo', 'hello', 'world'])
+
+    self.assertEqual(response.generic.output, b'hello world\n')
+
+  def test_execute_failed_command_raises(self):
+    with self.assertRaises(errors.AdbControllerError):
+      self.shell.execute(['false'])
+
+  def test_timeout_raises_and_restarts_session(self):
+    with self.assertRaisesRegex(errors.AdbControllerError, 'timed out'):
+      self.shell.execute(['sleep', '5'], timeout_sec=0.1)
+    self.assertEqual(self.shell.run('echo ok'), (0, b'ok\n'))
+
+    self.assertEqual(self.shell.stats.timeouts, 1)
+    self.assertEqual(self.shell.stats.fallbacks, 0)
+    self.assertEqual(self.shell.stats.starts, 2)
+
+  def test_reconnects_after_session_dies(self):
+    self.shell.run('true')
+    self.shell._process.kill()
+    self.shell._process.wait()
+
+    self.assertEqual(self.shell.run('echo ok'), (0, b'ok\n'))
+    self.assertEqual(self.shell.stats.starts, 2)
+
+  def test_unavailable_shell_falls_back(self):
+    shell = adb_shell.PersistentShell(['/nonexistent/adb', 'shell'])
+
+    self.assertIsNone(shell.execute(['ls']))
+    self.assertIsNone(shell.execute(['ls']))
+    self.assertEqual(shell.stats.fallbacks, 2)
+
+
+class IssueGenericRequestTest(absltest.TestCase):
+
+  def setUp(self):
+    super().setUp()
+    self.env = mock.MagicMock()
+    self.env.persistent_shell = adb_shell.PersistentShell(_LOCAL_SHELL)
+    self.addCleanup(self.env.persistent_shell.close)
+
+  def test_shell_commands_use_persistent_shell(self):
+    response = adb_utils.issue_generic_request(
+        ['shell', 'echo', 'hi'], self.env
+    )
+
+    self.assertEqual(response.generic.output, b'hi\n')
+    self.env.execute_adb_call.assert_not_called()
+
+  def test_timed_out_command_is_not_sent_again(self):
+    with self.assertRaises(errors.AdbControllerError):
+      adb_utils.issue_generic_request(
+          ['shell', 'sleep', '5'], self.env, timeout_sec=0.1
+      )
+
+    self.env.execute_adb_call.assert_not_called()
+
+  def test_unavailable_shell_falls_back_to_adb(self):
+    self.env.persistent_shell = adb_shell.PersistentShell(
+        ['/nonexistent/adb', 'shell']
+    )
+
+    adb_utils.issue_generic_request(['shell', 'ls'], self.env)
+
+    self.env.execute_adb_call.assert_called_once()
+
+  def test_other_commands_use_adb(self):
+    adb_utils.issue_generic_request('exec-out screencap', self.env)
+
+    self.env.execute_adb_call.assert_called_once()
+
+
+if __name__ == '__main__':
+  absltest.main()
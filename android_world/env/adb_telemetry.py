@@ -0,0 +1,320 @@
+# Copyright 2025 The android_world Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Latency telemetry for adb calls.
+
+AndroidWorldController passes every adb call through an AdbTelemetry, which
+tags it with a command family, e.g. `shell settings`, `shell input` or `pull`,
+and the task and episode phase it was issued in:
+
+  telemetry = controller.adb_telemetry
+  with telemetry.labels(task='ContactsAddContact', phase='initialize_task'):
+    task.initialize_task(env)
+  telemetry.as_dict()['by_task']['ContactsAddContact']['initialize_task']
+
+Per family it keeps a latency histogram, the number of failures and the bytes
+sent and received. Calls slower than a threshold are also logged, and kept for
+export, to find the commands that dominate reset time.
+"""
+
+import bisect
+import collections
+from collections.abc import Callable, Iterator
+import contextlib
+import dataclasses
+import threading
+import time
+from typing import Any, Optional
+
+from absl import logging
+from android_env.proto import adb_pb2
+
+# Upper bounds of the latency histogram's buckets; the last bucket is open.
+_BUCKET_BOUNDS_MS = (
+    1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000, 30000
+)
+
+_DEFAULT_SLOW_CALL_THRESHOLD_SEC = 1.0
+_DEFAULT_MAX_SLOW_CALLS = 100
+_MAX_COMMAND_CHARS = 200
+
+# Label of calls issued outside of any task or phase.
+UNLABELED = 'unlabeled'
+
+
+class LatencyHistogram:
+  """Latencies in logarithmic buckets, from 1 ms to 30 s."""
+
+  def __init__(self):
+    self._counts = [0] * (len(_BUCKET_BOUNDS_MS) + 1)
+    self.count = 0
+    self.total_ms = 0.0
+    self.max_ms = 0.0
+
+  def add(self, latency_ms: float) -> None:
+    self._counts[bisect.bisect_left(_BUCKET_BOUNDS_MS, latency_ms)] += 1
+    self.count += 1
+    self.total_ms += latency_ms
+    self.max_ms = max(self.max_ms, latency_ms)
+
+  def percentile(self, q: float) -> float:
+    """Returns an upper bound of the `q`th percentile, in milliseconds."""
+    if not self.count:
+      return 0.0
+    rank = q / 100 * self.count
+    seen = 0
+    for bound, count in zip(_BUCKET_BOUNDS_MS, self._counts):
+      seen += count
+      if seen >= rank:
+        return min(float(bound), self.max_ms)
+    return self.max_ms
+
+  def as_dict(self) -> dict[str, Any]:
+    labels = [f'<={bound}ms' for bound in _BUCKET_BOUNDS_MS]
+    labels.append(f'>{_BUCKET_BOUNDS_MS[-1]}ms')
+    return {
+        'count': self.count,
+        'total_ms': self.total_ms,
+        'mean_ms': self.total_ms / self.count if self.count else 0.0,
+        'p50_ms': self.percentile(50),
+        'p90_ms': self.percentile(90),
+        'p99_ms': self.percentile(99),
+        'max_ms': self.max_ms,
+        'buckets': {
+            label: count
+            for label, count in zip(labels, self._counts)
+            if count
+        },
+    }
+
+
+@dataclasses.dataclass
+class CommandStats:
+  """Statistics of one command family.
+
+  Attributes:
+    calls: Number of calls.
+    failures: Calls that raised or did not return an OK status.
+    bytes_sent: Serialized size of the requests.
+    bytes_received: Serialized size of the responses.
+    latency: Latency of the calls.
+  """
+
+  calls: int = 0
+  failures: int = 0
+  bytes_sent: int = 0
+  bytes_received: int = 0
+  latency: LatencyHistogram = dataclasses.field(
+      default_factory=LatencyHistogram
+  )
+
+  def as_dict(self) -> dict[str, Any]:
+    return {
+        'calls': self.calls,
+        'failures': self.failures,
+        'bytes_sent': self.bytes_sent,
+        'bytes_received': self.bytes_received,
+        'latency': self.latency.as_dict(),
+    }
+
+
+@dataclasses.dataclass(frozen=True)
+class SlowCall:
+  """An adb call that took longer than the slow call threshold."""
+
+  family: str
+  command: str
+  latency_sec: float
+  ok: bool
+  task: str
+  phase: str
+
+
+def _shell_program(command: str) -> str:
+  if '\n' in command:
+    return 'script'
+  words = command.lstrip('( ').split(maxsplit=1)
+  return words[0] if words else ''
+
+
+def command_family(request: adb_pb2.AdbRequest) -> str:
+  """Returns the family of `request`, e.g. `shell settings` or `pull`."""
+  kind = request.WhichOneof('command')
+  if kind != 'generic':
+    return kind or 'unknown'
+  args = request.generic.args
+  if not args:
+    return 'generic'
+  if args[0] == 'shell' and len(args) > 1:
+    return f'shell {_shell_program(args[1])}'.rstrip()
+  return args[0]
+
+
+def _describe(request: adb_pb2.AdbRequest) -> str:
+  kind = request.WhichOneof('command')
+  if kind == 'generic':
+    command = ' '.join(request.generic.args)
+  elif kind in ('pull', 'push'):
+    command = f'{kind} {getattr(request, kind).path}'
+  else:
+    command = kind or 'unknown'
+  return command[:_MAX_COMMAND_CHARS]
+
+
+class AdbTelemetry:
+  """Records latency, bytes and failures of adb calls; thread safe."""
+
+  def __init__(
+      self,
+      slow_call_threshold_sec: Optional[float] = (
+          _DEFAULT_SLOW_CALL_THRESHOLD_SEC
+      ),
+      max_slow_calls: int = _DEFAULT_MAX_SLOW_CALLS,
+      clock: Callable[[], float] = time.perf_counter,
+  ):
+    """Initializes the telemetry.
+
+    Args:
+      slow_call_threshold_sec: Calls taking longer are logged and kept in
+        `slow_calls`. None disables the slow call log.
+      max_slow_calls: Number of most recent slow calls kept.
+      clock: Monotonic clock; injectable for tests.
+    """
+    self.slow_call_threshold_sec = slow_call_threshold_sec
+    self._clock = clock
+    self._lock = threading.Lock()
+    self._task = UNLABELED
+    self._phase = UNLABELED
+    self._stats: dict[tuple[str, str, str], CommandStats] = {}
+    self._slow_calls: collections.deque[SlowCall] = collections.deque(
+        maxlen=max_slow_calls
+    )
+
+  @contextlib.contextmanager
+  def labels(
+      self, task: Optional[str] = None, phase: Optional[str] = None
+  ) -> Iterator[None]:
+    """Attributes calls made in this context to `task` and `phase`.
+
+    Args:
+      task: The task; keeps the current task if None.
+      phase: The episode phase, e.g. `initialize_task`; keeps the current
+        phase if None.
+    """
+    with self._lock:
+      previous = self._task, self._phase
+      if task is not None:
+        self._task = task
+      if phase is not None:
+        self._phase = phase
+    try:
+      yield
+    finally:
+      with self._lock:
+        self._task, self._phase = previous
+
+  def record(
+      self,
+      request: adb_pb2.AdbRequest,
+      response: Optional[adb_pb2.AdbResponse],
+      latency_sec: float,
+  ) -> None:
+    """Records a call; a None `response` means that the call raised."""
+    family = command_family(request)
+    ok = (
+        response is not None
+        and response.status == adb_pb2.AdbResponse.Status.OK
+    )
+    with self._lock:
+      task, phase = self._task, self._phase
+      stats = self._stats.setdefault((task, phase, family), CommandStats())
+      stats.calls += 1
+      stats.failures += not ok
+      stats.bytes_sent += request.ByteSize()
+      if response is not None:
+        stats.bytes_received += response.ByteSize()
+      stats.latency.add(latency_sec * 1000)
+      threshold = self.slow_call_threshold_sec
+      slow = threshold is not None and latency_sec > threshold
+      if slow:
+        slow_call = SlowCall(
+            family, _describe(request), latency_sec, ok, task, phase
+        )
+        self._slow_calls.append(slow_call)
+    if slow:
+      logging.warning(
+          'Slow adb call (%.2f s, %s/%s): %s',
+          latency_sec,
+          task,
+          phase,
+          slow_call.command,
+      )
+
+  def measure(
+      self,
+      request: adb_pb2.AdbRequest,
+      call: Callable[[adb_pb2.AdbRequest], adb_pb2.AdbResponse],
+  ) -> adb_pb2.AdbResponse:
+    """Issues `request` with `call` and records it."""
+    start = self._clock()
+    response = None
+    try:
+      response = call(request)
+      return response
+    finally:
+      self.record(request, response, self._clock() - start)
+
+  @property
+  def slow_calls(self) -> list[SlowCall]:
+    with self._lock:
+      return list(self._slow_calls)
+
+  def reset(self) -> None:
+    with self._lock:
+      self._stats.clear()
+      self._slow_calls.clear()
+
+  def as_dict(self) -> dict[str, Any]:
+    """Returns the statistics and slow calls.
+
+    Statistics are under `by_task`, as {task: {phase: {family: stats}}}.
+    """
+    with self._lock:
+      by_task = {}
+      for (task, phase, family), stats in sorted(self._stats.items()):
+        by_task.setdefault(task, {}).setdefault(phase, {})[family] = (
+            stats.as_dict()
+        )
+      return {
+          'by_task': by_task,
+          'slow_calls': [
+              dataclasses.asdict(call) for call in self._slow_calls
+          ],
+      }
+
+
+def telemetry_for(env: Any) -> Optional[AdbTelemetry]:
+  """Returns the AdbTelemetry of `env`, if it keeps any."""
+  telemetry = getattr(env, 'adb_telemetry', None)
+  return telemetry if isinstance(telemetry, AdbTelemetry) else None
+
+
+def labels(
+    env: Any, task: Optional[str] = None, phase: Optional[str] = None
+) -> contextlib.AbstractContextManager[None]:
+  """Like AdbTelemetry.labels, for the telemetry of `env` if it has one."""
+  telemetry = telemetry_for(env)
+  if telemetry is None:
+    return contextlib.nullcontext()
+  return telemetry.labels(task, phase)
@@ -0,0 +1,147 @@
+# Copyright 2025 The android_world Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from unittest import mock
+
+from absl.testing import absltest
+from absl.testing import parameterized
+from android_env.proto import adb_pb2
+from android_world.env import adb_telemetry
+
+_OK = adb_pb2.AdbResponse(status=adb_pb2.AdbResponse.Status.OK)
+_ERROR = adb_pb2.AdbResponse(status=adb_pb2.AdbResponse.Status.ADB_ERROR)
+
+
+def _generic(*args: str) -> adb_pb2.AdbRequest:
+  return adb_pb2.AdbRequest(
+      generic=adb_pb2.AdbRequest.GenericRequest(args=args)
+  )
+
+
+class CommandFamilyTest(parameterized.TestCase):
+
+  @parameterized.parameters(
+      (_generic('shell', 'settings', 'put', 'global', 'x', '1'),
+       'shell settings'),
+      (_generic('shell', 'input text hello'), 'shell input'),
+      (_generic('shell', '( input tap 1 2\n) </dev/null'), 'shell script'),
+      (_generic('install', '-r', 'app.apk'), 'install'),
+      (adb_pb2.AdbRequest(pull=adb_pb2.AdbRequest.Pull(path='/sdcard/a')),
+       'pull'),
+      (adb_pb2.AdbRequest(), 'unknown'),
+  )
+  def test_command_family(self, request, family):
+    self.assertEqual(adb_telemetry.command_family(request), family)
+
+
+class LatencyHistogramTest(absltest.TestCase):
+
+  def test_percentiles_are_bucket_bounds(self):
+    histogram = adb_telemetry.LatencyHistogram()
+    for latency_ms in [3] * 9 + [700]:
+      histogram.add(latency_ms)
+
+    self.assertEqual(histogram.percentile(50), 5)
+    self.assertEqual(histogram.percentile(99), 700)
+    self.assertEqual(
+        histogram.as_dict()['buckets'], {'<=5ms': 9, '<=1000ms': 1}
+    )
+
+
+class AdbTelemetryTest(absltest.TestCase):
+
+  def test_records_per_task_phase_and_family(self):
+    telemetry = adb_telemetry.AdbTelemetry()
+    request = _generic('shell', 'pm', 'clear', 'com.app')
+
+    with telemetry.labels(task='Task', phase='initialize_task'):
+      telemetry.record(request, _OK, 0.01)
+      telemetry.record(request, _ERROR, 0.03)
+    telemetry.record(request, _OK, 0.01)
+
+    by_task = telemetry.as_dict()['by_task']
+    stats = by_task['Task']['initialize_task']['shell pm']
+    self.assertEqual(stats['calls'], 2)
+    self.assertEqual(stats['failures'], 1)
+    self.assertEqual(stats['bytes_sent'], 2 * request.ByteSize())
+    self.assertEqual(stats['latency']['max_ms'], 30)
+    unlabeled = adb_telemetry.UNLABELED
+    self.assertEqual(by_task[unlabeled][unlabeled]['shell pm']['calls'], 1)
+
+  def test_nested_labels_keep_outer_task(self):
+    telemetry = adb_telemetry.AdbTelemetry()
+
+    with telemetry.labels(task='Task'):
+      with telemetry.labels(phase='tear_down'):
+        telemetry.record(_generic('root'), _OK, 0.01)
+
+    self.assertIn('tear_down', telemetry.as_dict()['by_task']['Task'])
+
+  def test_logs_slow_calls(self):
+    telemetry = adb_telemetry.AdbTelemetry(slow_call_threshold_sec=0.5)
+
+    with self.assertLogs(level='WARNING'):
+      telemetry.record(_generic('shell', 'pm', 'list'), _OK, 0.6)
+    telemetry.record(_generic('shell', 'true'), _OK, 0.1)
+
+    self.assertEqual(
+        telemetry.slow_calls,
+        [
+            adb_telemetry.SlowCall(
+                family='shell pm',
+                command='shell pm list',
+                latency_sec=0.6,
+                ok=True,
+                task=adb_telemetry.UNLABELED,
+                phase=adb_telemetry.UNLABELED,
+            )
+        ],
+    )
+
+  def test_measure_records_raising_calls_as_failures(self):
+    clock = mock.Mock(side_effect=[1.0, 3.0])
+    telemetry = adb_telemetry.AdbTelemetry(clock=clock)
+    call = mock.Mock(side_effect=RuntimeError('adb died'))
+
+    with self.assertRaises(RuntimeError):
+      telemetry.measure(_generic('shell', 'ls'), call)
+
+    stats = telemetry.as_dict()['by_task'][adb_telemetry.UNLABELED][
+        adb_telemetry.UNLABELED
+    ]['shell ls']
+    self.assertEqual(stats['failures'], 1)
+    self.assertEqual(stats['latency']['total_ms'], 2000)
+
+  def test_reset(self):
+    telemetry = adb_telemetry.AdbTelemetry(slow_call_threshold_sec=0.0)
+    telemetry.record(_generic('root'), _OK, 0.1)
+
+    telemetry.reset()
+
+    self.assertEqual(
+        telemetry.as_dict(), {'by_task': {}, 'slow_calls': []}
+    )
+
+  def test_telemetry_for(self):
+    telemetry = adb_telemetry.AdbTelemetry()
+
+    self.assertIs(
+        adb_telemetry.telemetry_for(mock.Mock(adb_telemetry=telemetry)),
+        telemetry,
+    )
+    self.assertIsNone(adb_telemetry.telemetry_for(mock.Mock()))
+
+
+if __name__ == '__main__':
+  absltest.main()
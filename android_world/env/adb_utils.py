@@ -14,16 +14,25 @@
 
 """Utilties to interact with the environment using adb."""
 
+import base64
+import dataclasses
+import enum
 import json
 import os
 import re
+import shlex
+import threading
 import time
 from typing import Any, Callable, Collection, Iterable, Literal, Optional, TypeVar
 import unicodedata
+import uuid
+import weakref
 from absl import logging
 from android_env import env_interface
 from android_env.components import errors
 from android_env.proto import adb_pb2
+from android_world.env import adb_shell
+from android_world.env import adb_telemetry
 import immutabledict
 
 T = TypeVar('T')
@@ -274,6 +283,36 @@ def get_current_activity(
   return (activity, response)
 
 
+def is_ime_shown(
+    env: env_interface.AndroidEnvInterface,
+    timeout_sec: Optional[float] = _DEFAULT_TIMEOUT_SECS,
+) -> bool:
+  """Returns whether the soft keyboard is currently shown.
+
+  Args:
+    env: The environment.
+    timeout_sec: A timeout to use for this operation.
+  """
+  response = issue_generic_request(
+      # `|| true` because grep fails when there is no match.
+      [
+          'shell',
+          'dumpsys',
+          'input_method',
+          '|',
+          'grep',
+          'mInputShown',
+          '||',
+          'true',
+      ],
+      env,
+      timeout_sec,
+  )
+  if response.status != adb_pb2.AdbResponse.Status.OK:
+    return False
+  return b'mInputShown=true' in response.generic.output
+
+
 def tap_screen(
     x: int,
     y: int,
@@ -508,10 +547,37 @@ def _split_words_and_newlines(text: str) -> Iterable[str]:
       yield '\n'
 
 
+class TextInputMode(enum.Enum):
+  """How type_text injects text.
+
+  WORDS: One `input text` adb request per word and one ENTER press per
+    newline. Slow, but works everywhere.
+  BULK: The same `input` commands, with short runs of words merged, run as one
+    adb shell script; see CommandBatch.
+  ADB_KEYBOARD: One broadcast of the whole text to the ADBKeyBoard IME
+    (com.android.adbkeyboard), which also types non-ASCII text. Only works
+    while that IME is selected.
+
+  Text that a faster mode cannot inject falls back to the next slower mode.
+  """
+
+  WORDS = 'words'
+  BULK = 'bulk'
+  ADB_KEYBOARD = 'adb_keyboard'
+
+
+_ADB_KEYBOARD_IME = 'com.android.adbkeyboard/.AdbIME'
+
+# Longer `input text` strings are sometimes typed out of order, so BULK mode
+# merges words only up to this many characters.
+_MAX_BULK_TEXT_CHARS = 24
+
+
 def type_text(
     text: str,
     env: env_interface.AndroidEnvInterface,
     timeout_sec: Optional[float] = _DEFAULT_TIMEOUT_SECS,
+    mode: Optional[TextInputMode] = None,
 ) -> None:
   """Issues an AdbRequest to type the specified text string word-by-word.
 
@@ -525,7 +591,28 @@ def type_text(
     env: The environment.
     timeout_sec: A timeout to use for this operation. Note: For longer texts,
       this should be longer as it takes longer to type.
+    mode: How to inject the text. Defaults to `env.text_input_mode` if `env`
+      has one (see AndroidWorldController), and to WORDS otherwise.
   """
+  if mode is None:
+    mode = getattr(env, 'text_input_mode', None)
+    if not isinstance(mode, TextInputMode):
+      mode = TextInputMode.WORDS
+  if mode == TextInputMode.ADB_KEYBOARD:
+    if _type_text_adb_keyboard(text, env, timeout_sec):
+      return
+    mode = TextInputMode.BULK
+  if mode == TextInputMode.BULK:
+    text = _type_text_bulk(text, env, timeout_sec)
+  _type_text_words(text, env, timeout_sec)
+
+
+def _type_text_words(
+    text: str,
+    env: env_interface.AndroidEnvInterface,
+    timeout_sec: Optional[float],
+) -> None:
+  """Types `text` with one adb request per word."""
   words = _split_words_and_newlines(text)
   for word in words:
     if word == '\n':
@@ -545,6 +632,96 @@ def type_text(
       logging.error('Failed to type word: %r', formatted)
 
 
+def _bulk_text_segments(text: str) -> list[tuple[str, str]]:
+  """Splits `text` into (source text, shell command) pairs for BULK mode."""
+  segments = []
+  run = ''
+
+  def flush():
+    nonlocal run
+    formatted = _adb_text_format(run.replace(' ', '%s'))
+    if formatted:
+      segments.append((run, f'input text {formatted}'))
+    elif run:
+      # Nothing typeable, e.g. only non-ASCII characters.
+      segments.append((run, 'true'))
+    run = ''
+
+  for i, line in enumerate(text.split('\n')):
+    if i:
+      flush()
+      segments.append(('\n', 'input keyevent KEYCODE_ENTER'))
+    # Split before spaces, keeping them, so that runs break between words.
+    for word in re.split('(?= )', line):
+      if run and len(run) + len(word) > _MAX_BULK_TEXT_CHARS:
+        flush()
+      run += word
+  flush()
+  return segments
+
+
+def _type_text_bulk(
+    text: str,
+    env: env_interface.AndroidEnvInterface,
+    timeout_sec: Optional[float],
+) -> str:
+  """Types `text` with one adb shell script.
+
+  Args:
+    text: The text to type.
+    env: The environment.
+    timeout_sec: A timeout per segment of text.
+
+  Returns:
+    The text that could not be typed, starting at the first failed segment.
+  """
+  segments = _bulk_text_segments(text)
+  if not segments:
+    return ''
+  if timeout_sec is not None:
+    timeout_sec *= len(segments)
+  commands = batch(env, timeout_sec=timeout_sec, stop_on_error=True)
+  for _, command in segments:
+    commands.add(command)
+  for i, result in enumerate(commands.run()):
+    if not result.ok:
+      logging.warning(
+          'Bulk typing failed at %r; typing the rest word by word.',
+          segments[i][0],
+      )
+      return ''.join(source for source, _ in segments[i:])
+  return ''
+
+
+def _type_text_adb_keyboard(
+    text: str,
+    env: env_interface.AndroidEnvInterface,
+    timeout_sec: Optional[float],
+) -> bool:
+  """Types `text` with one broadcast to ADBKeyBoard; returns success."""
+  if not text:
+    return True
+  encoded = base64.b64encode(text.encode('utf-8')).decode('ascii')
+  # Checking the IME in the same script avoids a second round trip.
+  script = (
+      '[ "$(settings get secure default_input_method)" ='
+      f' {_ADB_KEYBOARD_IME} ] &&'
+      f' am broadcast -a ADB_INPUT_B64 --es msg {encoded}'
+  )
+  try:
+    response = issue_generic_request(['shell', script], env, timeout_sec)
+  except errors.AdbControllerError:
+    response = None
+  if (
+      response is None
+      or response.status != adb_pb2.AdbResponse.Status.OK
+      or b'Broadcast completed' not in response.generic.output
+  ):
+    logging.info('ADBKeyBoard is not the current IME; not using it.')
+    return False
+  return True
+
+
 def issue_generic_request(
     args: Collection[str] | str,
     env: env_interface.AndroidEnvInterface,
@@ -559,6 +736,9 @@ def issue_generic_request(
   # or
   issue_generic_request('shell ls', env)
 
+  If `env` has a persistent_shell (see AndroidWorldController), `shell`
+  commands run in that session instead of spawning a new adb process.
+
   Args:
     args: Set of arguments to be issued with the ABD broadcast. Can also be a
       string.
@@ -574,6 +754,28 @@ def issue_generic_request(
   else:
     args_str = ' '.join(args)
 
+  shell = getattr(env, 'persistent_shell', None)
+  if (
+      isinstance(shell, adb_shell.PersistentShell)
+      and len(args) > 1
+      and args[0] == 'shell'
+      and not args[1].startswith('-')
+  ):
+    start = time.perf_counter()
+    response = shell.execute(args[1:], timeout_sec)
+    if response is not None:
+      telemetry = adb_telemetry.telemetry_for(env)
+      if telemetry is not None:
+        telemetry.record(
+            adb_pb2.AdbRequest(
+                generic=adb_pb2.AdbRequest.GenericRequest(args=args),
+                timeout_sec=timeout_sec,
+            ),
+            response,
+            time.perf_counter() - start,
+        )
+      return response
+
   response = env.execute_adb_call(
       adb_pb2.AdbRequest(
           generic=adb_pb2.AdbRequest.GenericRequest(args=args),
@@ -586,6 +788,288 @@ def issue_generic_request(
   return response
 
 
+_BATCH_MARKER_PREFIX = '__android_world_batch_'
+_DEFAULT_BATCH_TIMEOUT_SECS = 60
+
+# Scripts longer than this are split across several adb invocations, to stay
+# well within the device's command line limit.
+_MAX_BATCH_SCRIPT_BYTES = 32 * 1024
+
+
+@dataclasses.dataclass(frozen=True)
+class BatchCommandResult:
+  """The outcome of one command in a CommandBatch.
+
+  Attributes:
+    command: The shell command line.
+    exit_code: The command's exit status, or None if it did not run, e.g.
+      because adb failed or an earlier command failed with stop_on_error.
+    output: The command's output, with stderr merged into stdout.
+  """
+
+  command: str
+  exit_code: Optional[int]
+  output: bytes = b''
+
+  @property
+  def ok(self) -> bool:
+    return self.exit_code == 0
+
+
+@dataclasses.dataclass(frozen=True)
+class BatchResult:
+  """The outcomes of the commands in a CommandBatch, in the order queued.
+
+  Attributes:
+    results: One result per queued command.
+    round_trips: Number of adb invocations used to run the batch.
+  """
+
+  results: tuple[BatchCommandResult, ...]
+  round_trips: int = 0
+
+  def __len__(self) -> int:
+    return len(self.results)
+
+  def __getitem__(self, index: int) -> BatchCommandResult:
+    return self.results[index]
+
+  def __iter__(self):
+    return iter(self.results)
+
+  @property
+  def failures(self) -> list[BatchCommandResult]:
+    return [result for result in self.results if not result.ok]
+
+  @property
+  def ok(self) -> bool:
+    return not self.failures
+
+  def check_ok(self, message: Optional[str] = None) -> None:
+    """Raises RuntimeError if any command failed or did not run.
+
+    Args:
+      message: Error message to raise with. If not specified, the message
+        lists the failed commands.
+
+    Raises:
+      RuntimeError: If any command failed.
+    """
+    failures = self.failures
+    if not failures:
+      return
+    if message is None:
+      details = '; '.join(
+          f'[{result.command}] exit code {result.exit_code}'
+          for result in failures
+      )
+      message = (
+          f'{len(failures)} of {len(self.results)} batched commands failed:'
+          f' {details}'
+      )
+    raise RuntimeError(message)
+
+
+class CommandBatch:
+  """Queues shell commands and runs them as one adb shell script.
+
+  Each `adb shell` call costs an adb round trip that is usually much slower
+  than the command itself. A batch runs its commands one after another in a
+  single invocation and separates their outputs with unique markers carrying
+  each exit status, so that callers still get per-command results.
+
+  Commands run in subshells with stdin closed, so `cd`, `exit` and variable
+  assignments do not affect the commands after them. Command lines are joined
+  and quoted as for `adb shell`.
+
+  Example:
+  ~~~~~~~
+
+  with adb_utils.batch(env) as commands:
+    commands.add(['am', 'stack', 'remove', '3'])
+    commands.add('settings put global auto_time 0')
+  commands.result.check_ok()
+  """
+
+  def __init__(
+      self,
+      env: env_interface.AndroidEnvInterface,
+      timeout_sec: Optional[float] = _DEFAULT_BATCH_TIMEOUT_SECS,
+      stop_on_error: bool = False,
+      max_script_bytes: int = _MAX_BATCH_SCRIPT_BYTES,
+  ):
+    """Initializes an empty batch.
+
+    Args:
+      env: The environment.
+      timeout_sec: A timeout for each adb invocation.
+      stop_on_error: Whether to skip the remaining commands after one fails.
+      max_script_bytes: Scripts longer than this are split over several adb
+        invocations.
+    """
+    self._env = env
+    self._timeout_sec = timeout_sec
+    self._stop_on_error = stop_on_error
+    self._max_script_bytes = max_script_bytes
+    self._commands: list[str] = []
+    self.result: Optional[BatchResult] = None
+
+  def __len__(self) -> int:
+    return len(self._commands)
+
+  def __enter__(self) -> 'CommandBatch':
+    return self
+
+  def __exit__(self, exc_type, exc_value, traceback) -> None:
+    if exc_type is None:
+      self.run()
+
+  def add(self, args: Collection[str] | str) -> int:
+    """Queues a shell command.
+
+    Args:
+      args: The command, i.e. the arguments after `adb shell`. Can also be a
+        string.
+
+    Returns:
+      The index of the command's result in the BatchResult.
+    """
+    command = args if isinstance(args, str) else ' '.join(args)
+    if not command.strip():
+      raise ValueError('Command must not be empty.')
+    self._commands.append(command)
+    return len(self._commands) - 1
+
+  def put_settings(
+      self,
+      namespace: adb_pb2.AdbRequest.SettingsRequest.Namespace,
+      key: str,
+      value: str,
+  ) -> int:
+    """Queues a settings change; see put_settings.
+
+    Args:
+      namespace: The namespace in which the setting resides (SYSTEM, SECURE,
+        GLOBAL).
+      key: The key of the setting to change.
+      value: The new value for the setting.
+
+    Returns:
+      The index of the command's result in the BatchResult.
+    """
+    if not key:
+      raise ValueError('Key must be provided.')
+    if not value:
+      raise ValueError('Value must be provided.')
+    name_space = adb_pb2.AdbRequest.SettingsRequest.Namespace.Name(namespace)
+    return self.add([
+        'settings',
+        'put',
+        name_space.lower(),
+        shlex.quote(key),
+        shlex.quote(value),
+    ])
+
+  def run(self) -> BatchResult:
+    """Runs the queued commands and clears the queue.
+
+    Failures of individual commands are reported in the result rather than
+    raised; see BatchResult.check_ok.
+
+    Returns:
+      The results of the commands, in the order they were queued.
+    """
+    commands, self._commands = self._commands, []
+    results = []
+    round_trips = 0
+    stopped = False
+    for chunk in self._chunks(commands):
+      if stopped:
+        results.extend(BatchCommandResult(command, None) for command in chunk)
+        continue
+      round_trips += 1
+      chunk_results = self._run_script(chunk)
+      results.extend(chunk_results)
+      if self._stop_on_error and not all(r.ok for r in chunk_results):
+        stopped = True
+    self.result = BatchResult(tuple(results), round_trips)
+    if not self.result.ok:
+      logging.warning(
+          '%d of %d batched adb commands failed.',
+          len(self.result.failures),
+          len(commands),
+      )
+    return self.result
+
+  def _chunks(self, commands: list[str]) -> Iterable[list[str]]:
+    chunk = []
+    size = 0
+    for command in commands:
+      if chunk and size + len(command) > self._max_script_bytes:
+        yield chunk
+        chunk = []
+        size = 0
+      chunk.append(command)
+      size += len(command)
+    if chunk:
+      yield chunk
+
+  def _run_script(self, commands: list[str]) -> list[BatchCommandResult]:
+    """Runs `commands` in one adb invocation and parses their results."""
+    token = uuid.uuid4().hex
+    # The marker is split by quotes so that the script itself never contains
+    # it, and the final status keeps the invocation itself successful.
+    sections = []
+    for index, command in enumerate(commands):
+      section = (
+          f'( {command}\n) </dev/null 2>&1; s=$?;'
+          f' echo "{_BATCH_MARKER_PREFIX}""{token}__:{index}:$s"'
+      )
+      if self._stop_on_error:
+        section += '; [ $s -eq 0 ] || exit 0'
+      sections.append(section)
+    script = '\n'.join(sections) + '\ntrue'
+    try:
+      response = issue_generic_request(
+          ['shell', script], self._env, self._timeout_sec
+      )
+    except errors.AdbControllerError as e:
+      logging.error('Batched adb commands failed: %s', e)
+      return [BatchCommandResult(command, None) for command in commands]
+
+    exit_codes = {}
+    outputs = {}
+    if response.status == adb_pb2.AdbResponse.Status.OK:
+      output = response.generic.output
+      marker = re.compile(
+          re.escape(f'{_BATCH_MARKER_PREFIX}{token}__:'.encode())
+          + rb'(\d+):(\d+)\r?\n?'
+      )
+      start = 0
+      for match in marker.finditer(output):
+        index = int(match.group(1))
+        exit_codes[index] = int(match.group(2))
+        outputs[index] = output[start : match.start()]
+        start = match.end()
+    return [
+        BatchCommandResult(command, exit_codes.get(i), outputs.get(i, b''))
+        for i, command in enumerate(commands)
+    ]
+
+
+def batch(env: env_interface.AndroidEnvInterface, **kwargs) -> CommandBatch:
+  """Returns a CommandBatch that runs shell commands in one adb invocation.
+
+  Used as a context manager, the batch runs when the block exits without an
+  exception; the results are then in its `result` attribute.
+
+  Args:
+    env: The environment.
+    **kwargs: Passed to CommandBatch.
+  """
+  return CommandBatch(env, **kwargs)
+
+
 def get_adb_activity(app_name: str) -> Optional[str]:
   """Get a mapping of regex patterns to ADB activities top Android apps."""
   for pattern, activity in _PATTERN_TO_ACTIVITY.items():
@@ -720,8 +1204,9 @@ def close_recents(env: env_interface.AndroidEnvInterface):
   if response.status != adb_pb2.AdbResponse.Status.OK:
     return
   recents_ids = re.findall(r'id=(\d+)', response.generic.output.decode())
-  for recents_id in recents_ids:
-    issue_generic_request(['shell', 'am', 'stack', 'remove', recents_id], env)
+  with batch(env) as commands:
+    for recents_id in recents_ids:
+      commands.add(['am', 'stack', 'remove', recents_id])
 
 
 def close_app(
@@ -1022,6 +1507,56 @@ def clear_app_data(
     ) from exc
 
 
+@dataclasses.dataclass
+class DeviceVersions:
+  """Counters of the device state changes made through this module.
+
+  State cached from a device, such as the connectivity checked by
+  forest_subscription.py or the geometry cached by interface.AsyncAndroidEnv,
+  is invalidated when a counter changes.
+
+  Attributes:
+    connectivity: Incremented whenever airplane mode is toggled.
+    geometry: Incremented whenever the screen geometry is changed.
+  """
+
+  connectivity: int = 0
+  geometry: int = 0
+
+
+# Counters of envs that do not keep their own, by env.
+_device_versions: 'weakref.WeakKeyDictionary[Any, DeviceVersions]' = (
+    weakref.WeakKeyDictionary()
+)
+_device_versions_lock = threading.Lock()
+
+
+def versions_for(env: env_interface.AndroidEnvInterface) -> DeviceVersions:
+  """Returns the DeviceVersions of the device `env` controls.
+
+  AndroidWorldController keeps its own; other envs get counters of their own
+  on first use.
+
+  Args:
+    env: The Android environment.
+  """
+  versions = getattr(env, 'device_versions', None)
+  if isinstance(versions, DeviceVersions):
+    return versions
+  with _device_versions_lock:
+    return _device_versions.setdefault(env, DeviceVersions())
+
+
+def connectivity_version(env: env_interface.AndroidEnvInterface) -> int:
+  """Returns a counter that changes whenever airplane mode is toggled."""
+  return versions_for(env).connectivity
+
+
+def note_connectivity_change(env: env_interface.AndroidEnvInterface) -> None:
+  """Invalidates cached connectivity state, e.g. after airplane mode changed."""
+  versions_for(env).connectivity += 1
+
+
 def toggle_airplane_mode(
     on_or_off: Literal['on', 'off'], env: env_interface.AndroidEnvInterface
 ) -> adb_pb2.AdbResponse:
@@ -1039,6 +1574,7 @@ def toggle_airplane_mode(
   """
   if on_or_off not in ('on', 'off'):
     raise ValueError('Must be one of on or off.')
+  note_connectivity_change(env)
   state = '1' if on_or_off == 'on' else '0'
   return issue_generic_request(
       ['shell', 'settings', 'put', 'global', 'airplane_mode_on', state], env
@@ -1191,6 +1727,7 @@ def change_orientation(
   issue_generic_request(
       command + ['user_rotation', _ORIENTATIONS[orientation]], env
   )
+  _invalidate_geometry(env)
 
 
 def set_clipboard_contents(
@@ -1531,19 +2068,31 @@ def _post_process_settings(settings: dict[str, str]) -> dict[str, Any]:
 
 
 def get_all_settings(env: env_interface.AndroidEnvInterface) -> dict[str, str]:
-  """Get all settings from the Android system via ADB."""
-  adb_commands = [
-      'settings list secure',
-      'settings list global',
-      'settings list system',
-  ]
+  """Get all settings from the Android system via ADB, in one round trip.
+
+  Args:
+    env: The Android environment interface.
+
+  Returns:
+    The settings of all namespaces, by key.
+
+  Raises:
+    RuntimeError: If listing a namespace failed.
+  """
+  commands = CommandBatch(env)
+  for namespace in ('secure', 'global', 'system'):
+    commands.add(['settings', 'list', namespace])
+  results = commands.run()
+  results.check_ok('Failed to list settings.')
   settings = {}
-  for adb_command in adb_commands:
-    response = issue_generic_request(adb_command, env)
-    lines = response.generic.output.decode().split('\n')
+  for result in results:
+    lines = result.output.decode().split('\n')
     for line in lines:
       if not line:
         continue
+      if '=' not in line:
+        logging.warning('Skipping malformed settings line %r', line)
+        continue
       key, value = line.split('=', 1)
       settings[key] = value
   return _post_process_settings(settings)
@@ -1607,6 +2156,66 @@ def get_screen_size(env: env_interface.AndroidEnvInterface) -> tuple[int, int]:
   )
 
 
+def geometry_version(env: env_interface.AndroidEnvInterface) -> int:
+  """Returns a counter that changes whenever the screen geometry is changed."""
+  return versions_for(env).geometry
+
+
+def _invalidate_geometry(env: env_interface.AndroidEnvInterface) -> None:
+  versions_for(env).geometry += 1
+
+
+@dataclasses.dataclass(frozen=True)
+class DeviceGeometry:
+  """Screen geometry of a device.
+
+  Attributes:
+    logical_screen_size: See get_logical_screen_size.
+    orientation: See get_orientation.
+    physical_frame_boundary: See get_physical_frame_boundary.
+  """
+
+  logical_screen_size: tuple[int, int]
+  orientation: int
+  physical_frame_boundary: tuple[int, int, int, int]
+
+
+def _parse_logical_screen_size(raw_output: str) -> Optional[tuple[int, int]]:
+  pattern = r'logicalFrame=\[0, 0, (\d+), (\d+)\]'
+  for m in re.findall(pattern, raw_output):
+    if int(m[0]) == 0 and int(m[1]) == 0:
+      continue
+    return (int(m[0]), int(m[1]))
+  return None
+
+
+def _parse_physical_frame(
+    raw_output: str,
+) -> Optional[tuple[int, int, int, int]]:
+  """Returns the first non-empty physical frame, in the current orientation."""
+  pattern = r'physicalFrame=\[(\d+), (\d+), (\d+), (\d+)\]'
+  for m in re.findall(pattern, raw_output):
+    frame = tuple(int(v) for v in m)
+    if frame == (0, 0, 0, 0):
+      continue
+    return frame
+  return None
+
+
+def _to_portrait_frame(
+    frame: tuple[int, int, int, int], orientation: int
+) -> tuple[int, int, int, int]:
+  if orientation == 0 or orientation == 2:
+    return frame
+  return (frame[1], frame[0], frame[3], frame[2])
+
+
+def _parse_orientation(raw_output: str) -> Optional[int]:
+  for m in re.findall(r'mCurrentRotation=ROTATION_(\d+)', raw_output):
+    return int(m) // 90
+  return None
+
+
 def get_logical_screen_size(
     env: env_interface.AndroidEnvInterface,
 ) -> tuple[int, int]:
@@ -1627,14 +2236,9 @@ def get_logical_screen_size(
       'shell dumpsys input | grep logicalFrame', env
   )
   if response.status:
-    raw_output = response.generic.output.decode('utf-8')
-    pattern = r'logicalFrame=\[0, 0, (\d+), (\d+)\]'
-    matches = re.findall(pattern, raw_output)
-    for m in matches:
-      if int(m[0]) == 0 and int(m[1]) == 0:
-        continue
-      width, height = (int(m[0]), int(m[1]))
-      return (width, height)
+    size = _parse_logical_screen_size(response.generic.output.decode('utf-8'))
+    if size is not None:
+      return size
   raise ValueError('Failed to get logical screen size.')
 
 
@@ -1654,21 +2258,9 @@ def get_physical_frame_boundary(
       'shell dumpsys input | grep physicalFrame', env
   )
   if response.status:
-    raw_output = response.generic.output.decode('utf-8')
-    pattern = r'physicalFrame=\[(\d+), (\d+), (\d+), (\d+)\]'
-    matches = re.findall(pattern, raw_output)
-    for m in matches:
-      if (
-          int(m[0]) == 0
-          and int(m[1]) == 0
-          and int(m[2]) == 0
-          and int(m[3]) == 0
-      ):
-        continue
-      orientation = get_orientation(env)
-      if orientation == 0 or orientation == 2:
-        return (int(m[0]), int(m[1]), int(m[2]), int(m[3]))
-      return (int(m[1]), int(m[0]), int(m[3]), int(m[2]))
+    frame = _parse_physical_frame(response.generic.output.decode('utf-8'))
+    if frame is not None:
+      return _to_portrait_frame(frame, get_orientation(env))
   raise ValueError('Failed to get physical frame boundary.')
 
 
@@ -1690,14 +2282,55 @@ def get_orientation(
       'shell dumpsys window | grep mCurrentRotation', env
   )
   if response.status:
-    raw_output = response.generic.output.decode('utf-8')
-    pattern = r'mCurrentRotation=ROTATION_(\d+)'
-    matches = re.findall(pattern, raw_output)
-    for m in matches:
-      return int(m) // 90
+    orientation = _parse_orientation(response.generic.output.decode('utf-8'))
+    if orientation is not None:
+      return orientation
   raise ValueError('Failed to get orientation.')
 
 
+def get_device_geometry(
+    env: env_interface.AndroidEnvInterface,
+) -> DeviceGeometry:
+  """Returns the logical size, orientation and physical frame in one call.
+
+  This is equivalent to calling get_logical_screen_size, get_orientation and
+  get_physical_frame_boundary, but issues a single adb command instead of four.
+
+  Args:
+    env: The AndroidEnv interface.
+
+  Returns:
+    The device geometry.
+
+  Raises:
+    ValueError: If any part of the geometry could not be parsed.
+  """
+  response = issue_generic_request(
+      [
+          'shell',
+          "dumpsys input | grep -E 'logicalFrame|physicalFrame';"
+          ' dumpsys window | grep mCurrentRotation',
+      ],
+      env,
+  )
+  if response.status:
+    raw_output = response.generic.output.decode('utf-8')
+    logical_screen_size = _parse_logical_screen_size(raw_output)
+    frame = _parse_physical_frame(raw_output)
+    orientation = _parse_orientation(raw_output)
+    if (
+        logical_screen_size is not None
+        and frame is not None
+        and orientation is not None
+    ):
+      return DeviceGeometry(
+          logical_screen_size=logical_screen_size,
+          orientation=orientation,
+          physical_frame_boundary=_to_portrait_frame(frame, orientation),
+      )
+  raise ValueError('Failed to get device geometry.')
+
+
 def set_screen_size(
     width: int,
     height: int,
@@ -1723,7 +2356,9 @@ def set_screen_size(
   adb_command = ['shell', f'wm size {width}x{height}']
 
   # Issue the command and return the response
-  return issue_generic_request(adb_command, env)
+  response = issue_generic_request(adb_command, env)
+  _invalidate_geometry(env)
+  return response
 
 
 def retry(n: int) -> Callable[[Any], Any]:
@@ -1769,8 +2404,13 @@ def set_root_if_needed(
   return issue_generic_request(['root'], env, timeout_sec)
 
 
-def uiautomator_dump(env, timeout_sec: Optional[float] = 30) -> str:
-  """Issues a uiautomator dump request and returns the UI hierarchy."""
+_HIERARCHY_END_TAG = '</hierarchy>'
+
+
+def _uiautomator_dump_via_file(
+    env, timeout_sec: Optional[float] = 30
+) -> str:
+  """Dumps the UI hierarchy to a file on the device, then reads it back."""
   dump_args = 'shell uiautomator dump /sdcard/window_dump.xml'
   issue_generic_request(dump_args, env, timeout_sec=timeout_sec)
 
@@ -1778,3 +2418,31 @@ def uiautomator_dump(env, timeout_sec: Optional[float] = 30) -> str:
   response = issue_generic_request(read_args, env, timeout_sec=timeout_sec)
 
   return response.generic.output.decode('utf-8')
+
+
+def uiautomator_dump(env, timeout_sec: Optional[float] = 30) -> str:
+  """Issues a uiautomator dump request and returns the UI hierarchy.
+
+  The hierarchy is streamed back in a single `exec-out` call by dumping to
+  /dev/tty, which avoids a round trip and a write to the sdcard. Devices that
+  do not support this fall back to dumping to a file and reading it back.
+
+  Args:
+    env: The environment.
+    timeout_sec: A timeout for each ADB call.
+
+  Returns:
+    The UI hierarchy XML.
+  """
+  response = issue_generic_request(
+      'exec-out uiautomator dump /dev/tty', env, timeout_sec=timeout_sec
+  )
+  output = response.generic.output.decode('utf-8')
+  end = output.rfind(_HIERARCHY_END_TAG)
+  if response.status != adb_pb2.AdbResponse.Status.OK or end == -1:
+    logging.info(
+        'Streaming uiautomator dump failed; falling back to dumping to file.'
+    )
+    return _uiautomator_dump_via_file(env, timeout_sec=timeout_sec)
+  # Drop the "UI hierchary dumped to: /dev/tty" trailer.
+  return output[: end + len(_HIERARCHY_END_TAG)]
@@ -14,12 +14,16 @@
 
 """Tests for adb_utils."""
 
+import os
+import subprocess
+import tempfile
 from unittest import mock
 
 from absl.testing import absltest
 from android_env import env_interface
 from android_env.proto import adb_pb2
 from android_world.env import adb_utils
+from android_world.utils import fake_adb_responses
 
 
 class AdbTestSetup(absltest.TestCase):
@@ -242,6 +246,92 @@ class AdbTypingTest(AdbTestSetup):
       self.assertLen(expected_calls, mock_execute_adb_call.call_count)
 
 
+# Stands in for the device's `input` command: appends what it would type to
+# $INPUT_LOG, and fails on text containing FAIL.
+_FAKE_INPUT = r"""#!/bin/sh
+case "$1" in
+  text)
+    case "$2" in *FAIL*) exit 1;; esac
+    printf '%s' "$2" | sed 's/%s/ /g' >> "$INPUT_LOG";;
+  keyevent) printf '\n' >> "$INPUT_LOG";;
+esac
+"""
+
+_LONG_TEXT = '\n'.join(
+    f"Line {i}: buy 2 eggs & (maybe) milk; it's $3 | \"cheap\" <ok> #{i}"
+    for i in range(20)
+)
+
+
+class BulkTypingTest(absltest.TestCase):
+
+  def setUp(self):
+    super().setUp()
+    bin_dir = self.enter_context(tempfile.TemporaryDirectory())
+    fake_input = os.path.join(bin_dir, 'input')
+    with open(fake_input, 'w') as f:
+      f.write(_FAKE_INPUT)
+    os.chmod(fake_input, 0o755)
+    self.log = os.path.join(bin_dir, 'typed.txt')
+    open(self.log, 'w').close()
+    self.enter_context(mock.patch.dict(os.environ, {'INPUT_LOG': self.log}))
+    self.env = mock.create_autospec(env_interface.AndroidEnvInterface)
+    self.env.execute_adb_call.side_effect = lambda request: _run_locally(
+        request, bin_dir
+    )
+
+  def _typed(self) -> str:
+    with open(self.log) as f:
+      return f.read()
+
+  def test_bulk_types_long_text_in_one_call(self):
+    adb_utils.type_text(_LONG_TEXT, self.env, mode=adb_utils.TextInputMode.BULK)
+
+    self.assertEqual(self._typed(), _LONG_TEXT)
+    self.env.execute_adb_call.assert_called_once()
+
+  def test_bulk_is_fewer_round_trips_than_words(self):
+    words_env = mock.create_autospec(env_interface.AndroidEnvInterface)
+    words_env.execute_adb_call.return_value = adb_pb2.AdbResponse(
+        status=adb_pb2.AdbResponse.Status.OK
+    )
+
+    adb_utils.type_text(_LONG_TEXT, words_env)
+    adb_utils.type_text(_LONG_TEXT, self.env, mode=adb_utils.TextInputMode.BULK)
+
+    self.assertGreater(words_env.execute_adb_call.call_count, 200)
+    self.assertEqual(self.env.execute_adb_call.call_count, 1)
+
+  def test_bulk_falls_back_to_words_after_failure(self):
+    adb_utils.type_text(
+        'typed FAIL\nretyped', self.env, mode=adb_utils.TextInputMode.BULK
+    )
+
+    self.assertEqual(self._typed(), '')
+    typed_words = [
+        call.args[0].input_text.text
+        for call in self.env.execute_adb_call.call_args_list
+        if call.args[0].HasField('input_text')
+    ]
+    self.assertEqual(typed_words, ['typed', '%s', 'FAIL', 'retyped'])
+
+  def test_adb_keyboard_falls_back_to_bulk(self):
+    adb_utils.type_text(
+        'one\ntwo', self.env, mode=adb_utils.TextInputMode.ADB_KEYBOARD
+    )
+
+    self.assertEqual(self._typed(), 'one\ntwo')
+    self.assertEqual(self.env.execute_adb_call.call_count, 2)
+
+  def test_mode_defaults_to_env_text_input_mode(self):
+    self.env.text_input_mode = adb_utils.TextInputMode.BULK
+
+    adb_utils.type_text('a b c', self.env)
+
+    self.assertEqual(self._typed(), 'a b c')
+    self.env.execute_adb_call.assert_called_once()
+
+
 class TestExtractBroadcastData(absltest.TestCase):
 
   def test_successful_data_extraction(self):
@@ -282,5 +372,259 @@ class TestScreenUtils(absltest.TestCase):
     )
 
 
+_GEOMETRY_OUTPUT = """\
+    Viewport INTERNAL: displayId=0, uniqueId=local:0, port=0,
+      logicalFrame=[0, 0, 0, 0], physicalFrame=[0, 0, 0, 0]
+    Viewport INTERNAL: displayId=0, uniqueId=local:1, port=1,
+      logicalFrame=[0, 0, 2400, 1080], physicalFrame=[0, 0, 2400, 1080]
+  mCurrentRotation=ROTATION_90
+"""
+
+
+class DeviceGeometryTest(AdbTestSetup):
+
+  def test_get_device_geometry(self):
+    self.mock_issue_generic_request.return_value = (
+        fake_adb_responses.create_successful_generic_response(_GEOMETRY_OUTPUT)
+    )
+
+    geometry = adb_utils.get_device_geometry(self.mock_env)
+
+    self.assertEqual(
+        geometry,
+        adb_utils.DeviceGeometry(
+            logical_screen_size=(2400, 1080),
+            orientation=1,
+            physical_frame_boundary=(0, 0, 1080, 2400),
+        ),
+    )
+    self.mock_issue_generic_request.assert_called_once()
+
+  def test_get_device_geometry_agrees_with_individual_getters(self):
+    self.mock_issue_generic_request.return_value = (
+        fake_adb_responses.create_successful_generic_response(_GEOMETRY_OUTPUT)
+    )
+
+    geometry = adb_utils.get_device_geometry(self.mock_env)
+
+    self.assertEqual(
+        geometry.logical_screen_size,
+        adb_utils.get_logical_screen_size(self.mock_env),
+    )
+    self.assertEqual(
+        geometry.orientation, adb_utils.get_orientation(self.mock_env)
+    )
+    self.assertEqual(
+        geometry.physical_frame_boundary,
+        adb_utils.get_physical_frame_boundary(self.mock_env),
+    )
+
+  def test_get_device_geometry_fails(self):
+    self.mock_issue_generic_request.return_value = (
+        fake_adb_responses.create_successful_generic_response(
+            'mCurrentRotation=ROTATION_0'
+        )
+    )
+
+    with self.assertRaises(ValueError):
+      adb_utils.get_device_geometry(self.mock_env)
+
+  def test_geometry_changes_bump_version(self):
+    version = adb_utils.geometry_version(self.mock_env)
+
+    adb_utils.change_orientation('landscape', self.mock_env)
+    self.assertEqual(adb_utils.geometry_version(self.mock_env), version + 1)
+
+    adb_utils.set_screen_size(720, 1520, self.mock_env)
+    self.assertEqual(adb_utils.geometry_version(self.mock_env), version + 2)
+
+
+_WINDOW_DUMP = (
+    "<?xml version='1.0' encoding='UTF-8' standalone='yes' ?><hierarchy"
+    ' rotation="0"><node class="a" /></hierarchy>'
+)
+
+
+class UiautomatorDumpTest(AdbTestSetup):
+
+  def test_streams_dump_in_one_call(self):
+    self.mock_issue_generic_request.return_value = (
+        fake_adb_responses.create_successful_generic_response(
+            _WINDOW_DUMP + 'UI hierchary dumped to: /dev/tty\n'
+        )
+    )
+
+    self.assertEqual(adb_utils.uiautomator_dump(self.mock_env), _WINDOW_DUMP)
+    self.mock_issue_generic_request.assert_called_once_with(
+        'exec-out uiautomator dump /dev/tty', self.mock_env, timeout_sec=30
+    )
+
+  def test_falls_back_to_file(self):
+    self.mock_issue_generic_request.side_effect = [
+        fake_adb_responses.create_successful_generic_response(
+            'ERROR: null root node returned by UiTestAutomationBridge.'
+        ),
+        fake_adb_responses.create_successful_generic_response(
+            'UI hierchary dumped to: /sdcard/window_dump.xml'
+        ),
+        fake_adb_responses.create_successful_generic_response(_WINDOW_DUMP),
+    ]
+
+    self.assertEqual(adb_utils.uiautomator_dump(self.mock_env), _WINDOW_DUMP)
+    self.assertEqual(self.mock_issue_generic_request.call_count, 3)
+
+
+def _run_locally(
+    request: adb_pb2.AdbRequest, path: str | None = None
+) -> adb_pb2.AdbResponse:
+  """Runs a generic `shell` request with a local shell, as adb would."""
+  if not request.HasField('generic'):
+    return adb_pb2.AdbResponse(status=adb_pb2.AdbResponse.Status.OK)
+  args = list(request.generic.args)
+  assert args[0] == 'shell', args
+  env = dict(os.environ)
+  if path is not None:
+    env['PATH'] = path + os.pathsep + env['PATH']
+  result = subprocess.run(
+      ['sh', '-c', ' '.join(args[1:])],
+      capture_output=True,
+      check=False,
+      env=env,
+  )
+  return adb_pb2.AdbResponse(
+      status=adb_pb2.AdbResponse.Status.OK,
+      generic=adb_pb2.AdbResponse.GenericResponse(output=result.stdout),
+  )
+
+
+class CommandBatchTest(absltest.TestCase):
+
+  def setUp(self):
+    super().setUp()
+    self.env = mock.create_autospec(env_interface.AndroidEnvInterface)
+    self.env.execute_adb_call.side_effect = _run_locally
+
+  def test_runs_commands_in_one_call(self):
+    commands = adb_utils.batch(self.env)
+    commands.add(['echo', 'one'])
+    commands.add('printf two; echo err >&2')
+    commands.add('exit 3')
+    commands.add(['cd', '/', ';', 'pwd'])
+
+    result = commands.run()
+
+    self.assertEqual(
+        [(r.exit_code, r.output) for r in result],
+        [(0, b'one\n'), (0, b'twoerr\n'), (3, b''), (0, b'/\n')],
+    )
+    self.assertEqual(result.round_trips, 1)
+    self.env.execute_adb_call.assert_called_once()
+    self.assertEmpty(commands)
+
+  def test_reports_partial_failures(self):
+    with adb_utils.batch(self.env) as commands:
+      commands.add('true')
+      commands.add('false')
+
+    self.assertFalse(commands.result.ok)
+    self.assertEqual(
+        [r.command for r in commands.result.failures], ['false']
+    )
+    with self.assertRaisesRegex(RuntimeError, r'1 of 2 .*\[false\]'):
+      commands.result.check_ok()
+
+  def test_stop_on_error_skips_remaining_commands(self):
+    commands = adb_utils.batch(self.env, stop_on_error=True, max_script_bytes=1)
+    commands.add('false')
+    commands.add('echo skipped')
+    commands.add('echo skipped')
+
+    result = commands.run()
+
+    self.assertEqual([r.exit_code for r in result], [1, None, None])
+    self.assertEqual(result.round_trips, 1)
+
+  def test_long_batches_are_split(self):
+    commands = adb_utils.batch(self.env, max_script_bytes=12)
+    for i in range(3):
+      commands.add(f'echo {i}')
+
+    result = commands.run()
+
+    self.assertEqual([r.output for r in result], [b'0\n', b'1\n', b'2\n'])
+    self.assertEqual(result.round_trips, 2)
+
+  def test_adb_failure_marks_commands_not_run(self):
+    self.env.execute_adb_call.side_effect = None
+    self.env.execute_adb_call.return_value = adb_pb2.AdbResponse(
+        status=adb_pb2.AdbResponse.Status.ADB_ERROR
+    )
+    commands = adb_utils.batch(self.env)
+    commands.add('true')
+
+    self.assertIsNone(commands.run()[0].exit_code)
+
+  def test_put_settings(self):
+    commands = adb_utils.batch(self.env)
+    commands.put_settings(
+        adb_pb2.AdbRequest.SettingsRequest.Namespace.GLOBAL, 'key', 'a value'
+    )
+
+    with mock.patch.object(adb_utils, 'issue_generic_request') as mock_issue:
+      commands.run()
+
+    self.assertIn(
+        "settings put global key 'a value'", mock_issue.call_args.args[0][1]
+    )
+
+  @mock.patch.object(adb_utils, 'issue_generic_request')
+  def test_close_recents(self, mock_issue_generic_request):
+    mock_issue_generic_request.return_value = (
+        fake_adb_responses.create_successful_generic_response(
+            'Recent #0: Task{id=12}\nRecent #1: Task{id=34}\n'
+        )
+    )
+
+    adb_utils.close_recents(self.env)
+
+    self.assertEqual(mock_issue_generic_request.call_count, 2)
+    script = mock_issue_generic_request.call_args.args[0][1]
+    self.assertIn('am stack remove 12', script)
+    self.assertIn('am stack remove 34', script)
+
+
+class GetAllSettingsTest(absltest.TestCase):
+
+  def _batch_result(self, *results):
+    return adb_utils.BatchResult(
+        tuple(
+            adb_utils.BatchCommandResult('settings list', code, output)
+            for code, output in results
+        ),
+        round_trips=1,
+    )
+
+  @mock.patch.object(adb_utils.CommandBatch, 'run')
+  def test_skips_lines_without_value(self, mock_run):
+    mock_run.return_value = self._batch_result(
+        (0, b'a=1\nWARNING: linker\n'),
+        (0, b'b=x=y\nzen_duration=0\n'),
+        (0, b''),
+    )
+
+    settings = adb_utils.get_all_settings(mock.MagicMock())
+
+    self.assertEqual(settings, {'a': '1', 'b': 'x=y'})
+
+  @mock.patch.object(adb_utils.CommandBatch, 'run')
+  def test_raises_if_listing_fails(self, mock_run):
+    mock_run.return_value = self._batch_result(
+        (0, b'a=1\n'), (255, b'cmd: Failure\n'), (None, b'')
+    )
+
+    with self.assertRaisesRegex(RuntimeError, 'Failed to list settings'):
+      adb_utils.get_all_settings(mock.MagicMock())
+
+
 if __name__ == '__main__':
   absltest.main()
@@ -14,24 +14,38 @@
 
 """Controller for Android that adds UI tree information to the observation."""
 
+from collections.abc import Iterator, Sequence
 import contextlib
 import enum
+import glob
 import os
 import time
 from typing import Any
-from typing import cast
 from typing import Optional
 from absl import logging
 from android_env import env_interface
 from android_env import loader
+from android_env.components import action_type
 from android_env.components import config_classes
+from android_env.proto import adb_pb2
 from android_env.proto.a11y import android_accessibility_forest_pb2
 from android_env.wrappers import a11y_grpc_wrapper
 from android_env.wrappers import base_wrapper
+from android_world.env import action_waits
+from android_world.env import adb_async
+from android_world.env import adb_shell
+from android_world.env import adb_telemetry
 from android_world.env import adb_utils
+from android_world.env import emulator_snapshots
+from android_world.env import forest_subscription
+from android_world.env import gestures
+from android_world.env import observation_prefetcher
 from android_world.env import representation_utils
+from android_world.env import screen_capture
+from android_world.utils import app_state
 from android_world.utils import file_utils
 import dm_env
+import numpy as np
 
 
 def _has_wrapper(
@@ -62,10 +76,14 @@ def get_a11y_tree(
 ) -> android_accessibility_forest_pb2.AndroidAccessibilityForest:
   """Gets a11y tree.
 
+  This checks connectivity on every call; AndroidWorldController keeps a
+  forest_subscription.ForestSubscription instead, which avoids that.
+
   Args:
     env: AndroidEnv.
-    max_retries: Maximum number of retries to get a11y tree.
-    sleep_duration: Time to sleep between each retry in seconds.
+    max_retries: Together with `sleep_duration`, bounds the time to wait for
+      the a11y tree to max_retries * sleep_duration seconds.
+    sleep_duration: See `max_retries`.
 
   Returns:
     A11y tree.
@@ -77,30 +95,11 @@ def get_a11y_tree(
     raise ValueError(
         'Must use a11y_grpc_wrapper.A11yGrpcWrapper to get the a11y tree.'
     )
-  env = cast(a11y_grpc_wrapper.A11yGrpcWrapper, env)
-  if adb_utils.retry(3)(adb_utils.check_airplane_mode)(env):
-    logging.warning(
-        'Airplane mode is on -- cannot retrieve a11y tree via gRPC. Turning'
-        ' it off...'
-    )
-    logging.info('Enabling networking...')
-    env.attempt_enable_networking()
-    time.sleep(1.0)
-
-  forest: Optional[
-      android_accessibility_forest_pb2.AndroidAccessibilityForest
-  ] = None
-  for _ in range(max_retries):
-    try:
-      forest = env.accumulate_new_extras()['accessibility_tree'][-1]  # pytype:disable=attribute-error
-      return forest
-    except KeyError:
-      logging.warning('Could not get a11y tree, retrying.')
-    time.sleep(sleep_duration)
-
-  if forest is None:
-    raise RuntimeError('Could not get a11y tree.')
-  return forest
+  subscription = forest_subscription.ForestSubscription(env)
+  try:
+    return subscription.get(timeout_sec=max_retries * sleep_duration)
+  finally:
+    subscription.close()
 
 
 _TASK_PATH = file_utils.convert_to_posix_path(
@@ -120,10 +119,32 @@ DEFAULT_ADB_PATH = '~/Android/Sdk/platform-tools/adb'
 
 OBSERVATION_KEY_FOREST = 'forest'
 # UI elements are specific nodes extracted from forest. See
-# representation_utils.forest_to_ui_elements for details.
+# representation_utils.forest_to_ui_element_table for details.
 OBSERVATION_KEY_UI_ELEMENTS = 'ui_elements'
 
 
+# Maximum time to wait for the a11y forwarder app to send a forest.
+_FOREST_TIMEOUT_SEC = 5.0
+
+# Minimum time between reconnections to the device; see refresh_env.
+_MIN_RECONNECT_INTERVAL_SEC = 60.0
+
+# Maximum time to wait for the prefetcher to capture a fresh observation before
+# falling back to a synchronous capture.
+_PREFETCH_TIMEOUT_SEC = 5.0
+
+# The emulator console requires the token in this file, unless it is empty.
+_CONSOLE_AUTH_TOKEN_PATH = os.path.expanduser('~/.emulator_console_auth_token')
+
+
+def get_no_op_action() -> dict[str, Any]:
+  """Creates a no-op action; used to retrieve screen & UI tree."""
+  return {
+      'action_type': np.array(action_type.ActionType.LIFT, dtype=np.int32),
+      'touch_position': np.array((0.0, 0.0)),
+  }
+
+
 class A11yMethod(enum.Enum):
   """Method to get a11y tree."""
 
@@ -164,8 +185,28 @@ class AndroidWorldController(base_wrapper.BaseWrapper):
       env: env_interface.AndroidEnvInterface,
       a11y_method: A11yMethod = A11yMethod.A11Y_FORWARDER_APP,
       install_a11y_forwarding_app: bool = True,
+      forest_timeout_sec: float = _FOREST_TIMEOUT_SEC,
+      min_reconnect_interval_sec: float = _MIN_RECONNECT_INTERVAL_SEC,
+      console_port: Optional[int] = None,
+      grpc_port: Optional[int] = None,
   ):
+    """Initializes the controller.
+
+    Args:
+      env: The environment to wrap.
+      a11y_method: How to get the a11y tree.
+      install_a11y_forwarding_app: Whether to install the a11y forwarder app.
+      forest_timeout_sec: Maximum time to wait for a forest.
+      min_reconnect_interval_sec: Minimum time between reconnections; see
+        refresh_env.
+      console_port: The emulator's console port, if known; needed for
+        snapshot_service.
+      grpc_port: The emulator's gRPC port, if it has one; enables gRPC screen
+        captures and snapshots.
+    """
     self._original_env = env
+    self._console_port = console_port
+    self._grpc_port = grpc_port
     if a11y_method == A11yMethod.A11Y_FORWARDER_APP:
       self._env = apply_a11y_forwarder_app_wrapper(
           env, install_a11y_forwarding_app
@@ -174,6 +215,34 @@ class AndroidWorldController(base_wrapper.BaseWrapper):
     else:
       self._env = env
     self._a11y_method = a11y_method
+    self._prefetcher: Optional[observation_prefetcher.ObservationPrefetcher] = (
+        None
+    )
+    self._last_fingerprint_seq: Optional[int] = None
+    self._forest_timeout_sec = forest_timeout_sec
+    self._min_reconnect_interval_sec = min_reconnect_interval_sec
+    self._last_reconnect_time: Optional[float] = None
+    self._forest_stats = forest_subscription.ForestStats()
+    self._forest_subscription: Optional[
+        forest_subscription.ForestSubscription
+    ] = None
+    # ForestSubscription.arrivals() before the last action, until a forest is
+    # read after it.
+    self._forest_arrivals_before_action: Optional[int] = None
+    self._device_versions = adb_utils.DeviceVersions()
+    self._capture_backend: screen_capture.CaptureBackend = (
+        screen_capture.AndroidEnvStepBackend(self._step_pixels)
+    )
+    self._capture_options = screen_capture.FULL_FRAME
+    self._persistent_shell: Optional[adb_shell.PersistentShell] = None
+    self._text_input_mode = adb_utils.TextInputMode.WORDS
+    self._gesture_backend: Optional[gestures.GestureBackend] = None
+    self._touch_device: Optional[gestures.TouchDevice] = None
+    self._wait_stats = action_waits.WaitStats()
+    self._async_adb: Optional[adb_async.AsyncAdb] = None
+    self._adb_telemetry = adb_telemetry.AdbTelemetry()
+    self._app_state_tracker: Optional[app_state.AppStateTracker] = None
+    self._reset_backend: Optional[emulator_snapshots.ResetBackend] = None
 
   @property
   def device_screen_size(self) -> tuple[int, int]:
@@ -193,7 +262,179 @@ class AndroidWorldController(base_wrapper.BaseWrapper):
   def env(self) -> env_interface.AndroidEnvInterface:
     return self._env
 
-  def refresh_env(self):
+  @property
+  def a11y_method(self) -> A11yMethod:
+    return self._a11y_method
+
+  @property
+  def async_adb(self) -> adb_async.AsyncAdb:
+    """Returns the asyncio facade over adb_utils for this device."""
+    if self._async_adb is None:
+      self._async_adb = adb_async.AsyncAdb(self)
+    return self._async_adb
+
+  @property
+  def adb_telemetry(self) -> adb_telemetry.AdbTelemetry:
+    """Latency, bytes and failures of the adb calls made on this device."""
+    return self._adb_telemetry
+
+  @property
+  def app_state_tracker(self) -> Optional[app_state.AppStateTracker]:
+    """Apps whose data still matches their snapshot; None unless enabled."""
+    return self._app_state_tracker
+
+  def enable_app_state_tracking(self) -> app_state.AppStateTracker:
+    """Lets tasks skip restoring unchanged apps; see app_state.py."""
+    if self._app_state_tracker is None:
+      self._app_state_tracker = app_state.AppStateTracker()
+    return self._app_state_tracker
+
+  def disable_app_state_tracking(self) -> None:
+    self._app_state_tracker = None
+
+  @property
+  def reset_backend(self) -> Optional[emulator_snapshots.ResetBackend]:
+    """How tasks reset this device; file by file if None."""
+    return self._reset_backend
+
+  def set_reset_backend(
+      self, backend: Optional[emulator_snapshots.ResetBackend]
+  ) -> None:
+    """Sets how tasks reset this device; file by file if None."""
+    self._reset_backend = backend
+
+  def snapshot_service(self) -> emulator_snapshots.SnapshotService:
+    """Returns the emulator's snapshot service, over gRPC if it is enabled.
+
+    Raises:
+      ValueError: If the controller was created without the emulator's ports.
+    """
+    if self._grpc_port is not None:
+      try:
+        return emulator_snapshots.GrpcSnapshotService.connect(self._grpc_port)
+      except Exception:  # pylint: disable=broad-exception-caught
+        logging.info('Emulator gRPC snapshots are not available.')
+    if self._console_port is None:
+      raise ValueError(
+          'Snapshots need the emulator console port; see get_controller.'
+      )
+    auth_token = None
+    if os.path.exists(_CONSOLE_AUTH_TOKEN_PATH):
+      with open(_CONSOLE_AUTH_TOKEN_PATH) as f:
+        auth_token = f.read().strip()
+    return emulator_snapshots.ConsoleSnapshotService(
+        self._console_port, auth_token=auth_token
+    )
+
+  def execute_adb_call(
+      self, adb_call: adb_pb2.AdbRequest
+  ) -> adb_pb2.AdbResponse:
+    return self._adb_telemetry.measure(adb_call, super().execute_adb_call)
+
+  @property
+  def wait_stats(self) -> action_waits.WaitStats:
+    """Time spent waiting for the effects of actions, per action type."""
+    return self._wait_stats
+
+  @property
+  def text_input_mode(self) -> adb_utils.TextInputMode:
+    """How adb_utils.type_text injects text on this device."""
+    return self._text_input_mode
+
+  @text_input_mode.setter
+  def text_input_mode(self, mode: adb_utils.TextInputMode) -> None:
+    self._text_input_mode = mode
+
+  @property
+  def gesture_backend(self) -> Optional[gestures.GestureBackend]:
+    """How scrolls, swipes and drags are injected on this device.
+
+    None keeps issuing one `input swipe` or `input draganddrop` request per
+    gesture; otherwise gestures are compiled into scripts, see gestures.py.
+    """
+    return self._gesture_backend
+
+  @gesture_backend.setter
+  def gesture_backend(
+      self, backend: Optional[gestures.GestureBackend]
+  ) -> None:
+    self._gesture_backend = backend
+
+  @property
+  def touch_device(self) -> gestures.TouchDevice:
+    """The touchscreen's input device, queried on first use."""
+    if self._touch_device is None:
+      self._touch_device = gestures.find_touch_device(self)
+    return self._touch_device
+
+  @property
+  def persistent_shell(self) -> Optional[adb_shell.PersistentShell]:
+    """Returns the shell session adb_utils runs `shell` commands in, if any."""
+    return self._persistent_shell
+
+  def enable_persistent_shell(self) -> adb_shell.PersistentShell:
+    """Runs `shell` commands issued through adb_utils in one adb session.
+
+    Commands the session cannot run, e.g. because it could not connect, fall
+    back to a regular adb call.
+
+    Returns:
+      The session.
+    """
+    if self._persistent_shell is None:
+      # pylint: disable=protected-access
+      # pytype: disable=attribute-error
+      adb_controller = self.env._coordinator._simulator.create_adb_controller()
+      # pylint: enable=protected-access
+      # pytype: enable=attribute-error
+      self._persistent_shell = adb_shell.PersistentShell.for_adb(
+          adb_controller.command_prefix()
+      )
+    return self._persistent_shell
+
+  def disable_persistent_shell(self) -> None:
+    if self._persistent_shell is not None:
+      self._persistent_shell.close()
+    self._persistent_shell = None
+
+  @property
+  def device_versions(self) -> adb_utils.DeviceVersions:
+    """Counters of the changes adb_utils made to this device's state."""
+    return self._device_versions
+
+  @property
+  def forest_stats(self) -> forest_subscription.ForestStats:
+    """Returns counters of forest retrieval retries and reconnects."""
+    return self._forest_stats
+
+  def refresh_env(self, force: bool = False) -> bool:
+    """Reconnects to the emulator and reloads the a11y wrapper.
+
+    Reconnecting is slow and rarely helps if repeated right away, so it is
+    skipped if the previous reconnect was less than `min_reconnect_interval_sec`
+    ago.
+
+    Args:
+      force: Whether to reconnect even if the previous reconnect was recent,
+        e.g. because the device state was replaced since.
+
+    Returns:
+      Whether the environment was reconnected.
+    """
+    now = time.monotonic()
+    if (
+        not force
+        and self._last_reconnect_time is not None
+        and now - self._last_reconnect_time < self._min_reconnect_interval_sec
+    ):
+      self._forest_stats.reconnects_rate_limited += 1
+      logging.warning(
+          'Skipping reconnect; the last one was %.1fs ago.',
+          now - self._last_reconnect_time,
+      )
+      return False
+    self._last_reconnect_time = now
+    self._forest_stats.reconnects += 1
     # pylint: disable=protected-access
     # pytype: disable=attribute-error
     # Reconnect to emulator and reload a11y wrapper in case we lose connection.
@@ -204,45 +445,342 @@ class AndroidWorldController(base_wrapper.BaseWrapper):
     ).env
     # pylint: enable=protected-access
     # pytype: enable=attribute-error
+    self._close_forest_subscription()
+    return True
+
+  def note_device_restored(self) -> None:
+    """Drops what was cached from the device after its state was replaced.
+
+    Call this after loading an emulator snapshot. It reconnects to the
+    emulator, restarts prefetching and the persistent shell if they were on,
+    bumps the device versions and forgets which apps were clean.
+    """
+    prefetcher = self.prefetcher
+    self.stop_observation_prefetch()
+    shell_enabled = self._persistent_shell is not None
+    self.disable_persistent_shell()
+    self.refresh_env(force=True)
+    self._touch_device = None
+    self._device_versions.connectivity += 1
+    self._device_versions.geometry += 1
+    if self._app_state_tracker is not None:
+      self._app_state_tracker.reset()
+    if shell_enabled:
+      self.enable_persistent_shell()
+    if prefetcher is not None:
+      self.start_observation_prefetch(
+          prefetcher.capacity, prefetcher.interval_sec
+      )
+
+  def _get_forest_subscription(self) -> forest_subscription.ForestSubscription:
+    if self._forest_subscription is None:
+      self._forest_subscription = forest_subscription.ForestSubscription(
+          self._env, stats=self._forest_stats, versions=self._device_versions
+      )
+    return self._forest_subscription
+
+  def _close_forest_subscription(self) -> None:
+    if self._forest_subscription is not None:
+      self._forest_subscription.close()
+    self._forest_subscription = None
+    self._forest_arrivals_before_action = None
 
   def _get_a11y_forest(
       self,
   ) -> android_accessibility_forest_pb2.AndroidAccessibilityForest:
-    return get_a11y_tree(self._env)
+    forest = self._get_forest_subscription().get(
+        timeout_sec=self._forest_timeout_sec,
+        arrived_after=self._forest_arrivals_before_action,
+    )
+    self._forest_arrivals_before_action = None
+    return forest
 
   def get_a11y_forest(
       self,
   ) -> android_accessibility_forest_pb2.AndroidAccessibilityForest:
     """Returns the most recent a11y forest from the device."""
-    try:
-      return self._get_a11y_forest()
-    except RuntimeError:
-      print(
-          'Could not get a11y tree. Reconnecting to Android, reinitializing'
-          ' AndroidEnv, and restarting a11y forwarding.'
-      )
-      self.refresh_env()
-      return self._get_a11y_forest()
+    frame = self.get_prefetched_frame()
+    if frame is not None:
+      return frame.forest
+    with self._exclusive_device_access():
+      try:
+        return self._get_a11y_forest()
+      except RuntimeError:
+        print(
+            'Could not get a11y tree. Reconnecting to Android, reinitializing'
+            ' AndroidEnv, and restarting a11y forwarding.'
+        )
+        self.refresh_env()
+        return self._get_a11y_forest()
+
+  def get_ui_elements(
+      self,
+      forest: Optional[
+          android_accessibility_forest_pb2.AndroidAccessibilityForest
+      ] = None,
+  ) -> Sequence[representation_utils.UIElement]:
+    """Returns the most recent UI elements from the device.
+
+    With the a11y forwarder app, elements are returned as a
+    representation_utils.UIElementTable, which builds UIElements lazily.
 
-  def get_ui_elements(self) -> list[representation_utils.UIElement]:
-    """Returns the most recent UI elements from the device."""
+    Args:
+      forest: A forest from get_a11y_forest to convert, instead of fetching a
+        new one. Only used with the a11y forwarder app.
+    """
     if self._a11y_method == A11yMethod.A11Y_FORWARDER_APP:
-      return representation_utils.forest_to_ui_elements(
-          self.get_a11y_forest(),
+      return representation_utils.forest_to_ui_element_table(
+          forest if forest is not None else self.get_a11y_forest(),
           exclude_invisible_elements=True,
       )
     elif self._a11y_method == A11yMethod.UIAUTOMATOR:
       return representation_utils.xml_dump_to_ui_elements(
-          adb_utils.uiautomator_dump(self._env)
+          adb_utils.uiautomator_dump(self)
       )
     else:
       return []
 
+  def get_ui_fingerprint(self) -> int:
+    """Returns a structural hash of the current UI elements.
+
+    This fetches the UI tree but neither captures a screenshot nor builds
+    UIElements when using the a11y forwarder app, so it is suitable for
+    frequent polling; see ui_stability.py.
+    """
+    if self._a11y_method == A11yMethod.A11Y_FORWARDER_APP:
+      # Each sample must come from a new frame, or polling the buffer would
+      # trivially look stable.
+      frame = self.get_prefetched_frame(newer_than=self._last_fingerprint_seq)
+      if frame is not None:
+        self._last_fingerprint_seq = frame.seq
+        forest = frame.forest
+      else:
+        forest = self.get_a11y_forest()
+      return representation_utils.forest_fingerprint(
+          forest, exclude_invisible_elements=True
+      )
+    return representation_utils.ui_elements_fingerprint(self.get_ui_elements())
+
+  def get_state_fingerprint(self, state: Any) -> Optional[int]:
+    """Returns what get_ui_fingerprint returned when `state` was observed.
+
+    Args:
+      state: An interface.State observed through this controller.
+
+    Returns:
+      The fingerprint, or None if `state` lacks the UI tree it is taken from.
+    """
+    if self._a11y_method == A11yMethod.A11Y_FORWARDER_APP:
+      if state.forest is None:
+        return None
+      return representation_utils.forest_fingerprint(
+          state.forest, exclude_invisible_elements=True
+      )
+    return representation_utils.ui_elements_fingerprint(state.ui_elements)
+
+  def step(self, action: Any) -> dm_env.TimeStep:
+    with self._exclusive_device_access():
+      return super().step(action)
+
+  def start_observation_prefetch(
+      self, capacity: int = 4, interval_sec: float = 0.05
+  ) -> observation_prefetcher.ObservationPrefetcher:
+    """Starts capturing observations in the background.
+
+    While prefetching, get_a11y_forest and get_prefetched_frame read from a
+    ring buffer of recent frames instead of capturing synchronously. Actions
+    must be executed inside `observation_barrier` so that frames read after an
+    action were captured after it.
+
+    Args:
+      capacity: Number of frames kept in the buffer.
+      interval_sec: Pause between captures.
+
+    Returns:
+      The running prefetcher.
+
+    Raises:
+      ValueError: If the a11y tree does not come from the a11y forwarder app.
+    """
+    if self._a11y_method != A11yMethod.A11Y_FORWARDER_APP:
+      raise ValueError(
+          'Observation prefetching requires the a11y forwarder app.'
+      )
+    if self._prefetcher is None or not self._prefetcher.running:
+      self._prefetcher = observation_prefetcher.ObservationPrefetcher(
+          capture_pixels=self._capture_pixels,
+          fetch_forest=self._fetch_newest_forest,
+          to_ui_elements=lambda forest: (
+              representation_utils.forest_to_ui_element_table(
+                  forest, exclude_invisible_elements=True
+              )
+          ),
+          capacity=capacity,
+          interval_sec=interval_sec,
+      )
+      self._prefetcher.start()
+    return self._prefetcher
+
+  def stop_observation_prefetch(self) -> None:
+    if self._prefetcher is not None:
+      self._prefetcher.stop()
+    self._prefetcher = None
+
+  @property
+  def prefetcher(
+      self,
+  ) -> Optional[observation_prefetcher.ObservationPrefetcher]:
+    """Returns the running prefetcher, if any."""
+    if self._prefetcher is not None and self._prefetcher.running:
+      return self._prefetcher
+    return None
+
+  def get_prefetched_frame(
+      self, newer_than: Optional[int] = None
+  ) -> Optional[observation_prefetcher.Frame]:
+    """Returns the freshest frame captured after the last action.
+
+    Args:
+      newer_than: If set, waits for a frame with a larger sequence number.
+
+    Returns:
+      The frame, or None if not prefetching or no frame was captured in time.
+    """
+    prefetcher = self.prefetcher
+    if prefetcher is None or prefetcher.holds_device():
+      return None
+    try:
+      return prefetcher.latest(_PREFETCH_TIMEOUT_SEC, newer_than=newer_than)
+    except TimeoutError:
+      logging.warning('No prefetched observation; capturing synchronously.')
+      return None
+
+  @contextlib.contextmanager
+  def observation_barrier(self) -> Iterator[None]:
+    """Returns a context to execute actions in.
+
+    Forests read after the context exits arrived after it was entered, unless
+    none arrives in time; see ForestSubscription.get. See also
+    start_observation_prefetch.
+    """
+    if self._forest_subscription is not None:
+      self._forest_arrivals_before_action = (
+          self._forest_subscription.arrivals()
+      )
+    prefetcher = self.prefetcher
+    if prefetcher is None:
+      yield
+      return
+    with prefetcher.paused():
+      yield
+
+  def _exclusive_device_access(self) -> contextlib.AbstractContextManager[None]:
+    prefetcher = self.prefetcher
+    if prefetcher is None:
+      return contextlib.nullcontext()
+    return prefetcher.exclusive()
+
+  @property
+  def capture_backend(self) -> screen_capture.CaptureBackend:
+    return self._capture_backend
+
+  @property
+  def capture_options(self) -> screen_capture.CaptureOptions:
+    return self._capture_options
+
+  def set_capture_backend(
+      self,
+      backend: Optional[screen_capture.CaptureBackend] = None,
+      options: screen_capture.CaptureOptions = screen_capture.FULL_FRAME,
+  ) -> None:
+    """Sets how `capture_screen` captures the screen.
+
+    Cropped or downscaled frames do not line up with the pixel coordinates of
+    UI elements, so only use them with agents that work in normalized
+    coordinates.
+
+    Args:
+      backend: The backend to capture with; the AndroidEnv step if None.
+      options: How to crop and downscale captured frames.
+    """
+    if backend is None:
+      backend = screen_capture.AndroidEnvStepBackend(self._step_pixels)
+    self._capture_backend = backend
+    self._capture_options = options
+
+  def capture_backends(self) -> list[screen_capture.CaptureBackend]:
+    """Returns the capture backends available for this device."""
+    backends = [
+        screen_capture.AndroidEnvStepBackend(self._step_pixels),
+        screen_capture.AdbScreencapBackend(self),
+    ]
+    if self._grpc_port is None:
+      return backends
+    try:
+      backends.append(
+          screen_capture.EmulatorGrpcBackend.connect(self._grpc_port)
+      )
+    except Exception:  # pylint: disable=broad-exception-caught
+      logging.info('Emulator gRPC screenshots are not available.')
+    return backends
+
+  def select_fastest_capture_backend(
+      self,
+      options: screen_capture.CaptureOptions = screen_capture.FULL_FRAME,
+      num_samples: int = 5,
+  ) -> dict[str, float]:
+    """Measures the available capture backends and uses the fastest.
+
+    Args:
+      options: How to crop and downscale captured frames.
+      num_samples: Captures per backend.
+
+    Returns:
+      The median capture latency in seconds of each backend, by name.
+    """
+    with self._exclusive_device_access():
+      backend, latencies = screen_capture.select_fastest(
+          self.capture_backends(), options, num_samples=num_samples
+      )
+    logging.info(
+        'Capturing the screen with %s; latencies: %s', backend.name, latencies
+    )
+    self.set_capture_backend(backend, options)
+    return latencies
+
+  def capture_screen(self) -> np.ndarray:
+    """Captures the screen with the configured backend and options."""
+    with self._exclusive_device_access():
+      return self._capture_pixels()
+
+  def _step_pixels(self) -> np.ndarray:
+    return self._env.step(get_no_op_action()).observation['pixels']
+
+  def _capture_pixels(self) -> np.ndarray:
+    return self._capture_backend.capture(self._capture_options)
+
+  def _fetch_newest_forest(
+      self,
+  ) -> Optional[android_accessibility_forest_pb2.AndroidAccessibilityForest]:
+    try:
+      return self._env.accumulate_new_extras()['accessibility_tree'][-1]  # pytype:disable=attribute-error
+    except KeyError:
+      return None
+
+  def close(self) -> None:
+    self.stop_observation_prefetch()
+    self._close_forest_subscription()
+    self.disable_persistent_shell()
+    if self._async_adb is not None:
+      self._async_adb.close()
+      self._async_adb = None
+    super().close()
+
   def _process_timestep(self, timestep: dm_env.TimeStep) -> dm_env.TimeStep:
     """Adds a11y tree info to the observation."""
     if self._a11y_method == A11yMethod.A11Y_FORWARDER_APP:
       forest = self.get_a11y_forest()
-      ui_elements = representation_utils.forest_to_ui_elements(
+      ui_elements = representation_utils.forest_to_ui_element_table(
           forest,
           exclude_invisible_elements=True,
       )
@@ -258,6 +796,8 @@ class AndroidWorldController(base_wrapper.BaseWrapper):
   ) -> contextlib._GeneratorContextManager[str]:
     """Pulls a file from the device to a temporary directory.
 
+    The file is pulled along with its siblings sharing its name as prefix,
+    such as the `-wal` and `-shm` files of a database, in one tar stream.
     The directory will be deleted when the context manager exits.
     Args:
       remote_db_file_path: The path to the file on the device.
@@ -266,9 +806,13 @@ class AndroidWorldController(base_wrapper.BaseWrapper):
     Returns:
       The path to the temporary directory containing the file.
     """
-    remote_db_directory = os.path.dirname(remote_db_file_path)
+    remote_db_directory, file_name = os.path.split(remote_db_file_path)
     return file_utils.tmp_directory_from_device(
-        remote_db_directory, self.env, timeout_sec
+        remote_db_directory,
+        self,
+        timeout_sec,
+        bulk=True,
+        pattern=f'{glob.escape(file_name)}*',
     )
 
   def push_file(
@@ -286,7 +830,7 @@ class AndroidWorldController(base_wrapper.BaseWrapper):
     file_utils.copy_data_to_device(
         local_db_file_path,
         remote_db_file_path,
-        self.env,
+        self,
         timeout_sec,
     )
 
@@ -326,4 +870,6 @@ def get_controller(
   )
   android_env_instance = loader.load(config)
   logging.info('Setting up AndroidWorldController.')
-  return AndroidWorldController(android_env_instance)
+  return AndroidWorldController(
+      android_env_instance, console_port=console_port, grpc_port=grpc_port
+  )
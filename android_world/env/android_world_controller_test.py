@@ -12,20 +12,32 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import dataclasses
+import io
 import os
+import tarfile
 import tempfile
 from unittest import mock
 
 from absl.testing import absltest
 from android_env import env_interface
+from android_env.proto import adb_pb2
 from android_env.wrappers import a11y_grpc_wrapper
 from android_world.env import adb_utils
 from android_world.env import android_world_controller
+from android_world.env import emulator_snapshots
+from android_world.env import forest_subscription
 from android_world.env import representation_utils
+from android_world.env import screen_capture
+from android_world.utils import app_state
 from android_world.utils import fake_adb_responses
 from android_world.utils import file_test_utils
 from android_world.utils import file_utils
 import dm_env
+import numpy as np
+
+_issue_generic_request = adb_utils.issue_generic_request
+_tmp_directory_from_device = file_utils.tmp_directory_from_device
 
 
 def create_file_with_contents(contents: str) -> str:
@@ -40,10 +52,10 @@ class AndroidWorldControllerTest(absltest.TestCase):
 
   def setUp(self):
     super().setUp()
-    mock_issue_generic_request = self.enter_context(
+    self.mock_issue_generic_request = self.enter_context(
         mock.patch.object(adb_utils, 'issue_generic_request')
     )
-    mock_issue_generic_request.return_value = (
+    self.mock_issue_generic_request.return_value = (
         fake_adb_responses.create_successful_generic_response(
             'Physical size: 100x200'
         )
@@ -102,18 +114,36 @@ class AndroidWorldControllerTest(absltest.TestCase):
 
     self.assertEqual(env.device_screen_size, (100, 200))
 
+  def test_execute_adb_call_records_telemetry(self):
+    mock_base_env = mock.Mock(spec=env_interface.AndroidEnvInterface)
+    env = android_world_controller.AndroidWorldController(
+        mock_base_env,
+        a11y_method=android_world_controller.A11yMethod.NONE,
+    )
+    mock_base_env.execute_adb_call.return_value = adb_pb2.AdbResponse(
+        status=adb_pb2.AdbResponse.Status.OK
+    )
+    request = adb_pb2.AdbRequest(pull=adb_pb2.AdbRequest.Pull(path='/a'))
+
+    with env.adb_telemetry.labels(task='Task', phase='initialize_task'):
+      response = env.execute_adb_call(request)
+
+    self.assertIs(response, mock_base_env.execute_adb_call.return_value)
+    stats = env.adb_telemetry.as_dict()['by_task']['Task']['initialize_task']
+    self.assertEqual(stats['pull']['calls'], 1)
+
   @mock.patch.object(adb_utils, 'get_logical_screen_size')
-  @mock.patch.object(android_world_controller, 'get_a11y_tree')
-  @mock.patch.object(representation_utils, 'forest_to_ui_elements')
+  @mock.patch.object(forest_subscription.ForestSubscription, 'get')
+  @mock.patch.object(representation_utils, 'forest_to_ui_element_table')
   def test_process_timestep(
-      self, mock_forest_to_ui, mock_get_a11y_tree, mock_get_logical_screen_size
+      self, mock_forest_to_ui, mock_get_forest, mock_get_logical_screen_size
   ):
     mock_base_env = mock.Mock(spec=env_interface.AndroidEnvInterface)
     env = android_world_controller.AndroidWorldController(mock_base_env)
     mock_forest = mock.Mock()
     mock_ui_elements = mock.Mock()
     mock_get_logical_screen_size.return_value = (100, 200)
-    mock_get_a11y_tree.return_value = mock_forest
+    mock_get_forest.return_value = mock_forest
     mock_forest_to_ui.return_value = mock_ui_elements
     timestep = dm_env.TimeStep(
         observation={}, reward=None, discount=None, step_type=None
@@ -130,36 +160,261 @@ class AndroidWorldControllerTest(absltest.TestCase):
         exclude_invisible_elements=True,
     )
 
-  @mock.patch.object(adb_utils, 'check_airplane_mode')
-  @mock.patch.object(android_world_controller, 'get_controller')
-  @mock.patch.object(android_world_controller, '_has_wrapper')
+  @mock.patch.object(forest_subscription.ForestSubscription, 'get')
+  @mock.patch.object(representation_utils, 'forest_to_ui_elements')
+  @mock.patch.object(representation_utils, 'forest_fingerprint')
+  def test_get_ui_fingerprint_skips_ui_element_conversion(
+      self, mock_forest_fingerprint, mock_forest_to_ui, mock_get_forest
+  ):
+    mock_base_env = mock.Mock(spec=env_interface.AndroidEnvInterface)
+    env = android_world_controller.AndroidWorldController(mock_base_env)
+    mock_forest = mock.Mock()
+    mock_get_forest.return_value = mock_forest
+    mock_forest_fingerprint.return_value = 123
+
+    self.assertEqual(env.get_ui_fingerprint(), 123)
+    mock_forest_fingerprint.assert_called_once_with(
+        mock_forest, exclude_invisible_elements=True
+    )
+    mock_forest_to_ui.assert_not_called()
+
+  @mock.patch.object(forest_subscription.ForestSubscription, 'get')
+  @mock.patch.object(representation_utils, 'forest_fingerprint')
+  def test_get_state_fingerprint_matches_ui_fingerprint(
+      self, mock_forest_fingerprint, mock_get_forest
+  ):
+    mock_base_env = mock.Mock(spec=env_interface.AndroidEnvInterface)
+    env = android_world_controller.AndroidWorldController(mock_base_env)
+    mock_forest_fingerprint.side_effect = lambda forest, **_: hash(forest)
+    mock_get_forest.return_value = 'forest'
+    state = mock.Mock(forest='forest')
+
+    self.assertEqual(env.get_state_fingerprint(state), env.get_ui_fingerprint())
+    self.assertIsNone(env.get_state_fingerprint(mock.Mock(forest=None)))
+    mock_get_forest.assert_called_once()
+
+  @mock.patch.object(forest_subscription.ForestSubscription, 'arrivals')
+  @mock.patch.object(forest_subscription.ForestSubscription, 'get')
+  def test_forest_after_action_arrived_after_it(
+      self, mock_get_forest, mock_arrivals
+  ):
+    mock_base_env = mock.Mock(spec=env_interface.AndroidEnvInterface)
+    env = android_world_controller.AndroidWorldController(mock_base_env)
+    mock_get_forest.return_value = 'forest'
+    mock_arrivals.return_value = 3
+
+    env.get_a11y_forest()
+    with env.observation_barrier():
+      pass
+    env.get_a11y_forest()
+    env.get_a11y_forest()
+
+    self.assertEqual(
+        [call.kwargs['arrived_after'] for call in mock_get_forest.mock_calls],
+        [None, 3, None],
+    )
+
+  def test_device_versions_are_per_controller(self):
+    env = android_world_controller.AndroidWorldController(
+        mock.Mock(spec=env_interface.AndroidEnvInterface)
+    )
+    other = android_world_controller.AndroidWorldController(
+        mock.Mock(spec=env_interface.AndroidEnvInterface)
+    )
+
+    adb_utils.note_connectivity_change(env)
+
+    self.assertIs(adb_utils.versions_for(env), env.device_versions)
+    self.assertEqual(adb_utils.connectivity_version(env), 1)
+    self.assertEqual(adb_utils.connectivity_version(other), 0)
+
+  @mock.patch.object(forest_subscription.ForestSubscription, 'get')
+  def test_get_ui_elements_converts_given_forest(self, mock_get_forest):
+    mock_base_env = mock.Mock(spec=env_interface.AndroidEnvInterface)
+    env = android_world_controller.AndroidWorldController(mock_base_env)
+    forest = mock.MagicMock()
+    forest.windows = []
+
+    ui_elements = env.get_ui_elements(forest=forest)
+
+    self.assertEmpty(ui_elements)
+    mock_get_forest.assert_not_called()
+
+  @mock.patch.object(representation_utils, 'forest_to_ui_element_table')
+  @mock.patch.object(forest_subscription.ForestSubscription, 'get')
+  def test_observation_prefetch(
+      self, mock_get_forest, mock_forest_to_ui_element_table
+  ):
+    mock_base_env = mock.Mock(spec=env_interface.AndroidEnvInterface)
+    env = android_world_controller.AndroidWorldController(mock_base_env)
+    env._env.step.return_value = dm_env.TimeStep(
+        observation={'pixels': 'pixels'},
+        reward=None,
+        discount=None,
+        step_type=None,
+    )
+    env._env.accumulate_new_extras.return_value = {
+        'accessibility_tree': ['forest']
+    }
+    mock_forest_to_ui_element_table.return_value = ['element']
+
+    env.start_observation_prefetch(interval_sec=0.01)
+    with env.observation_barrier():
+      self.assertIsNone(env.get_prefetched_frame())
+    frame = env.get_prefetched_frame()
+    forest = env.get_a11y_forest()
+    env.close()
+
+    self.assertEqual(frame.pixels, 'pixels')
+    self.assertEqual(frame.ui_elements, ['element'])
+    self.assertEqual(forest, 'forest')
+    mock_get_forest.assert_not_called()
+    self.assertIsNone(env.prefetcher)
+
+  def test_observation_prefetch_requires_a11y_forwarder(self):
+    mock_base_env = mock.Mock(spec=env_interface.AndroidEnvInterface)
+    env = android_world_controller.AndroidWorldController(
+        mock_base_env, a11y_method=android_world_controller.A11yMethod.NONE
+    )
+
+    with self.assertRaises(ValueError):
+      env.start_observation_prefetch()
+
+  @mock.patch.object(adb_utils, 'check_airplane_mode', return_value=False)
   @mock.patch.object(
       android_world_controller.AndroidWorldController, 'refresh_env'
   )
-  def test_refresh_env(
-      self,
-      mock_refresh_env,
-      mock_has_wrapper,
-      mock_get_controller,
-      mock_check_airplane_mode,
-  ):
-    del mock_has_wrapper, mock_get_controller, mock_check_airplane_mode
+  def test_refresh_env(self, mock_refresh_env, unused_mock_check_airplane_mode):
     mock_base_env = mock.Mock(spec=env_interface.AndroidEnvInterface)
-    env = android_world_controller.AndroidWorldController(mock_base_env)
-    unused_mock_check_airplane_mode = False
-    env._env.accumulate_new_extras.side_effect = [
-        {},
-        {},
-        {},
-        {},
-        {},
-        {'accessibility_tree': ['success']},
-    ]
+    env = android_world_controller.AndroidWorldController(
+        mock_base_env, forest_timeout_sec=0.05
+    )
+    env._env.accumulate_new_extras.return_value = {}
+
+    def refresh_env():
+      env._env.accumulate_new_extras.return_value = {
+          'accessibility_tree': ['success']
+      }
+
+    mock_refresh_env.side_effect = refresh_env
 
     forest = env.get_a11y_forest()
 
     self.assertEqual(forest, 'success')
     mock_refresh_env.assert_called_once()
+    self.assertEqual(env.forest_stats.timeouts, 1)
+    self.assertGreater(env.forest_stats.retries, 0)
+
+  @mock.patch.object(adb_utils, 'check_airplane_mode', return_value=False)
+  def test_forest_retrieval_checks_connectivity_once(
+      self, mock_check_airplane_mode
+  ):
+    mock_base_env = mock.Mock(spec=env_interface.AndroidEnvInterface)
+    env = android_world_controller.AndroidWorldController(mock_base_env)
+    env._env.accumulate_new_extras.return_value = {
+        'accessibility_tree': ['forest']
+    }
+
+    for _ in range(3):
+      self.assertEqual(env.get_a11y_forest(), 'forest')
+
+    mock_check_airplane_mode.assert_called_once()
+    self.assertEqual(env.forest_stats.forests, 3)
+    self.assertEqual(env.forest_stats.retries, 0)
+
+  @mock.patch.object(android_world_controller, 'get_controller')
+  def test_refresh_env_is_rate_limited(self, mock_get_controller):
+    mock_base_env = mock.Mock(spec=env_interface.AndroidEnvInterface)
+    env = android_world_controller.AndroidWorldController(
+        mock_base_env, min_reconnect_interval_sec=60.0
+    )
+    env._env._coordinator = mock.MagicMock()
+
+    self.assertTrue(env.refresh_env())
+    self.assertFalse(env.refresh_env())
+
+    mock_get_controller.assert_called_once()
+    self.assertEqual(env.forest_stats.reconnects, 1)
+    self.assertEqual(env.forest_stats.reconnects_rate_limited, 1)
+
+  @mock.patch.object(android_world_controller, 'get_controller')
+  def test_note_device_restored_drops_cached_state(self, mock_get_controller):
+    mock_base_env = mock.Mock(spec=env_interface.AndroidEnvInterface)
+    env = android_world_controller.AndroidWorldController(mock_base_env)
+    env._env._coordinator = mock.MagicMock()
+    self.assertTrue(env.refresh_env())
+    subscription = env._get_forest_subscription()
+    env._touch_device = mock.Mock()
+    versions = dataclasses.replace(env.device_versions)
+
+    env.note_device_restored()
+
+    # The reconnect is not rate limited.
+    self.assertEqual(mock_get_controller.call_count, 2)
+    self.assertIsNot(env._get_forest_subscription(), subscription)
+    self.assertIsNone(env._touch_device)
+    self.assertGreater(env.device_versions.geometry, versions.geometry)
+    self.assertGreater(
+        env.device_versions.connectivity, versions.connectivity
+    )
+
+  def test_app_state_tracking_is_opt_in(self):
+    env = android_world_controller.AndroidWorldController(
+        mock.Mock(spec=env_interface.AndroidEnvInterface)
+    )
+    self.assertIsNone(app_state.tracker_for(env))
+
+    tracker = env.enable_app_state_tracking()
+
+    self.assertIs(app_state.tracker_for(env), tracker)
+    self.assertIs(env.enable_app_state_tracking(), tracker)
+    env.disable_app_state_tracking()
+    self.assertIsNone(app_state.tracker_for(env))
+
+  def test_capture_screen(self):
+    mock_base_env = mock.Mock(spec=env_interface.AndroidEnvInterface)
+    env = android_world_controller.AndroidWorldController(mock_base_env)
+    pixels = np.zeros((8, 4, 3), dtype=np.uint8)
+    env._env.step.return_value = dm_env.TimeStep(
+        observation={'pixels': pixels},
+        reward=None,
+        discount=None,
+        step_type=None,
+    )
+
+    self.assertIs(env.capture_screen(), pixels)
+
+    backend = mock.create_autospec(screen_capture.CaptureBackend)
+    options = screen_capture.CaptureOptions(scale=0.5)
+    env.set_capture_backend(backend, options)
+    self.assertIs(env.capture_screen(), backend.capture.return_value)
+    backend.capture.assert_called_once_with(options)
+
+  @mock.patch.object(
+      emulator_snapshots.GrpcSnapshotService,
+      'connect',
+      side_effect=RuntimeError('no gRPC'),
+  )
+  def test_snapshot_service_uses_given_ports(self, mock_connect):
+    env = android_world_controller.AndroidWorldController(
+        mock.Mock(spec=env_interface.AndroidEnvInterface),
+        console_port=5556,
+        grpc_port=8556,
+    )
+
+    service = env.snapshot_service()
+
+    mock_connect.assert_called_once_with(8556)
+    self.assertIsInstance(service, emulator_snapshots.ConsoleSnapshotService)
+    self.assertEqual(service._address, ('localhost', 5556))
+
+  def test_snapshot_service_requires_ports(self):
+    env = android_world_controller.AndroidWorldController(
+        mock.Mock(spec=env_interface.AndroidEnvInterface)
+    )
+
+    with self.assertRaisesRegex(ValueError, 'console port'):
+      env.snapshot_service()
 
   def test_pull_file(self):
     file_contents = 'test file contents'
@@ -174,10 +429,33 @@ class AndroidWorldControllerTest(absltest.TestCase):
       )
       self.assertEqual(open(remote_file_path, 'r').read(), local_file.read())
 
+    directory, file_name = os.path.split(remote_file_path)
     self.mock_copy_db.assert_called_once_with(
-        os.path.dirname(remote_file_path), env._env, None
+        directory, env, None, bulk=True, pattern=f'{file_name}*'
     )
 
+  def test_pull_file_records_telemetry(self):
+    archive = io.BytesIO()
+    with tarfile.open(fileobj=archive, mode='w') as tar:
+      info = tarfile.TarInfo('./app.db')
+      info.size = 4
+      tar.addfile(info, io.BytesIO(b'rows'))
+    mock_base_env = mock.Mock(spec=env_interface.AndroidEnvInterface)
+    env = android_world_controller.AndroidWorldController(mock_base_env)
+    env._env.execute_adb_call.return_value = (
+        fake_adb_responses.create_successful_generic_response('')
+    )
+    env._env.execute_adb_call.return_value.generic.output = archive.getvalue()
+    self.mock_issue_generic_request.side_effect = _issue_generic_request
+    self.mock_copy_db.side_effect = _tmp_directory_from_device
+
+    with env.pull_file('/data/data/app/databases/app.db') as local_dir:
+      with open(os.path.join(local_dir, 'app.db')) as f:
+        self.assertEqual(f.read(), 'rows')
+
+    stats = env.adb_telemetry.as_dict()['by_task']['unlabeled']['unlabeled']
+    self.assertEqual(stats['exec-out']['calls'], 1)
+
   def test_push_file(self):
     old_file_contents = 'test file contents'
     new_file_contents = 'new file'
@@ -0,0 +1,267 @@
+# Copyright 2025 The android_world Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Queries of Android content providers, filtered on the device.
+
+Wraps `adb shell content query`, pushing the projection, selection, sort order
+and row limit to the device so that only the needed rows and columns are
+transferred:
+
+  rows = content_provider.query(
+      env,
+      'content://sms/sent',
+      columns=['address', 'body', 'date'],
+      where=f'date >= {since_ms}',
+      sort='date DESC',
+  )
+
+Rows are dicts of column name to value, or instances of `record_type` if one
+is given, with values converted to the types of its fields. Large tables can
+be streamed page by page with `iter_query`.
+"""
+
+from collections.abc import Iterator, Sequence
+import dataclasses
+import re
+import shlex
+import types
+import typing
+from typing import Any, Optional, TypeVar, Union
+
+from android_env import env_interface
+from android_world.env import adb_utils
+
+_RecordT = TypeVar('_RecordT')
+
+# Printed by `content query` when no row matches.
+_NO_RESULT = 'No result found.'
+
+# How `content query` prints a column without value.
+_NULL = 'NULL'
+
+# A row, up to the next row or the end of the output.
+_ROW = re.compile(
+    r'^[ \t]*Row: \d+,? (.*?)(?=\n[ \t]*Row: \d+|\s*\Z)', re.M | re.S
+)
+
+# The output of a query that returned rows.
+_FIRST_ROW = re.compile(r'\s*Row: \d+')
+
+# Column of the row id, used to page through tables.
+ID_COLUMN = '_id'
+
+_DEFAULT_PAGE_SIZE = 500
+
+
+def _column_pattern(columns: Optional[Sequence[str]]) -> re.Pattern[str]:
+  """Matches the start of a column in a row, capturing its name."""
+  if columns:
+    names = '|'.join(re.escape(column) for column in columns)
+  else:
+    names = r'\w+'
+  return re.compile(rf'(?:^|, )({names})=')
+
+
+def parse_rows(
+    output: str, columns: Optional[Sequence[str]] = None
+) -> list[dict[str, Optional[str]]]:
+  """Parses the output of `content query`.
+
+  Values may contain `, ` and `=`, e.g. message bodies. Knowing the queried
+  columns, a value only ends where the next of those columns starts; without
+  them, any `, name=` starts a new column.
+
+  Args:
+    output: The output of `content query`.
+    columns: The projection of the query, if any.
+
+  Returns:
+    The rows, as dicts of column name to value. `NULL` values are None.
+
+  Raises:
+    RuntimeError: If the output is not rows, e.g. the provider's error.
+  """
+  if output.lstrip().startswith(_NO_RESULT):
+    return []
+  if not _FIRST_ROW.match(output):
+    raise RuntimeError(f'Unexpected output of content query: {output!r}')
+  column_pattern = _column_pattern(columns)
+  rows = []
+  for row in _ROW.finditer(output.replace('\r', '')):
+    # Splitting on a capturing pattern alternates names and values, after a
+    # leading empty string.
+    parts = column_pattern.split(row.group(1))
+    rows.append({
+        name: None if value == _NULL else value
+        for name, value in zip(parts[1::2], parts[2::2])
+    })
+  return rows
+
+
+def _convert(value: Optional[str], field_type: Any) -> Any:
+  """Converts a column value to `field_type`."""
+  if value is None:
+    return None
+  origin = typing.get_origin(field_type)
+  if origin is Union or origin is types.UnionType:
+    field_type = next(
+        arg for arg in typing.get_args(field_type) if arg is not type(None)
+    )
+  if field_type is bool:
+    return value not in ('0', 'false', '')
+  if field_type in (int, float):
+    return field_type(value)
+  return value
+
+
+def to_record(
+    row: dict[str, Optional[str]], record_type: type[_RecordT]
+) -> _RecordT:
+  """Converts a parsed row to a dataclass, ignoring unknown columns.
+
+  Args:
+    row: The parsed row.
+    record_type: A dataclass, whose fields are named after the columns and
+      typed `str`, `int`, `float` or `bool`, optionally Optional.
+
+  Returns:
+    The record.
+  """
+  hints = typing.get_type_hints(record_type)
+  return record_type(**{
+      field.name: _convert(row[field.name], hints[field.name])
+      for field in dataclasses.fields(record_type)
+      if field.name in row
+  })
+
+
+def query_command(
+    uri: str,
+    columns: Optional[Sequence[str]] = None,
+    where: Optional[str] = None,
+    sort: Optional[str] = None,
+    limit: Optional[int] = None,
+) -> str:
+  """Returns the shell command for a query; see `query` for the arguments."""
+  command = f'content query --uri {shlex.quote(uri)}'
+  if columns:
+    command += f' --projection {shlex.quote(":".join(columns))}'
+  if where:
+    command += f' --where {shlex.quote(where)}'
+  if limit is not None:
+    # `content query` has no limit flag, but providers that build their
+    # queries with SQLiteQueryBuilder append the sort order to the ORDER BY
+    # clause.
+    sort = f'{sort or ID_COLUMN} LIMIT {limit}'
+  if sort:
+    command += f' --sort {shlex.quote(sort)}'
+  return command
+
+
+def query(
+    env: env_interface.AndroidEnvInterface,
+    uri: str,
+    columns: Optional[Sequence[str]] = None,
+    where: Optional[str] = None,
+    sort: Optional[str] = None,
+    limit: Optional[int] = None,
+    record_type: Optional[type[_RecordT]] = None,
+    timeout_sec: Optional[float] = None,
+) -> list[Any]:
+  """Queries a content provider, filtering on the device.
+
+  Args:
+    env: The environment.
+    uri: The content URI, e.g. `content://sms/inbox`.
+    columns: The columns to return; all columns if None.
+    where: An SQL selection, e.g. `date >= 1700000000000`.
+    sort: An SQL sort order, e.g. `date DESC`.
+    limit: The maximum number of rows to return. It is appended to the sort
+      order as `LIMIT n`, which the SQLite-backed system providers, such as
+      sms, contacts, calendar and media, accept. Providers that parse the sort
+      order themselves may reject it, and the query then raises; others may
+      ignore it, and the rows are then cut to `limit` on the host.
+    record_type: A dataclass to convert rows to; see `to_record`.
+    timeout_sec: A timeout for the adb call; the adb_utils default if None.
+
+  Returns:
+    The rows, as dicts of column name to value, or as `record_type`s.
+
+  Raises:
+    RuntimeError: If the query failed, e.g. the provider does not exist or
+      rejected the selection or the sort order.
+  """
+  kwargs = {} if timeout_sec is None else {'timeout_sec': timeout_sec}
+  response = adb_utils.issue_generic_request(
+      ['shell', query_command(uri, columns, where, sort, limit)], env, **kwargs
+  )
+  adb_utils.check_ok(response, f'Failed to query {uri}.')
+  rows = parse_rows(
+      response.generic.output.decode('utf-8', errors='replace'), columns
+  )
+  if limit is not None:
+    rows = rows[:limit]
+  if record_type is None:
+    return rows
+  return [to_record(row, record_type) for row in rows]
+
+
+def iter_query(
+    env: env_interface.AndroidEnvInterface,
+    uri: str,
+    columns: Optional[Sequence[str]] = None,
+    where: Optional[str] = None,
+    page_size: int = _DEFAULT_PAGE_SIZE,
+    record_type: Optional[type[_RecordT]] = None,
+    timeout_sec: Optional[float] = None,
+) -> Iterator[Any]:
+  """Streams the rows of a large table, in pages of `page_size` rows.
+
+  Pages are selected by row id, so that each query stays cheap however far
+  into the table it is. Rows come in increasing `_id` order. The provider must
+  accept a `LIMIT` in the sort order; see `query`.
+
+  Args:
+    env: The environment.
+    uri: The content URI; the provider must have an `_id` column.
+    columns: The columns to return; `_id` is added if missing.
+    where: An SQL selection.
+    page_size: The number of rows per query.
+    record_type: A dataclass to convert rows to; see `to_record`.
+    timeout_sec: A timeout for each adb call.
+
+  Yields:
+    The rows, as dicts of column name to value, or as `record_type`s.
+  """
+  if columns and ID_COLUMN not in columns:
+    columns = [ID_COLUMN, *columns]
+  last_id = None
+  while True:
+    selection = [f'({where})'] if where else []
+    if last_id is not None:
+      selection.append(f'{ID_COLUMN} > {last_id}')
+    rows = query(
+        env,
+        uri,
+        columns,
+        where=' AND '.join(selection) or None,
+        sort=ID_COLUMN,
+        limit=page_size,
+        timeout_sec=timeout_sec,
+    )
+    for row in rows:
+      yield row if record_type is None else to_record(row, record_type)
+    if len(rows) < page_size:
+      return
+    last_id = int(rows[-1][ID_COLUMN])
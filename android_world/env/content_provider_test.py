@@ -0,0 +1,181 @@
+# Copyright 2025 The android_world Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import dataclasses
+from typing import Optional
+from unittest import mock
+
+from absl.testing import absltest
+from android_env import env_interface
+from android_env.proto import adb_pb2
+from android_world.env import adb_utils
+from android_world.env import content_provider
+
+
+def _response(output: str) -> adb_pb2.AdbResponse:
+  return adb_pb2.AdbResponse(
+      status=adb_pb2.AdbResponse.Status.OK,
+      generic=adb_pb2.AdbResponse.GenericResponse(output=output.encode()),
+  )
+
+
+def _rows(first_id: int, count: int) -> str:
+  return ''.join(
+      f'Row: {i} _id={first_id + i}, body=message {first_id + i}\n'
+      for i in range(count)
+  )
+
+
+@dataclasses.dataclass(frozen=True)
+class _Message:
+  _id: int
+  body: str
+  read: bool
+  date: Optional[int] = None
+
+
+class ParseRowsTest(absltest.TestCase):
+
+  def test_values_may_contain_separators(self):
+    output = (
+        'Row: 0 _id=1, body=Hi, friend, date=1=2\n'
+        'Row: 1 _id=2, body=Two\nlines, date=NULL\r\n'
+    )
+
+    self.assertEqual(
+        content_provider.parse_rows(output, ['_id', 'body', 'date']),
+        [
+            {'_id': '1', 'body': 'Hi, friend', 'date': '1=2'},
+            {'_id': '2', 'body': 'Two\nlines', 'date': None},
+        ],
+    )
+
+  def test_without_columns_splits_on_any_name(self):
+    output = '  Row: 0 display_name=Jane, number=1 (234)\n  Row: 1 number=5\n'
+
+    self.assertEqual(
+        content_provider.parse_rows(output),
+        [{'display_name': 'Jane', 'number': '1 (234)'}, {'number': '5'}],
+    )
+
+  def test_no_result(self):
+    self.assertEqual(content_provider.parse_rows('No result found.\n'), [])
+
+  def test_error_raises(self):
+    output = (
+        'Error while accessing provider:sms\n'
+        'java.lang.IllegalArgumentException: Invalid token LIMIT\n'
+    )
+
+    with self.assertRaisesRegex(RuntimeError, 'Invalid token LIMIT'):
+      content_provider.parse_rows(output)
+
+  def test_to_record_converts_types(self):
+    row = {'_id': '3', 'body': 'Hi', 'read': '0', 'date': None, 'other': 'x'}
+
+    self.assertEqual(
+        content_provider.to_record(row, _Message),
+        _Message(_id=3, body='Hi', read=False, date=None),
+    )
+
+
+class QueryTest(absltest.TestCase):
+
+  def setUp(self):
+    super().setUp()
+    self.env = mock.create_autospec(env_interface.AndroidEnvInterface)
+    self.mock_issue_generic_request = self.enter_context(
+        mock.patch.object(adb_utils, 'issue_generic_request')
+    )
+
+  def test_pushes_filters_to_device(self):
+    self.mock_issue_generic_request.return_value = _response(
+        'Row: 0 _id=7, body=Hi, read=1\n'
+    )
+
+    messages = content_provider.query(
+        self.env,
+        'content://sms/sent',
+        columns=['_id', 'body', 'read'],
+        where="address = '123'",
+        sort='date DESC',
+        limit=10,
+        record_type=_Message,
+    )
+
+    self.assertEqual(messages, [_Message(_id=7, body='Hi', read=True)])
+    self.mock_issue_generic_request.assert_called_once_with(
+        [
+            'shell',
+            'content query --uri content://sms/sent --projection _id:body:read'
+            " --where 'address = '\"'\"'123'\"'\"''"
+            " --sort 'date DESC LIMIT 10'",
+        ],
+        self.env,
+    )
+
+  def test_failed_request_raises(self):
+    self.mock_issue_generic_request.return_value = adb_pb2.AdbResponse(
+        status=adb_pb2.AdbResponse.Status.ADB_ERROR
+    )
+
+    with self.assertRaisesRegex(RuntimeError, 'content://sms/sent'):
+      content_provider.query(self.env, 'content://sms/sent')
+
+  def test_iter_query_stops_on_provider_error(self):
+    self.mock_issue_generic_request.side_effect = [
+        _response(_rows(1, 2)),
+        _response('Error while accessing provider:sms\n'),
+    ]
+
+    rows = content_provider.iter_query(
+        self.env, 'content://sms/inbox', page_size=2
+    )
+
+    self.assertEqual(next(rows)['_id'], '1')
+    self.assertEqual(next(rows)['_id'], '2')
+    with self.assertRaises(RuntimeError):
+      next(rows)
+
+  def test_iter_query_pages_by_id(self):
+    self.mock_issue_generic_request.side_effect = [
+        _response(_rows(1, 2)),
+        _response(_rows(5, 2)),
+        _response(_rows(9, 1)),
+    ]
+
+    rows = list(
+        content_provider.iter_query(
+            self.env,
+            'content://sms/inbox',
+            columns=['body'],
+            where='read = 0',
+            page_size=2,
+        )
+    )
+
+    self.assertEqual([row['_id'] for row in rows], ['1', '2', '5', '6', '9'])
+    commands = [
+        call.args[0][1]
+        for call in self.mock_issue_generic_request.call_args_list
+    ]
+    self.assertEqual(
+        commands[1],
+        'content query --uri content://sms/inbox --projection _id:body'
+        " --where '(read = 0) AND _id > 2' --sort '_id LIMIT 2'",
+    )
+
+
+if __name__ == '__main__':
+  absltest.main()
@@ -0,0 +1,171 @@
+# Copyright 2025 The android_world Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Fuzzy lookup of UI elements by their text.
+
+An index is built once per observation from the `text` and
+`content_description` of its UI elements. Queries find the element whose text
+is closest to a target in Levenshtein distance:
+
+- Exact matches are a dictionary lookup.
+- Texts are bucketed by length. The length difference is a lower bound on the
+  edit distance, so buckets are visited closest length first and skipped once
+  they cannot beat the best match so far.
+- Distances are computed with Myers' bit-parallel algorithm, one machine word
+  operation per character of the candidate, and abandoned as soon as they
+  must exceed the best match so far.
+"""
+
+import collections
+from collections.abc import Sequence
+from typing import Optional
+
+from android_world.env import representation_utils
+
+# Distance reported when no element has any text.
+NO_MATCH = int(1e9)
+
+
+def _pattern_masks(pattern: str) -> dict[str, int]:
+  """Returns, per character, the bitmask of its positions in `pattern`."""
+  masks = collections.defaultdict(int)
+  for i, char in enumerate(pattern):
+    masks[char] |= 1 << i
+  return masks
+
+
+def _bounded_distance(
+    masks: dict[str, int], length: int, text: str, bound: int
+) -> int:
+  """Returns the edit distance from the pattern to `text`, if at most `bound`.
+
+  Args:
+    masks: The pattern's character masks; see _pattern_masks.
+    length: Length of the pattern.
+    text: The text to compare the pattern with.
+    bound: Distances above this are not computed exactly.
+
+  Returns:
+    The distance, or `bound + 1` if it exceeds `bound`.
+  """
+  if not length:
+    return len(text) if len(text) <= bound else bound + 1
+  full = (1 << length) - 1
+  last = 1 << (length - 1)
+  vp = full
+  vn = 0
+  score = length
+  remaining = len(text)
+  for char in text:
+    eq = masks.get(char, 0)
+    xv = eq | vn
+    xh = (((eq & vp) + vp) ^ vp) | eq
+    hp = (vn | ~(xh | vp)) & full
+    hn = vp & xh
+    if hp & last:
+      score += 1
+    elif hn & last:
+      score -= 1
+    hp = ((hp << 1) | 1) & full
+    hn = (hn << 1) & full
+    vp = (hn | ~(xv | hp)) & full
+    vn = hp & xv
+    remaining -= 1
+    # Each remaining character lowers the distance by at most one.
+    if score - remaining > bound:
+      return bound + 1
+  return score
+
+
+def levenshtein_distance(s1: str, s2: str) -> int:
+  """Computes the Levenshtein distance between two strings."""
+  return _bounded_distance(
+      _pattern_masks(s1), len(s1), s2, max(len(s1), len(s2))
+  )
+
+
+class FuzzyElementIndex:
+  """Finds the UI element whose text best matches a target."""
+
+  def __init__(
+      self,
+      ui_elements: Sequence[representation_utils.UIElement],
+      case_sensitive: bool = False,
+  ):
+    """Indexes the text and content description of `ui_elements`.
+
+    Args:
+      ui_elements: The UI elements of one observation.
+      case_sensitive: Whether matching is case sensitive.
+    """
+    self._case_sensitive = case_sensitive
+    self._exact: dict[str, int] = {}
+    self._by_length: dict[int, list[tuple[int, str]]] = (
+        collections.defaultdict(list)
+    )
+    for i, element in enumerate(ui_elements):
+      for attr in (element.text, element.content_description):
+        if attr is None:
+          continue
+        if not case_sensitive:
+          attr = attr.lower()
+        self._exact.setdefault(attr, i)
+        self._by_length[len(attr)].append((i, attr))
+
+  def find(
+      self, target: str, max_distance: Optional[int] = None
+  ) -> tuple[int, int]:
+    """Returns the element closest to `target`, and its distance.
+
+    Ties are broken in favor of the element that comes first.
+
+    Args:
+      target: The text to look for.
+      max_distance: If set, only matches within this distance are considered.
+
+    Returns:
+      The index of the element and the edit distance of its text, or
+      (-1, NO_MATCH) if no element has text within `max_distance`.
+    """
+    if not self._case_sensitive:
+      target = target.lower()
+    if target in self._exact:
+      return self._exact[target], 0
+
+    best_index = -1
+    best_distance = NO_MATCH if max_distance is None else max_distance
+    masks = _pattern_masks(target)
+    length = len(target)
+    for text_length in sorted(
+        self._by_length, key=lambda l: abs(l - length)
+    ):
+      if abs(text_length - length) > best_distance:
+        break
+      for index, text in self._by_length[text_length]:
+        if best_index != -1 and index > best_index and (
+            abs(text_length - length) == best_distance
+        ):
+          continue
+        distance = _bounded_distance(masks, length, text, best_distance)
+        if distance > best_distance:
+          continue
+        if (
+            best_index == -1
+            or distance < best_distance
+            or index < best_index
+        ):
+          best_index, best_distance = index, distance
+    if best_index == -1:
+      return -1, NO_MATCH
+    return best_index, best_distance
@@ -0,0 +1,104 @@
+# Copyright 2025 The android_world Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import random
+
+from absl.testing import absltest
+from absl.testing import parameterized
+from android_world.env import element_index
+from android_world.env import representation_utils
+
+
+def _reference_distance(s1: str, s2: str) -> int:
+  previous = list(range(len(s2) + 1))
+  for i, c1 in enumerate(s1):
+    current = [i + 1]
+    for j, c2 in enumerate(s2):
+      current.append(
+          min(previous[j + 1] + 1, current[j] + 1, previous[j] + (c1 != c2))
+      )
+    previous = current
+  return previous[-1]
+
+
+def _element(text=None, content_description=None):
+  return representation_utils.UIElement(
+      text=text, content_description=content_description
+  )
+
+
+class LevenshteinDistanceTest(parameterized.TestCase):
+
+  @parameterized.parameters(
+      ('', '', 0),
+      ('', 'abc', 3),
+      ('kitten', 'sitting', 3),
+      ('flaw', 'lawn', 2),
+      ('a' * 100, 'a' * 99 + 'b', 1),
+  )
+  def test_distance(self, s1, s2, expected):
+    self.assertEqual(element_index.levenshtein_distance(s1, s2), expected)
+    self.assertEqual(element_index.levenshtein_distance(s2, s1), expected)
+
+  def test_matches_reference(self):
+    rng = random.Random(0)
+    for _ in range(500):
+      s1, s2 = (
+          ''.join(rng.choices('abc ', k=rng.randint(0, 80))) for _ in range(2)
+      )
+      self.assertEqual(
+          element_index.levenshtein_distance(s1, s2),
+          _reference_distance(s1, s2),
+      )
+
+
+class FuzzyElementIndexTest(absltest.TestCase):
+
+  def test_exact_match(self):
+    index = element_index.FuzzyElementIndex(
+        [_element('Cancel'), _element(content_description='Save')]
+    )
+
+    self.assertEqual(index.find('SAVE'), (1, 0))
+
+  def test_case_sensitive(self):
+    index = element_index.FuzzyElementIndex(
+        [_element('Save')], case_sensitive=True
+    )
+
+    self.assertEqual(index.find('SAVE'), (0, 3))
+
+  def test_closest_match_first_element_wins_ties(self):
+    index = element_index.FuzzyElementIndex(
+        [_element('Nxt'), _element('Text'), _element('Nex')]
+    )
+
+    self.assertEqual(index.find('Next'), (0, 1))
+
+  def test_max_distance(self):
+    index = element_index.FuzzyElementIndex([_element('Settings')])
+
+    self.assertEqual(index.find('Setting', max_distance=1), (0, 1))
+    self.assertEqual(
+        index.find('Set', max_distance=1), (-1, element_index.NO_MATCH)
+    )
+
+  def test_no_text(self):
+    index = element_index.FuzzyElementIndex([_element()])
+
+    self.assertEqual(index.find('OK'), (-1, element_index.NO_MATCH))
+
+
+if __name__ == '__main__':
+  absltest.main()
@@ -0,0 +1,406 @@
+# Copyright 2025 The android_world Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Backends for resetting the device between tasks.
+
+By default tasks reset the device file by file: they set the device time and
+restore the snapshots of their apps' data, see `app_snapshot`. This is slow
+for apps with a lot of data, and leaves out state kept by system providers,
+such as SMS, contacts and calendar.
+
+`EmulatorSnapshotReset` instead saves the whole emulator, RAM included, as a
+quickboot snapshot the first time a baseline is reached, and loads it on later
+resets to that baseline:
+
+  service = emulator_snapshots.GrpcSnapshotService.connect(grpc_port=8554)
+  controller.set_reset_backend(
+      emulator_snapshots.EmulatorSnapshotReset(service)
+  )
+
+Tasks that reset the device alike share a baseline; see
+`TaskEval.reset_baseline`. Emulator snapshots take hundreds of megabytes, so
+only the most recently used baselines are kept.
+
+Baselines are only reused within a run. Snapshots left by earlier runs may
+hold other app versions or data, which the baseline names do not capture, so
+they are overwritten rather than loaded.
+
+Loading a snapshot replaces the device state under the controller, which must
+then drop what it cached from the device; see
+`AndroidWorldController.note_device_restored`.
+"""
+
+import abc
+import collections
+from collections.abc import Callable
+import dataclasses
+import socket
+import threading
+import time
+from typing import Any, Optional
+
+from absl import logging
+from android_env.proto import snapshot_service_pb2
+from android_env.proto import snapshot_service_pb2_grpc
+import grpc
+
+_DEFAULT_MAX_BASELINES = 4
+
+# Prefix of the snapshots saved by EmulatorSnapshotReset.
+SNAPSHOT_PREFIX = 'android_world_'
+
+
+class SnapshotService(abc.ABC):
+  """Saves and loads whole-emulator snapshots."""
+
+  name: str
+
+  @abc.abstractmethod
+  def save(self, snapshot_id: str) -> None:
+    """Saves the emulator's current state, replacing any prior snapshot.
+
+    Args:
+      snapshot_id: Name of the snapshot.
+
+    Raises:
+      RuntimeError: If the snapshot could not be saved.
+    """
+
+  @abc.abstractmethod
+  def load(self, snapshot_id: str) -> None:
+    """Loads a snapshot.
+
+    Args:
+      snapshot_id: Name of the snapshot.
+
+    Raises:
+      RuntimeError: If the snapshot does not exist or could not be loaded.
+    """
+
+  @abc.abstractmethod
+  def list_snapshots(self) -> list[str]:
+    """Returns the names of the stored snapshots."""
+
+  @abc.abstractmethod
+  def delete(self, snapshot_id: str) -> None:
+    """Deletes a snapshot, if it exists."""
+
+
+class GrpcSnapshotService(SnapshotService):
+  """Snapshots through the emulator's gRPC snapshot service."""
+
+  name = 'emulator_grpc'
+
+  def __init__(self, stub: snapshot_service_pb2_grpc.SnapshotServiceStub):
+    self._stub = stub
+
+  @classmethod
+  def connect(
+      cls, grpc_port: int, timeout_sec: int = 10
+  ) -> 'GrpcSnapshotService':
+    """Connects to the emulator listening on `grpc_port` on localhost."""
+    channel = grpc.secure_channel(
+        f'localhost:{grpc_port}', grpc.local_channel_credentials()
+    )
+    grpc.channel_ready_future(channel).result(timeout=timeout_sec)
+    return cls(snapshot_service_pb2_grpc.SnapshotServiceStub(channel))
+
+  def _check(
+      self, action: str, response: snapshot_service_pb2.SnapshotPackage
+  ) -> None:
+    if not response.success:
+      raise RuntimeError(
+          f'Failed to {action} snapshot {response.snapshot_id}:'
+          f' {response.err.decode("utf-8", errors="replace")}'
+      )
+
+  def save(self, snapshot_id: str) -> None:
+    self._check(
+        'save',
+        self._stub.SaveSnapshot(
+            snapshot_service_pb2.SnapshotPackage(snapshot_id=snapshot_id)
+        ),
+    )
+
+  def load(self, snapshot_id: str) -> None:
+    self._check(
+        'load',
+        self._stub.LoadSnapshot(
+            snapshot_service_pb2.SnapshotPackage(snapshot_id=snapshot_id)
+        ),
+    )
+
+  def list_snapshots(self) -> list[str]:
+    snapshots = self._stub.ListSnapshots(
+        snapshot_service_pb2.SnapshotFilter(
+            statusFilter=snapshot_service_pb2.SnapshotFilter.LoadStatus.All
+        )
+    )
+    return [snapshot.snapshot_id for snapshot in snapshots.snapshots]
+
+  def delete(self, snapshot_id: str) -> None:
+    self._stub.DeleteSnapshot(
+        snapshot_service_pb2.SnapshotPackage(snapshot_id=snapshot_id)
+    )
+
+
+class ConsoleSnapshotService(SnapshotService):
+  """Snapshots through the emulator console, for emulators without gRPC.
+
+  The console answers each command with its output, followed by `OK` or by
+  `KO: <error>`.
+  """
+
+  name = 'emulator_console'
+
+  def __init__(
+      self,
+      console_port: int,
+      auth_token: Optional[str] = None,
+      host: str = 'localhost',
+      timeout_sec: float = 120.0,
+  ):
+    """Initializes the service.
+
+    Args:
+      console_port: The console port of the emulator, e.g. 5554.
+      auth_token: The console auth token, from
+        `~/.emulator_console_auth_token`. Not needed if that file is empty.
+      host: The host the emulator runs on.
+      timeout_sec: Timeout of each command; saving can take a while.
+    """
+    self._address = (host, console_port)
+    self._auth_token = auth_token
+    self._timeout_sec = timeout_sec
+    self._socket: Optional[socket.socket] = None
+    self._buffer = b''
+    self._lock = threading.Lock()
+
+  def _read_reply(self) -> list[str]:
+    """Reads lines up to the status line; raises RuntimeError on `KO`."""
+    lines = []
+    while True:
+      while b'\n' not in self._buffer:
+        data = self._socket.recv(4096)
+        if not data:
+          raise RuntimeError('The emulator console closed the connection.')
+        self._buffer += data
+      line, self._buffer = self._buffer.split(b'\n', 1)
+      line = line.decode('utf-8', errors='replace').rstrip('\r')
+      if line == 'OK':
+        return lines
+      if line.startswith('KO'):
+        raise RuntimeError(f'Emulator console error: {line}')
+      lines.append(line)
+
+  def _command(self, command: str) -> list[str]:
+    """Sends a command and returns the lines of its output."""
+    with self._lock:
+      if self._socket is None:
+        self._socket = socket.create_connection(
+            self._address, timeout=self._timeout_sec
+        )
+        self._buffer = b''
+        self._read_reply()  # The banner.
+        if self._auth_token:
+          self._socket.sendall(f'auth {self._auth_token}\n'.encode())
+          self._read_reply()
+      try:
+        self._socket.sendall(f'{command}\n'.encode())
+        return self._read_reply()
+      except OSError:
+        self.close()
+        raise
+
+  def close(self) -> None:
+    if self._socket is not None:
+      self._socket.close()
+      self._socket = None
+
+  def save(self, snapshot_id: str) -> None:
+    self._command(f'avd snapshot save {snapshot_id}')
+
+  def load(self, snapshot_id: str) -> None:
+    self._command(f'avd snapshot load {snapshot_id}')
+
+  def list_snapshots(self) -> list[str]:
+    return parse_console_snapshot_list(self._command('avd snapshot list'))
+
+  def delete(self, snapshot_id: str) -> None:
+    self._command(f'avd snapshot delete {snapshot_id}')
+
+
+def parse_console_snapshot_list(lines: list[str]) -> list[str]:
+  """Parses the table printed by `avd snapshot list`.
+
+  Args:
+    lines: The output lines, e.g. a `List of snapshots...` title, then a
+      header starting with `ID  TAG` and one row per snapshot.
+
+  Returns:
+    The names, i.e. tags, of the snapshots.
+  """
+  names = []
+  in_table = False
+  for line in lines:
+    columns = line.split()
+    if columns[:2] == ['ID', 'TAG']:
+      in_table = True
+    elif in_table and len(columns) >= 2:
+      names.append(columns[1])
+  return names
+
+
+class ResetBackend(abc.ABC):
+  """Brings the device to the state a task starts from."""
+
+  name: str
+
+  # Whether tasks should still restore their apps when torn down. Backends
+  # that restore the whole device on the next reset make it redundant.
+  restore_apps_on_tear_down: bool = True
+
+  @abc.abstractmethod
+  def reset(self, baseline: str, prepare: Callable[[], None]) -> bool:
+    """Resets the device to `baseline`.
+
+    Args:
+      baseline: Name of the starting state, shared by the tasks that reset
+        the device alike.
+      prepare: Brings the device to `baseline` file by file, e.g. by setting
+        the device time and restoring app snapshots.
+
+    Returns:
+      Whether `prepare` was skipped.
+    """
+
+
+class FileReset(ResetBackend):
+  """Resets the device file by file, as tasks do without a backend."""
+
+  name = 'file'
+
+  def reset(self, baseline: str, prepare: Callable[[], None]) -> bool:
+    del baseline
+    prepare()
+    return False
+
+
+@dataclasses.dataclass
+class ResetStats:
+  """Counters of EmulatorSnapshotReset.
+
+  Attributes:
+    loads: Resets served by loading a snapshot.
+    saves: Baselines reached with `prepare` and then saved.
+    evictions: Snapshots deleted to keep at most `max_baselines`.
+    failures: Loads or saves that failed, falling back to `prepare`.
+    load_sec: Total time spent loading snapshots.
+    prepare_sec: Total time spent in `prepare` and saving snapshots.
+  """
+
+  loads: int = 0
+  saves: int = 0
+  evictions: int = 0
+  failures: int = 0
+  load_sec: float = 0.0
+  prepare_sec: float = 0.0
+
+  def as_dict(self) -> dict[str, Any]:
+    return dataclasses.asdict(self)
+
+
+class EmulatorSnapshotReset(ResetBackend):
+  """Resets the device by loading quickboot snapshots of baselines."""
+
+  name = 'emulator_snapshot'
+  restore_apps_on_tear_down = False
+
+  def __init__(
+      self,
+      service: SnapshotService,
+      max_baselines: int = _DEFAULT_MAX_BASELINES,
+      clock: Callable[[], float] = time.perf_counter,
+  ):
+    """Initializes the backend.
+
+    Args:
+      service: Service to save and load snapshots with.
+      max_baselines: Number of baseline snapshots to keep; the least recently
+        used one is deleted to make room for a new one.
+      clock: Clock to time resets with; injectable for tests.
+    """
+    if max_baselines < 1:
+      raise ValueError(f'max_baselines must be positive, got {max_baselines}.')
+    self._service = service
+    self._max_baselines = max_baselines
+    self._clock = clock
+    self._lock = threading.Lock()
+    self.stats = ResetStats()
+    # Snapshots saved by this backend, least recently used first.
+    self._baselines: collections.OrderedDict[str, None] = (
+        collections.OrderedDict()
+    )
+
+  @property
+  def baselines(self) -> list[str]:
+    """Ids of the kept snapshots, least recently used first."""
+    return list(self._baselines)
+
+  def forget(self) -> None:
+    """Deletes all baseline snapshots, e.g. after the apps were set up anew."""
+    with self._lock:
+      for snapshot_id in self._baselines:
+        self._service.delete(snapshot_id)
+      self._baselines.clear()
+
+  def reset(self, baseline: str, prepare: Callable[[], None]) -> bool:
+    snapshot_id = SNAPSHOT_PREFIX + baseline
+    with self._lock:
+      if snapshot_id in self._baselines:
+        start = self._clock()
+        try:
+          self._service.load(snapshot_id)
+        except RuntimeError:
+          logging.exception('Failed to load snapshot %s.', snapshot_id)
+          self.stats.failures += 1
+          del self._baselines[snapshot_id]
+        else:
+          self._baselines.move_to_end(snapshot_id)
+          self.stats.loads += 1
+          self.stats.load_sec += self._clock() - start
+          return True
+
+      start = self._clock()
+      prepare()
+      while len(self._baselines) >= self._max_baselines:
+        evicted, _ = self._baselines.popitem(last=False)
+        self._service.delete(evicted)
+        self.stats.evictions += 1
+      try:
+        self._service.save(snapshot_id)
+      except RuntimeError:
+        logging.exception('Failed to save snapshot %s.', snapshot_id)
+        self.stats.failures += 1
+      else:
+        self._baselines[snapshot_id] = None
+        self.stats.saves += 1
+      self.stats.prepare_sec += self._clock() - start
+      return False
+
+
+def backend_for(env: Any) -> Optional[ResetBackend]:
+  """Returns the ResetBackend of `env`, if one is set."""
+  backend = getattr(env, 'reset_backend', None)
+  return backend if isinstance(backend, ResetBackend) else None
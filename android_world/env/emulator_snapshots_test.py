@@ -0,0 +1,163 @@
+# Copyright 2025 The android_world Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from unittest import mock
+
+from absl.testing import absltest
+from android_world.env import emulator_snapshots
+from android_world.utils import fake_emulator
+
+
+class EmulatorSnapshotResetTest(absltest.TestCase):
+
+  def setUp(self):
+    super().setUp()
+    self.emulator = fake_emulator.FakeEmulator({'sms': []})
+
+  def _prepare(self):
+    """Returns a prepare callback that resets the fake's SMS provider."""
+    prepare = mock.Mock()
+    prepare.side_effect = lambda: self.emulator.state.update(sms=[])
+    return prepare
+
+  def test_loads_baseline_after_preparing_it_once(self):
+    backend = emulator_snapshots.EmulatorSnapshotReset(self.emulator)
+    prepare = self._prepare()
+
+    self.assertFalse(backend.reset('a', prepare))
+    self.emulator.state['sms'].append('leaked message')
+    self.assertTrue(backend.reset('a', prepare))
+
+    prepare.assert_called_once()
+    self.assertEqual(self.emulator.state, {'sms': []})
+    self.assertEqual(
+        self.emulator.calls,
+        [('save', 'android_world_a'), ('load', 'android_world_a')],
+    )
+    self.assertEqual(backend.stats.loads, 1)
+    self.assertEqual(backend.stats.saves, 1)
+
+  def test_evicts_least_recently_used_baseline(self):
+    backend = emulator_snapshots.EmulatorSnapshotReset(
+        self.emulator, max_baselines=2
+    )
+    prepare = self._prepare()
+
+    backend.reset('a', prepare)
+    backend.reset('b', prepare)
+    backend.reset('a', prepare)
+    backend.reset('c', prepare)
+
+    self.assertEqual(backend.baselines, ['android_world_a', 'android_world_c'])
+    self.assertCountEqual(
+        self.emulator.snapshots, ['android_world_a', 'android_world_c']
+    )
+    self.assertEqual(backend.stats.evictions, 1)
+
+  def test_ignores_snapshots_of_prior_runs(self):
+    self.emulator.snapshots = {
+        'android_world_a': {'sms': ['stale message']},
+        'other': {},
+    }
+    backend = emulator_snapshots.EmulatorSnapshotReset(self.emulator)
+    prepare = self._prepare()
+
+    self.assertFalse(backend.reset('a', prepare))
+    prepare.assert_called_once()
+    self.assertEqual(self.emulator.snapshots['android_world_a'], {'sms': []})
+    self.assertEqual(backend.baselines, ['android_world_a'])
+
+  def test_prepares_again_if_load_fails(self):
+    backend = emulator_snapshots.EmulatorSnapshotReset(self.emulator)
+    prepare = self._prepare()
+    backend.reset('a', prepare)
+    del self.emulator.snapshots['android_world_a']
+
+    self.assertFalse(backend.reset('a', prepare))
+
+    self.assertEqual(prepare.call_count, 2)
+    self.assertEqual(backend.stats.failures, 1)
+    self.assertIn('android_world_a', self.emulator.snapshots)
+
+  def test_file_reset_always_prepares(self):
+    prepare = self._prepare()
+
+    self.assertFalse(emulator_snapshots.FileReset().reset('a', prepare))
+    prepare.assert_called_once()
+
+  def test_backend_for(self):
+    backend = emulator_snapshots.FileReset()
+
+    self.assertIs(
+        emulator_snapshots.backend_for(mock.Mock(reset_backend=backend)),
+        backend,
+    )
+    self.assertIsNone(emulator_snapshots.backend_for(mock.Mock()))
+
+
+class SnapshotServiceTest(absltest.TestCase):
+
+  def setUp(self):
+    super().setUp()
+    self.emulator = fake_emulator.FakeEmulator({'contacts': ['Jane']})
+
+  def _check_round_trip(self, service):
+    service.save('baseline')
+    self.emulator.state['contacts'].append('John')
+    service.load('baseline')
+
+    self.assertEqual(self.emulator.state, {'contacts': ['Jane']})
+    self.assertEqual(service.list_snapshots(), ['baseline'])
+    with self.assertRaises(RuntimeError):
+      service.load('missing')
+    service.delete('baseline')
+    self.assertEqual(service.list_snapshots(), [])
+
+  def test_console(self):
+    with self.emulator.serve_console(auth_token='secret') as port:
+      service = emulator_snapshots.ConsoleSnapshotService(
+          port, auth_token='secret', timeout_sec=5
+      )
+      self._check_round_trip(service)
+      service.close()
+
+  def test_console_without_auth_token_fails(self):
+    with self.emulator.serve_console(auth_token='secret') as port:
+      service = emulator_snapshots.ConsoleSnapshotService(port, timeout_sec=5)
+      with self.assertRaisesRegex(RuntimeError, 'authentication required'):
+        service.save('baseline')
+      service.close()
+
+  def test_grpc(self):
+    with self.emulator.serve_grpc() as port:
+      self._check_round_trip(
+          emulator_snapshots.GrpcSnapshotService.connect(port)
+      )
+
+  def test_parse_console_snapshot_list(self):
+    lines = [
+        'List of snapshots present on all disks:',
+        'ID        TAG                 VM SIZE                DATE',
+        '--        default_boot           1.2G 2023-10-15 15:34:00',
+        '--        android_world_1f       1.1G 2023-10-15 15:40:00',
+    ]
+
+    self.assertEqual(
+        emulator_snapshots.parse_console_snapshot_list(lines),
+        ['default_boot', 'android_world_1f'],
+    )
+
+
+if __name__ == '__main__':
+  absltest.main()
@@ -0,0 +1,334 @@
+# Copyright 2025 The android_world Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Waits for a11y forests pushed by the a11y forwarder app.
+
+The forwarder app pushes a forest over gRPC whenever the UI changes. Instead of
+sleeping a fixed time between polls, a subscription waits until the gRPC
+servicer receives a forest, up to a deadline.
+
+To be signaled, a subscription hooks into the servicer's private
+`_process_forest`; the hook is removed when the last subscription to the
+servicer is closed. The signal also counts forests as they arrive, so that
+callers can ask for a forest that arrived after an action; see
+`ForestSubscription.arrivals`.
+
+The forwarder cannot reach the host while airplane mode is on, so connectivity
+is checked before waiting. The result is cached and only checked again after a
+forest failed to arrive or after airplane mode was toggled through adb_utils.
+In the common case, getting a forest therefore issues no adb calls.
+"""
+
+import dataclasses
+import threading
+import time
+from typing import Any, Callable, Optional
+import weakref
+
+from absl import logging
+from android_env import env_interface
+from android_env.proto.a11y import android_accessibility_forest_pb2
+from android_world.env import adb_utils
+from android_world.env import ui_stability
+
+Forest = android_accessibility_forest_pb2.AndroidAccessibilityForest
+
+# Fallback polling for when the servicer cannot signal new forests.
+_DEFAULT_POLLING_SCHEDULE = ui_stability.PollingSchedule(
+    initial_interval=0.05, max_interval=0.5
+)
+
+# How long to wait for a forest that arrived after an action before returning
+# an older one; the UI may not have changed.
+_DEFAULT_FRESH_TIMEOUT_SEC = 1.0
+
+
+@dataclasses.dataclass
+class ForestStats:
+  """Counters describing how forests were obtained.
+
+  Attributes:
+    forests: Forests returned.
+    polls: Times the wrapper was polled for new forests.
+    retries: Polls that found no usable forest.
+    timeouts: Requests for which no forest arrived before the deadline.
+    stale: Requests for a forest that arrived after an action, answered with
+      an older one as none arrived in time.
+    connectivity_checks: Airplane mode checks; each is an adb call.
+    networking_enabled: Times networking was re-enabled.
+    reconnects: Reconnections to the device.
+    reconnects_rate_limited: Reconnections skipped because the previous one
+      was too recent.
+  """
+
+  forests: int = 0
+  polls: int = 0
+  retries: int = 0
+  timeouts: int = 0
+  stale: int = 0
+  connectivity_checks: int = 0
+  networking_enabled: int = 0
+  reconnects: int = 0
+  reconnects_rate_limited: int = 0
+
+  def as_dict(self) -> dict[str, int]:
+    return dataclasses.asdict(self)
+
+
+class _ForestSignal:
+  """Counts forests received by a servicer and wakes up waiters."""
+
+  def __init__(self):
+    self.condition = threading.Condition()
+    self.count = 0
+    # Subscriptions using the signal; the hook is removed when none is left.
+    self.subscribers = 0
+
+  def notify(self) -> None:
+    with self.condition:
+      self.count += 1
+      self.condition.notify_all()
+
+
+_signals: 'weakref.WeakKeyDictionary[Any, _ForestSignal]' = (
+    weakref.WeakKeyDictionary()
+)
+_signals_lock = threading.Lock()
+
+
+def _find_servicer(env: env_interface.AndroidEnvInterface) -> Any:
+  """Returns the a11y servicer of `env`, or None if it has none."""
+  # pylint: disable=protected-access
+  servicer = None
+  while env is not None and servicer is None:
+    servicer = getattr(env, '_servicer', None)
+    env = getattr(env, '_env', None)
+  # pylint: enable=protected-access
+  if servicer is None or not hasattr(servicer, '_process_forest'):
+    return None
+  return servicer
+
+
+def _subscribe(servicer: Any) -> _ForestSignal:
+  """Returns a signal raised whenever `servicer` gets a forest.
+
+  The signal is shared by all subscriptions to the same servicer. The first
+  subscription hooks it into the servicer; see `_unsubscribe`.
+
+  Args:
+    servicer: The a11y servicer of an A11yGrpcWrapper.
+  """
+  # pylint: disable=protected-access
+  with _signals_lock:
+    signal = _signals.get(servicer)
+    if signal is None:
+      signal = _ForestSignal()
+      process_forest = servicer._process_forest
+
+      def process_forest_and_notify(forest: Forest) -> None:
+        process_forest(forest)
+        signal.notify()
+
+      servicer._process_forest = process_forest_and_notify
+      _signals[servicer] = signal
+    signal.subscribers += 1
+  # pylint: enable=protected-access
+  return signal
+
+
+def _unsubscribe(servicer: Any) -> None:
+  """Removes the hook of `_subscribe` once no subscription is left."""
+  # pylint: disable=protected-access
+  with _signals_lock:
+    signal = _signals.get(servicer)
+    if signal is None:
+      return
+    signal.subscribers -= 1
+    if signal.subscribers <= 0:
+      # Drops the instance attribute, so the class' method is used again.
+      vars(servicer).pop('_process_forest', None)
+      del _signals[servicer]
+  # pylint: enable=protected-access
+
+
+class ForestSubscription:
+  """Gets the newest a11y forest from an env wrapped by A11yGrpcWrapper."""
+
+  def __init__(
+      self,
+      env: env_interface.AndroidEnvInterface,
+      stats: Optional[ForestStats] = None,
+      schedule: ui_stability.PollingSchedule = _DEFAULT_POLLING_SCHEDULE,
+      versions: Optional[adb_utils.DeviceVersions] = None,
+      fresh_timeout_sec: float = _DEFAULT_FRESH_TIMEOUT_SEC,
+      clock: Callable[[], float] = time.monotonic,
+  ):
+    """Initializes the subscription.
+
+    Args:
+      env: An environment wrapped by a11y_grpc_wrapper.A11yGrpcWrapper.
+      stats: Counters to update; pass the same object to subscriptions that
+        replace each other to keep counting across reconnects.
+      schedule: Intervals between polls if no forest arrives. Waiting ends
+        early when the servicer receives a forest.
+      versions: The counters adb_utils bumps when airplane mode is toggled on
+        the device; those of `env` if None. See adb_utils.versions_for.
+      fresh_timeout_sec: How long `get` waits for a forest that arrived after
+        `arrived_after` before returning an older one.
+      clock: Monotonic clock; injectable for tests.
+    """
+    self._env = env
+    self.stats = stats if stats is not None else ForestStats()
+    self._schedule = schedule
+    self._versions = (
+        versions if versions is not None else adb_utils.versions_for(env)
+    )
+    self._fresh_timeout_sec = fresh_timeout_sec
+    self._clock = clock
+    self._servicer = _find_servicer(env)
+    self._signal = None
+    if self._servicer is not None:
+      self._signal = _subscribe(self._servicer)
+    self._lock = threading.Lock()
+    # DeviceVersions.connectivity when connectivity was last verified.
+    self._verified_connectivity: Optional[int] = None
+
+  def close(self) -> None:
+    """Stops being signaled of new forests."""
+    if self._signal is not None:
+      _unsubscribe(self._servicer)
+      self._signal = None
+
+  def arrivals(self) -> Optional[int]:
+    """Returns the number of forests the servicer received so far.
+
+    Pass it to `get` as `arrived_after`, e.g. before an action, to wait for a
+    forest received after it. None if the servicer cannot be signaled.
+    """
+    return self._signal.count if self._signal is not None else None
+
+  def poll(self) -> Optional[Forest]:
+    """Returns the newest forest received so far, or None; never waits.
+
+    The forest may be older than the last call, as it is kept until a newer
+    one arrives.
+    """
+    self.stats.polls += 1
+    try:
+      return self._env.accumulate_new_extras()['accessibility_tree'][-1]  # pytype:disable=attribute-error
+    except KeyError:
+      return None
+
+  def invalidate_connectivity(self) -> None:
+    """Makes the next `get` check connectivity again."""
+    self._verified_connectivity = None
+
+  def get(
+      self,
+      timeout_sec: float = 5.0,
+      newer_than: Optional[Forest] = None,
+      arrived_after: Optional[int] = None,
+  ) -> Forest:
+    """Returns the newest forest, waiting for one to arrive if needed.
+
+    Args:
+      timeout_sec: Maximum time to wait for a forest.
+      newer_than: If set, waits for a forest other than this one.
+      arrived_after: If set, a value of `arrivals`; waits up to
+        `fresh_timeout_sec` for a forest received after it, then settles for
+        the newest one, as the UI may not have changed.
+
+    Returns:
+      The forest.
+
+    Raises:
+      RuntimeError: If no forest arrived in time.
+    """
+    with self._lock:
+      was_verified = self._verified_connectivity == self._versions.connectivity
+      self._ensure_connectivity()
+      forest = self._wait(timeout_sec, newer_than, arrived_after)
+      if forest is None and was_verified:
+        # Connectivity may have been lost since it was last checked.
+        self.invalidate_connectivity()
+        if self._ensure_connectivity():
+          forest = self._wait(timeout_sec, newer_than, arrived_after)
+      if forest is None:
+        self.stats.timeouts += 1
+        self.invalidate_connectivity()
+        raise RuntimeError('Could not get a11y tree.')
+      self.stats.forests += 1
+      return forest
+
+  def _ensure_connectivity(self) -> bool:
+    """Turns off airplane mode unless connectivity is known to be fine.
+
+    Returns:
+      Whether networking was re-enabled.
+    """
+    version = self._versions.connectivity
+    if self._verified_connectivity == version:
+      return False
+    self.stats.connectivity_checks += 1
+    enabled = False
+    if adb_utils.retry(3)(adb_utils.check_airplane_mode)(self._env):
+      logging.warning(
+          'Airplane mode is on -- cannot retrieve a11y tree via gRPC. Turning'
+          ' it off...'
+      )
+      self._env.attempt_enable_networking()  # pytype:disable=attribute-error
+      self.stats.networking_enabled += 1
+      enabled = True
+    self._verified_connectivity = version
+    return enabled
+
+  def _wait(
+      self,
+      timeout_sec: float,
+      newer_than: Optional[Forest],
+      arrived_after: Optional[int],
+  ) -> Optional[Forest]:
+    start = self._clock()
+    deadline = start + timeout_sec
+    wants_fresh = arrived_after is not None and self._signal is not None
+    fresh_deadline = start + min(self._fresh_timeout_sec, timeout_sec)
+    intervals = self._schedule.intervals()
+    while True:
+      # Read before polling so that a forest arriving mid-poll is not missed.
+      # The forest polled is then at least the `seen`-th to arrive.
+      seen = self._signal.count if self._signal is not None else 0
+      forest = self.poll()
+      if forest is not None and forest is not newer_than:
+        if not wants_fresh or seen > arrived_after:
+          return forest
+        if self._clock() >= fresh_deadline:
+          self.stats.stale += 1
+          return forest
+      self.stats.retries += 1
+      now = self._clock()
+      remaining = deadline - now
+      if remaining <= 0:
+        return None
+      if wants_fresh and fresh_deadline > now:
+        remaining = min(remaining, fresh_deadline - now)
+      self._wait_for_arrival(seen, min(next(intervals), remaining))
+
+  def _wait_for_arrival(self, seen: int, timeout: float) -> None:
+    if self._signal is None:
+      time.sleep(timeout)
+      return
+    with self._signal.condition:
+      self._signal.condition.wait_for(
+          lambda: self._signal.count != seen, timeout=timeout
+      )
@@ -0,0 +1,182 @@
+# Copyright 2025 The android_world Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import threading
+import time
+from unittest import mock
+
+from absl.testing import absltest
+from android_world.env import adb_utils
+from android_world.env import forest_subscription
+from android_world.env import ui_stability
+
+
+class _FakeServicer:
+  """Stands in for android_env's A11yServicer."""
+
+  def __init__(self):
+    self.forests = []
+
+  def _process_forest(self, forest):
+    self.forests.append(forest)
+
+  def send(self, forest):
+    """Simulates the a11y forwarder app sending a forest over gRPC."""
+    self._process_forest(forest)
+
+
+class _FakeA11yEnv:
+  """Stands in for an env wrapped by A11yGrpcWrapper."""
+
+  def __init__(self):
+    self._servicer = _FakeServicer()
+    self.attempt_enable_networking = mock.MagicMock()
+
+  def accumulate_new_extras(self):
+    if not self._servicer.forests:
+      return {}
+    return {'accessibility_tree': list(self._servicer.forests)}
+
+
+class ForestSubscriptionTest(absltest.TestCase):
+
+  def setUp(self):
+    super().setUp()
+    self.mock_check_airplane_mode = self.enter_context(
+        mock.patch.object(
+            adb_utils, 'check_airplane_mode', return_value=False
+        )
+    )
+    self.env = _FakeA11yEnv()
+    self.subscription = forest_subscription.ForestSubscription(
+        self.env,
+        schedule=ui_stability.PollingSchedule.fixed(10.0),
+    )
+    self.addCleanup(self.subscription.close)
+
+  def test_returns_newest_forest(self):
+    self.env._servicer.send('first')
+    self.env._servicer.send('second')
+
+    self.assertEqual(self.subscription.get(), 'second')
+    self.assertEqual(self.subscription.stats.retries, 0)
+
+  def test_wakes_up_when_forest_arrives(self):
+    threading.Timer(0.05, self.env._servicer.send, args=('forest',)).start()
+
+    start = time.monotonic()
+    forest = self.subscription.get(timeout_sec=5.0)
+
+    self.assertEqual(forest, 'forest')
+    # The polling interval is 10s, so only the signal can end the wait early.
+    self.assertLess(time.monotonic() - start, 1.0)
+
+  def test_waits_for_newer_forest(self):
+    self.env._servicer.send('old')
+    threading.Timer(0.05, self.env._servicer.send, args=('new',)).start()
+
+    self.assertEqual(self.subscription.get(newer_than='old'), 'new')
+
+  def test_waits_for_forest_arrived_after_mark(self):
+    self.env._servicer.send('before action')
+    arrivals = self.subscription.arrivals()
+    threading.Timer(0.05, self.env._servicer.send, args=('after',)).start()
+
+    self.assertEqual(self.subscription.get(arrived_after=arrivals), 'after')
+    self.assertEqual(self.subscription.stats.stale, 0)
+
+  def test_returns_older_forest_if_none_arrives_after_mark(self):
+    subscription = forest_subscription.ForestSubscription(
+        self.env, fresh_timeout_sec=0.05
+    )
+    self.addCleanup(subscription.close)
+    self.env._servicer.send('unchanged')
+
+    forest = subscription.get(arrived_after=subscription.arrivals())
+
+    self.assertEqual(forest, 'unchanged')
+    self.assertEqual(subscription.stats.stale, 1)
+
+  def test_timeout_raises(self):
+    with self.assertRaises(RuntimeError):
+      self.subscription.get(timeout_sec=0.05)
+
+    self.assertEqual(self.subscription.stats.timeouts, 1)
+
+  def test_connectivity_is_checked_once(self):
+    self.env._servicer.send('forest')
+
+    for _ in range(3):
+      self.subscription.get()
+
+    self.mock_check_airplane_mode.assert_called_once()
+    self.assertEqual(self.subscription.stats.connectivity_checks, 1)
+
+  def test_connectivity_is_rechecked_after_airplane_mode_toggle(self):
+    self.env._servicer.send('forest')
+    self.subscription.get()
+
+    with mock.patch.object(adb_utils, 'issue_generic_request'):
+      adb_utils.toggle_airplane_mode('off', self.env)
+    self.subscription.get()
+
+    self.assertEqual(self.mock_check_airplane_mode.call_count, 2)
+
+  def test_airplane_mode_toggle_on_other_device_is_ignored(self):
+    self.env._servicer.send('forest')
+    self.subscription.get()
+
+    with mock.patch.object(adb_utils, 'issue_generic_request'):
+      adb_utils.toggle_airplane_mode('off', _FakeA11yEnv())
+    self.subscription.get()
+
+    self.mock_check_airplane_mode.assert_called_once()
+
+  def test_reenables_networking_when_forests_stop_arriving(self):
+    self.env._servicer.send('forest')
+    self.subscription.get()
+    self.env._servicer.forests.clear()
+    self.mock_check_airplane_mode.return_value = True
+    self.env.attempt_enable_networking.side_effect = (
+        lambda: self.env._servicer.send('after airplane mode')
+    )
+
+    self.assertEqual(
+        self.subscription.get(timeout_sec=0.05), 'after airplane mode'
+    )
+    self.env.attempt_enable_networking.assert_called_once()
+    self.assertEqual(self.subscription.stats.networking_enabled, 1)
+
+  def test_subscriptions_share_signal(self):
+    other = forest_subscription.ForestSubscription(self.env)
+
+    self.assertIs(other._signal, self.subscription._signal)
+    other.close()
+
+  def test_last_close_unhooks_servicer(self):
+    other = forest_subscription.ForestSubscription(self.env)
+    other.close()
+    self.env._servicer.send('forest')
+    self.assertEqual(self.subscription.arrivals(), 1)
+
+    self.subscription.close()
+
+    self.assertNotIn('_process_forest', vars(self.env._servicer))
+    self.assertIsNone(self.subscription.arrivals())
+    self.env._servicer.send('after close')
+    self.assertEqual(self.env._servicer.forests, ['forest', 'after close'])
+
+
+if __name__ == '__main__':
+  absltest.main()
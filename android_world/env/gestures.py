@@ -0,0 +1,462 @@
+# Copyright 2025 The android_world Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Compiles touch gestures into device-side shell scripts.
+
+A gesture is a sequence of strokes, and a stroke is the timed path of one
+finger from touching the screen to lifting it. Strokes are built from
+primitives such as `line` and `drag`, whose timing follows a precomputed
+FlingProfile:
+
+  gesture = [gestures.line((540, 1800), (540, 600), gestures.FLING)]
+  gestures.perform(gesture, env, gestures.GestureBackend.SENDEVENT)
+
+The whole gesture is compiled into one shell script and runs in a single adb
+round trip. Timing is then kept by the device, so it does not depend on the
+load of the host or on adb latency.
+"""
+
+from collections.abc import Sequence
+import dataclasses
+import enum
+import re
+from typing import Any, Optional
+
+from android_env import env_interface
+from android_env.proto import adb_pb2
+from android_world.env import adb_utils
+
+# Time between consecutive events of a profile, i.e. one 60 Hz frame.
+_FRAME_MS = 16
+
+# Strokes that stay still at least this long before moving are drags; see
+# ViewConfiguration.getLongPressTimeout.
+_LONG_PRESS_MS = 400
+
+# Timeout of a gesture script on top of the gesture's own duration.
+_TIMEOUT_MARGIN_SEC = 10.0
+
+# Linux input event codes used by sendevent scripts.
+_EV_SYN = 0
+_EV_KEY = 1
+_EV_ABS = 3
+_SYN_REPORT = 0
+_BTN_TOUCH = 330
+_ABS_MT_SLOT = 47
+_ABS_MT_POSITION_X = 53
+_ABS_MT_POSITION_Y = 54
+_ABS_MT_TRACKING_ID = 57
+# -1 as the unsigned value sendevent writes; lifts the tracked finger.
+_NO_TRACKING_ID = 0xFFFFFFFF
+
+
+class GestureBackend(enum.Enum):
+  """How a compiled gesture is injected.
+
+  INPUT: One `input swipe` or `input draganddrop` per stroke. Each stroke is a
+    straight line with constant speed; profiles only set its duration.
+  MOTIONEVENT: `input motionevent` DOWN, MOVE and UP events. Follows the
+    profile's path, but every event starts an `input` process, which delays
+    it by tens of milliseconds; suited to slow drags and holds, not flings.
+  SENDEVENT: Raw multi-touch events written to the touchscreen's input device
+    with `sendevent`. Follows the profile's path, but every event starts a
+    `sendevent` process whose startup adds to the sleeps between points, so
+    strokes run longer than their profile, more so on a loaded device; see
+    compile_sendevent. Requires a multi-touch device, see find_touch_device,
+    and assumes the display is in its natural orientation.
+  """
+
+  INPUT = 'input'
+  MOTIONEVENT = 'motionevent'
+  SENDEVENT = 'sendevent'
+
+
+@dataclasses.dataclass(frozen=True)
+class TouchPoint:
+  """Position of a finger at a time relative to the start of its stroke."""
+
+  x: int
+  y: int
+  t_ms: int
+
+
+Stroke = tuple[TouchPoint, ...]
+Gesture = Sequence[Stroke]
+
+
+@dataclasses.dataclass(frozen=True)
+class FlingProfile:
+  """Precomputed timing of a stroke.
+
+  Attributes:
+    duration_ms: Time from touching the screen to lifting the finger.
+    progress: Fraction of the path covered at equally spaced times, starting
+      with 0.0 and ending with 1.0.
+  """
+
+  duration_ms: int
+  progress: tuple[float, ...]
+
+  @classmethod
+  def linear(cls, duration_ms: int) -> 'FlingProfile':
+    """Returns a profile with constant speed; a scroll or a slow swipe."""
+    steps = max(1, duration_ms // _FRAME_MS)
+    return cls(duration_ms, tuple(i / steps for i in range(steps + 1)))
+
+  @classmethod
+  def ease_out(cls, duration_ms: int, power: float = 3.0) -> 'FlingProfile':
+    """Returns a profile that decelerates; a fling.
+
+    Args:
+      duration_ms: Duration of the stroke.
+      power: Exponent of the deceleration; higher values start faster.
+    """
+    steps = max(1, duration_ms // _FRAME_MS)
+    return cls(
+        duration_ms,
+        tuple(1.0 - (1.0 - i / steps) ** power for i in range(steps + 1)),
+    )
+
+
+# Matches `input swipe` without a duration.
+SCROLL = FlingProfile.linear(300)
+# A swipe slow enough not to fling the content.
+SLOW_SWIPE = FlingProfile.linear(2000)
+# Fast enough for the content to keep scrolling after the finger lifts.
+FLING = FlingProfile.ease_out(120)
+
+
+def line(
+    start: tuple[int, int],
+    end: tuple[int, int],
+    profile: FlingProfile = SCROLL,
+) -> Stroke:
+  """Returns a stroke from `start` to `end` following `profile`."""
+  (x0, y0), (x1, y1) = start, end
+  steps = len(profile.progress) - 1
+  return tuple(
+      TouchPoint(
+          round(x0 + (x1 - x0) * progress),
+          round(y0 + (y1 - y0) * progress),
+          round(profile.duration_ms * i / steps),
+      )
+      for i, progress in enumerate(profile.progress)
+  )
+
+
+def drag(
+    start: tuple[int, int],
+    end: tuple[int, int],
+    profile: FlingProfile = SLOW_SWIPE,
+    hold_ms: int = 600,
+) -> Stroke:
+  """Returns a stroke that long presses `start`, then moves to `end`.
+
+  Args:
+    start: Where the dragged item is.
+    end: Where it is dropped.
+    profile: Timing of the move, after the hold.
+    hold_ms: How long to hold before moving; longer than the long press
+      timeout so that the item is picked up.
+  """
+  path = line(start, end, profile)
+  return (path[0],) + tuple(
+      dataclasses.replace(point, t_ms=point.t_ms + hold_ms) for point in path
+  )
+
+
+def duration_ms(gesture: Gesture) -> int:
+  """Returns the duration of `gesture` if its strokes run back to back."""
+  return sum(stroke[-1].t_ms for stroke in gesture)
+
+
+def _sleep(delta_ms: int) -> list[str]:
+  return [f'sleep {delta_ms / 1000:.3f}'] if delta_ms > 0 else []
+
+
+def _hold_ms(stroke: Stroke) -> int:
+  """Returns how long the finger stays still before the stroke moves."""
+  first = stroke[0]
+  still_until = first.t_ms
+  for point in stroke[1:]:
+    if (point.x, point.y) != (first.x, first.y):
+      break
+    still_until = point.t_ms
+  return still_until - first.t_ms
+
+
+def compile_input(gesture: Gesture) -> list[str]:
+  """Compiles `gesture` into `input swipe` and `input draganddrop` commands."""
+  commands = []
+  for stroke in gesture:
+    first, last = stroke[0], stroke[-1]
+    hold_ms = _hold_ms(stroke)
+    if hold_ms >= _LONG_PRESS_MS:
+      # draganddrop holds for the long press timeout by itself.
+      command, move_ms = 'draganddrop', last.t_ms - hold_ms
+    else:
+      command, move_ms = 'swipe', last.t_ms
+    commands.append(
+        f'input {command} {first.x} {first.y} {last.x} {last.y}'
+        f' {max(move_ms, 1)}'
+    )
+  return commands
+
+
+def _thin(stroke: Stroke, max_moves: int) -> Stroke:
+  """Keeps the first and last point and at most `max_moves` in between."""
+  inner = stroke[1:-1]
+  if len(inner) > max_moves:
+    step = len(inner) / max_moves
+    inner = tuple(inner[int(i * step)] for i in range(max_moves))
+  return (stroke[0],) + tuple(inner) + (stroke[-1],)
+
+
+def compile_motionevent(gesture: Gesture, max_moves: int = 4) -> list[str]:
+  """Compiles `gesture` into `input motionevent` commands.
+
+  Args:
+    gesture: The gesture.
+    max_moves: Maximum number of MOVE events per stroke, since each costs an
+      `input` process.
+
+  Returns:
+    Shell commands.
+  """
+  commands = []
+  for stroke in gesture:
+    if len(stroke) > 1:
+      stroke = _thin(stroke, max_moves)
+    previous = stroke[0]
+    commands.append(f'input motionevent DOWN {previous.x} {previous.y}')
+    for point in stroke[1:-1]:
+      commands.extend(_sleep(point.t_ms - previous.t_ms))
+      commands.append(f'input motionevent MOVE {point.x} {point.y}')
+      previous = point
+    last = stroke[-1]
+    commands.extend(_sleep(last.t_ms - previous.t_ms))
+    commands.append(f'input motionevent UP {last.x} {last.y}')
+  return commands
+
+
+@dataclasses.dataclass(frozen=True)
+class AbsAxis:
+  """Range of an absolute input axis."""
+
+  minimum: int
+  maximum: int
+
+
+@dataclasses.dataclass(frozen=True)
+class TouchDevice:
+  """A multi-touch input device and the screen it covers.
+
+  Attributes:
+    path: Path of the device, e.g. /dev/input/event1.
+    x_axis: Range of ABS_MT_POSITION_X.
+    y_axis: Range of ABS_MT_POSITION_Y.
+    screen_size: Physical (width, height) of the screen in pixels.
+    has_slots: Whether the device reports ABS_MT_SLOT.
+  """
+
+  path: str
+  x_axis: AbsAxis
+  y_axis: AbsAxis
+  screen_size: tuple[int, int]
+  has_slots: bool = True
+
+  def scale(self, x: int, y: int) -> tuple[int, int]:
+    """Converts screen pixels to device axis values."""
+
+    def to_axis(value: int, size: int, axis: AbsAxis) -> int:
+      span = axis.maximum - axis.minimum
+      scaled = axis.minimum + round(value * span / max(size - 1, 1))
+      return min(max(scaled, axis.minimum), axis.maximum)
+
+    width, height = self.screen_size
+    return to_axis(x, width, self.x_axis), to_axis(y, height, self.y_axis)
+
+
+_GETEVENT_DEVICE = re.compile(r'^add device \d+: (\S+)')
+_GETEVENT_AXIS = re.compile(
+    r'\b(ABS_MT_SLOT|ABS_MT_POSITION_X|ABS_MT_POSITION_Y)\s*:.*?'
+    r'min (-?\d+), max (-?\d+)'
+)
+
+
+def parse_touch_device(
+    getevent_output: str, screen_size: tuple[int, int]
+) -> Optional[TouchDevice]:
+  """Finds the first multi-touch device in the output of `getevent -pl`.
+
+  Args:
+    getevent_output: Output of `getevent -pl`.
+    screen_size: Physical (width, height) of the screen.
+
+  Returns:
+    The device, or None if no device reports multi-touch positions.
+  """
+  devices: list[tuple[str, dict[str, AbsAxis]]] = []
+  for row in getevent_output.splitlines():
+    if match := _GETEVENT_DEVICE.match(row):
+      devices.append((match.group(1), {}))
+    elif devices and (match := _GETEVENT_AXIS.search(row)):
+      devices[-1][1][match.group(1)] = AbsAxis(
+          int(match.group(2)), int(match.group(3))
+      )
+  for path, axes in devices:
+    if 'ABS_MT_POSITION_X' in axes and 'ABS_MT_POSITION_Y' in axes:
+      return TouchDevice(
+          path=path,
+          x_axis=axes['ABS_MT_POSITION_X'],
+          y_axis=axes['ABS_MT_POSITION_Y'],
+          screen_size=screen_size,
+          has_slots='ABS_MT_SLOT' in axes,
+      )
+  return None
+
+
+def find_touch_device(env: env_interface.AndroidEnvInterface) -> TouchDevice:
+  """Queries the device's touchscreen.
+
+  Args:
+    env: The environment.
+
+  Returns:
+    The touchscreen.
+
+  Raises:
+    RuntimeError: If the device has no multi-touch input device.
+  """
+  response = adb_utils.issue_generic_request(['shell', 'getevent -pl'], env)
+  device = parse_touch_device(
+      response.generic.output.decode('utf-8', errors='replace'),
+      adb_utils.get_screen_size(env),
+  )
+  if device is None:
+    raise RuntimeError('No multi-touch input device found.')
+  return device
+
+
+def compile_sendevent(gesture: Gesture, device: TouchDevice) -> list[str]:
+  """Compiles `gesture` into `sendevent` commands for `device`.
+
+  Each event is written by its own `sendevent` process, and each point that
+  moves takes three of them: X, Y and the SYN_REPORT. The time those processes
+  take to start is not subtracted from the sleeps between points, so a stroke
+  drifts behind its profile by that startup time at every point; a 300 ms
+  SCROLL starts about 60 `sendevent` and 20 `sleep` processes.
+
+  Args:
+    gesture: The gesture to compile.
+    device: The touchscreen to write the events to.
+
+  Returns:
+    The shell commands, to run in order in one script.
+  """
+  commands = []
+
+  def send(*events: tuple[int, int, int]) -> None:
+    for event_type, code, value in events + ((_EV_SYN, _SYN_REPORT, 0),):
+      commands.append(f'sendevent {device.path} {event_type} {code} {value}')
+
+  for tracking_id, stroke in enumerate(gesture):
+    previous = stroke[0]
+    x, y = device.scale(previous.x, previous.y)
+    down = [(_EV_ABS, _ABS_MT_SLOT, 0)] if device.has_slots else []
+    send(
+        *down,
+        (_EV_ABS, _ABS_MT_TRACKING_ID, tracking_id),
+        (_EV_ABS, _ABS_MT_POSITION_X, x),
+        (_EV_ABS, _ABS_MT_POSITION_Y, y),
+        (_EV_KEY, _BTN_TOUCH, 1),
+    )
+    for point in stroke[1:]:
+      commands.extend(_sleep(point.t_ms - previous.t_ms))
+      if (point.x, point.y) != (previous.x, previous.y):
+        x, y = device.scale(point.x, point.y)
+        send(
+            (_EV_ABS, _ABS_MT_POSITION_X, x),
+            (_EV_ABS, _ABS_MT_POSITION_Y, y),
+        )
+      previous = point
+    send(
+        (_EV_ABS, _ABS_MT_TRACKING_ID, _NO_TRACKING_ID),
+        (_EV_KEY, _BTN_TOUCH, 0),
+    )
+  return commands
+
+
+def compile_gesture(
+    gesture: Gesture,
+    backend: GestureBackend,
+    device: Optional[TouchDevice] = None,
+) -> list[str]:
+  """Compiles `gesture` into shell commands for `backend`.
+
+  Args:
+    gesture: The gesture.
+    backend: How to inject it.
+    device: The touchscreen; required by GestureBackend.SENDEVENT.
+
+  Returns:
+    Shell commands, to be run in order.
+  """
+  if backend == GestureBackend.INPUT:
+    return compile_input(gesture)
+  if backend == GestureBackend.MOTIONEVENT:
+    return compile_motionevent(gesture)
+  if device is None:
+    raise ValueError('GestureBackend.SENDEVENT requires a touch device.')
+  return compile_sendevent(gesture, device)
+
+
+def backend_for(env: Any) -> Optional[GestureBackend]:
+  """Returns the gesture backend configured on `env`, if any."""
+  backend = getattr(env, 'gesture_backend', None)
+  return backend if isinstance(backend, GestureBackend) else None
+
+
+def perform(
+    gesture: Gesture,
+    env: env_interface.AndroidEnvInterface,
+    backend: Optional[GestureBackend] = None,
+    prelude: Sequence[str] = (),
+) -> adb_pb2.AdbResponse:
+  """Performs `gesture` on the device in one adb round trip.
+
+  Args:
+    gesture: The gesture.
+    env: The environment.
+    backend: How to inject the gesture. Defaults to `env.gesture_backend` if
+      `env` has one, otherwise GestureBackend.INPUT.
+    prelude: Shell commands to run before the gesture, in the same script,
+      e.g. to hide the keyboard.
+
+  Returns:
+    The response of the script.
+  """
+  if backend is None:
+    backend = backend_for(env) or GestureBackend.INPUT
+  device = None
+  if backend == GestureBackend.SENDEVENT:
+    device = getattr(env, 'touch_device', None)
+    if not isinstance(device, TouchDevice):
+      device = find_touch_device(env)
+  commands = list(prelude) + compile_gesture(gesture, backend, device)
+  return adb_utils.issue_generic_request(
+      ['shell', ' && '.join(commands)],
+      env,
+      timeout_sec=duration_ms(gesture) / 1000 + _TIMEOUT_MARGIN_SEC,
+  )
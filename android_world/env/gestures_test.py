@@ -0,0 +1,253 @@
+# Copyright 2025 The android_world Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from unittest import mock
+
+from absl.testing import absltest
+from android_env import env_interface
+from android_world.env import adb_utils
+from android_world.env import gestures
+
+_GETEVENT_OUTPUT = """\
+add device 1: /dev/input/event2
+  name:     "virtio_input_keyboard"
+  events:
+    KEY (0001): KEY_ESC               KEY_1
+add device 2: /dev/input/event1
+  name:     "virtio_input_multi_touch_1"
+  events:
+    KEY (0001): BTN_TOUCH
+    ABS (0003): ABS_MT_SLOT           : value 0, min 0, max 9, fuzz 0, flat 0, resolution 0
+                ABS_MT_POSITION_X     : value 0, min 0, max 32767, fuzz 0, flat 0, resolution 0
+                ABS_MT_POSITION_Y     : value 0, min 0, max 32767, fuzz 0, flat 0, resolution 0
+                ABS_MT_TRACKING_ID    : value 0, min 0, max 10, fuzz 0, flat 0, resolution 0
+  input props:
+    INPUT_PROP_DIRECT
+"""
+
+_DEVICE = gestures.TouchDevice(
+    path='/dev/input/event1',
+    x_axis=gestures.AbsAxis(0, 1079),
+    y_axis=gestures.AbsAxis(0, 2399),
+    screen_size=(1080, 2400),
+    has_slots=False,
+)
+
+
+class StrokeTest(absltest.TestCase):
+
+  def test_line_follows_profile(self):
+    profile = gestures.FlingProfile(100, (0.0, 0.75, 1.0))
+
+    stroke = gestures.line((0, 100), (0, 0), profile)
+
+    self.assertEqual(
+        stroke,
+        (
+            gestures.TouchPoint(0, 100, 0),
+            gestures.TouchPoint(0, 25, 50),
+            gestures.TouchPoint(0, 0, 100),
+        ),
+    )
+
+  def test_profiles_span_the_path(self):
+    for profile in (gestures.SCROLL, gestures.SLOW_SWIPE, gestures.FLING):
+      self.assertEqual(profile.progress[0], 0.0)
+      self.assertEqual(profile.progress[-1], 1.0)
+      self.assertEqual(list(profile.progress), sorted(profile.progress))
+
+  def test_fling_decelerates(self):
+    progress = gestures.FLING.progress
+    steps = [b - a for a, b in zip(progress, progress[1:])]
+
+    self.assertEqual(steps, sorted(steps, reverse=True))
+
+  def test_drag_holds_before_moving(self):
+    profile = gestures.FlingProfile(100, (0.0, 1.0))
+
+    stroke = gestures.drag((10, 10), (90, 10), profile, hold_ms=500)
+
+    self.assertEqual(
+        stroke,
+        (
+            gestures.TouchPoint(10, 10, 0),
+            gestures.TouchPoint(10, 10, 500),
+            gestures.TouchPoint(90, 10, 600),
+        ),
+    )
+    self.assertEqual(gestures.duration_ms([stroke, stroke]), 1200)
+
+
+class CompileTest(absltest.TestCase):
+
+  def test_compile_input(self):
+    gesture = [
+        gestures.line((50, 50), (50, 0)),
+        gestures.drag((10, 10), (90, 10), gestures.FlingProfile(100, (0, 1))),
+    ]
+
+    self.assertEqual(
+        gestures.compile_input(gesture),
+        [
+            'input swipe 50 50 50 0 300',
+            'input draganddrop 10 10 90 10 100',
+        ],
+    )
+
+  def test_compile_motionevent_limits_moves(self):
+    stroke = gestures.line((0, 0), (0, 1000), gestures.FlingProfile.linear(80))
+
+    commands = gestures.compile_motionevent([stroke], max_moves=2)
+
+    self.assertEqual(
+        commands,
+        [
+            'input motionevent DOWN 0 0',
+            'sleep 0.016',
+            'input motionevent MOVE 0 200',
+            'sleep 0.032',
+            'input motionevent MOVE 0 600',
+            'sleep 0.032',
+            'input motionevent UP 0 1000',
+        ],
+    )
+
+  def test_compile_sendevent(self):
+    device = gestures.TouchDevice(
+        path='/dev/input/event1',
+        x_axis=gestures.AbsAxis(0, 32767),
+        y_axis=gestures.AbsAxis(0, 32767),
+        screen_size=(1081, 2401),
+    )
+    stroke = (
+        gestures.TouchPoint(0, 0, 0),
+        gestures.TouchPoint(1080, 2400, 20),
+    )
+
+    commands = gestures.compile_sendevent([stroke], device)
+
+    events = [
+        command.removeprefix('sendevent /dev/input/event1 ')
+        for command in commands
+    ]
+    self.assertEqual(
+        events,
+        [
+            '3 47 0',
+            '3 57 0',
+            '3 53 0',
+            '3 54 0',
+            '1 330 1',
+            '0 0 0',
+            'sleep 0.020',
+            '3 53 32767',
+            '3 54 32767',
+            '0 0 0',
+            '3 57 4294967295',
+            '1 330 0',
+            '0 0 0',
+        ],
+    )
+
+  def test_compile_sendevent_skips_unchanged_positions(self):
+    stroke = gestures.drag(
+        (10, 10), (20, 10), gestures.FlingProfile(100, (0, 1)), hold_ms=500
+    )
+
+    commands = gestures.compile_sendevent([stroke], _DEVICE)
+
+    self.assertEqual(commands.count('sleep 0.500'), 1)
+    self.assertLen([c for c in commands if ' 3 53 ' in c], 2)
+
+  def test_compile_gesture_requires_device_for_sendevent(self):
+    with self.assertRaises(ValueError):
+      gestures.compile_gesture(
+          [gestures.line((0, 0), (1, 1))], gestures.GestureBackend.SENDEVENT
+      )
+
+
+class TouchDeviceTest(absltest.TestCase):
+
+  def test_parse_touch_device(self):
+    device = gestures.parse_touch_device(_GETEVENT_OUTPUT, (1080, 2400))
+
+    self.assertEqual(
+        device,
+        gestures.TouchDevice(
+            path='/dev/input/event1',
+            x_axis=gestures.AbsAxis(0, 32767),
+            y_axis=gestures.AbsAxis(0, 32767),
+            screen_size=(1080, 2400),
+            has_slots=True,
+        ),
+    )
+
+  def test_parse_without_touch_device(self):
+    self.assertIsNone(
+        gestures.parse_touch_device(
+            _GETEVENT_OUTPUT.split('add device 2')[0], (1080, 2400)
+        )
+    )
+
+  def test_scale_clamps_to_axis(self):
+    self.assertEqual(_DEVICE.scale(540, 5000), (540, 2399))
+
+
+class PerformTest(absltest.TestCase):
+
+  def setUp(self):
+    super().setUp()
+    self.env = mock.create_autospec(env_interface.AndroidEnvInterface)
+    self.mock_issue_generic_request = self.enter_context(
+        mock.patch.object(adb_utils, 'issue_generic_request')
+    )
+
+  def test_performs_gesture_in_one_request(self):
+    gesture = [gestures.line((50, 50), (50, 0)), gestures.line((0, 0), (9, 9))]
+
+    gestures.perform(
+        gesture,
+        self.env,
+        gestures.GestureBackend.INPUT,
+        prelude=['input keyevent 111'],
+    )
+
+    self.mock_issue_generic_request.assert_called_once_with(
+        [
+            'shell',
+            'input keyevent 111 && input swipe 50 50 50 0 300'
+            ' && input swipe 0 0 9 9 300',
+        ],
+        self.env,
+        timeout_sec=10.6,
+    )
+
+  def test_uses_backend_and_touch_device_of_env(self):
+    self.env.gesture_backend = gestures.GestureBackend.SENDEVENT
+    self.env.touch_device = _DEVICE
+
+    gestures.perform([gestures.line((0, 0), (1, 1))], self.env)
+
+    (args, _), _ = self.mock_issue_generic_request.call_args
+    self.assertStartsWith(args[1], 'sendevent /dev/input/event1 ')
+
+  def test_defaults_to_input(self):
+    gestures.perform([gestures.line((0, 0), (1, 1))], self.env)
+
+    (args, _), _ = self.mock_issue_generic_request.call_args
+    self.assertEqual(args[1], 'input swipe 0 0 1 1 300')
+
+
+if __name__ == '__main__':
+  absltest.main()
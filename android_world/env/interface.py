@@ -15,27 +15,35 @@
 """Environment interface for real-time interaction Android."""
 
 import abc
+from collections.abc import Callable, Collection, Mapping, Sequence
 import dataclasses
+import threading
 import time
 from typing import Any, Optional, Self
 
 from absl import logging
-from android_env.components import action_type
 from android_world.env import actuation
 from android_world.env import adb_utils
 from android_world.env import android_world_controller
 from android_world.env import json_action
 from android_world.env import representation_utils
+from android_world.env import ui_stability
 import dm_env
 import numpy as np
 
 
-def _get_no_op_action() -> dict[str, Any]:
-  """Creates a no-op action; used to retrieve screen & UI tree."""
-  return {
-      'action_type': np.array(action_type.ActionType.LIFT, dtype=np.int32),
-      'touch_position': np.array((0.0, 0.0)),
-  }
+# Default maximum time to wait for the UI to stabilize.
+_DEFAULT_STABILITY_TIMEOUT_SEC = 6.0
+_DEFAULT_POLLING_SCHEDULE = ui_stability.PollingSchedule()
+# How long the screen must stay unchanged after an action to be stable; the
+# effect of an action may only show up after the first few polls.
+_SETTLE_AFTER_ACTION_SEC = 0.5
+
+# Observation components that can be requested from AsyncEnv.get_state.
+PIXELS = 'pixels'
+FOREST = 'forest'
+UI_ELEMENTS = 'ui_elements'
+ALL_COMPONENTS = frozenset({PIXELS, FOREST, UI_ELEMENTS})
 
 
 @dataclasses.dataclass(frozen=True)
@@ -46,13 +54,14 @@ class State:
     pixels: RGB array of current screen.
     forest: Raw UI forest; see android_world_controller.py for more info.
     ui_elements: Processed children and stateful UI elements extracted from
-      forest.
+      forest. Usually a representation_utils.UIElementTable, which behaves as
+      a list of UIElements.
     auxiliaries: Additional information about the state.
   """
 
   pixels: np.ndarray
   forest: Any
-  ui_elements: list[representation_utils.UIElement]
+  ui_elements: Sequence[representation_utils.UIElement]
   auxiliaries: dict[str, Any] | None = None
 
   @classmethod
@@ -70,6 +79,82 @@ class State:
     return cls(pixels, forest, elements)
 
 
+class LazyState(State):
+  """A State whose components are fetched on first access.
+
+  Each component is fetched at most once; the time it took is recorded in
+  `timings`, keyed by component name. Components fetched at different times may
+  describe slightly different screens, so request everything needed up front;
+  see AsyncEnv.get_state.
+  """
+
+  def __init__(
+      self,
+      loaders: Mapping[str, Callable[[], Any]],
+      auxiliaries: dict[str, Any] | None = None,
+  ):
+    """Initializes the state.
+
+    Args:
+      loaders: Function fetching each of ALL_COMPONENTS.
+      auxiliaries: Additional information about the state.
+
+    Raises:
+      ValueError: If a loader is missing.
+    """
+    missing = ALL_COMPONENTS - loaders.keys()
+    if missing:
+      raise ValueError(f'Missing loaders for {sorted(missing)}.')
+    # The dataclass is frozen, so attributes are set through object.
+    object.__setattr__(self, '_loaders', dict(loaders))
+    object.__setattr__(self, '_values', {})
+    # Reentrant, since loading UI elements may first load the forest.
+    object.__setattr__(self, '_lock', threading.RLock())
+    object.__setattr__(self, 'timings', {})
+    object.__setattr__(
+        self, 'auxiliaries', {} if auxiliaries is None else auxiliaries
+    )
+
+  def _get(self, component: str) -> Any:
+    with self._lock:
+      if component not in self._values:
+        start = time.perf_counter()
+        self._values[component] = self._loaders[component]()
+        self.timings[component] = time.perf_counter() - start
+      return self._values[component]
+
+  def load(self, components: Collection[str]) -> None:
+    """Fetches the given components now, if not already fetched."""
+    for component in (PIXELS, FOREST, UI_ELEMENTS):
+      if component in components:
+        self._get(component)
+
+  def is_loaded(self, component: str) -> bool:
+    return component in self._values
+
+  @property
+  def pixels(self) -> np.ndarray:
+    return self._get(PIXELS)
+
+  @property
+  def forest(self) -> Any:
+    return self._get(FOREST)
+
+  @property
+  def ui_elements(self) -> Sequence[representation_utils.UIElement]:
+    return self._get(UI_ELEMENTS)
+
+  def __repr__(self) -> str:
+    return f'LazyState(loaded={sorted(self._values)})'
+
+  def __reduce__(self):
+    # Loaders are not picklable; pickle as a fully loaded State.
+    return (
+        State,
+        (self.pixels, self.forest, self.ui_elements, self.auxiliaries),
+    )
+
+
 class AsyncEnv(abc.ABC):
   """Interface for interacting with a real-time Android device.
 
@@ -93,7 +178,11 @@ class AsyncEnv(abc.ABC):
     """
 
   @abc.abstractmethod
-  def get_state(self, wait_to_stabilize: bool = False) -> State:
+  def get_state(
+      self,
+      wait_to_stabilize: bool = False,
+      components: Optional[Collection[str]] = None,
+  ) -> State:
     """Gets the state of the environment; i.e., screenshot & UI tree.
 
     In practice this will usually be called after executing an action. Logic
@@ -103,6 +192,9 @@ class AsyncEnv(abc.ABC):
     Args:
       wait_to_stabilize: Whether to wait for the screen to stabilize before
         returning state.
+      components: The components of ALL_COMPONENTS the caller needs. If set,
+        implementations may return a LazyState that only fetches the other
+        components when they are accessed. If None, all are fetched.
 
     Returns:
       Observation containing RGB array of screen, the accessibility forest,
@@ -138,6 +230,33 @@ class AsyncEnv(abc.ABC):
   def execute_action(self, action: json_action.JSONAction) -> None:
     """Executes action on the environment."""
 
+  def step(
+      self,
+      action: json_action.JSONAction,
+      wait_to_stabilize: bool = True,
+      stability_timeout: float = _DEFAULT_STABILITY_TIMEOUT_SEC,
+      components: Optional[Collection[str]] = None,
+  ) -> State:
+    """Executes an action and returns the state it leads to.
+
+    Args:
+      action: The action to execute.
+      wait_to_stabilize: Whether to wait for the screen to stabilize after the
+        action before returning state.
+      stability_timeout: Maximum time in seconds to wait for the screen to
+        stabilize. Implementations that cannot bound the wait may ignore it.
+      components: The components of the state the caller needs; see
+        get_state.
+
+    Returns:
+      The state after executing the action.
+    """
+    del stability_timeout
+    self.execute_action(action)
+    return self.get_state(
+        wait_to_stabilize=wait_to_stabilize, components=components
+    )
+
   @property
   @abc.abstractmethod
   def foreground_activity_name(self) -> str:
@@ -216,10 +335,44 @@ class AsyncAndroidEnv(AsyncEnv):
   interaction_cache = ''
 
   def __init__(
-      self, controller: android_world_controller.AndroidWorldController
+      self,
+      controller: android_world_controller.AndroidWorldController,
+      compare_pixels: bool = False,
+      max_pixel_distance: int = 0,
+      geometry_refresh_interval_sec: Optional[float] = None,
   ):
+    """Initializes the environment.
+
+    Args:
+      controller: The controller for the device.
+      compare_pixels: Whether waiting for the UI to stabilize also compares
+        perceptual hashes of screenshots. This catches changes that are not
+        reflected in the UI tree, such as images loading, at the cost of a
+        screenshot per check.
+      max_pixel_distance: Number of perceptual hash bits that may differ for
+        screenshots to be considered unchanged.
+      geometry_refresh_interval_sec: If set, the cached device geometry is
+        refreshed in a background thread at this interval. This picks up
+        rotations not made through adb_utils, e.g. by apps themselves.
+    """
     self._controller = controller
-    self._prior_state = None
+    self._compare_pixels = compare_pixels
+    self._max_pixel_distance = max_pixel_distance
+    self._prior_fingerprint = None
+    self._acted_since_sample = False
+    self.last_stability_result: Optional[ui_stability.StabilityResult] = None
+    self._geometry: Optional[adb_utils.DeviceGeometry] = None
+    self._geometry_version = -1
+    self._geometry_lock = threading.Lock()
+    self._stop_geometry_refresh = threading.Event()
+    self._geometry_refresh_thread = None
+    if geometry_refresh_interval_sec is not None:
+      self._geometry_refresh_thread = threading.Thread(
+          target=self._refresh_geometry_periodically,
+          args=(geometry_refresh_interval_sec,),
+          daemon=True,
+      )
+      self._geometry_refresh_thread.start()
     # Variable used to temporarily save interactions between agent and user.
     # Like when agent use answer action to answer user questions, we
     # use this to save the agent response. Or later on when agent has the
@@ -234,65 +387,179 @@ class AsyncAndroidEnv(AsyncEnv):
     if go_home:
       adb_utils.press_home_button(self.controller)
     self.interaction_cache = ''
+    self.invalidate_geometry()
 
     return _process_timestep(self.controller.reset())
 
   def _get_state(self):
-    return _process_timestep(self.controller.step(_get_no_op_action()))
+    return _process_timestep(
+        self.controller.step(android_world_controller.get_no_op_action())
+    )
+
+  def _get_lazy_state(self, components: Collection[str]) -> LazyState:
+    """Returns a LazyState with `components` already fetched.
+
+    Args:
+      components: The components to fetch now; others are fetched on access.
+
+    Raises:
+      ValueError: If a component is unknown.
+    """
+    unknown = set(components) - ALL_COMPONENTS
+    if unknown:
+      raise ValueError(
+          f'Unknown state components {sorted(unknown)}; must be in'
+          f' {sorted(ALL_COMPONENTS)}.'
+      )
+    controller = self.controller
+    uses_forest = (
+        controller.a11y_method
+        == android_world_controller.A11yMethod.A11Y_FORWARDER_APP
+    )
+    state = None
+
+    def load_pixels() -> np.ndarray:
+      return controller.capture_screen()
+
+    def load_forest() -> Any:
+      return controller.get_a11y_forest() if uses_forest else None
+
+    def load_ui_elements() -> Sequence[representation_utils.UIElement]:
+      if uses_forest:
+        return controller.get_ui_elements(forest=state.forest)
+      return controller.get_ui_elements()
+
+    state = LazyState({
+        PIXELS: load_pixels,
+        FOREST: load_forest,
+        UI_ELEMENTS: load_ui_elements,
+    })
+    state.load(components)
+    return state
+
+  def _sample_ui(
+      self,
+  ) -> tuple[ui_stability.Fingerprint, Optional[State]]:
+    """Takes a stability sample; see ui_stability.py.
+
+    Returns:
+      The fingerprint of the current UI and, if pixels are compared, the full
+      state the fingerprint was computed from.
+    """
+    if self._compare_pixels:
+      state = self._get_state()
+      fingerprint = ui_stability.Fingerprint(
+          ui=representation_utils.ui_elements_fingerprint(state.ui_elements),
+          pixels=ui_stability.perceptual_hash(state.pixels),
+      )
+      return fingerprint, state
+    return (
+        ui_stability.Fingerprint(ui=self.controller.get_ui_fingerprint()),
+        None,
+    )
 
   def _get_stable_state(
       self,
       stability_threshold: int = 3,
-      sleep_duration: float = 0.5,
-      timeout: float = 6.0,
+      timeout: float = _DEFAULT_STABILITY_TIMEOUT_SEC,
+      schedule: ui_stability.PollingSchedule = _DEFAULT_POLLING_SCHEDULE,
+      components: Optional[Collection[str]] = None,
   ) -> State:
-    """Checks if the UI elements remain stable over a number of checks and returns the state.
+    """Waits until the UI stops changing and returns the state.
+
+    The UI is sampled with cheap fingerprints until `stability_threshold`
+    consecutive samples match. The fingerprint from the previous call counts as
+    the first sample, so an unchanged screen is confirmed after a few fast
+    polls. After an action it does not, and the screen must also stay
+    unchanged for _SETTLE_AFTER_ACTION_SEC. How long this took is stored in `last_stability_result` and in the
+    returned state's auxiliaries.
 
     Args:
         stability_threshold: Number of consecutive checks where UI elements must
           remain the same to consider UI stable.
-        sleep_duration: Minimum time in seconds between each check.
         timeout: Maximum time in seconds to wait for UI to become stable before
           giving up.
+        schedule: Intervals between checks.
+        components: The components of the returned state the caller needs; see
+          get_state.
 
     Returns:
-        The current state of the UI if stability is achieved within the timeout.
+        The current state of the UI, whether or not stability was achieved
+        within the timeout.
     """
-    if not self._prior_state:
-      self._prior_state = self._get_state()
-    if stability_threshold <= 0:
-      raise ValueError('Stability threshold must be a positive integer.')
-
-    stable_checks = 1
-    start_time = time.time()
-    deadline = start_time + timeout
-
-    while stable_checks < stability_threshold and time.time() < deadline:
-      iteration_start_time = time.time()
-      current_state = self._get_state()
-
-      if self._prior_state.ui_elements == current_state.ui_elements:
-        stable_checks += 1
-        if stable_checks == stability_threshold:
-          break  # Exit early if stability is achieved.
-      else:
-        stable_checks = 1  # Reset if any change is detected
-        self._prior_state = current_state
-
-      elapsed_time = time.time() - iteration_start_time
-      remaining_sleep = sleep_duration - elapsed_time
-      if remaining_sleep > 0:
-        sleep_time = min(remaining_sleep, deadline - time.time())
-        if sleep_time > 0:
-          time.sleep(sleep_time)
-      # If remaining_sleep <= 0, proceed immediately to the next iteration
-
-    return current_state  # pylint: disable=undefined-variable
-
-  def get_state(self, wait_to_stabilize: bool = False) -> State:
+    prior = None
+    if self._prior_fingerprint is not None:
+      prior = (self._prior_fingerprint, None)
+    min_stable_sec = 0.0
+    if self._acted_since_sample:
+      min_stable_sec = _SETTLE_AFTER_ACTION_SEC
+    result = ui_stability.wait_until_stable(
+        self._sample_ui,
+        lambda a, b: a[0].matches(b[0], self._max_pixel_distance),
+        stability_threshold=stability_threshold,
+        timeout=timeout,
+        schedule=schedule,
+        prior=prior,
+        min_stable_sec=min_stable_sec,
+    )
+    fingerprint, state = result.sample
+    self._prior_fingerprint = fingerprint
+    self._acted_since_sample = False
+    self.last_stability_result = result
+    if not result.is_stable:
+      logging.warning(
+          'UI did not stabilize within %.1fs (%d polls).',
+          timeout,
+          result.num_polls,
+      )
+    if state is None:
+      state = self._get_observation(components)
+    if state.auxiliaries is None:
+      state = dataclasses.replace(state, auxiliaries={})
+    state.auxiliaries.update(
+        is_stable=result.is_stable,
+        stabilization_sec=result.elapsed_sec,
+        stabilization_polls=result.num_polls,
+    )
+    return state
+
+  def _get_observation(self, components: Optional[Collection[str]]) -> State:
+    frame = self.controller.get_prefetched_frame()
+    if frame is not None:
+      return State(
+          pixels=frame.pixels,
+          forest=frame.forest,
+          ui_elements=frame.ui_elements,
+          auxiliaries={
+              'observation_age_sec': time.monotonic() - frame.timestamp
+          },
+      )
+    if components is None:
+      return self._get_state()
+    return self._get_lazy_state(components)
+
+  def get_state(
+      self,
+      wait_to_stabilize: bool = False,
+      components: Optional[Collection[str]] = None,
+  ) -> State:
     if wait_to_stabilize:
-      return self._get_stable_state()
-    return self._get_state()
+      return self._get_stable_state(components=components)
+    return self._get_observation(components)
+
+  def step(
+      self,
+      action: json_action.JSONAction,
+      wait_to_stabilize: bool = True,
+      stability_timeout: float = _DEFAULT_STABILITY_TIMEOUT_SEC,
+      components: Optional[Collection[str]] = None,
+  ) -> State:
+    self.execute_action(action)
+    if wait_to_stabilize:
+      return self._get_stable_state(
+          timeout=stability_timeout, components=components
+      )
+    return self._get_observation(components)
 
   def execute_action(self, action: json_action.JSONAction) -> None:
     if action.action_type == json_action.ANSWER:
@@ -303,13 +570,18 @@ class AsyncAndroidEnv(AsyncEnv):
     if action.action_type == json_action.STATUS:
       # Do nothing if it is a termination action.
       return
-    state = self.get_state(wait_to_stabilize=False)
-    actuation.execute_adb_action(
-        action,
-        state.ui_elements,
-        self.logical_screen_size,
-        self.controller,
-    )
+    state = self.get_state(wait_to_stabilize=False, components={UI_ELEMENTS})
+    logical_screen_size = self.logical_screen_size
+    with self.controller.observation_barrier():
+      actuation.execute_adb_action(
+          action,
+          state.ui_elements,
+          logical_screen_size,
+          self.controller,
+      )
+    # The screen from before the action must not confirm the screen after it.
+    self._prior_fingerprint = None
+    self._acted_since_sample = True
 
   def hide_automation_ui(self) -> None:
     """Hides the coordinates on screen."""
@@ -342,11 +614,46 @@ class AsyncAndroidEnv(AsyncEnv):
   def device_screen_size(self) -> tuple[int, int]:
     return self.controller.device_screen_size
 
+  @property
+  def device_geometry(self) -> adb_utils.DeviceGeometry:
+    """Returns the device geometry, fetching it only if it may have changed.
+
+    The geometry is cached until the screen is rotated or resized through
+    adb_utils (see adb_utils.geometry_version), the env is reset, or
+    `invalidate_geometry` is called.
+    """
+    with self._geometry_lock:
+      if self._geometry is None or self._geometry_version != (
+          adb_utils.geometry_version(self.controller)
+      ):
+        self._refresh_geometry_locked()
+      return self._geometry
+
+  def invalidate_geometry(self) -> None:
+    """Forces the device geometry to be fetched on its next access."""
+    with self._geometry_lock:
+      self._geometry = None
+
+  def _refresh_geometry_locked(self) -> None:
+    # Read the version first, so a change made while fetching is not missed.
+    version = adb_utils.geometry_version(self.controller)
+    self._geometry = adb_utils.get_device_geometry(self.controller)
+    self._geometry_version = version
+
+  def _refresh_geometry_periodically(self, interval_sec: float) -> None:
+    while not self._stop_geometry_refresh.wait(interval_sec):
+      try:
+        with self._geometry_lock:
+          self._refresh_geometry_locked()
+      except Exception:  # pylint: disable=broad-exception-caught
+        logging.exception('Failed to refresh device geometry.')
+
   @property
   def logical_screen_size(self) -> tuple[int, int]:
-    return adb_utils.get_logical_screen_size(self.controller)
+    return self.device_geometry.logical_screen_size
 
   def close(self) -> None:
+    self._stop_geometry_refresh.set()
     try:
       self.controller.close()
     except:  # pylint: disable=bare-except
@@ -354,8 +661,8 @@ class AsyncAndroidEnv(AsyncEnv):
 
   @property
   def orientation(self) -> int:
-    return adb_utils.get_orientation(self.controller)
+    return self.device_geometry.orientation
 
   @property
   def physical_frame_boundary(self) -> tuple[int, int, int, int]:
-    return adb_utils.get_physical_frame_boundary(self.controller)
+    return self.device_geometry.physical_frame_boundary
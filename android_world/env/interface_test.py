@@ -12,78 +12,343 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import itertools
+import pickle
+import threading
+import time
 from unittest import mock
 
 from absl.testing import absltest
 from android_world.env import interface
+from android_world.env import observation_prefetcher
 from android_world.env import representation_utils
+from android_world.env import ui_stability
 import numpy as np
 
 
+def _mock_controller() -> mock.MagicMock:
+  """Returns a mock controller that is not prefetching observations."""
+  controller = mock.MagicMock()
+  controller.get_prefetched_frame.return_value = None
+  return controller
+
+
 class InterfaceTest(absltest.TestCase):
 
-  @mock.patch("time.sleep", return_value=None)
-  def test_ui_stability_true(self, unused_mocked_time_sleep):
-    stable_ui_elements = [representation_utils.UIElement(text="StableElement")]
-    states = [
-        interface.State(
-            ui_elements=stable_ui_elements,
-            pixels=np.empty([1, 2, 3]),
-            forest=None,
-        )
-        for _ in range(4)
-    ]
-    env = interface.AsyncAndroidEnv(mock.MagicMock())
-    env._get_state = mock.MagicMock(side_effect=states)
+  def test_ui_stability_true(self):
+    controller = _mock_controller()
+    controller.get_ui_fingerprint.return_value = 123
+    state = interface.State(
+        ui_elements=[representation_utils.UIElement(text="StableElement")],
+        pixels=np.empty([1, 2, 3]),
+        forest=None,
+    )
+    env = interface.AsyncAndroidEnv(controller)
+    env._get_state = mock.MagicMock(return_value=state)
 
-    self.assertEqual(
-        env._get_stable_state(
-            stability_threshold=3, sleep_duration=0.1, timeout=1
-        ),
-        states[2],
+    result = env._get_stable_state(
+        stability_threshold=3,
+        timeout=1,
+        schedule=ui_stability.PollingSchedule.fixed(0),
     )
 
+    self.assertEqual(result.ui_elements, state.ui_elements)
+    self.assertTrue(result.auxiliaries["is_stable"])
+    self.assertEqual(result.auxiliaries["stabilization_polls"], 3)
+    # Only the fingerprint is polled; the full state is captured once.
+    env._get_state.assert_called_once()
+
   def test_ui_stability_false_due_to_timeout(self):
-    changing_ui_elements = [
-        representation_utils.UIElement(text=f"Element{i}") for i in range(10)
-    ]
-    env = interface.AsyncAndroidEnv(mock.MagicMock())
-    states = [
-        interface.State(
-            ui_elements=[elem], pixels=np.empty([1, 2, 3]), forest=None
+    controller = _mock_controller()
+    controller.get_ui_fingerprint.side_effect = itertools.count()
+    env = interface.AsyncAndroidEnv(controller)
+    env._get_state = mock.MagicMock(
+        return_value=interface.State(
+            ui_elements=[], pixels=np.empty([1, 2, 3]), forest=None
         )
-        for elem in changing_ui_elements
-    ]
-    env._get_state = mock.MagicMock(side_effect=states)
-    self.assertEqual(
-        env._get_stable_state(
-            stability_threshold=3, sleep_duration=0.1, timeout=0.41
-        ),
-        states[5],
-    )
-
-  @mock.patch("time.sleep", return_value=None)
-  def test_stability_fluctuates(self, unused_mocked_time_sleep):
-    env = interface.AsyncAndroidEnv(mock.MagicMock())
-    fluctuating_ui_elements = (
-        [representation_utils.UIElement(text="Stable")] * 2
-        + [representation_utils.UIElement(text="Unstable")]
-        + [representation_utils.UIElement(text="Stable")] * 3
-        + [representation_utils.UIElement(text="Unstable")]
     )
-    states = [
-        interface.State(
-            ui_elements=[elem], pixels=np.empty([1, 2, 3]), forest=None
+
+    result = env._get_stable_state(
+        stability_threshold=3,
+        timeout=0.2,
+        schedule=ui_stability.PollingSchedule.fixed(0.05),
+    )
+
+    self.assertFalse(result.auxiliaries["is_stable"])
+    self.assertFalse(env.last_stability_result.is_stable)
+    self.assertGreaterEqual(env.last_stability_result.elapsed_sec, 0.2)
+
+  def test_stability_fluctuates(self):
+    controller = _mock_controller()
+    controller.get_ui_fingerprint.side_effect = [1, 1, 2, 1, 1, 1, 2]
+    env = interface.AsyncAndroidEnv(controller)
+    env._get_state = mock.MagicMock(
+        return_value=interface.State(
+            ui_elements=[], pixels=np.empty([1, 2, 3]), forest=None
         )
-        for elem in fluctuating_ui_elements
+    )
+
+    result = env._get_stable_state(
+        stability_threshold=3,
+        timeout=2.5,
+        schedule=ui_stability.PollingSchedule.fixed(0),
+    )
+
+    self.assertTrue(result.auxiliaries["is_stable"])
+    self.assertEqual(env.last_stability_result.num_polls, 6)
+
+  def test_prior_fingerprint_counts_towards_stability(self):
+    controller = _mock_controller()
+    controller.get_ui_fingerprint.return_value = 7
+    env = interface.AsyncAndroidEnv(controller)
+    env._get_state = mock.MagicMock(
+        return_value=interface.State(
+            ui_elements=[], pixels=np.empty([1, 2, 3]), forest=None
+        )
+    )
+    schedule = ui_stability.PollingSchedule.fixed(0)
+
+    env._get_stable_state(stability_threshold=3, schedule=schedule)
+    env._get_stable_state(stability_threshold=3, schedule=schedule)
+
+    self.assertEqual(env.last_stability_result.num_polls, 2)
+
+  @mock.patch.object(interface.actuation, "execute_adb_action")
+  def test_step_waits_for_late_effect_of_action(self, mock_execute_adb_action):
+    before = interface.State(
+        ui_elements=[representation_utils.UIElement(text="Before")],
+        pixels=np.empty([1, 2, 3]),
+        forest=None,
+    )
+    after = interface.State(
+        ui_elements=[representation_utils.UIElement(text="After")],
+        pixels=np.empty([1, 2, 3]),
+        forest=None,
+    )
+    acted_at = []
+    mock_execute_adb_action.side_effect = lambda *args: acted_at.append(
+        time.monotonic()
+    )
+
+    def changed() -> bool:
+      # The UI changes 200ms after the action.
+      return bool(acted_at) and time.monotonic() - acted_at[0] >= 0.2
+
+    controller = _mock_controller()
+    controller.get_ui_fingerprint.side_effect = lambda: 2 if changed() else 1
+    env = interface.AsyncAndroidEnv(controller)
+    env._get_state = mock.MagicMock(
+        side_effect=lambda: after if changed() else before
+    )
+    env.get_state(wait_to_stabilize=True)
+
+    with mock.patch.object(
+        interface.adb_utils,
+        "get_device_geometry",
+        return_value=interface.adb_utils.DeviceGeometry((1, 2), 0, (0, 0, 1, 2)),
+    ):
+      result = env.step(
+          interface.json_action.JSONAction(action_type="click", x=1, y=1)
+      )
+
+    self.assertEqual(result.ui_elements, after.ui_elements)
+    self.assertTrue(result.auxiliaries["is_stable"])
+
+  def test_ui_stability_compares_pixels(self):
+    ui_elements = [representation_utils.UIElement(text="Image")]
+    blank = np.zeros([64, 64, 3], dtype=np.uint8)
+    loaded = blank.copy()
+    loaded[:32] = 255
+    states = [
+        interface.State(ui_elements=ui_elements, pixels=pixels, forest=None)
+        for pixels in (blank, loaded, loaded, loaded)
     ]
+    env = interface.AsyncAndroidEnv(_mock_controller(), compare_pixels=True)
     env._get_state = mock.MagicMock(side_effect=states)
-    cur = env._get_stable_state(
-        stability_threshold=3, sleep_duration=0.5, timeout=2.5
+
+    result = env._get_stable_state(
+        stability_threshold=3, schedule=ui_stability.PollingSchedule.fixed(0)
+    )
+
+    np.testing.assert_array_equal(result.pixels, loaded)
+    self.assertEqual(env._get_state.call_count, 4)
+
+  @mock.patch.object(interface.adb_utils, "get_device_geometry")
+  def test_device_geometry_is_cached(self, mock_get_device_geometry):
+    mock_get_device_geometry.return_value = interface.adb_utils.DeviceGeometry(
+        logical_screen_size=(1080, 2400),
+        orientation=0,
+        physical_frame_boundary=(0, 0, 1080, 2400),
+    )
+    env = interface.AsyncAndroidEnv(_mock_controller())
+
+    self.assertEqual(env.logical_screen_size, (1080, 2400))
+    self.assertEqual(env.orientation, 0)
+    self.assertEqual(env.physical_frame_boundary, (0, 0, 1080, 2400))
+    mock_get_device_geometry.assert_called_once()
+
+  @mock.patch.object(interface.adb_utils, "issue_generic_request")
+  @mock.patch.object(interface.adb_utils, "get_device_geometry")
+  def test_device_geometry_invalidated_by_rotation(
+      self, mock_get_device_geometry, unused_mock_issue_generic_request
+  ):
+    portrait = interface.adb_utils.DeviceGeometry(
+        (1080, 2400), 0, (0, 0, 1080, 2400)
+    )
+    landscape = interface.adb_utils.DeviceGeometry(
+        (2400, 1080), 1, (0, 0, 1080, 2400)
+    )
+    mock_get_device_geometry.side_effect = [portrait, landscape, portrait]
+    env = interface.AsyncAndroidEnv(_mock_controller())
+
+    self.assertEqual(env.orientation, 0)
+    interface.adb_utils.change_orientation("landscape", env.controller)
+    self.assertEqual(env.orientation, 1)
+    self.assertEqual(env.logical_screen_size, (2400, 1080))
+    env.invalidate_geometry()
+    self.assertEqual(env.orientation, 0)
+    self.assertEqual(mock_get_device_geometry.call_count, 3)
+
+  @mock.patch.object(interface.adb_utils, "get_device_geometry")
+  def test_device_geometry_background_refresh(self, mock_get_device_geometry):
+    refreshed = threading.Event()
+    geometries = [
+        interface.adb_utils.DeviceGeometry((1080, 2400), 0, (0, 0, 1080, 2400)),
+        interface.adb_utils.DeviceGeometry((2400, 1080), 1, (0, 0, 1080, 2400)),
+    ]
+
+    def get_device_geometry(unused_env):
+      if len(geometries) == 1:
+        refreshed.set()
+        return geometries[0]
+      return geometries.pop(0)
+
+    mock_get_device_geometry.side_effect = get_device_geometry
+    env = interface.AsyncAndroidEnv(
+        mock.MagicMock(), geometry_refresh_interval_sec=0.01
     )
-    self.assertEqual(
-        cur,
-        states[5],
+
+    self.assertTrue(refreshed.wait(timeout=5))
+    self.assertEqual(env.orientation, 1)
+    env.close()
+
+  def test_lazy_state_fetches_components_on_access(self):
+    loaders = {
+        interface.PIXELS: mock.MagicMock(return_value=np.zeros([1, 2, 3])),
+        interface.FOREST: mock.MagicMock(return_value="forest"),
+        interface.UI_ELEMENTS: mock.MagicMock(return_value=[]),
+    }
+    state = interface.LazyState(loaders)
+
+    self.assertFalse(state.is_loaded(interface.PIXELS))
+    self.assertEqual(state.forest, "forest")
+    self.assertEqual(state.forest, "forest")
+
+    loaders[interface.FOREST].assert_called_once()
+    loaders[interface.PIXELS].assert_not_called()
+    self.assertEqual(list(state.timings), [interface.FOREST])
+    self.assertIsInstance(state, interface.State)
+
+  def test_lazy_state_requires_all_loaders(self):
+    with self.assertRaises(ValueError):
+      interface.LazyState({interface.PIXELS: lambda: None})
+
+  def test_lazy_state_pickles_as_state(self):
+    state = interface.LazyState({
+        interface.PIXELS: lambda: np.zeros([1, 2, 3]),
+        interface.FOREST: lambda: None,
+        interface.UI_ELEMENTS: lambda: [],
+    })
+
+    unpickled = pickle.loads(pickle.dumps(state))
+
+    self.assertIs(type(unpickled), interface.State)
+    self.assertEqual(unpickled.ui_elements, [])
+
+  def test_get_state_with_components_skips_unneeded_fetches(self):
+    controller = _mock_controller()
+    controller.a11y_method = (
+        interface.android_world_controller.A11yMethod.A11Y_FORWARDER_APP
+    )
+    controller.get_ui_elements.return_value = ["element"]
+    env = interface.AsyncAndroidEnv(controller)
+
+    state = env.get_state(components={interface.UI_ELEMENTS})
+
+    self.assertEqual(state.ui_elements, ["element"])
+    controller.get_ui_elements.assert_called_once_with(
+        forest=controller.get_a11y_forest.return_value
+    )
+    controller.capture_screen.assert_not_called()
+    controller.step.assert_not_called()
+
+    pixels = np.zeros([1, 2, 3])
+    controller.capture_screen.return_value = pixels
+    self.assertIs(state.pixels, pixels)
+    controller.get_a11y_forest.assert_called_once()
+
+  def test_get_state_pixels_only(self):
+    controller = _mock_controller()
+    controller.a11y_method = (
+        interface.android_world_controller.A11yMethod.A11Y_FORWARDER_APP
+    )
+    env = interface.AsyncAndroidEnv(controller)
+
+    state = env.get_state(components=[interface.PIXELS])
+
+    self.assertTrue(state.is_loaded(interface.PIXELS))
+    self.assertIn(interface.PIXELS, state.timings)
+    controller.get_a11y_forest.assert_not_called()
+
+  def test_get_state_unknown_component_raises(self):
+    env = interface.AsyncAndroidEnv(_mock_controller())
+
+    with self.assertRaises(ValueError):
+      env.get_state(components={"audio"})
+
+  def test_get_state_reads_prefetched_frame(self):
+    controller = _mock_controller()
+    frame = observation_prefetcher.Frame(
+        seq=1,
+        timestamp=0.0,
+        pixels=np.zeros([1, 2, 3]),
+        forest="forest",
+        ui_elements=["element"],
+    )
+    controller.get_prefetched_frame.return_value = frame
+    env = interface.AsyncAndroidEnv(controller)
+
+    state = env.get_state()
+
+    self.assertEqual(state.forest, "forest")
+    self.assertEqual(state.ui_elements, ["element"])
+    self.assertIn("observation_age_sec", state.auxiliaries)
+    controller.step.assert_not_called()
+
+  @mock.patch.object(interface.actuation, "execute_adb_action")
+  def test_step_executes_action_and_waits_for_stable_state(
+      self, mock_execute_adb_action
+  ):
+    env = interface.AsyncAndroidEnv(_mock_controller())
+    state = interface.State(
+        ui_elements=[], pixels=np.empty([1, 2, 3]), forest=None
+    )
+    env._get_state = mock.MagicMock(return_value=state)
+    env._get_stable_state = mock.MagicMock(return_value=state)
+    with mock.patch.object(
+        interface.adb_utils,
+        "get_device_geometry",
+        return_value=interface.adb_utils.DeviceGeometry((1, 2), 0, (0, 0, 1, 2)),
+    ):
+      result = env.step(
+          interface.json_action.JSONAction(action_type="click", x=1, y=1),
+          stability_timeout=1.5,
+      )
+
+    self.assertEqual(result, state)
+    mock_execute_adb_action.assert_called_once()
+    env._get_stable_state.assert_called_once_with(
+        timeout=1.5, components=None
     )
 
 
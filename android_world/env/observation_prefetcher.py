@@ -0,0 +1,248 @@
+# Copyright 2025 The android_world Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Captures observations in the background so reading one is a buffer lookup.
+
+A thread repeatedly captures a screenshot and pulls the newest a11y forest into
+a small ring buffer of timestamped frames. Readers get the freshest frame that
+was captured entirely after the last barrier. Barriers are set when an action
+finishes (see `paused`), so a frame read after an action never shows the screen
+from before it.
+"""
+
+import collections
+from collections.abc import Callable, Iterator, Sequence
+import contextlib
+import dataclasses
+import threading
+import time
+from typing import Any, Optional
+
+from absl import logging
+from android_world.env import representation_utils
+import numpy as np
+
+
+@dataclasses.dataclass(frozen=True)
+class Frame:
+  """An observation captured by the prefetcher.
+
+  Attributes:
+    seq: Sequence number; increases by one per captured frame.
+    timestamp: Monotonic time at which capture started. The frame shows the
+      screen at or after this time.
+    pixels: The screenshot.
+    forest: The newest a11y forest received when the frame was captured, as
+      for a synchronous capture.
+    ui_elements: UI elements extracted from `forest`.
+  """
+
+  seq: int
+  timestamp: float
+  pixels: np.ndarray
+  forest: Any
+  ui_elements: Sequence[representation_utils.UIElement]
+
+
+class ObservationPrefetcher:
+  """Captures frames in a background thread into a ring buffer."""
+
+  def __init__(
+      self,
+      capture_pixels: Callable[[], np.ndarray],
+      fetch_forest: Callable[[], Any],
+      to_ui_elements: Callable[
+          [Any], Sequence[representation_utils.UIElement]
+      ],
+      capacity: int = 4,
+      interval_sec: float = 0.05,
+      clock: Callable[[], float] = time.monotonic,
+  ):
+    """Initializes the prefetcher; call `start` to begin capturing.
+
+    Args:
+      capture_pixels: Captures a screenshot.
+      fetch_forest: Returns the newest a11y forest received, or None if none
+        has been received yet. Returning the same object again means no new
+        forest has arrived.
+      to_ui_elements: Converts a forest to UI elements.
+      capacity: Number of frames kept in the buffer.
+      interval_sec: Pause between captures.
+      clock: Monotonic clock; injectable for tests.
+
+    Raises:
+      ValueError: If capacity is not positive.
+    """
+    if capacity <= 0:
+      raise ValueError('Capacity must be positive.')
+    self._capture_pixels = capture_pixels
+    self._fetch_forest = fetch_forest
+    self._to_ui_elements = to_ui_elements
+    self._interval_sec = interval_sec
+    self._clock = clock
+
+    self._frames: collections.deque[Frame] = collections.deque(
+        maxlen=capacity
+    )
+    self._condition = threading.Condition()
+    # Held while capturing and while callers need exclusive use of the device.
+    self._device_lock = threading.RLock()
+    self._local = threading.local()
+    self._barrier = float('-inf')
+    self._seq = 0
+    self._forest = None
+    self._ui_elements = None
+
+    self._stop = threading.Event()
+    self._thread: Optional[threading.Thread] = None
+
+  @property
+  def capacity(self) -> int:
+    """Number of frames kept in the buffer."""
+    return self._frames.maxlen
+
+  @property
+  def interval_sec(self) -> float:
+    """Pause between captures."""
+    return self._interval_sec
+
+  @property
+  def running(self) -> bool:
+    return self._thread is not None and self._thread.is_alive()
+
+  def start(self) -> None:
+    if self.running:
+      return
+    self._stop.clear()
+    self._thread = threading.Thread(
+        target=self._run, name='observation-prefetcher', daemon=True
+    )
+    self._thread.start()
+
+  def stop(self, timeout: Optional[float] = None) -> None:
+    self._stop.set()
+    if self._thread is not None:
+      self._thread.join(timeout)
+    self._thread = None
+
+  def _run(self) -> None:
+    while not self._stop.is_set():
+      try:
+        with self._device_lock:
+          self.capture()
+      except Exception:  # pylint: disable=broad-exception-caught
+        logging.exception('Failed to prefetch observation.')
+      self._stop.wait(self._interval_sec)
+
+  def capture(self) -> Optional[Frame]:
+    """Captures one frame into the buffer; called by the background thread.
+
+    Returns:
+      The captured frame, or None if no forest has been received yet.
+    """
+    start = self._clock()
+    pixels = self._capture_pixels()
+    forest = self._fetch_forest()
+    if forest is not None and forest is not self._forest:
+      self._forest = forest
+      self._ui_elements = self._to_ui_elements(forest)
+    if self._forest is None:
+      return None
+    with self._condition:
+      self._seq += 1
+      frame = Frame(
+          seq=self._seq,
+          timestamp=start,
+          pixels=pixels,
+          forest=self._forest,
+          ui_elements=self._ui_elements,
+      )
+      self._frames.append(frame)
+      self._condition.notify_all()
+    return frame
+
+  @contextlib.contextmanager
+  def exclusive(self) -> Iterator[None]:
+    """Blocks capturing while the caller uses the device."""
+    with self._device_lock:
+      depth = getattr(self._local, 'depth', 0)
+      self._local.depth = depth + 1
+      try:
+        yield
+      finally:
+        self._local.depth = depth
+
+  def holds_device(self) -> bool:
+    """Returns whether the calling thread blocks capturing.
+
+    Such a thread must not wait for new frames, since none can be captured.
+    """
+    return getattr(self._local, 'depth', 0) > 0
+
+  @contextlib.contextmanager
+  def paused(self) -> Iterator[None]:
+    """Blocks capturing, then marks all frames captured so far as stale.
+
+    Wrap actions in this: frames read afterwards are guaranteed to have been
+    captured after the action finished.
+
+    Yields:
+      None.
+    """
+    with self.exclusive():
+      try:
+        yield
+      finally:
+        self.mark_stale()
+
+  def mark_stale(self) -> None:
+    with self._condition:
+      self._barrier = self._clock()
+
+  def latest(
+      self, timeout: float, newer_than: Optional[int] = None
+  ) -> Frame:
+    """Returns the freshest frame captured after the last barrier.
+
+    Args:
+      timeout: Maximum time in seconds to wait for such a frame.
+      newer_than: If set, only frames with a larger sequence number qualify.
+
+    Returns:
+      The frame.
+
+    Raises:
+      TimeoutError: If no frame qualified within the timeout.
+    """
+
+    def qualifies() -> bool:
+      if not self._frames:
+        return False
+      frame = self._frames[-1]
+      return frame.timestamp >= self._barrier and (
+          newer_than is None or frame.seq > newer_than
+      )
+
+    with self._condition:
+      if not self._condition.wait_for(qualifies, timeout=timeout):
+        raise TimeoutError(
+            f'No observation captured within {timeout:.1f}s after the last'
+            ' action.'
+        )
+      return self._frames[-1]
+
+  def frames(self) -> list[Frame]:
+    """Returns the buffered frames, oldest first."""
+    with self._condition:
+      return list(self._frames)
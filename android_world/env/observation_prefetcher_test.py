@@ -0,0 +1,137 @@
+# Copyright 2025 The android_world Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import itertools
+import time
+
+from absl.testing import absltest
+from android_world.env import observation_prefetcher
+import numpy as np
+
+
+class FakeClock:
+
+  def __init__(self):
+    self.now = 0.0
+
+  def __call__(self) -> float:
+    self.now += 1.0
+    return self.now
+
+
+def _make_prefetcher(forests, capacity=4, clock=None):
+  """Returns a prefetcher whose forests come from `forests`."""
+  forests = iter(forests)
+  pixels = (np.full([1, 1, 3], i) for i in itertools.count())
+  kwargs = {} if clock is None else {'clock': clock}
+  return observation_prefetcher.ObservationPrefetcher(
+      capture_pixels=lambda: next(pixels),
+      fetch_forest=lambda: next(forests),
+      to_ui_elements=lambda forest: [forest],
+      capacity=capacity,
+      interval_sec=0.0,
+      **kwargs,
+  )
+
+
+class ObservationPrefetcherTest(absltest.TestCase):
+
+  def test_capture_waits_for_first_forest(self):
+    prefetcher = _make_prefetcher([None, 'a'])
+
+    self.assertIsNone(prefetcher.capture())
+    frame = prefetcher.capture()
+
+    self.assertEqual(frame.forest, 'a')
+    self.assertEqual(frame.ui_elements, ['a'])
+    self.assertEqual(frame.seq, 1)
+
+  def test_reuses_forest_until_a_new_one_arrives(self):
+    forest = object()
+    conversions = []
+    prefetcher = observation_prefetcher.ObservationPrefetcher(
+        capture_pixels=lambda: np.zeros([1, 1, 3]),
+        fetch_forest=lambda: forest,
+        to_ui_elements=lambda f: conversions.append(f) or [],
+    )
+
+    prefetcher.capture()
+    prefetcher.capture()
+
+    self.assertLen(conversions, 1)
+    self.assertLen(prefetcher.frames(), 2)
+
+  def test_ring_buffer_keeps_latest_frames(self):
+    prefetcher = _make_prefetcher(['a'] * 5, capacity=2)
+
+    for _ in range(5):
+      prefetcher.capture()
+
+    self.assertEqual([f.seq for f in prefetcher.frames()], [4, 5])
+    self.assertEqual(prefetcher.latest(timeout=0).seq, 5)
+
+  def test_frames_before_barrier_are_stale(self):
+    prefetcher = _make_prefetcher(['a', 'b'], clock=FakeClock())
+    prefetcher.capture()
+
+    with prefetcher.paused():
+      self.assertTrue(prefetcher.holds_device())
+    self.assertFalse(prefetcher.holds_device())
+
+    with self.assertRaises(TimeoutError):
+      prefetcher.latest(timeout=0)
+    frame = prefetcher.capture()
+    self.assertIs(prefetcher.latest(timeout=0), frame)
+    self.assertEqual(frame.forest, 'b')
+
+  def test_latest_newer_than(self):
+    prefetcher = _make_prefetcher(['a'] * 2)
+    first = prefetcher.capture()
+
+    with self.assertRaises(TimeoutError):
+      prefetcher.latest(timeout=0, newer_than=first.seq)
+    prefetcher.capture()
+    self.assertEqual(prefetcher.latest(timeout=0, newer_than=first.seq).seq, 2)
+
+  def test_background_thread(self):
+    prefetcher = _make_prefetcher(itertools.repeat('a'))
+    prefetcher.start()
+    self.assertTrue(prefetcher.running)
+
+    with prefetcher.paused():
+      barrier_seq = prefetcher.frames()[-1].seq if prefetcher.frames() else 0
+    frame = prefetcher.latest(timeout=5)
+    prefetcher.stop()
+
+    self.assertGreater(frame.seq, barrier_seq)
+    self.assertFalse(prefetcher.running)
+
+  def test_capture_blocked_while_paused(self):
+    prefetcher = _make_prefetcher(itertools.repeat('a'))
+    prefetcher.start()
+    prefetcher.latest(timeout=5)
+
+    with prefetcher.paused():
+      seq = prefetcher.frames()[-1].seq
+      time.sleep(0.05)
+      self.assertEqual(prefetcher.frames()[-1].seq, seq)
+    prefetcher.stop()
+
+  def test_invalid_capacity_raises(self):
+    with self.assertRaises(ValueError):
+      _make_prefetcher([], capacity=0)
+
+
+if __name__ == '__main__':
+  absltest.main()
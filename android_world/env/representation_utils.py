@@ -14,10 +14,14 @@
 
 """Tools for processing and representing accessibility trees."""
 
+from collections.abc import Sequence
 import dataclasses
-from typing import Any, Optional
+import re
+import sys
+from typing import Any, Iterator, Optional, overload
 import xml.etree.ElementTree as ET
 from android_env.proto.a11y import android_accessibility_forest_pb2
+import numpy as np
 
 
 @dataclasses.dataclass
@@ -77,6 +81,14 @@ class UIElement:
   metadata: Optional[dict[str, Any]] = None
 
 
+# All UIElement fields except metadata, which may hold unhashable values.
+_FINGERPRINT_FIELDS = tuple(
+    field.name
+    for field in dataclasses.fields(UIElement)
+    if field.name != 'metadata'
+)
+
+
 def accessibility_node_to_ui_element(
     node: Any,
     screen_size: Optional[tuple[int, int]] = None,
@@ -152,68 +164,431 @@ def forest_to_ui_elements(
   Returns:
     The extracted UI elements.
   """
-  elements = []
+  return [
+      accessibility_node_to_ui_element(node, screen_size)
+      for node in _iter_element_nodes(forest, exclude_invisible_elements)
+  ]
+
+
+def _iter_element_nodes(
+    forest: android_accessibility_forest_pb2.AndroidAccessibilityForest | Any,
+    exclude_invisible_elements: bool,
+) -> Iterator[Any]:
+  """Yields the forest nodes that are converted to UI elements."""
   for window in forest.windows:
     for node in window.tree.nodes:
       if not node.child_ids or node.content_description or node.is_scrollable:
         if exclude_invisible_elements and not node.is_visible_to_user:
           continue
-        else:
-          elements.append(accessibility_node_to_ui_element(node, screen_size))
-  return elements
+        yield node
 
 
-def _parse_ui_hierarchy(xml_string: str) -> dict[str, Any]:
-  """Parses the UI hierarchy XML into a dictionary structure."""
-  root = ET.fromstring(xml_string)
+def forest_fingerprint(
+    forest: android_accessibility_forest_pb2.AndroidAccessibilityForest | Any,
+    exclude_invisible_elements: bool = False,
+) -> int:
+  """Returns a structural hash of the nodes `forest_to_ui_elements` extracts.
+
+  This is much cheaper than converting the forest and comparing UI element
+  lists, since no dataclasses are created. Two forests that convert to equal UI
+  elements have equal fingerprints. Hashes are only comparable within a single
+  process, as Python randomizes string hashing per process.
 
-  def parse_node(node):
-    result = node.attrib
-    result['children'] = [parse_node(child) for child in node]
-    return result
+  Args:
+    forest: The forest to fingerprint.
+    exclude_invisible_elements: Must match the value used for conversion.
+
+  Returns:
+    The fingerprint.
+  """
+  keys = []
+  for node in _iter_element_nodes(forest, exclude_invisible_elements):
+    bounds = node.bounds_in_screen
+    keys.append((
+        node.text,
+        node.content_description,
+        node.class_name,
+        node.hint_text,
+        node.package_name,
+        node.view_id_resource_name,
+        bounds.left,
+        bounds.top,
+        bounds.right,
+        bounds.bottom,
+        node.is_checked,
+        node.is_checkable,
+        node.is_clickable,
+        node.is_editable,
+        node.is_enabled,
+        node.is_focused,
+        node.is_focusable,
+        node.is_long_clickable,
+        node.is_scrollable,
+        node.is_selected,
+        node.is_visible_to_user,
+    ))
+  return hash(tuple(keys))
+
+
+def ui_elements_fingerprint(elements: list[UIElement]) -> int:
+  """Returns a hash of UI elements, ignoring their metadata.
+
+  Two lists of UI elements that compare equal (metadata aside) have equal
+  fingerprints. Hashes are only comparable within a single process.
 
-  return parse_node(root)
+  Args:
+    elements: The UI elements to fingerprint.
 
+  Returns:
+    The fingerprint.
+  """
+  keys = []
+  for element in elements:
+    key = []
+    for field in _FINGERPRINT_FIELDS:
+      value = getattr(element, field)
+      if isinstance(value, BoundingBox):
+        value = (value.x_min, value.x_max, value.y_min, value.y_max)
+      key.append(value)
+    keys.append(tuple(key))
+  return hash(tuple(keys))
+
+
+# Boolean UIElement fields, in UIElement field order; the columns of
+# UIElementTable.flags.
+FLAG_NAMES = (
+    'is_checked',
+    'is_checkable',
+    'is_clickable',
+    'is_editable',
+    'is_enabled',
+    'is_focused',
+    'is_focusable',
+    'is_long_clickable',
+    'is_scrollable',
+    'is_selected',
+    'is_visible',
+)
+
+
+class UIElementTable(Sequence[UIElement]):
+  """Columnar storage for the UI elements of one screen.
+
+  Converting a forest with `forest_to_ui_elements` allocates a UIElement and
+  two BoundingBoxes per node on every observation. The table instead stores
+  one list per string field, a boolean matrix for the flags and an int32 matrix
+  for the pixel bounding boxes. Package, class and resource names are interned,
+  so repeated values share one string.
+
+  The table is a sequence of UIElements, so it can be used wherever a list of
+  UIElements is expected. Elements are built on first access and cached; they
+  compare equal to the elements `forest_to_ui_elements` returns.
+  """
 
-def xml_dump_to_ui_elements(xml_string: str) -> list[UIElement]:
-  """Converts a UI hierarchy XML dump from uiautomator dump to UIElements."""
-  parsed_hierarchy = _parse_ui_hierarchy(xml_string)
-  ui_elements = []
+  __slots__ = (
+      'text',
+      'content_description',
+      'class_name',
+      'hint_text',
+      'package_name',
+      'resource_name',
+      'flags',
+      'bbox_pixels',
+      'screen_size',
+      '_elements',
+  )
 
-  def process_node(node, is_root):
-    bounds = node.get('bounds')
-    if bounds:
-      x_min, y_min, x_max, y_max = map(
-          int, bounds.strip('[]').replace('][', ',').split(',')
+  def __init__(
+      self,
+      text: list[Optional[str]],
+      content_description: list[Optional[str]],
+      class_name: list[Optional[str]],
+      hint_text: list[Optional[str]],
+      package_name: list[Optional[str]],
+      resource_name: list[Optional[str]],
+      flags: np.ndarray,
+      bbox_pixels: np.ndarray,
+      screen_size: Optional[tuple[int, int]] = None,
+  ):
+    """Initializes the table from its columns.
+
+    Args:
+      text: Text of each element.
+      content_description: Content description of each element.
+      class_name: Class name of each element.
+      hint_text: Hint text of each element.
+      package_name: Package name of each element.
+      resource_name: Resource name of each element.
+      flags: Boolean matrix of shape (n, len(FLAG_NAMES)).
+      bbox_pixels: int32 matrix of shape (n, 4) with columns x_min, x_max,
+        y_min, y_max.
+      screen_size: The size of the device screen in pixels (width, height),
+        used to compute normalized bounding boxes.
+
+    Raises:
+      ValueError: If the columns have different lengths.
+    """
+    n = len(text)
+    if any(
+        len(column) != n
+        for column in (
+            content_description,
+            class_name,
+            hint_text,
+            package_name,
+            resource_name,
+        )
+    ):
+      raise ValueError('All columns must have the same length.')
+    if flags.shape != (n, len(FLAG_NAMES)) or bbox_pixels.shape != (n, 4):
+      raise ValueError(
+          f'Expected flags of shape {(n, len(FLAG_NAMES))} and bbox_pixels of'
+          f' shape {(n, 4)}, got {flags.shape} and {bbox_pixels.shape}.'
       )
-      bbox = BoundingBox(x_min, x_max, y_min, y_max)
-    else:
-      bbox = None
-
-    ui_element = UIElement(
-        text=node.get('text'),
-        content_description=node.get('content-desc'),
-        class_name=node.get('class'),
-        bbox=bbox,
-        bbox_pixels=bbox,
-        is_checked=node.get('checked') == 'true',
-        is_checkable=node.get('checkable') == 'true',
-        is_clickable=node.get('clickable') == 'true',
-        is_enabled=node.get('enabled') == 'true',
-        is_focused=node.get('focused') == 'true',
-        is_focusable=node.get('focusable') == 'true',
-        is_long_clickable=node.get('long-clickable') == 'true',
-        is_scrollable=node.get('scrollable') == 'true',
-        is_selected=node.get('selected') == 'true',
-        package_name=node.get('package'),
-        resource_id=node.get('resource-id'),
-        is_visible=True,
+    self.text = text
+    self.content_description = content_description
+    self.class_name = class_name
+    self.hint_text = hint_text
+    self.package_name = package_name
+    self.resource_name = resource_name
+    self.flags = flags
+    self.bbox_pixels = bbox_pixels
+    self.screen_size = screen_size
+    self._elements: list[Optional[UIElement]] = [None] * n
+
+  @classmethod
+  def from_forest(
+      cls,
+      forest: android_accessibility_forest_pb2.AndroidAccessibilityForest | Any,
+      exclude_invisible_elements: bool = False,
+      screen_size: Optional[tuple[int, int]] = None,
+  ) -> 'UIElementTable':
+    """Builds a table from the nodes `forest_to_ui_elements` would convert.
+
+    Args:
+      forest: The forest to extract nodes from.
+      exclude_invisible_elements: True if invisible elements should be skipped.
+      screen_size: The size of the device screen in pixels (width, height).
+
+    Returns:
+      The table.
+    """
+    intern = sys.intern
+    text, content_description, class_name = [], [], []
+    hint_text, package_name, resource_name = [], [], []
+    flags, bboxes = [], []
+    for node in _iter_element_nodes(forest, exclude_invisible_elements):
+      # Empty strings become None, as in accessibility_node_to_ui_element.
+      text.append(node.text or None)
+      content_description.append(node.content_description or None)
+      class_name.append(intern(node.class_name) if node.class_name else None)
+      hint_text.append(node.hint_text or None)
+      package_name.append(
+          intern(node.package_name) if node.package_name else None
+      )
+      resource_name.append(
+          intern(node.view_id_resource_name)
+          if node.view_id_resource_name
+          else None
+      )
+      flags.append((
+          node.is_checked,
+          node.is_checkable,
+          node.is_clickable,
+          node.is_editable,
+          node.is_enabled,
+          node.is_focused,
+          node.is_focusable,
+          node.is_long_clickable,
+          node.is_scrollable,
+          node.is_selected,
+          node.is_visible_to_user,
+      ))
+      bounds = node.bounds_in_screen
+      bboxes.append((bounds.left, bounds.right, bounds.top, bounds.bottom))
+    return cls(
+        text=text,
+        content_description=content_description,
+        class_name=class_name,
+        hint_text=hint_text,
+        package_name=package_name,
+        resource_name=resource_name,
+        flags=np.array(flags, dtype=bool).reshape(-1, len(FLAG_NAMES)),
+        bbox_pixels=np.array(bboxes, dtype=np.int32).reshape(-1, 4),
+        screen_size=screen_size,
     )
-    if not is_root:
-      ui_elements.append(ui_element)
 
-    for child in node.get('children', []):
-      process_node(child, is_root=False)
+  def __len__(self) -> int:
+    return len(self._elements)
+
+  @overload
+  def __getitem__(self, index: int) -> UIElement:
+    ...
+
+  @overload
+  def __getitem__(self, index: slice) -> list[UIElement]:
+    ...
+
+  def __getitem__(self, index):
+    if isinstance(index, slice):
+      return [self[i] for i in range(*index.indices(len(self)))]
+    if index < 0:
+      index += len(self)
+    if not 0 <= index < len(self):
+      raise IndexError('UIElementTable index out of range.')
+    element = self._elements[index]
+    if element is None:
+      element = self._build_element(index)
+      self._elements[index] = element
+    return element
+
+  def __eq__(self, other: Any) -> bool:
+    if not isinstance(other, Sequence) or isinstance(other, str):
+      return NotImplemented
+    return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+
+  __hash__ = None
+
+  def __repr__(self) -> str:
+    return f'UIElementTable({self.to_list()!r})'
+
+  def __iter__(self) -> Iterator[UIElement]:
+    return iter(self.to_list())
+
+  def _build_element(
+      self,
+      index: int,
+      bbox_pixels: Optional[list[int]] = None,
+      flags: Optional[list[bool]] = None,
+  ) -> UIElement:
+    """Builds the element at `index`, optionally from pre-converted rows."""
+    if bbox_pixels is None:
+      bbox_pixels = self.bbox_pixels[index].tolist()
+    if flags is None:
+      flags = self.flags[index].tolist()
+    pixels = BoundingBox(*bbox_pixels)
+    bbox = None
+    if self.screen_size is not None:
+      bbox = _normalize_bounding_box(pixels, self.screen_size)
+    return UIElement(
+        self.text[index],
+        self.content_description[index],
+        self.class_name[index],
+        bbox,
+        pixels,
+        self.hint_text[index],
+        *flags,
+        package_name=self.package_name[index],
+        resource_name=self.resource_name[index],
+    )
 
-  process_node(parsed_hierarchy, is_root=True)
-  return ui_elements
+  def to_list(self) -> list[UIElement]:
+    """Returns all elements as a list, building missing ones in bulk."""
+    if None in self._elements:
+      # Converting whole arrays is much cheaper than indexing row by row.
+      bboxes = self.bbox_pixels.tolist()
+      flags = self.flags.tolist()
+      self._elements = [
+          element or self._build_element(i, bboxes[i], flags[i])
+          for i, element in enumerate(self._elements)
+      ]
+    return list(self._elements)
+
+  def flag(self, name: str) -> np.ndarray:
+    """Returns the boolean column for a flag, e.g. "is_clickable"."""
+    return self.flags[:, FLAG_NAMES.index(name)]
+
+  def centers(self) -> np.ndarray:
+    """Returns the (x, y) pixel center of each element, shape (n, 2)."""
+    x = (self.bbox_pixels[:, 0] + self.bbox_pixels[:, 1]) / 2.0
+    y = (self.bbox_pixels[:, 2] + self.bbox_pixels[:, 3]) / 2.0
+    return np.stack([x, y], axis=1)
+
+
+def forest_to_ui_element_table(
+    forest: android_accessibility_forest_pb2.AndroidAccessibilityForest | Any,
+    exclude_invisible_elements: bool = False,
+    screen_size: Optional[tuple[int, int]] = None,
+) -> UIElementTable:
+  """Like `forest_to_ui_elements`, but returns a lazily built UIElementTable."""
+  return UIElementTable.from_forest(
+      forest,
+      exclude_invisible_elements=exclude_invisible_elements,
+      screen_size=screen_size,
+  )
+
+
+# Matches uiautomator bounds, e.g. "[0,63][1080,210]".
+_BOUNDS_PATTERN = re.compile(r'\[(-?\d+),(-?\d+)\]\[(-?\d+),(-?\d+)\]')
+
+
+def _parse_bounds(bounds: str) -> BoundingBox:
+  match = _BOUNDS_PATTERN.fullmatch(bounds)
+  if match is None:
+    raise ValueError(f'Invalid bounds: {bounds!r}')
+  x_min, y_min, x_max, y_max = map(int, match.groups())
+  return BoundingBox(x_min, x_max, y_min, y_max)
+
+
+class _UIElementBuilder:
+  """XMLParser target that builds UIElements as start tags are parsed.
+
+  No element tree is built, so memory does not grow with the depth or size of
+  the hierarchy beyond the UIElements themselves.
+  """
+
+  def __init__(self):
+    self._depth = 0
+    self.ui_elements: list[UIElement] = []
+
+  def start(self, tag: str, attrib: dict[str, str]) -> None:
+    del tag
+    self._depth += 1
+    # The root <hierarchy> tag is not a UI element.
+    if self._depth == 1:
+      return
+    get = attrib.get
+    bounds = get('bounds')
+    bbox = _parse_bounds(bounds) if bounds else None
+    self.ui_elements.append(
+        UIElement(
+            text=get('text'),
+            content_description=get('content-desc'),
+            class_name=get('class'),
+            bbox=bbox,
+            bbox_pixels=bbox,
+            is_checked=get('checked') == 'true',
+            is_checkable=get('checkable') == 'true',
+            is_clickable=get('clickable') == 'true',
+            is_enabled=get('enabled') == 'true',
+            is_focused=get('focused') == 'true',
+            is_focusable=get('focusable') == 'true',
+            is_long_clickable=get('long-clickable') == 'true',
+            is_scrollable=get('scrollable') == 'true',
+            is_selected=get('selected') == 'true',
+            package_name=get('package'),
+            resource_id=get('resource-id'),
+            is_visible=True,
+        )
+    )
+
+  def end(self, tag: str) -> None:
+    del tag
+    self._depth -= 1
+
+  def close(self) -> list[UIElement]:
+    return self.ui_elements
+
+
+def xml_dump_to_ui_elements(xml_dump: str | bytes) -> list[UIElement]:
+  """Converts a UI hierarchy XML dump from uiautomator dump to UIElements.
+
+  Args:
+    xml_dump: Output of uiautomator dump, as text or raw bytes.
+
+  Returns:
+    UI elements for all nodes except the root, in document order.
+  """
+  parser = ET.XMLParser(target=_UIElementBuilder())
+  parser.feed(xml_dump)
+  return parser.close()
@@ -13,11 +13,14 @@
 # limitations under the License.
 
 import dataclasses
+import pickle
 from unittest import mock
 
 from absl.testing import absltest
 from absl.testing import parameterized
+from android_env.proto.a11y import android_accessibility_forest_pb2
 from android_world.env import representation_utils
+import numpy as np
 
 
 @dataclasses.dataclass(frozen=True)
@@ -115,5 +118,236 @@ class TestAccessibilityNodeToUIElement(parameterized.TestCase):
     self.assertEqual(ui_element.bbox, expected_normalized_bbox)
 
 
+def _make_forest(
+    texts: list[str], right: int = 100
+) -> android_accessibility_forest_pb2.AndroidAccessibilityForest:
+  forest = android_accessibility_forest_pb2.AndroidAccessibilityForest()
+  window = forest.windows.add()
+  for i, text in enumerate(texts):
+    node = window.tree.nodes.add()
+    node.unique_id = i
+    node.text = text
+    node.is_visible_to_user = True
+    node.bounds_in_screen.right = right
+    node.bounds_in_screen.bottom = 50
+  return forest
+
+
+class FingerprintTest(absltest.TestCase):
+
+  def test_forest_fingerprint_equal_for_equal_forests(self):
+    self.assertEqual(
+        representation_utils.forest_fingerprint(_make_forest(['a', 'b'])),
+        representation_utils.forest_fingerprint(_make_forest(['a', 'b'])),
+    )
+
+  def test_forest_fingerprint_changes_with_content(self):
+    fingerprint = representation_utils.forest_fingerprint(
+        _make_forest(['a', 'b'])
+    )
+
+    self.assertNotEqual(
+        fingerprint,
+        representation_utils.forest_fingerprint(_make_forest(['a', 'c'])),
+    )
+    self.assertNotEqual(
+        fingerprint,
+        representation_utils.forest_fingerprint(
+            _make_forest(['a', 'b'], right=99)
+        ),
+    )
+
+  def test_fingerprints_agree_with_ui_element_equality(self):
+    forest_a = _make_forest(['a', 'b'])
+    forest_b = _make_forest(['a', 'b'])
+    forest_b.windows[0].tree.nodes[0].unique_id = 42
+
+    elements_a = representation_utils.forest_to_ui_elements(forest_a)
+    elements_b = representation_utils.forest_to_ui_elements(forest_b)
+
+    self.assertEqual(elements_a, elements_b)
+    self.assertEqual(
+        representation_utils.forest_fingerprint(forest_a),
+        representation_utils.forest_fingerprint(forest_b),
+    )
+    self.assertEqual(
+        representation_utils.ui_elements_fingerprint(elements_a),
+        representation_utils.ui_elements_fingerprint(elements_b),
+    )
+
+  def test_ui_elements_fingerprint_ignores_metadata(self):
+    element = representation_utils.UIElement(text='a')
+    with_metadata = dataclasses.replace(element, metadata={'k': 'v'})
+
+    self.assertEqual(
+        representation_utils.ui_elements_fingerprint([element]),
+        representation_utils.ui_elements_fingerprint([with_metadata]),
+    )
+    self.assertNotEqual(
+        representation_utils.ui_elements_fingerprint([element]),
+        representation_utils.ui_elements_fingerprint(
+            [representation_utils.UIElement(text='b')]
+        ),
+    )
+
+
+class UIElementTableTest(absltest.TestCase):
+
+  def setUp(self):
+    super().setUp()
+    self.forest = _make_forest(['a', '', 'c'])
+    nodes = self.forest.windows[0].tree.nodes
+    nodes[0].is_clickable = True
+    nodes[1].class_name = 'android.widget.TextView'
+    nodes[2].class_name = 'android.widget.TextView'
+    nodes[2].bounds_in_screen.left = 20
+    nodes[2].is_visible_to_user = False
+
+  def test_matches_forest_to_ui_elements(self):
+    for screen_size in (None, (100, 200)):
+      for exclude_invisible_elements in (False, True):
+        table = representation_utils.forest_to_ui_element_table(
+            self.forest,
+            exclude_invisible_elements=exclude_invisible_elements,
+            screen_size=screen_size,
+        )
+        elements = representation_utils.forest_to_ui_elements(
+            self.forest,
+            exclude_invisible_elements=exclude_invisible_elements,
+            screen_size=screen_size,
+        )
+
+        self.assertEqual(table, elements)
+        self.assertEqual(elements, table)
+        self.assertEqual(table.to_list(), elements)
+
+  def test_sequence_access(self):
+    table = representation_utils.forest_to_ui_element_table(self.forest)
+
+    self.assertLen(table, 3)
+    self.assertEqual(table[-1].text, 'c')
+    self.assertIs(table[0], table[0])
+    self.assertEqual([e.text for e in table[1:]], [None, 'c'])
+    self.assertIsInstance(table[0].bbox_pixels.x_min, int)
+    self.assertIsInstance(table[0].is_clickable, bool)
+    with self.assertRaises(IndexError):
+      _ = table[3]
+
+  def test_columns(self):
+    table = representation_utils.forest_to_ui_element_table(self.forest)
+
+    self.assertEqual(table.bbox_pixels.dtype, np.int32)
+    np.testing.assert_array_equal(
+        table.flag('is_clickable'), [True, False, False]
+    )
+    np.testing.assert_array_equal(
+        table.centers(), [[50, 25], [50, 25], [60, 25]]
+    )
+    self.assertIs(table.class_name[1], table.class_name[2])
+
+  def test_empty_forest(self):
+    table = representation_utils.forest_to_ui_element_table(_make_forest([]))
+
+    self.assertEmpty(table)
+    self.assertEqual(table, [])
+    self.assertEqual(table.bbox_pixels.shape, (0, 4))
+
+  def test_pickle_round_trip(self):
+    table = representation_utils.forest_to_ui_element_table(self.forest)
+
+    self.assertEqual(pickle.loads(pickle.dumps(table)), table)
+
+  def test_mismatched_columns_raise(self):
+    with self.assertRaises(ValueError):
+      representation_utils.UIElementTable(
+          text=['a'],
+          content_description=[],
+          class_name=['x'],
+          hint_text=[None],
+          package_name=[None],
+          resource_name=[None],
+          flags=np.zeros((1, len(representation_utils.FLAG_NAMES)), bool),
+          bbox_pixels=np.zeros((1, 4), np.int32),
+      )
+
+
+_UIAUTOMATOR_DUMP = """<?xml version='1.0' encoding='UTF-8' standalone='yes' ?>
+<hierarchy rotation="0">
+  <node index="0" text="" class="android.widget.FrameLayout" package="com.example" bounds="[0,0][1080,2400]">
+    <node index="0" text="Hello" content-desc="greeting" class="android.widget.TextView" package="com.example" resource-id="com.example:id/title" clickable="true" enabled="true" bounds="[10,20][110,70]" />
+    <node index="1" text="OK" class="android.widget.Button" package="com.example" checkable="true" checked="false" bounds="[-5,100][200,160]" />
+  </node>
+  <node index="1" class="android.view.View" />
+</hierarchy>"""
+
+
+class XmlDumpToUIElementsTest(absltest.TestCase):
+
+  def test_elements_in_document_order(self):
+    elements = representation_utils.xml_dump_to_ui_elements(_UIAUTOMATOR_DUMP)
+
+    self.assertEqual(
+        [element.class_name for element in elements],
+        [
+            'android.widget.FrameLayout',
+            'android.widget.TextView',
+            'android.widget.Button',
+            'android.view.View',
+        ],
+    )
+    self.assertEqual(
+        elements[1],
+        representation_utils.UIElement(
+            text='Hello',
+            content_description='greeting',
+            class_name='android.widget.TextView',
+            bbox=representation_utils.BoundingBox(10, 110, 20, 70),
+            bbox_pixels=representation_utils.BoundingBox(10, 110, 20, 70),
+            is_checked=False,
+            is_checkable=False,
+            is_clickable=True,
+            is_enabled=True,
+            is_focused=False,
+            is_focusable=False,
+            is_long_clickable=False,
+            is_scrollable=False,
+            is_selected=False,
+            package_name='com.example',
+            resource_id='com.example:id/title',
+            is_visible=True,
+        ),
+    )
+    self.assertEqual(
+        elements[2].bbox_pixels,
+        representation_utils.BoundingBox(-5, 200, 100, 160),
+    )
+    self.assertIsNone(elements[3].bbox)
+
+  def test_accepts_bytes(self):
+    self.assertEqual(
+        representation_utils.xml_dump_to_ui_elements(
+            _UIAUTOMATOR_DUMP.encode('utf-8')
+        ),
+        representation_utils.xml_dump_to_ui_elements(_UIAUTOMATOR_DUMP),
+    )
+
+  def test_deep_hierarchy(self):
+    depth = 5000
+    xml_dump = (
+        '<hierarchy>'
+        + '<node class="a" bounds="[0,0][1,1]">' * depth
+        + '</node>' * depth
+        + '</hierarchy>'
+    )
+
+    self.assertLen(representation_utils.xml_dump_to_ui_elements(xml_dump), depth)
+
+  def test_invalid_bounds_raise(self):
+    with self.assertRaises(ValueError):
+      representation_utils.xml_dump_to_ui_elements(
+          '<hierarchy><node bounds="[0,0][1080]" /></hierarchy>'
+      )
+
+
 if __name__ == '__main__':
   absltest.main()
@@ -0,0 +1,297 @@
+# Copyright 2025 The android_world Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Backends for capturing the screen, optionally cropped and downscaled.
+
+Which backend is fastest depends on the host: stepping AndroidEnv goes through
+its coordinator, `adb exec-out screencap` streams raw RGBA over adb, and the
+emulator's gRPC endpoint can downscale on the emulator side. Use
+`select_fastest` to measure them on the current host.
+
+Frames are RGB uint8 arrays of shape (height, width, 3), like the `pixels`
+observation of AndroidEnv.
+"""
+
+import abc
+from collections.abc import Callable, Sequence
+import dataclasses
+import statistics
+import struct
+import time
+from typing import Optional
+
+from absl import logging
+from android_env import env_interface
+from android_env.proto import adb_pb2
+from android_env.proto import emulator_controller_pb2
+from android_env.proto import emulator_controller_pb2_grpc
+from android_world.env import adb_utils
+import cv2
+import grpc
+import numpy as np
+
+
+@dataclasses.dataclass(frozen=True)
+class CaptureOptions:
+  """How to crop and downscale a captured frame.
+
+  Attributes:
+    roi: Region of interest to crop to, as (left, top, right, bottom) in pixels
+      of the full frame. The full frame is used if None.
+    scale: Factor in (0, 1] to downscale by, applied after cropping.
+  """
+
+  roi: Optional[tuple[int, int, int, int]] = None
+  scale: float = 1.0
+
+  def __post_init__(self):
+    if not 0 < self.scale <= 1:
+      raise ValueError(f'Scale must be in (0, 1], got {self.scale}.')
+    if self.roi is not None:
+      left, top, right, bottom = self.roi
+      if left < 0 or top < 0 or right <= left or bottom <= top:
+        raise ValueError(f'Invalid region of interest: {self.roi}.')
+
+
+FULL_FRAME = CaptureOptions()
+
+
+def scaled_size(width: int, height: int, scale: float) -> tuple[int, int]:
+  """Returns the (width, height) of a frame downscaled by `scale`."""
+  return max(1, round(width * scale)), max(1, round(height * scale))
+
+
+def apply_options(pixels: np.ndarray, options: CaptureOptions) -> np.ndarray:
+  """Crops and downscales a full frame according to `options`."""
+  if options.roi is not None:
+    left, top, right, bottom = options.roi
+    pixels = pixels[top:bottom, left:right]
+  if options.scale != 1:
+    height, width = pixels.shape[:2]
+    pixels = cv2.resize(
+        pixels,
+        scaled_size(width, height, options.scale),
+        interpolation=cv2.INTER_AREA,
+    )
+  return pixels
+
+
+class CaptureBackend(abc.ABC):
+  """Captures the screen."""
+
+  name: str
+
+  @abc.abstractmethod
+  def capture(self, options: CaptureOptions = FULL_FRAME) -> np.ndarray:
+    """Returns the current screen, cropped and downscaled per `options`."""
+
+
+class AndroidEnvStepBackend(CaptureBackend):
+  """Captures the `pixels` observation of a no-op AndroidEnv step."""
+
+  name = 'android_env'
+
+  def __init__(self, step_pixels: Callable[[], np.ndarray]):
+    """Initializes the backend.
+
+    Args:
+      step_pixels: Steps the environment with a no-op action and returns the
+        pixels observation.
+    """
+    self._step_pixels = step_pixels
+
+  def capture(self, options: CaptureOptions = FULL_FRAME) -> np.ndarray:
+    return apply_options(self._step_pixels(), options)
+
+
+# Pixel formats from android.graphics.PixelFormat that screencap emits.
+_RGBA_8888 = 1
+_RGBX_8888 = 2
+_BGRA_8888 = 5
+
+
+def parse_raw_screencap(data: bytes) -> np.ndarray:
+  """Parses the raw output of `screencap` into an RGB frame.
+
+  The output is a header of width, height and pixel format as little-endian
+  uint32s, followed by a colorspace on API 28+, followed by 4 bytes per pixel.
+
+  Args:
+    data: Output of `adb exec-out screencap`.
+
+  Returns:
+    The frame.
+
+  Raises:
+    ValueError: If the output is truncated or in an unsupported format.
+  """
+  if len(data) < 12:
+    raise ValueError(f'Screencap output too short: {len(data)} bytes.')
+  width, height, pixel_format = struct.unpack_from('<3I', data)
+  num_bytes = width * height * 4
+  header_size = len(data) - num_bytes
+  if header_size not in (12, 16):
+    raise ValueError(
+        f'Screencap output of {len(data)} bytes does not match a'
+        f' {width}x{height} frame.'
+    )
+  if pixel_format not in (_RGBA_8888, _RGBX_8888, _BGRA_8888):
+    raise ValueError(f'Unsupported screencap pixel format {pixel_format}.')
+  pixels = np.frombuffer(data, dtype=np.uint8, offset=header_size)
+  pixels = pixels.reshape(height, width, 4)
+  if pixel_format == _BGRA_8888:
+    return pixels[:, :, 2::-1]
+  return pixels[:, :, :3]
+
+
+class AdbScreencapBackend(CaptureBackend):
+  """Streams a raw frame with `adb exec-out screencap`."""
+
+  name = 'adb_screencap'
+
+  def __init__(
+      self,
+      env: env_interface.AndroidEnvInterface,
+      timeout_sec: Optional[float] = None,
+  ):
+    self._env = env
+    self._timeout_sec = timeout_sec
+
+  def capture(self, options: CaptureOptions = FULL_FRAME) -> np.ndarray:
+    response = adb_utils.issue_generic_request(
+        'exec-out screencap', self._env, timeout_sec=self._timeout_sec
+    )
+    if response.status != adb_pb2.AdbResponse.Status.OK:
+      raise RuntimeError(f'screencap failed: {response.error_message}')
+    return apply_options(
+        parse_raw_screencap(response.generic.output), options
+    )
+
+
+class EmulatorGrpcBackend(CaptureBackend):
+  """Requests screenshots from the emulator's gRPC controller.
+
+  The emulator downscales on its side, so a downscaled frame costs less to
+  transfer than a full one.
+  """
+
+  name = 'emulator_grpc'
+
+  def __init__(
+      self,
+      stub: emulator_controller_pb2_grpc.EmulatorControllerStub,
+      image_format: str = 'RGB888',
+  ):
+    """Initializes the backend.
+
+    Args:
+      stub: Stub of the emulator's gRPC controller.
+      image_format: 'RGB888', 'RGBA8888' or 'PNG'; the format the emulator
+        sends frames in. PNG is smaller but must be decoded.
+    """
+    self._stub = stub
+    self._format = emulator_controller_pb2.ImageFormat.ImgFormat.Value(
+        image_format
+    )
+    self._full_size: Optional[tuple[int, int]] = None
+
+  @classmethod
+  def connect(
+      cls, grpc_port: int, image_format: str = 'RGB888', timeout_sec: int = 10
+  ) -> 'EmulatorGrpcBackend':
+    """Connects to the emulator listening on `grpc_port` on localhost."""
+    channel = grpc.secure_channel(
+        f'localhost:{grpc_port}',
+        grpc.local_channel_credentials(),
+        options=[
+            ('grpc.max_send_message_length', -1),
+            ('grpc.max_receive_message_length', -1),
+        ],
+    )
+    grpc.channel_ready_future(channel).result(timeout=timeout_sec)
+    return cls(
+        emulator_controller_pb2_grpc.EmulatorControllerStub(channel),
+        image_format=image_format,
+    )
+
+  def _get_screenshot(self, width: int = 0, height: int = 0) -> np.ndarray:
+    image = self._stub.getScreenshot(
+        emulator_controller_pb2.ImageFormat(
+            format=self._format, width=width, height=height
+        )
+    )
+    if self._format == emulator_controller_pb2.ImageFormat.ImgFormat.PNG:
+      pixels = cv2.imdecode(
+          np.frombuffer(image.image, dtype=np.uint8), cv2.IMREAD_COLOR
+      )
+      return cv2.cvtColor(pixels, cv2.COLOR_BGR2RGB)
+    if self._format == emulator_controller_pb2.ImageFormat.ImgFormat.RGB888:
+      channels = 3
+    else:
+      channels = 4
+    h, w = image.format.height, image.format.width
+    pixels = np.frombuffer(image.image, dtype=np.uint8, count=h * w * channels)
+    return pixels.reshape(h, w, channels)[:, :, :3]
+
+  def capture(self, options: CaptureOptions = FULL_FRAME) -> np.ndarray:
+    # The emulator can only downscale whole frames, to a size derived from the
+    # full size, which is learned from the first full capture.
+    if options.roi is None and options.scale != 1 and self._full_size:
+      width, height = scaled_size(*self._full_size, options.scale)
+      return self._get_screenshot(width, height)
+    pixels = self._get_screenshot()
+    self._full_size = (pixels.shape[1], pixels.shape[0])
+    return apply_options(pixels, options)
+
+
+def select_fastest(
+    backends: Sequence[CaptureBackend],
+    options: CaptureOptions = FULL_FRAME,
+    num_samples: int = 5,
+    clock: Callable[[], float] = time.perf_counter,
+) -> tuple[CaptureBackend, dict[str, float]]:
+  """Measures the backends and returns the fastest one.
+
+  Args:
+    backends: Candidate backends.
+    options: Options to capture with.
+    num_samples: Captures per backend, after one warm-up capture.
+    clock: Clock to time captures with; injectable for tests.
+
+  Returns:
+    The backend with the lowest median latency, and the median latency in
+    seconds of every backend that did not fail, keyed by name.
+
+  Raises:
+    RuntimeError: If every backend failed.
+  """
+  latencies = {}
+  fastest = None
+  for backend in backends:
+    try:
+      backend.capture(options)
+      timings = []
+      for _ in range(num_samples):
+        start = clock()
+        backend.capture(options)
+        timings.append(clock() - start)
+    except Exception:  # pylint: disable=broad-exception-caught
+      logging.exception('Screen capture backend %s failed.', backend.name)
+      continue
+    latencies[backend.name] = statistics.median(timings)
+    if fastest is None or latencies[backend.name] < latencies[fastest.name]:
+      fastest = backend
+  if fastest is None:
+    raise RuntimeError('All screen capture backends failed.')
+  return fastest, latencies
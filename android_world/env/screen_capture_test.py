@@ -0,0 +1,177 @@
+# Copyright 2025 The android_world Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import itertools
+import struct
+from unittest import mock
+
+from absl.testing import absltest
+from android_env.proto import adb_pb2
+from android_env.proto import emulator_controller_pb2
+from android_world.env import adb_utils
+from android_world.env import screen_capture
+import numpy as np
+
+
+def _frame(height: int = 8, width: int = 4) -> np.ndarray:
+  return np.arange(height * width * 3, dtype=np.uint8).reshape(height, width, 3)
+
+
+def _raw_screencap(
+    pixels: np.ndarray, pixel_format: int = 1, colorspace: bool = True
+) -> bytes:
+  height, width = pixels.shape[:2]
+  header = struct.pack('<3I', width, height, pixel_format)
+  if colorspace:
+    header += struct.pack('<I', 1)
+  alpha = np.full((height, width, 1), 255, dtype=np.uint8)
+  return header + np.concatenate([pixels, alpha], axis=2).tobytes()
+
+
+class _FakeBackend(screen_capture.CaptureBackend):
+
+  def __init__(self, name, fail=False):
+    self.name = name
+    self._fail = fail
+
+  def capture(self, options=screen_capture.FULL_FRAME):
+    if self._fail:
+      raise RuntimeError('Capture failed.')
+    return _frame()
+
+
+class CaptureOptionsTest(absltest.TestCase):
+
+  def test_invalid_options_raise(self):
+    with self.assertRaises(ValueError):
+      screen_capture.CaptureOptions(scale=0)
+    with self.assertRaises(ValueError):
+      screen_capture.CaptureOptions(roi=(10, 0, 5, 10))
+
+  def test_apply_options_crops_then_downscales(self):
+    pixels = _frame(height=8, width=4)
+
+    cropped = screen_capture.apply_options(
+        pixels, screen_capture.CaptureOptions(roi=(1, 2, 3, 6))
+    )
+    downscaled = screen_capture.apply_options(
+        pixels, screen_capture.CaptureOptions(roi=(0, 0, 4, 4), scale=0.5)
+    )
+
+    np.testing.assert_array_equal(cropped, pixels[2:6, 1:3])
+    self.assertEqual(downscaled.shape, (2, 2, 3))
+
+  def test_full_frame_is_unchanged(self):
+    pixels = _frame()
+
+    self.assertIs(
+        screen_capture.apply_options(pixels, screen_capture.FULL_FRAME), pixels
+    )
+
+
+class ParseRawScreencapTest(absltest.TestCase):
+
+  def test_parses_rgba(self):
+    pixels = _frame()
+
+    np.testing.assert_array_equal(
+        screen_capture.parse_raw_screencap(_raw_screencap(pixels)), pixels
+    )
+
+  def test_parses_header_without_colorspace(self):
+    pixels = _frame()
+
+    np.testing.assert_array_equal(
+        screen_capture.parse_raw_screencap(
+            _raw_screencap(pixels, colorspace=False)
+        ),
+        pixels,
+    )
+
+  def test_parses_bgra(self):
+    pixels = _frame()
+
+    np.testing.assert_array_equal(
+        screen_capture.parse_raw_screencap(
+            _raw_screencap(pixels[:, :, ::-1], pixel_format=5)
+        ),
+        pixels,
+    )
+
+  def test_truncated_output_raises(self):
+    with self.assertRaises(ValueError):
+      screen_capture.parse_raw_screencap(_raw_screencap(_frame())[:-10])
+
+
+class BackendsTest(absltest.TestCase):
+
+  @mock.patch.object(adb_utils, 'issue_generic_request')
+  def test_adb_screencap(self, mock_issue_generic_request):
+    pixels = _frame()
+    mock_issue_generic_request.return_value = adb_pb2.AdbResponse(
+        status=adb_pb2.AdbResponse.Status.OK,
+        generic=adb_pb2.AdbResponse.GenericResponse(
+            output=_raw_screencap(pixels)
+        ),
+    )
+    backend = screen_capture.AdbScreencapBackend(mock.MagicMock())
+
+    np.testing.assert_array_equal(backend.capture(), pixels)
+    self.assertEqual(
+        mock_issue_generic_request.call_args.args[0], 'exec-out screencap'
+    )
+
+  def test_emulator_grpc_downscales_on_emulator(self):
+    stub = mock.MagicMock()
+
+    def get_screenshot(image_format):
+      width = image_format.width or 4
+      height = image_format.height or 8
+      return emulator_controller_pb2.Image(
+          format=emulator_controller_pb2.ImageFormat(
+              format=image_format.format, width=width, height=height
+          ),
+          image=bytes(width * height * 3),
+      )
+
+    stub.getScreenshot.side_effect = get_screenshot
+    backend = screen_capture.EmulatorGrpcBackend(stub)
+    options = screen_capture.CaptureOptions(scale=0.5)
+
+    self.assertEqual(backend.capture(options).shape, (4, 2, 3))
+    self.assertEqual(backend.capture(options).shape, (4, 2, 3))
+    requested = stub.getScreenshot.call_args.args[0]
+    self.assertEqual((requested.width, requested.height), (2, 4))
+
+  def test_select_fastest(self):
+    slow = _FakeBackend('slow')
+    fast = _FakeBackend('fast')
+    broken = _FakeBackend('broken', fail=True)
+    # Each capture of `slow` takes 2 ticks, each capture of `fast` 1 tick.
+    ticks = itertools.chain([0, 2] * 3, [10, 11] * 3)
+
+    backend, latencies = screen_capture.select_fastest(
+        [slow, broken, fast], num_samples=3, clock=lambda: next(ticks)
+    )
+
+    self.assertIs(backend, fast)
+    self.assertEqual(latencies, {'slow': 2, 'fast': 1})
+
+  def test_select_fastest_all_failed_raises(self):
+    with self.assertRaises(RuntimeError):
+      screen_capture.select_fastest([_FakeBackend('broken', fail=True)])
+
+
+if __name__ == '__main__':
+  absltest.main()
@@ -0,0 +1,277 @@
+# Copyright 2025 The android_world Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Snapshots of the device settings, and minimal restores.
+
+A snapshot holds the system, secure and global settings, captured with one
+adb round trip. Restoring a snapshot captures the current settings, diffs
+them against the snapshot and writes back only the keys that drifted, in one
+more round trip:
+
+  baseline = settings_snapshot.capture(env)
+  ...  # Task changes wifi, brightness, ...
+  settings_snapshot.restore(baseline, env)
+
+Settings that mirror a service's state, such as `wifi_on`, are restored
+through that service, since writing the setting alone does not change it.
+Settings the system maintains itself, such as timestamps and the wifi state
+saved by airplane mode, are left alone; see DEFAULT_IGNORED.
+"""
+
+from collections.abc import Callable, Collection, Mapping
+import dataclasses
+import fnmatch
+import shlex
+from typing import Optional
+
+from absl import logging
+from android_env import env_interface
+from android_world.env import adb_utils
+
+NAMESPACES = ('system', 'secure', 'global')
+
+# (namespace, key) of a setting.
+SettingKey = tuple[str, str]
+
+# Settings that the system maintains itself, and are not compared by default:
+# counters, timestamps, estimates and state that services keep about
+# themselves. Restoring them would fight the service, and deleting ones that
+# appeared during a task would drop state the device relies on. Names may be
+# fnmatch patterns.
+DEFAULT_IGNORED: frozenset[SettingKey] = frozenset({
+    # Counters and timestamps.
+    ('global', 'boot_count'),
+    ('global', 'database_creation_buildid'),
+    ('global', 'network_watchlist_last_report_time'),
+    ('global', 'ntp_*'),
+    ('global', 'sys_*'),
+    ('secure', 'last_setup_shown'),
+    ('system', 'next_alarm_formatted'),
+    # Battery estimates.
+    ('global', 'average_time_to_discharge'),
+    ('global', 'battery_estimates_last_update_time'),
+    ('global', 'time_remaining_estimate_*'),
+    # Wifi and bluetooth bookkeeping, e.g. the state to return to after
+    # airplane mode; wifi_on and bluetooth_on themselves are restored.
+    ('global', 'wifi_saved_state'),
+    ('global', 'wifi_score_params'),
+    ('global', 'bluetooth_sanitized_exposure_notification_supported'),
+    ('secure', 'bluetooth_address'),
+    ('secure', 'bluetooth_addr_valid'),
+    ('secure', 'bluetooth_name'),
+    # Values written by the UI or system services as a side effect.
+    ('global', 'zen_duration'),
+    ('secure', 'theme_customization_overlay_packages'),
+    ('secure', 'zen_duration'),
+})
+
+_AIRPLANE_MODE = ('global', 'airplane_mode_on')
+
+# Settings that mirror the state of a service, and the command that changes
+# that state; formatted with `enable` or `disable`.
+_SERVICE_COMMANDS: Mapping[SettingKey, str] = {
+    ('global', 'wifi_on'): 'svc wifi {}',
+    ('global', 'bluetooth_on'): 'svc bluetooth {}',
+    _AIRPLANE_MODE: 'cmd connectivity airplane-mode {}',
+}
+
+# How `settings list` prints a setting without value.
+_NULL = 'null'
+
+
+@dataclasses.dataclass(frozen=True)
+class SettingsSnapshot:
+  """Values of the settings of a device.
+
+  Attributes:
+    values: Value of each setting. Settings without value are absent.
+  """
+
+  values: Mapping[SettingKey, str]
+
+  def get(self, namespace: str, key: str) -> Optional[str]:
+    return self.values.get((namespace, key))
+
+
+@dataclasses.dataclass(frozen=True)
+class SettingsDiff:
+  """Changes that turn the current settings back into a baseline.
+
+  Attributes:
+    put: Settings to write, with their baseline value.
+    delete: Settings that have no value in the baseline.
+  """
+
+  put: Mapping[SettingKey, str] = dataclasses.field(default_factory=dict)
+  delete: frozenset[SettingKey] = frozenset()
+
+  def __len__(self) -> int:
+    return len(self.put) + len(self.delete)
+
+  def __bool__(self) -> bool:
+    return bool(len(self))
+
+
+def parse_settings_list(output: str, namespace: str) -> dict[SettingKey, str]:
+  """Parses the output of `settings list <namespace>`.
+
+  Args:
+    output: The output.
+    namespace: The namespace that was listed.
+
+  Returns:
+    The value of each setting; lines without `=` continue the value of the
+    previous setting.
+  """
+  values = {}
+  last_key = None
+  for line in output.splitlines():
+    key, sep, value = line.partition('=')
+    if sep and key:
+      last_key = (namespace, key)
+      values[last_key] = value
+    elif last_key is not None:
+      values[last_key] += '\n' + line
+  return {key: value for key, value in values.items() if value != _NULL}
+
+
+def capture(env: env_interface.AndroidEnvInterface) -> SettingsSnapshot:
+  """Captures all settings namespaces in one adb round trip.
+
+  Args:
+    env: The environment.
+
+  Returns:
+    The snapshot.
+
+  Raises:
+    RuntimeError: If a namespace could not be listed.
+  """
+  commands = adb_utils.CommandBatch(env)
+  indices = {
+      namespace: commands.add(['settings', 'list', namespace])
+      for namespace in NAMESPACES
+  }
+  result = commands.run()
+  result.check_ok('Failed to list the device settings.')
+  values = {}
+  for namespace, index in indices.items():
+    values.update(
+        parse_settings_list(
+            result[index].output.decode('utf-8', errors='replace'), namespace
+        )
+    )
+  return SettingsSnapshot(values)
+
+
+def diff(
+    baseline: SettingsSnapshot,
+    current: SettingsSnapshot,
+    ignore: Collection[SettingKey] = DEFAULT_IGNORED,
+) -> SettingsDiff:
+  """Returns the changes that turn `current` back into `baseline`.
+
+  Args:
+    baseline: The settings to return to.
+    current: The settings now.
+    ignore: Settings that are not compared. Names may be fnmatch patterns.
+  """
+  ignored = _matcher(ignore)
+  put = {
+      key: value
+      for key, value in baseline.values.items()
+      if not ignored(key) and current.values.get(key) != value
+  }
+  delete = frozenset(
+      key
+      for key in current.values
+      if key not in baseline.values and not ignored(key)
+  )
+  return SettingsDiff(put, delete)
+
+
+def _matcher(ignore: Collection[SettingKey]) -> Callable[[SettingKey], bool]:
+  """Returns whether a setting matches one of `ignore`; see diff."""
+  patterns = [key for key in ignore if set(key[1]) & set('*?[')]
+  exact = set(ignore) - set(patterns)
+
+  def ignored(key: SettingKey) -> bool:
+    if key in exact:
+      return True
+    namespace, name = key
+    return any(
+        namespace == pattern_namespace and fnmatch.fnmatchcase(name, pattern)
+        for pattern_namespace, pattern in patterns
+    )
+
+  return ignored
+
+
+def _enabled(value: Optional[str]) -> bool:
+  return value not in (None, '', '0')
+
+
+def restore_commands(changes: SettingsDiff) -> list[str]:
+  """Returns the shell commands that apply `changes`."""
+  commands = []
+  for (namespace, key), value in sorted(changes.put.items()):
+    commands.append(
+        f'settings put {namespace} {shlex.quote(key)} {shlex.quote(value)}'
+    )
+  for namespace, key in sorted(changes.delete):
+    commands.append(f'settings delete {namespace} {shlex.quote(key)}')
+  # Services update their settings themselves, so they are changed last.
+  for setting, command in sorted(_SERVICE_COMMANDS.items()):
+    if setting in changes.put or setting in changes.delete:
+      enabled = _enabled(changes.put.get(setting))
+      commands.append(command.format('enable' if enabled else 'disable'))
+  return commands
+
+
+def restore(
+    baseline: SettingsSnapshot,
+    env: env_interface.AndroidEnvInterface,
+    current: Optional[SettingsSnapshot] = None,
+    ignore: Collection[SettingKey] = DEFAULT_IGNORED,
+) -> SettingsDiff:
+  """Restores the settings that drifted from `baseline`.
+
+  Costs one round trip to capture the current settings, unless `current` is
+  given, and one more to write the changed ones, if any.
+
+  Args:
+    baseline: The settings to return to.
+    env: The environment.
+    current: The current settings, if already captured.
+    ignore: Settings that are not restored.
+
+  Returns:
+    The changes that were applied.
+
+  Raises:
+    RuntimeError: If the settings could not be captured or written.
+  """
+  if current is None:
+    current = capture(env)
+  changes = diff(baseline, current, ignore)
+  if not changes:
+    return changes
+  logging.info('Restoring %d drifted settings.', len(changes))
+  commands = adb_utils.CommandBatch(env)
+  for command in restore_commands(changes):
+    commands.add(command)
+  commands.run().check_ok()
+  if _AIRPLANE_MODE in changes.put or _AIRPLANE_MODE in changes.delete:
+    adb_utils.note_connectivity_change(env)
+  return changes
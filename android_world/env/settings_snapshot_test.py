@@ -0,0 +1,196 @@
+# Copyright 2025 The android_world Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import subprocess
+import tempfile
+from unittest import mock
+
+from absl.testing import absltest
+from android_env import env_interface
+from android_env.proto import adb_pb2
+from android_world.env import settings_snapshot
+
+# Fake `settings`, `svc` and `cmd` commands, storing one file per setting.
+_FAKE_SETTINGS = r"""#!/bin/sh
+case $1 in
+  list)
+    for f in "$STORE/$2"/*; do
+      if [ -e "$f" ]; then
+        printf '%s=%s\n' "$(basename "$f")" "$(cat "$f")"
+      fi
+    done ;;
+  put) mkdir -p "$STORE/$2" && printf '%s' "$4" > "$STORE/$2/$3" ;;
+  delete) rm -f "$STORE/$2/$3" ;;
+esac
+"""
+_FAKE_SERVICE = """#!/bin/sh
+echo "$(basename "$0") $*" >> "$STORE/services.log"
+"""
+
+
+class SettingsSnapshotTest(absltest.TestCase):
+
+  def setUp(self):
+    super().setUp()
+    self.store = self.enter_context(tempfile.TemporaryDirectory())
+    bin_dir = os.path.join(self.store, 'bin')
+    os.mkdir(bin_dir)
+    for name, script in (
+        ('settings', _FAKE_SETTINGS),
+        ('svc', _FAKE_SERVICE),
+        ('cmd', _FAKE_SERVICE),
+    ):
+      path = os.path.join(bin_dir, name)
+      with open(path, 'w') as f:
+        f.write(script)
+      os.chmod(path, 0o755)
+    self.shell_env = dict(
+        os.environ,
+        STORE=self.store,
+        PATH=bin_dir + os.pathsep + os.environ['PATH'],
+    )
+    self.env = mock.create_autospec(env_interface.AndroidEnvInterface)
+    self.env.execute_adb_call.side_effect = self._run_locally
+
+  def _run_locally(self, request):
+    args = list(request.generic.args)
+    result = subprocess.run(
+        ['sh', '-c', ' '.join(args[1:])],
+        capture_output=True,
+        check=False,
+        env=self.shell_env,
+    )
+    return adb_pb2.AdbResponse(
+        status=adb_pb2.AdbResponse.Status.OK,
+        generic=adb_pb2.AdbResponse.GenericResponse(output=result.stdout),
+    )
+
+  def _put(self, namespace, key, value):
+    os.makedirs(os.path.join(self.store, namespace), exist_ok=True)
+    with open(os.path.join(self.store, namespace, key), 'w') as f:
+      f.write(value)
+
+  def _services_log(self):
+    path = os.path.join(self.store, 'services.log')
+    if not os.path.exists(path):
+      return []
+    with open(path) as f:
+      return f.read().splitlines()
+
+  def test_capture_lists_all_namespaces_in_one_round_trip(self):
+    self._put('system', 'screen_brightness', '102')
+    self._put('global', 'wifi_on', '1')
+
+    snapshot = settings_snapshot.capture(self.env)
+
+    self.assertEqual(
+        snapshot.values,
+        {
+            ('system', 'screen_brightness'): '102',
+            ('global', 'wifi_on'): '1',
+        },
+    )
+    self.env.execute_adb_call.assert_called_once()
+
+  def test_restore_writes_only_drifted_keys(self):
+    self._put('system', 'screen_brightness', '102')
+    self._put('system', 'font_scale', '1.0')
+    self._put('global', 'wifi_on', '1')
+    baseline = settings_snapshot.capture(self.env)
+    self._put('system', 'screen_brightness', '255')
+    self._put('global', 'wifi_on', '0')
+    self._put('secure', 'new_key', 'x')
+    self.env.execute_adb_call.reset_mock()
+
+    changes = settings_snapshot.restore(baseline, self.env)
+
+    self.assertEqual(
+        changes.put,
+        {('system', 'screen_brightness'): '102', ('global', 'wifi_on'): '1'},
+    )
+    self.assertEqual(changes.delete, {('secure', 'new_key')})
+    self.assertEqual(self.env.execute_adb_call.call_count, 2)
+    self.assertEqual(settings_snapshot.capture(self.env), baseline)
+    self.assertEqual(self._services_log(), ['svc wifi enable'])
+
+  def test_restore_keeps_system_managed_keys(self):
+    self._put('global', 'wifi_on', '1')
+    self._put('global', 'ntp_timeout', '5000')
+    baseline = settings_snapshot.capture(self.env)
+    # Toggling airplane mode makes the system save and update wifi state.
+    self._put('global', 'wifi_on', '0')
+    self._put('global', 'wifi_saved_state', '1')
+    self._put('global', 'ntp_timeout', '10000')
+    self._put('system', 'next_alarm_formatted', 'Mon 7:00 AM')
+
+    changes = settings_snapshot.restore(baseline, self.env)
+
+    self.assertEqual(changes.put, {('global', 'wifi_on'): '1'})
+    self.assertEmpty(changes.delete)
+    self.assertEqual(
+        settings_snapshot.capture(self.env).get('global', 'wifi_saved_state'),
+        '1',
+    )
+
+  def test_restore_without_drift_is_one_round_trip(self):
+    self._put('system', 'screen_brightness', '102')
+    baseline = settings_snapshot.capture(self.env)
+    self.env.execute_adb_call.reset_mock()
+
+    changes = settings_snapshot.restore(baseline, self.env)
+
+    self.assertFalse(changes)
+    self.env.execute_adb_call.assert_called_once()
+
+  def test_parse_settings_list(self):
+    output = 'a=1\nb=null\nc=first\nsecond\nd=x=y\n'
+
+    self.assertEqual(
+        settings_snapshot.parse_settings_list(output, 'secure'),
+        {
+            ('secure', 'a'): '1',
+            ('secure', 'c'): 'first\nsecond',
+            ('secure', 'd'): 'x=y',
+        },
+    )
+
+  def test_diff_skips_ignored_keys(self):
+    baseline = settings_snapshot.SettingsSnapshot(
+        {('global', 'boot_count'): '1'}
+    )
+    current = settings_snapshot.SettingsSnapshot(
+        {('global', 'boot_count'): '2'}
+    )
+
+    self.assertFalse(settings_snapshot.diff(baseline, current))
+
+  def test_restore_commands_quote_values(self):
+    changes = settings_snapshot.SettingsDiff(
+        put={('secure', 'name'): "it's mine"},
+        delete=frozenset({('global', 'airplane_mode_on')}),
+    )
+
+    self.assertEqual(
+        settings_snapshot.restore_commands(changes),
+        [
+            "settings put secure name 'it'\"'\"'s mine'",
+            'settings delete global airplane_mode_on',
+            'cmd connectivity airplane-mode disable',
+        ],
+    )
+
+
+if __name__ == '__main__':
+  absltest.main()
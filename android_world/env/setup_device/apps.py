@@ -105,18 +105,15 @@ class AppSetup(abc.ABC):
       device_path: Location on device to load the files.
       env: Android environment.
     """
-    for file in files:
-      copy_to_device = lambda path: adb_utils.check_ok(
-          file_utils.copy_data_to_device(
-              path,
-              device_path,
-              env.controller,
-          ),
-          f"Failed to copy {device_path} to device.",
-      )
-
-      full_path = download_app_data(file)
-      copy_to_device(full_path)
+    # All files are pushed as one archive, and unpacked in one adb call.
+    adb_utils.check_ok(
+        file_utils.push_files(
+            [download_app_data(file) for file in files],
+            device_path,
+            env.controller,
+        ),
+        f"Failed to copy {device_path} to device.",
+    )
 
 
 class CameraApp(AppSetup):
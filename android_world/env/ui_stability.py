@@ -0,0 +1,212 @@
+# Copyright 2025 The android_world Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Detects when the UI has stopped changing.
+
+The UI is sampled repeatedly and considered stable once a number of consecutive
+samples match. Samples are cheap fingerprints: a structural hash of the a11y
+forest (see representation_utils.forest_fingerprint) and, optionally, a
+perceptual hash of a downsampled screenshot. Sampling starts fast and backs off,
+so static screens are detected quickly without hammering the device while the
+UI is animating.
+"""
+
+import dataclasses
+import time
+from typing import Callable, Generic, Iterator, Optional, TypeVar
+
+import cv2
+import numpy as np
+
+T = TypeVar('T')
+
+
+@dataclasses.dataclass(frozen=True)
+class PollingSchedule:
+  """Intervals between samples, growing geometrically.
+
+  Attributes:
+    initial_interval: Seconds to wait before the second sample.
+    max_interval: Upper bound for the interval between samples.
+    backoff: Factor the interval is multiplied by after every sample.
+  """
+
+  initial_interval: float = 0.05
+  max_interval: float = 0.5
+  backoff: float = 2.0
+
+  def __post_init__(self):
+    if self.initial_interval < 0 or self.max_interval < self.initial_interval:
+      raise ValueError(
+          'Intervals must satisfy 0 <= initial_interval <= max_interval.'
+      )
+    if self.backoff < 1:
+      raise ValueError('Backoff must be at least 1.')
+
+  @classmethod
+  def fixed(cls, interval: float) -> 'PollingSchedule':
+    """Returns a schedule that always waits `interval` seconds."""
+    return cls(initial_interval=interval, max_interval=interval, backoff=1.0)
+
+  def intervals(self) -> Iterator[float]:
+    interval = self.initial_interval
+    while True:
+      yield interval
+      interval = min(interval * self.backoff, self.max_interval)
+
+
+@dataclasses.dataclass(frozen=True)
+class Fingerprint:
+  """A cheap summary of what is on screen.
+
+  Attributes:
+    ui: Structural hash of the UI elements.
+    pixels: Perceptual hash of the screenshot, if pixels are being compared.
+  """
+
+  ui: int
+  pixels: Optional[int] = None
+
+  def matches(self, other: 'Fingerprint', max_pixel_distance: int = 0) -> bool:
+    """Returns whether both fingerprints describe the same screen.
+
+    Args:
+      other: The fingerprint to compare against.
+      max_pixel_distance: Maximum number of differing perceptual hash bits for
+        the screenshots to still be considered the same.
+    """
+    if self.ui != other.ui:
+      return False
+    if self.pixels is None or other.pixels is None:
+      return True
+    return hamming_distance(self.pixels, other.pixels) <= max_pixel_distance
+
+
+@dataclasses.dataclass(frozen=True)
+class StabilityResult(Generic[T]):
+  """Outcome of waiting for the UI to stabilize.
+
+  Attributes:
+    sample: The last sample taken.
+    is_stable: Whether stability was reached before the timeout.
+    elapsed_sec: Time spent waiting.
+    num_polls: Number of samples taken.
+  """
+
+  sample: T
+  is_stable: bool
+  elapsed_sec: float
+  num_polls: int
+
+
+def perceptual_hash(pixels: np.ndarray, hash_size: int = 16) -> int:
+  """Returns an average hash of a screenshot.
+
+  The screenshot is reduced to a `hash_size` x `hash_size` grayscale thumbnail
+  and each bit records whether a cell is brighter than the mean. Small changes,
+  e.g. from compression or a blinking cursor, flip few bits, which makes the
+  hash suitable for Hamming distance comparisons.
+
+  Args:
+    pixels: RGB or grayscale screenshot.
+    hash_size: Side length of the thumbnail; the hash has hash_size**2 bits.
+
+  Returns:
+    The hash as an integer.
+  """
+  # Subsample before resizing; full-resolution area interpolation is the
+  # dominant cost otherwise.
+  step = max(1, min(pixels.shape[:2]) // (hash_size * 4))
+  thumbnail = np.asarray(pixels[::step, ::step], dtype=np.float32)
+  if thumbnail.ndim == 3:
+    thumbnail = thumbnail.mean(axis=2)
+  thumbnail = cv2.resize(
+      thumbnail, (hash_size, hash_size), interpolation=cv2.INTER_AREA
+  )
+  bits = np.packbits(thumbnail > thumbnail.mean())
+  return int.from_bytes(bits.tobytes(), 'big')
+
+
+def hamming_distance(a: int, b: int) -> int:
+  return (a ^ b).bit_count()
+
+
+def wait_until_stable(
+    sample: Callable[[], T],
+    matches: Callable[[T, T], bool],
+    stability_threshold: int = 3,
+    timeout: float = 6.0,
+    schedule: PollingSchedule = PollingSchedule(),
+    prior: Optional[T] = None,
+    min_stable_sec: float = 0.0,
+    clock: Callable[[], float] = time.monotonic,
+    sleep: Callable[[float], None] = time.sleep,
+) -> StabilityResult[T]:
+  """Samples until `stability_threshold` consecutive samples match.
+
+  Args:
+    sample: Takes a sample of the UI.
+    matches: Returns whether two samples describe the same UI.
+    stability_threshold: Number of consecutive matching samples, including
+      `prior`, required to consider the UI stable.
+    timeout: Maximum time in seconds to wait before giving up.
+    schedule: Intervals between samples.
+    prior: A previous sample, e.g. from the last observation. It counts towards
+      the threshold if the first new sample matches it.
+    min_stable_sec: Minimum time between the first and the last of the
+      matching samples. After an action, this leaves its effect time to show
+      up before an unchanged screen is taken as stable.
+    clock: Monotonic clock; injectable for tests.
+    sleep: Sleep function; injectable for tests.
+
+  Returns:
+    The last sample and whether stability was reached.
+
+  Raises:
+    ValueError: If stability_threshold is not positive.
+  """
+  if stability_threshold <= 0:
+    raise ValueError('Stability threshold must be a positive integer.')
+
+  start = clock()
+  deadline = start + timeout
+  intervals = schedule.intervals()
+  last = prior
+  stable_checks = 1 if prior is not None else 0
+  stable_since = start
+  num_polls = 0
+
+  while True:
+    poll_start = clock()
+    current = sample()
+    num_polls += 1
+    if last is not None and matches(last, current):
+      stable_checks += 1
+    else:
+      stable_checks = 1
+      stable_since = poll_start
+    last = current
+
+    if (
+        stable_checks >= stability_threshold
+        and poll_start - stable_since >= min_stable_sec
+    ):
+      return StabilityResult(current, True, clock() - start, num_polls)
+
+    sleep_time = next(intervals) - (clock() - poll_start)
+    remaining = deadline - clock()
+    if remaining <= 0:
+      return StabilityResult(current, False, clock() - start, num_polls)
+    if sleep_time > 0:
+      sleep(min(sleep_time, remaining))
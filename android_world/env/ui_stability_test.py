@@ -0,0 +1,184 @@
+# Copyright 2025 The android_world Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import itertools
+
+from absl.testing import absltest
+from android_world.env import ui_stability
+import numpy as np
+
+
+class FakeClock:
+  """A clock that only advances when sleeping."""
+
+  def __init__(self):
+    self.now = 0.0
+    self.sleeps = []
+
+  def __call__(self) -> float:
+    return self.now
+
+  def sleep(self, seconds: float) -> None:
+    self.sleeps.append(seconds)
+    self.now += seconds
+
+
+def _wait(samples, clock, **kwargs):
+  return ui_stability.wait_until_stable(
+      iter(samples).__next__,
+      lambda a, b: a == b,
+      clock=clock,
+      sleep=clock.sleep,
+      **kwargs,
+  )
+
+
+class PollingScheduleTest(absltest.TestCase):
+
+  def test_intervals_back_off_to_max(self):
+    schedule = ui_stability.PollingSchedule(
+        initial_interval=0.1, max_interval=0.5, backoff=2.0
+    )
+
+    self.assertEqual(
+        list(itertools.islice(schedule.intervals(), 5)),
+        [0.1, 0.2, 0.4, 0.5, 0.5],
+    )
+
+  def test_fixed(self):
+    schedule = ui_stability.PollingSchedule.fixed(0.3)
+
+    self.assertEqual(
+        list(itertools.islice(schedule.intervals(), 3)), [0.3, 0.3, 0.3]
+    )
+
+  def test_invalid_schedule_raises(self):
+    with self.assertRaises(ValueError):
+      ui_stability.PollingSchedule(initial_interval=1.0, max_interval=0.5)
+    with self.assertRaises(ValueError):
+      ui_stability.PollingSchedule(backoff=0.5)
+
+
+class WaitUntilStableTest(absltest.TestCase):
+
+  def test_stable(self):
+    clock = FakeClock()
+
+    result = _wait(
+        [1, 1, 1, 1],
+        clock,
+        schedule=ui_stability.PollingSchedule(
+            initial_interval=0.1, max_interval=1.0
+        ),
+    )
+
+    self.assertTrue(result.is_stable)
+    self.assertEqual(result.num_polls, 3)
+    self.assertEqual(clock.sleeps, [0.1, 0.2])
+    self.assertAlmostEqual(result.elapsed_sec, 0.3)
+
+  def test_resets_on_change(self):
+    result = _wait([1, 1, 2, 2, 2], FakeClock())
+
+    self.assertTrue(result.is_stable)
+    self.assertEqual(result.sample, 2)
+    self.assertEqual(result.num_polls, 5)
+
+  def test_prior_counts_towards_threshold(self):
+    result = _wait([1, 1], FakeClock(), prior=1)
+
+    self.assertTrue(result.is_stable)
+    self.assertEqual(result.num_polls, 2)
+
+  def test_prior_ignored_when_changed(self):
+    result = _wait([2, 2, 2], FakeClock(), prior=1)
+
+    self.assertTrue(result.is_stable)
+    self.assertEqual(result.num_polls, 3)
+
+  def test_min_stable_sec_waits_for_late_change(self):
+    clock = FakeClock()
+
+    def sample():
+      return 1 if clock.now < 0.2 else 2
+
+    result = ui_stability.wait_until_stable(
+        sample,
+        lambda a, b: a == b,
+        min_stable_sec=0.5,
+        clock=clock,
+        sleep=clock.sleep,
+    )
+
+    self.assertTrue(result.is_stable)
+    self.assertEqual(result.sample, 2)
+    self.assertGreaterEqual(result.elapsed_sec, 0.7)
+
+  def test_timeout(self):
+    clock = FakeClock()
+
+    result = _wait(
+        itertools.count(),
+        clock,
+        timeout=1.0,
+        schedule=ui_stability.PollingSchedule.fixed(0.25),
+    )
+
+    self.assertFalse(result.is_stable)
+    self.assertEqual(result.num_polls, 5)
+    self.assertEqual(result.sample, 4)
+    self.assertAlmostEqual(result.elapsed_sec, 1.0)
+
+  def test_invalid_threshold_raises(self):
+    with self.assertRaises(ValueError):
+      _wait([1], FakeClock(), stability_threshold=0)
+
+
+class FingerprintTest(absltest.TestCase):
+
+  def test_matches_compares_ui(self):
+    self.assertTrue(
+        ui_stability.Fingerprint(ui=1).matches(ui_stability.Fingerprint(ui=1))
+    )
+    self.assertFalse(
+        ui_stability.Fingerprint(ui=1).matches(ui_stability.Fingerprint(ui=2))
+    )
+
+  def test_matches_tolerates_pixel_distance(self):
+    a = ui_stability.Fingerprint(ui=1, pixels=0b1100)
+    b = ui_stability.Fingerprint(ui=1, pixels=0b1000)
+
+    self.assertFalse(a.matches(b))
+    self.assertTrue(a.matches(b, max_pixel_distance=1))
+
+  def test_perceptual_hash(self):
+    pixels = np.zeros((128, 64, 3), dtype=np.uint8)
+    pixels[:64] = 255
+    noisy = pixels.copy()
+    noisy[0, 0] = 128
+    flipped = pixels[::-1]
+
+    phash = ui_stability.perceptual_hash(pixels)
+
+    self.assertEqual(phash, ui_stability.perceptual_hash(noisy))
+    self.assertEqual(
+        ui_stability.hamming_distance(
+            phash, ui_stability.perceptual_hash(flipped)
+        ),
+        256,
+    )
+
+
+if __name__ == '__main__':
+  absltest.main()
@@ -18,6 +18,7 @@ import dataclasses
 from typing import Any, Callable, Optional
 from android_world import constants
 from android_world.agents import base_agent
+from android_world.env import action_waits
 from android_world.env import interface
 import termcolor
 
@@ -75,6 +76,22 @@ def run_episode(
 
   agent.reset(start_on_home_screen)
   agent.set_max_steps(max_n_steps)
+  wait_stats = action_waits.stats_for(
+      getattr(agent.env, 'controller', None)
+  )
+  if wait_stats is not None:
+    wait_stats.reset()
+
+  def episode_result(done: bool) -> EpisodeResult:
+    aux_data = None
+    if wait_stats is not None:
+      # Idle time spent waiting for the effects of actions, per action type.
+      aux_data = {'wait_stats': wait_stats.as_dict()}
+    return EpisodeResult(
+        done=done,
+        step_data=_transpose_lod_to_dol(output),
+        aux_data=aux_data,
+    )
 
   output = []
   for step_n in range(max_n_steps):
@@ -84,25 +101,17 @@ def run_episode(
     output.append(result.data | {constants.STEP_NUMBER: step_n})
     if termination_fn(agent.env):
       print_fn('Environment ends episode.')
-      return EpisodeResult(
-          done=True,
-          step_data=_transpose_lod_to_dol(output),
-      )
+      return episode_result(True)
     elif result.done:
       print_fn('Agent indicates task is done.')
-      return EpisodeResult(
-          done=result.done,
-          step_data=_transpose_lod_to_dol(output),
-      )
+      return episode_result(result.done)
   print_fn(
       termcolor.colored(
           'Agent did not indicate task is done. Reached max number of steps.',
           'red',
       )
   )
-  return EpisodeResult(
-      done=result.done, step_data=_transpose_lod_to_dol(output)  # pylint: disable=undefined-variable
-  )
+  return episode_result(result.done)  # pylint: disable=undefined-variable
 
 
 def _transpose_lod_to_dol(data: list[dict[str, Any]]) -> dict[str, list[Any]]:
@@ -29,6 +29,7 @@ from android_world import checkpointer as checkpointer_lib
 from android_world import constants
 from android_world import episode_runner
 from android_world.agents import base_agent
+from android_world.env import adb_telemetry
 from android_world.env import adb_utils
 from android_world.env import interface
 from android_world.task_evals import task_eval
@@ -241,11 +242,22 @@ def _run_task(
     ValueError: If step data was not as expected.
   """
   start = time.time()
+  controller = getattr(env, 'controller', None)
+  telemetry = adb_telemetry.telemetry_for(controller)
+  if telemetry is not None:
+    telemetry.reset()
+
+  def phase(name: str):
+    return adb_telemetry.labels(controller, task=task.name, phase=name)
+
   try:
-    task.initialize_task(env)
+    with phase('initialize_task'):
+      task.initialize_task(env)
     _log_and_print('Running task %s with goal "%s"', task.name, task.goal)
-    interaction_results = run_episode(task)
-    task_successful = task.is_successful(env)
+    with phase('episode'):
+      interaction_results = run_episode(task)
+    with phase('is_successful'):
+      task_successful = task.is_successful(env)
   except Exception as e:  # pylint: disable=broad-exception-caught
     _log_and_print('%s\nSKIPPING %s.', '~' * 80, task.name)
     logging.exception(
@@ -254,9 +266,12 @@ def _run_task(
         e,
     )
     traceback.print_exc()
-    return _create_failed_result(
+    result = _create_failed_result(
         task.name, task.goal, traceback.format_exc(), time.time() - start
     )
+    if telemetry is not None:
+      result[constants.EpisodeConstants.ADB_TELEMETRY] = telemetry.as_dict()
+    return result
   else:
     agent_successful = task_successful if interaction_results.done else 0.0
     _log_and_print(
@@ -285,7 +300,11 @@ def _run_task(
             constants.EpisodeConstants.SEED
         ],
     }
-    task.tear_down(env)
+    with phase('tear_down'):
+      task.tear_down(env)
+    if telemetry is not None:
+      # Includes tear_down, which comes after the other results.
+      result[constants.EpisodeConstants.ADB_TELEMETRY] = telemetry.as_dict()
     return result
 
 
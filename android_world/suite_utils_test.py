@@ -20,12 +20,14 @@ from typing import Any
 from unittest import mock
 from absl.testing import absltest
 from absl.testing import parameterized
+from android_env.proto import adb_pb2
 from android_world import checkpointer
 from android_world import constants
 from android_world import episode_runner
 from android_world import registry
 from android_world import suite_utils
 from android_world.agents import base_agent
+from android_world.env import adb_telemetry
 from android_world.env import adb_utils
 from android_world.env import interface
 from android_world.utils import test_utils
@@ -323,6 +325,33 @@ class SuiteUtilsTest(parameterized.TestCase):
     )
     self.assertIsNotNone(result[constants.EpisodeConstants.EXCEPTION_INFO])
 
+  def test_run_task_exports_adb_telemetry_per_phase(self):
+    env = mock.MagicMock()
+    telemetry = adb_telemetry.AdbTelemetry()
+    env.controller.adb_telemetry = telemetry
+    request = adb_pb2.AdbRequest(
+        generic=adb_pb2.AdbRequest.GenericRequest(args=['shell', 'true'])
+    )
+    response = adb_pb2.AdbResponse(status=adb_pb2.AdbResponse.Status.OK)
+    task = test_utils.FakeAdbEval(
+        test_utils.FakeAdbEval.generate_random_params()
+    )
+    task.initialize_task = lambda env: telemetry.record(request, response, 0.1)
+    task.tear_down = lambda env: telemetry.record(request, response, 0.2)
+    mock_run_e2e = mock.MagicMock()
+    mock_run_e2e.return_value = episode_runner.EpisodeResult(
+        done=True,
+        step_data={'step_number': [0]},
+    )
+
+    result = suite_utils._run_task(task, mock_run_e2e, env, demo_mode=False)
+
+    phases = result[constants.EpisodeConstants.ADB_TELEMETRY]['by_task'][
+        task.name
+    ]
+    self.assertCountEqual(phases, ['initialize_task', 'tear_down'])
+    self.assertEqual(phases['tear_down']['shell true']['calls'], 1)
+
   @mock.patch.object(interface, 'AsyncAndroidEnv')
   def test_run_adb_task_instances_is_successful_fails(self, mock_env):
     mock_run_e2e = mock.MagicMock()
@@ -14,29 +14,38 @@
 
 """Logic for validating an SMS has been sent."""
 
+from collections.abc import Mapping
 import random
 import time
+from typing import Any, Optional
 
 from absl import logging
 from android_env import env_interface
-from android_env.proto import adb_pb2
 from android_world.env import adb_utils
+from android_world.env import content_provider
 from android_world.env import interface
 from android_world.task_evals import task_eval
 from android_world.task_evals.utils import user_data_generation
 from android_world.utils import fuzzy_match_lib
 
+# Columns of the sms table read by the validators.
+_MESSAGE_COLUMNS = ("_id", "address", "body", "date")
 
-def parse_message(row: str) -> dict[str, str]:
+# Window in which a sent message counts, for `was_sent`.
+_SENT_WINDOW_MINS = 5
+
+
+def parse_message(row: str | Mapping[str, Any]) -> dict[str, Any]:
   """Parse a string representing a row of message data into a dictionary.
 
   The row should contain multiple key-value pairs separated by commas and an
   equal sign. The function specifically accounts for the 'body' field, which can
-  contain commas, by handling it separately from other fields.
+  contain commas, by handling it separately from other fields. Rows already
+  parsed by `content_provider.query` are returned as a dict.
 
   Args:
     row (str): A string containing the row data, with key-value pairs separated
-      by ",".
+      by ",", or an already parsed row.
 
   Returns:
     A dictionary where the keys are the field names and the values are the
@@ -47,6 +56,8 @@ def parse_message(row: str) -> dict[str, str]:
   {'Row': '0', '_id': '5', 'thread_id': '5', 'body': 'Hello, World', 'read':
   '1'}
   """
+  if isinstance(row, Mapping):
+    return dict(row)
   parsed_dict = {}
 
   row = row.strip()
@@ -75,27 +86,12 @@ def parse_message(row: str) -> dict[str, str]:
   return parsed_dict
 
 
-def _decode_messages_from_response(response: adb_pb2.AdbResponse) -> list[str]:
-  """Decodes the ADB response into a list of messages."""
-  if (
-      response.generic.output.decode()
-      .replace("\r", "")
-      .startswith("No result found.")
-  ):
-    return []
-  messages = response.generic.output.split(b"\nRow:")
-  for i, m in enumerate(messages):
-    if i > 0:
-      messages[i] = b"Row:" + m
-  return [m.decode() for m in messages]
-
-
 def was_sent(
-    messages: list[str],
+    messages: list[str | Mapping[str, Any]],
     phone_number: str,
     body: str,
     current_time_ms: int,
-    time_mins: int = 5,
+    time_mins: int = _SENT_WINDOW_MINS,
 ) -> bool:
   """Checks if a message was sent within the last time_mins minutes.
 
@@ -111,7 +107,7 @@ def was_sent(
 
   Args:
     messages: A list of message records returned by ADB shell content query,
-      each as a string.
+      each as a string or as a row parsed by `content_provider.query`.
     phone_number: The target phone number or address to check the message
       against.
     body: The message body text to check for.
@@ -152,7 +148,9 @@ def was_sent(
   return False
 
 
-def sms_are_equal(message1: str, message2: str) -> bool:
+def sms_are_equal(
+    message1: str | Mapping[str, Any], message2: str | Mapping[str, Any]
+) -> bool:
   """Checks if two messages are equal.
 
   A message is equal to another if its address and body fields are equal.
@@ -180,6 +178,26 @@ def clear_sms_and_threads(env: env_interface.AndroidEnvInterface) -> None:
   adb_utils.execute_sql_command(db_path, "DELETE FROM threads;", env)
 
 
+def _query_messages(
+    uri: str,
+    env: env_interface.AndroidEnvInterface,
+    since_ms: Optional[int] = None,
+) -> list[dict[str, Optional[str]]]:
+  """Reads the messages of an sms table, most recent first."""
+  return content_provider.query(
+      env,
+      uri,
+      columns=_MESSAGE_COLUMNS,
+      where=None if since_ms is None else f"date >= {since_ms}",
+      sort="date DESC",
+  )
+
+
+def _window_start_ms(current_time_ms: int) -> int:
+  """Returns the start of the window checked by `was_sent`."""
+  return current_time_ms - _SENT_WINDOW_MINS * 60 * 1000
+
+
 class SimpleSMSSendSms(task_eval.TaskEval):
   """Task for checking that a single text message has been sent to a specific number with a specific message.
 
@@ -209,20 +227,23 @@ class SimpleSMSSendSms(task_eval.TaskEval):
   messages = user_data_generation.RANDOM_SENTENCES
 
   def get_sent_messages(
-      self, env: env_interface.AndroidEnvInterface
-  ) -> list[str]:
-    response = adb_utils.issue_generic_request(
-        "shell content query --uri content://sms/sent".split(), env
-    )
-    return _decode_messages_from_response(response)
+      self,
+      env: env_interface.AndroidEnvInterface,
+      since_ms: Optional[int] = None,
+  ) -> list[dict[str, Optional[str]]]:
+    """Returns the sent messages, most recent first.
+
+    Args:
+      env: The environment.
+      since_ms: If set, only messages sent at or after this device time are
+        read from the device.
+    """
+    return _query_messages("content://sms/sent", env, since_ms)
 
   def _get_received_messages(
       self, env: env_interface.AndroidEnvInterface
-  ) -> list[str]:
-    response = adb_utils.issue_generic_request(
-        "shell content query --uri content://sms/inbox".split(), env
-    )
-    return _decode_messages_from_response(response)
+  ) -> list[dict[str, Optional[str]]]:
+    return _query_messages("content://sms/inbox", env)
 
   # Returns the time on the android env in milliseconds.
   def get_android_time(self, env: env_interface.AndroidEnvInterface) -> int:
@@ -237,7 +258,9 @@ class SimpleSMSSendSms(task_eval.TaskEval):
     clear_sms_and_threads(env.controller)
     android_time = self.get_android_time(env.controller)
 
-    messages = self.get_sent_messages(env.controller)
+    messages = self.get_sent_messages(
+        env.controller, since_ms=_window_start_ms(android_time)
+    )
     time.sleep(5)
     logging.info("During initialize_task, messages: %s", messages)
     if was_sent(
@@ -254,14 +277,17 @@ class SimpleSMSSendSms(task_eval.TaskEval):
 
   def is_successful(self, env: interface.AsyncEnv) -> float:
     super().is_successful(env)
-    messages = self.get_sent_messages(env.controller)
+    android_time = self.get_android_time(env.controller)
+    messages = self.get_sent_messages(
+        env.controller, since_ms=_window_start_ms(android_time)
+    )
     time.sleep(5)
     logging.info("During is_successful, messages: %s", messages)
     sms_was_sent = was_sent(
         messages,
         phone_number=self.params["number"],
         body=self.params["message"],
-        current_time_ms=self.get_android_time(env.controller),
+        current_time_ms=android_time,
     )
     in_correct_app = (
         adb_utils.extract_package_name(
@@ -33,6 +33,11 @@ class TestSmsAreEqual(absltest.TestCase):
     ]
     self.assertTrue(sms_validators.sms_are_equal(messages[0], messages[1]))
 
+  def test_sms_are_equal_with_parsed_rows(self):
+    message = 'Row: 0 _id=1, address=111-1, body=Hi, friend, date=1'
+    row = {'_id': '2', 'address': '1111', 'body': 'Hi, friend', 'date': '2'}
+    self.assertTrue(sms_validators.sms_are_equal(message, row))
+
   def test_address_are_not_equal(self):
     four_minutes_ago = int(time.time() * 1000) - 4 * 60 * 1000
     messages = [
@@ -124,20 +129,24 @@ class TestMessagesSendTextMessage(test_utils.AdbEvalTestBase):
 
     # Make stale message.
     one_day_s = 24 * 60 * 60
-    mock_response_sms0 = adb_pb2.AdbResponse()
+    mock_response_sms0 = adb_pb2.AdbResponse(
+        status=adb_pb2.AdbResponse.Status.OK
+    )
     date0_ms = str(int((time.time() - one_day_s) * 1000))
     mock_response_sms0.generic.output = (
-        'Row: 0, address=1234567890, body=Hello World, service_center=NULL,'
+        'Row: 0 _id=1, address=1234567890, body=Hello World,'
         ' date={}'.format(
             date0_ms
         ).encode()
     )
 
     # Successful message.
-    mock_response_sms1 = adb_pb2.AdbResponse()
+    mock_response_sms1 = adb_pb2.AdbResponse(
+        status=adb_pb2.AdbResponse.Status.OK
+    )
     date1_ms = str(int(time.time() * 1000))
     mock_response_sms1.generic.output = (
-        'Row: 0, address=1234567890, body=Hello World, service_center=NULL,'
+        'Row: 0 _id=1, address=1234567890, body=Hello World,'
         ' date={}'.format(
             date1_ms
         ).encode()
@@ -146,8 +155,8 @@ class TestMessagesSendTextMessage(test_utils.AdbEvalTestBase):
     self.mock_issue_generic_request.side_effect = [
         mock_response_time,
         mock_response_sms0,
-        mock_response_sms1,
         mock_response_time,
+        mock_response_sms1,
     ]
     test_utils.log_mock_calls(self.mock_issue_generic_request)
 
@@ -157,6 +166,16 @@ class TestMessagesSendTextMessage(test_utils.AdbEvalTestBase):
     task = sms_validators.SimpleSMSSendSms(params)
     self.assertEqual(test_utils.perform_task(task, env), 1)
 
+    # Only messages of the last five minutes are read from the device.
+    (query_args, _), _ = self.mock_issue_generic_request.call_args
+    window_start_ms = int(mock_response_time.generic.output) * 1000 - 300_000
+    self.assertEqual(
+        query_args[1],
+        'content query --uri content://sms/sent'
+        ' --projection _id:address:body:date'
+        f" --where 'date >= {window_start_ms}' --sort 'date DESC'",
+    )
+
     # Clear sms and threads tables.
     self.assertEqual(self.mock_execute_sql_command.call_count, 2)
 
@@ -169,20 +188,24 @@ class TestMessagesSendTextMessage(test_utils.AdbEvalTestBase):
 
     # Make stale message.
     one_s = 1
-    mock_response_sms0 = adb_pb2.AdbResponse()
+    mock_response_sms0 = adb_pb2.AdbResponse(
+        status=adb_pb2.AdbResponse.Status.OK
+    )
     date0_ms = str(int((time.time() - one_s) * 1000))
     mock_response_sms0.generic.output = (
-        'Row: 0, address=1234567890, body=Hello World, service_center=NULL,'
+        'Row: 0 _id=1, address=1234567890, body=Hello World,'
         ' date={}'.format(
             date0_ms
         ).encode()
     )
 
     # Successful message.
-    mock_response_sms1 = adb_pb2.AdbResponse()
+    mock_response_sms1 = adb_pb2.AdbResponse(
+        status=adb_pb2.AdbResponse.Status.OK
+    )
     date1_ms = str(int(time.time() * 1000))
     mock_response_sms1.generic.output = (
-        'Row: 0, address=1234567890, body=Hello World, service_center=NULL,'
+        'Row: 0 _id=1, address=1234567890, body=Hello World,'
         ' date={}'.format(
             date1_ms
         ).encode()
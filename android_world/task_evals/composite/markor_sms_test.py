@@ -55,20 +55,24 @@ class TestMarkorCreateNoteAndSms(test_utils.AdbEvalTestBase):
 
     # Make stale message.
     one_day_s = 24 * 60 * 60
-    mock_response_sms0 = adb_pb2.AdbResponse()
+    mock_response_sms0 = adb_pb2.AdbResponse(
+        status=adb_pb2.AdbResponse.Status.OK
+    )
     date0_ms = str(int((time.time() - one_day_s) * 1000))
     mock_response_sms0.generic.output = (
-        'Row: 0, address=1234567890, body=Hello World, service_center=NULL,'
+        'Row: 0 _id=1, address=1234567890, body=Hello World,'
         ' date={}'.format(
             date0_ms
         ).encode()
     )
 
     # Successful message.
-    mock_response_sms1 = adb_pb2.AdbResponse()
+    mock_response_sms1 = adb_pb2.AdbResponse(
+        status=adb_pb2.AdbResponse.Status.OK
+    )
     date1_ms = str(int(time.time() * 1000))
     mock_response_sms1.generic.output = (
-        'Row: 0, address=1234567890, body=Hello World, service_center=NULL,'
+        'Row: 0 _id=1, address=1234567890, body=Hello World,'
         ' date={}'.format(
             date1_ms
         ).encode()
@@ -78,8 +82,8 @@ class TestMarkorCreateNoteAndSms(test_utils.AdbEvalTestBase):
         mock_response_time,
         mock_response_sms0,
         mock_response_cat,
-        mock_response_sms1,
         mock_response_time,
+        mock_response_sms1,
     ]
     test_utils.log_mock_calls(self.mock_issue_generic_request)
 
@@ -115,17 +119,21 @@ class TestMarkorCreateNoteAndSms(test_utils.AdbEvalTestBase):
 
     # Make stale message.
     one_day_s = 24 * 60 * 60
-    mock_response_sms0 = adb_pb2.AdbResponse()
+    mock_response_sms0 = adb_pb2.AdbResponse(
+        status=adb_pb2.AdbResponse.Status.OK
+    )
     date0_ms = str(int((time.time() - one_day_s) * 1000))
     mock_response_sms0.generic.output = (
-        'Row: 0, address=1234567890, body=Hello World, service_center=NULL,'
+        'Row: 0 _id=1, address=1234567890, body=Hello World,'
         ' date={}'.format(
             date0_ms
         ).encode()
     )
 
     # No message found response.
-    mock_response_sms1 = adb_pb2.AdbResponse()
+    mock_response_sms1 = adb_pb2.AdbResponse(
+        status=adb_pb2.AdbResponse.Status.OK
+    )
     mock_response_sms1.generic.output = (
         'No result found.'.encode()
     )
@@ -134,8 +142,8 @@ class TestMarkorCreateNoteAndSms(test_utils.AdbEvalTestBase):
         mock_response_time,
         mock_response_sms0,
         mock_response_cat,
-        mock_response_sms1,
         mock_response_time,
+        mock_response_sms1,
     ]
     test_utils.log_mock_calls(self.mock_issue_generic_request)
 
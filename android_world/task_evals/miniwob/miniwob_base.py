@@ -106,7 +106,9 @@ class MiniWoBTask(task_eval.TaskEval, abc.ABC):
       )
     return super().goal
 
-  def _initialize_apps(self, env: interface.AsyncEnv) -> None:
+  def _initialize_apps(
+      self, env: interface.AsyncEnv, in_use: bool = False
+  ) -> None:
     """Initializes the MiniWoB apps."""
 
   def initialize_task(self, env: interface.AsyncEnv):
@@ -177,10 +177,12 @@ class TestSimpleSmsReplyMostRecent(test_utils.AdbEvalTestBase):
 
   def test_is_successful(self):
     new_message = 'New message'
-    mock_sent_message = adb_pb2.AdbResponse()
+    mock_sent_message = adb_pb2.AdbResponse(
+        status=adb_pb2.AdbResponse.Status.OK
+    )
     date_ms = str(int(time.time() * 1000))
     mock_sent_message.generic.output = (
-        'Row: 0, address={}, body={}, service_center=NULL, date={}'.format(
+        'Row: 0 _id=1, address={}, body={}, date={}'.format(
             self.most_recent_number, new_message, date_ms
         ).encode()
     )
@@ -279,10 +281,12 @@ class TestSimpleSmsReply(test_utils.AdbEvalTestBase):
   def test_is_successful(self):
     new_message = 'New message'
     # Add successful message
-    mock_sent_message = adb_pb2.AdbResponse()
+    mock_sent_message = adb_pb2.AdbResponse(
+        status=adb_pb2.AdbResponse.Status.OK
+    )
     date_ms = str(int(time.time() * 1000))
     mock_sent_message.generic.output = (
-        'Row: 0, address={}, body={}, service_center=NULL, date={}'.format(
+        'Row: 0 _id=1, address={}, body={}, date={}'.format(
             self.relevant_number, new_message, date_ms
         ).encode()
     )
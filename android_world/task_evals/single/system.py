@@ -16,17 +16,45 @@
 
 import dataclasses
 import random
-from typing import Any
+from typing import Any, Optional
 
 from absl import logging
 from android_world.env import adb_utils
 from android_world.env import interface
+from android_world.env import settings_snapshot
 from android_world.task_evals import task_eval
 from android_world.utils import fuzzy_match_lib
 import immutabledict
 
 
-class _SystemBrightnessToggle(task_eval.TaskEval):
+class _SettingsRestoringTask(task_eval.TaskEval):
+  """Task that restores the settings it started with on tear down.
+
+  The settings are captured after initialization, before subclasses set up
+  their preconditions, and only the keys that drifted are written back.
+  """
+
+  _settings_baseline: Optional[settings_snapshot.SettingsSnapshot] = None
+
+  def initialize_task(self, env: interface.AsyncEnv) -> None:
+    super().initialize_task(env)
+    try:
+      self._settings_baseline = settings_snapshot.capture(env.controller)
+    except RuntimeError:
+      logging.exception('Failed to capture settings. Continuing.')
+      self._settings_baseline = None
+
+  def tear_down(self, env: interface.AsyncEnv) -> None:
+    if self._settings_baseline is not None:
+      try:
+        settings_snapshot.restore(self._settings_baseline, env.controller)
+      except RuntimeError:
+        logging.exception('Failed to restore settings. Continuing.')
+      self._settings_baseline = None
+    super().tear_down(env)
+
+
+class _SystemBrightnessToggle(_SettingsRestoringTask):
   """Task for checking that the screen brightness has been set to {max_or_min}."""
 
   app_names = ('settings',)
@@ -116,7 +144,7 @@ class SystemBrightnessMax(_SystemBrightnessToggle):
     return {'max_or_min': 'max'}
 
 
-class _SystemWifiToggle(task_eval.TaskEval):
+class _SystemWifiToggle(_SettingsRestoringTask):
   """Task for checking that WiFi has been turned {on_or_off}."""
 
   app_names = ('settings',)
@@ -208,7 +236,7 @@ class SystemWifiTurnOn(_SystemWifiToggle):
     return {'on_or_off': 'on'}
 
 
-class _SystemBluetoothToggle(task_eval.TaskEval):
+class _SystemBluetoothToggle(_SettingsRestoringTask):
   """Task for checking that Bluetooth has been turned {on_or_off}."""
 
   app_names = ('settings',)
@@ -15,15 +15,18 @@
 """Interface for a task and the evaluation logic for that task."""
 
 import abc
+import hashlib
 import random
 from typing import Any
 
 from absl import logging
 from android_world.env import adb_utils
 from android_world.env import device_constants
+from android_world.env import emulator_snapshots
 from android_world.env import interface
 from android_world.env.setup_device import setup
 from android_world.utils import app_snapshot
+from android_world.utils import app_state
 from android_world.utils import datetime_utils
 
 
@@ -113,16 +116,46 @@ class TaskEval(abc.ABC):
   def generate_random_params(cls) -> dict[str, Any]:
     """Returns a random set of parameters for defining the task."""
 
-  def _initialize_apps(self, env: interface.AsyncEnv) -> None:
+  def _initialize_apps(
+      self, env: interface.AsyncEnv, in_use: bool = False
+  ) -> None:
+    """Restores the snapshots of the task's apps.
 
-    for app_name in self.app_names:
-      # Don't need to restore snapshot for clipper app since it doesn't have
-      # any state.
-      if app_name and app_name != "clipper":
-        try:
-          app_snapshot.restore_snapshot(app_name, env.controller)
-        except RuntimeError as error:
-          logging.warning("Skipping app snapshot loading : %s", error)
+    If the device tracks app state, apps that its AppStateTracker knows to be
+    unchanged since their last restore are skipped.
+
+    Args:
+      env: The environment.
+      in_use: Whether the task is about to use the apps, so that they are
+        no longer clean afterwards.
+    """
+    # Don't need to restore snapshot for clipper app since it doesn't have
+    # any state.
+    app_names = [
+        app_name
+        for app_name in self.app_names
+        if app_name and app_name != "clipper"
+    ]
+    tracker = app_state.tracker_for(env.controller)
+    if tracker is not None:
+      to_restore = tracker.dirty_apps(app_names, env.controller)
+    else:
+      to_restore = app_names
+    restored = []
+    for app_name in to_restore:
+      try:
+        app_snapshot.restore_snapshot(
+            app_name, env.controller, incremental=True
+        )
+        restored.append(app_name)
+      except RuntimeError as error:
+        logging.warning("Skipping app snapshot loading : %s", error)
+    if tracker is None:
+      return
+    if in_use:
+      tracker.mark_dirty(app_names)
+    else:
+      tracker.mark_clean(restored, env.controller)
 
   def install_apps_if_not_installed(self, env: interface.AsyncEnv) -> None:
     for app_name in self.app_names:
@@ -139,12 +172,43 @@ class TaskEval(abc.ABC):
     datetime_utils.setup_datetime(env.controller)
     datetime_utils.set_datetime(env.controller, self.device_time)
 
+  @property
+  def reset_baseline(self) -> str:
+    """Name of the device state that the task starts from.
+
+    Tasks that set the same device time, the same way, and restore the same
+    apps start from the same state, and share its emulator snapshot.
+    """
+    key = "|".join([
+        type(self).initialize_device_time.__qualname__,
+        type(self)._initialize_apps.__qualname__,
+        self.device_time.isoformat(),
+        *sorted(set(self.app_names)),
+    ])
+    return hashlib.md5(key.encode()).hexdigest()[:16]
+
+  def _reset_device(self, env: interface.AsyncEnv) -> None:
+    """Brings the device to `reset_baseline`, with its reset backend if any."""
+
+    def prepare() -> None:
+      self.initialize_device_time(env)
+      self._initialize_apps(env, in_use=True)
+
+    backend = emulator_snapshots.backend_for(env.controller)
+    if backend is None:
+      prepare()
+      return
+    if backend.reset(self.reset_baseline, prepare):
+      # A loaded snapshot replaces the whole device state, and its clock does
+      # not stay frozen while it is stored.
+      env.controller.note_device_restored()
+      self.initialize_device_time(env)
+
   def initialize_task(self, env: interface.AsyncEnv) -> None:  # pylint: disable=unused-argument
     """Initializes the task."""
     # Reset the interaction cache so previous tasks don't affect this run:
     env.interaction_cache = ""
-    self.initialize_device_time(env)
-    self._initialize_apps(env)
+    self._reset_device(env)
     logging.info("Initializing %s", self.name)
     if self.initialized:
       raise RuntimeError(f"{self.name}.initialize_task() is already called.")
@@ -181,7 +245,9 @@ class TaskEval(abc.ABC):
 
   def tear_down(self, env: interface.AsyncEnv) -> None:  # pylint: disable=unused-argument
     """Tears down the task."""
-    self._initialize_apps(env)
+    backend = emulator_snapshots.backend_for(env.controller)
+    if backend is None or backend.restore_apps_on_tear_down:
+      self._initialize_apps(env)
     try:
       adb_utils.close_recents(env.controller)
     except:  # pylint: disable=bare-except
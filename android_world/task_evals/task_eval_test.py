@@ -15,8 +15,11 @@
 from typing import Any
 from unittest import mock
 from absl.testing import absltest
+from android_world.env import emulator_snapshots
 from android_world.env import interface
 from android_world.task_evals import task_eval
+from android_world.utils import app_state
+from android_world.utils import fake_emulator
 from android_world.utils import test_utils
 
 
@@ -86,6 +89,55 @@ class TestTaskEval(test_utils.AdbEvalTestBase):
     self.scripted_task.tear_down(self.mock_env)
     self.mock_close_recents.assert_called_once()
 
+  def test_skips_restoring_clean_apps(self):
+    tracker = mock.create_autospec(app_state.AppStateTracker, instance=True)
+    tracker.dirty_apps.return_value = []
+    self.mock_env.controller.app_state_tracker = tracker
+
+    self.scripted_task.initialize_task(self.mock_env)
+
+    self.mock_restore_snapshot.assert_not_called()
+    tracker.mark_dirty.assert_called_once_with(["MockApp"])
+
+  def test_tear_down_marks_restored_apps_clean(self):
+    tracker = mock.create_autospec(app_state.AppStateTracker, instance=True)
+    tracker.dirty_apps.return_value = ["MockApp"]
+    self.mock_env.controller.app_state_tracker = tracker
+
+    self.scripted_task.tear_down(self.mock_env)
+
+    self.mock_restore_snapshot.assert_called_once_with(
+        "MockApp", self.mock_env.controller, incremental=True
+    )
+    tracker.mark_clean.assert_called_once_with(
+        ["MockApp"], self.mock_env.controller
+    )
+
+  def test_resets_from_emulator_snapshot(self):
+    emulator = fake_emulator.FakeEmulator()
+    backend = emulator_snapshots.EmulatorSnapshotReset(emulator)
+    self.mock_env.controller.reset_backend = backend
+
+    self.scripted_task.initialize_task(self.mock_env)
+    self.scripted_task.tear_down(self.mock_env)
+    MockTaskEval(self.params).initialize_task(self.mock_env)
+
+    self.mock_restore_snapshot.assert_called_once()
+    self.mock_env.controller.note_device_restored.assert_called_once()
+    self.assertEqual(self.mock_set_datetime.call_count, 2)
+    snapshot_id = "android_world_" + self.scripted_task.reset_baseline
+    self.assertEqual(
+        emulator.calls, [("save", snapshot_id), ("load", snapshot_id)]
+    )
+
+  def test_reset_baseline_depends_on_apps(self):
+    baseline = self.scripted_task.reset_baseline
+
+    self.assertEqual(MockTaskEval({"param1": "other"}).reset_baseline, baseline)
+    with mock.patch.object(
+        MockTaskEval, "app_names", new=("MockApp", "OtherApp")
+    ):
+      self.assertNotEqual(self.scripted_task.reset_baseline, baseline)
 
 if __name__ == "__main__":
   absltest.main()
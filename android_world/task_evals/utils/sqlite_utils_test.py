@@ -83,7 +83,11 @@ class SqliteUtilsTest(absltest.TestCase):
 
     self.assertEqual(result, expected_rows)
     self.mock_copy_db.assert_called_once_with(
-        os.path.dirname(self.remote_db_path), self.controller.env, None
+        os.path.dirname(self.remote_db_path),
+        self.controller,
+        None,
+        bulk=True,
+        pattern='events.db*',
     )
 
   @mock.patch.object(sqlite_utils, 'execute_query', autospec=True)
@@ -21,6 +21,7 @@ import os
 import random
 import re
 import string
+import tempfile
 from android_env import env_interface
 from android_world.env import adb_utils
 from android_world.env import device_constants
@@ -101,8 +102,19 @@ def generate_noise_files(
       filename += extension
     names.add(filename)
 
-  for filename in names:
-    file_utils.create_file(filename, directory_path, env)
+  # Files are written locally and pushed at once, rather than created one by
+  # one on the device.
+  with tempfile.TemporaryDirectory() as local_directory:
+    local_paths = []
+    for filename in names:
+      local_path = file_utils.convert_to_posix_path(local_directory, filename)
+      with open(local_path, "w") as f:
+        f.write(generate_random_string(20) + "\n")
+      local_paths.append(local_path)
+    adb_utils.check_ok(
+        file_utils.push_files(local_paths, directory_path, env),
+        f"Failed to create noise files in {directory_path}.",
+    )
 
 
 def generate_modified_file_name(base_file_name: str) -> str:
@@ -12,8 +12,12 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import os
 import tempfile
+from unittest import mock
+
 from absl.testing import absltest
+from android_env.proto import adb_pb2
 from android_world.task_evals.utils import user_data_generation
 from android_world.utils import file_utils
 import cv2
@@ -60,5 +64,32 @@ class TestCreateMpegWithMessages(absltest.TestCase):
     self.assertEqual(total_frames, 300)
 
 
+
+class TestGenerateNoiseFiles(absltest.TestCase):
+
+  @mock.patch.object(file_utils, "push_files")
+  def test_pushes_all_files_at_once(self, mock_push_files):
+    pushed = {}
+
+    def push_files(local_paths, remote_directory, env):
+      del remote_directory, env
+      for path in local_paths:
+        with open(path) as f:
+          pushed[os.path.basename(path)] = f.read()
+      return adb_pb2.AdbResponse(status=adb_pb2.AdbResponse.Status.OK)
+
+    mock_push_files.side_effect = push_files
+    env = mock.MagicMock()
+
+    user_data_generation.generate_noise_files(
+        "note.md", "/sdcard/Markor", env, ["todo.md"], n=5
+    )
+
+    mock_push_files.assert_called_once()
+    self.assertBetween(len(pushed), 1, 5)
+    for name, content in pushed.items():
+      self.assertEndsWith(name, ".md")
+      self.assertLen(content, 21)
+
 if __name__ == "__main__":
   absltest.main()
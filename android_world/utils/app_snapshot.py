@@ -12,12 +12,24 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-"""Utils for handling snapshots for apps."""
+"""Utils for handling snapshots for apps.
+
+Saving a snapshot also saves a manifest of its files, with their sizes and
+MD5 hashes. An incremental restore compares the manifest with the app data,
+hashed on the device, and copies back only the files that the app changed,
+so that its cost scales with what was modified rather than with the app size.
+"""
+
+from collections.abc import Mapping
+import dataclasses
+import shlex
 
 from absl import logging
 from android_env import env_interface
+from android_env.proto import adb_pb2
 from android_world.env import adb_utils
 from android_world.env import device_constants
+from android_world.utils import app_state
 from android_world.utils import file_utils
 
 
@@ -37,6 +49,163 @@ def _snapshot_path(app_name: str) -> str:
   )
 
 
+def _manifest_path(app_name: str) -> str:
+  return _snapshot_path(app_name) + ".manifest"
+
+
+def _forget_app_state(
+    app_name: str, env: env_interface.AndroidEnvInterface
+) -> None:
+  """Stops trusting that the app data matches its now replaced snapshot."""
+  tracker = app_state.tracker_for(env)
+  if tracker is not None:
+    tracker.mark_dirty([app_name])
+
+
+@dataclasses.dataclass(frozen=True)
+class FileEntry:
+  """Size and MD5 hash of a file."""
+
+  size: int
+  md5: str
+
+
+@dataclasses.dataclass(frozen=True)
+class Manifest:
+  """The files and directories of a directory tree.
+
+  Attributes:
+    files: Size and hash of each regular file, by path relative to the root,
+      e.g. `./databases/app.db`.
+    directories: Relative paths of the directories, including `.`.
+  """
+
+  files: Mapping[str, FileEntry]
+  directories: frozenset[str]
+
+
+@dataclasses.dataclass(frozen=True)
+class SnapshotDelta:
+  """Changes that turn app data back into its snapshot.
+
+  Attributes:
+    changed: Files to copy from the snapshot, as they differ or are missing.
+    removed: Files to delete, as they are not in the snapshot.
+    removed_directories: Directories to delete with their contents.
+    added_directories: Directories to create, parents first.
+  """
+
+  changed: tuple[str, ...] = ()
+  removed: tuple[str, ...] = ()
+  removed_directories: tuple[str, ...] = ()
+  added_directories: tuple[str, ...] = ()
+
+  def __bool__(self) -> bool:
+    return bool(
+        self.changed
+        or self.removed
+        or self.removed_directories
+        or self.added_directories
+    )
+
+
+def manifest_command(directory_path: str) -> str:
+  """Returns a shell command printing the manifest of a directory tree."""
+  return (
+      f"cd {shlex.quote(directory_path)} && {{ find . -type d | sed 's/^/dir"
+      " /'; find . -type f -exec stat -c 'size %s %n' {} +; find . -type f"
+      " -exec md5sum {} +; } 2>/dev/null"
+  )
+
+
+def parse_manifest(output: str) -> Manifest:
+  """Parses the output of `manifest_command`."""
+  sizes = {}
+  hashes = {}
+  directories = set()
+  for line in output.splitlines():
+    if line.startswith("dir "):
+      directories.add(line[len("dir ") :])
+    elif line.startswith("size "):
+      _, size, path = line.split(" ", 2)
+      sizes[path] = int(size)
+    else:
+      md5, sep, path = line.partition("  ")
+      if sep:
+        hashes[path] = md5
+  return Manifest(
+      files={
+          path: FileEntry(size, hashes.get(path, ""))
+          for path, size in sizes.items()
+      },
+      directories=frozenset(directories),
+  )
+
+
+def _is_under(path: str, directories: frozenset[str]) -> bool:
+  parent = path.rpartition("/")[0]
+  while parent:
+    if parent in directories:
+      return True
+    parent = parent.rpartition("/")[0]
+  return False
+
+
+def diff_manifests(snapshot: Manifest, current: Manifest) -> SnapshotDelta:
+  """Returns the changes that turn `current` back into `snapshot`."""
+  extra_directories = current.directories - snapshot.directories
+  removed_directories = frozenset(
+      d for d in extra_directories if not _is_under(d, extra_directories)
+  )
+  return SnapshotDelta(
+      changed=tuple(
+          sorted(
+              path
+              for path, entry in snapshot.files.items()
+              if current.files.get(path) != entry
+          )
+      ),
+      removed=tuple(
+          sorted(
+              path
+              for path in current.files
+              if path not in snapshot.files
+              and not _is_under(path, removed_directories)
+          )
+      ),
+      removed_directories=tuple(sorted(removed_directories)),
+      added_directories=tuple(
+          sorted(snapshot.directories - current.directories)
+      ),
+  )
+
+
+def _restore_commands(
+    delta: SnapshotDelta, snapshot_path: str, app_data_path: str
+) -> list[str]:
+  """Returns the shell commands applying `delta`, one per path."""
+
+  def app_path(path: str) -> str:
+    return shlex.quote(file_utils.convert_to_posix_path(app_data_path, path))
+
+  commands = [f"rm -rf {app_path(d)}" for d in delta.removed_directories]
+  commands.extend(f"rm -f {app_path(f)}" for f in delta.removed)
+  # As for full restores, ownership and labels may be lost along the way, so
+  # the restored paths get their security context back and open permissions.
+  commands.extend(
+      f"mkdir -p {app_path(d)} && chmod 777 {app_path(d)} && restorecon"
+      f" {app_path(d)}"
+      for d in delta.added_directories
+  )
+  for path in delta.changed:
+    source = shlex.quote(file_utils.convert_to_posix_path(snapshot_path, path))
+    commands.append(
+        f"cp -a {source} {app_path(path)} && chmod 777 {app_path(path)} &&"
+        f" restorecon {app_path(path)}"
+    )
+  return commands
+
+
 def clear_snapshot(
     app_name: str,
     env: env_interface.AndroidEnvInterface,
@@ -47,8 +216,12 @@ def clear_snapshot(
     app_name: Package name for the application snapshot to remove.
     env: Android environment.
   """
+  _forget_app_state(app_name, env)
   snapshot_path = _snapshot_path(app_name)
   file_utils.clear_directory(snapshot_path, env)
+  adb_utils.issue_generic_request(
+      ["shell", f"rm -f {shlex.quote(_manifest_path(app_name))}"], env
+  )
 
 
 def save_snapshot(app_name: str, env: env_interface.AndroidEnvInterface):
@@ -64,6 +237,7 @@ def save_snapshot(app_name: str, env: env_interface.AndroidEnvInterface):
   Raises:
     RuntimeError: on failed or incomplete snapshot.
   """
+  _forget_app_state(app_name, env)
   snapshot_path = _snapshot_path(app_name)
   try:
     file_utils.clear_directory(snapshot_path, env)
@@ -74,21 +248,94 @@ def save_snapshot(app_name: str, env: env_interface.AndroidEnvInterface):
     )
 
   file_utils.copy_dir(_app_data_path(app_name), snapshot_path, env)
+  # The manifest is written on the device, so the hashes never cross adb.
+  manifest_path = shlex.quote(_manifest_path(app_name))
+  response = adb_utils.issue_generic_request(
+      [
+          "shell",
+          f"{manifest_command(snapshot_path)} > {manifest_path}.tmp && mv"
+          f" {manifest_path}.tmp {manifest_path}",
+      ],
+      env,
+  )
+  if response.status != adb_pb2.AdbResponse.Status.OK:
+    logging.warning(
+        "Failed to save the %s snapshot manifest; restores will be full.",
+        app_name,
+    )
+
+
+def _restore_incrementally(
+    app_name: str, env: env_interface.AndroidEnvInterface
+) -> bool:
+  """Restores only the files that differ from the snapshot.
 
+  Costs one adb round trip to read the manifest and hash the app data, and
+  one more to apply the changes, if any.
 
-def restore_snapshot(app_name: str, env: env_interface.AndroidEnvInterface):
+  Args:
+    app_name: App package that will have its data restored.
+    env: Android environment.
+
+  Returns:
+    Whether the snapshot was restored; False if it has no manifest.
+
+  Raises:
+    RuntimeError: If the changed files could not be restored.
+  """
+  snapshot_path = _snapshot_path(app_name)
+  app_data_path = _app_data_path(app_name)
+  commands = adb_utils.CommandBatch(env)
+  read_manifest = commands.add(
+      f"cat {shlex.quote(_manifest_path(app_name))}"
+  )
+  hash_app_data = commands.add(manifest_command(app_data_path))
+  result = commands.run()
+  if not result[read_manifest].ok or not result[hash_app_data].ok:
+    return False
+  snapshot = parse_manifest(result[read_manifest].output.decode())
+  current = parse_manifest(result[hash_app_data].output.decode())
+  if "." not in snapshot.directories:
+    return False
+
+  delta = diff_manifests(snapshot, current)
+  logging.info(
+      "Restoring %s snapshot: %d changed and %d removed of %d files.",
+      app_name,
+      len(delta.changed),
+      len(delta.removed),
+      len(snapshot.files),
+  )
+  if not delta:
+    return True
+  commands = adb_utils.CommandBatch(env, stop_on_error=True)
+  for command in _restore_commands(delta, snapshot_path, app_data_path):
+    commands.add(command)
+  commands.run().check_ok(f"Failed to restore {app_name} snapshot.")
+  return True
+
+
+def restore_snapshot(
+    app_name: str,
+    env: env_interface.AndroidEnvInterface,
+    incremental: bool = False,
+):
   """Loads a snapshot of application data.
 
   Args:
     app_name: App package that will have its data overwritten with the stored
       snapshot.
     env: Android environment.
+    incremental: Whether to restore only the files that differ from the
+      snapshot. Falls back to a full restore for snapshots without manifest.
 
   Raises:
     RuntimeError: when there is no available snapshot or a failure occurs while
       loading the snapshot.
   """
   adb_utils.close_app(app_name, env)
+  if incremental and _restore_incrementally(app_name, env):
+    return
 
   snapshot_path = _snapshot_path(app_name)
   if not file_utils.check_directory_exists(snapshot_path, env):
@@ -0,0 +1,203 @@
+# Copyright 2025 The android_world Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import subprocess
+import tempfile
+from unittest import mock
+
+from absl.testing import absltest
+from android_env import env_interface
+from android_env.proto import adb_pb2
+from android_world.env import adb_utils
+from android_world.utils import app_snapshot
+
+# `restorecon` is not available on the host; it only logs its arguments.
+_FAKE_RESTORECON = """#!/bin/sh
+echo "$*" >> "$ROOT/restorecon.log"
+"""
+
+
+class AppSnapshotTest(absltest.TestCase):
+
+  def setUp(self):
+    super().setUp()
+    self.root = self.enter_context(tempfile.TemporaryDirectory())
+    self.app_data = os.path.join(self.root, 'app')
+    self.snapshot = os.path.join(self.root, 'snapshots', 'app')
+    os.makedirs(self.app_data)
+    bin_dir = os.path.join(self.root, 'bin')
+    os.mkdir(bin_dir)
+    restorecon = os.path.join(bin_dir, 'restorecon')
+    with open(restorecon, 'w') as f:
+      f.write(_FAKE_RESTORECON)
+    os.chmod(restorecon, 0o755)
+    self.shell_env = dict(
+        os.environ,
+        ROOT=self.root,
+        PATH=bin_dir + os.pathsep + os.environ['PATH'],
+    )
+
+    self.env = mock.create_autospec(env_interface.AndroidEnvInterface)
+    self.mock_issue_generic_request = self.enter_context(
+        mock.patch.object(
+            adb_utils,
+            'issue_generic_request',
+            side_effect=self._run_locally,
+        )
+    )
+    self.enter_context(mock.patch.object(adb_utils, 'close_app'))
+    self.enter_context(
+        mock.patch.object(
+            app_snapshot, '_app_data_path', return_value=self.app_data
+        )
+    )
+    self.enter_context(
+        mock.patch.object(
+            app_snapshot, '_snapshot_path', return_value=self.snapshot
+        )
+    )
+
+  def _run_locally(self, args, env, timeout_sec=None):
+    del env, timeout_sec
+    if isinstance(args, str):
+      args = args.split(' ')
+    result = subprocess.run(
+        ['sh', '-c', ' '.join(args[1:])],
+        capture_output=True,
+        check=False,
+        env=self.shell_env,
+    )
+    return adb_pb2.AdbResponse(
+        status=adb_pb2.AdbResponse.Status.OK,
+        generic=adb_pb2.AdbResponse.GenericResponse(output=result.stdout),
+    )
+
+  def _write(self, path, contents):
+    path = os.path.join(self.app_data, path)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w') as f:
+      f.write(contents)
+
+  def _read_tree(self):
+    tree = {}
+    for directory, _, files in os.walk(self.app_data):
+      relative = os.path.relpath(directory, self.app_data)
+      tree[relative] = None
+      for name in files:
+        with open(os.path.join(directory, name)) as f:
+          tree[os.path.normpath(os.path.join(relative, name))] = f.read()
+    return tree
+
+  def _restorecon_log(self):
+    path = os.path.join(self.root, 'restorecon.log')
+    if not os.path.exists(path):
+      return []
+    with open(path) as f:
+      return f.read().splitlines()
+
+  def test_incremental_restore_only_copies_changes(self):
+    self._write('databases/app.db', 'rows')
+    self._write('shared_prefs/prefs.xml', 'prefs')
+    self._write('files/big.bin', 'x' * 10000)
+    app_snapshot.save_snapshot('app', self.env)
+    saved = self._read_tree()
+    self._write('databases/app.db', 'more rows')
+    self._write('databases/app.db-wal', 'wal')
+    self._write('cache/new/file', 'cached')
+    os.remove(os.path.join(self.app_data, 'shared_prefs/prefs.xml'))
+    self.mock_issue_generic_request.reset_mock()
+
+    app_snapshot.restore_snapshot('app', self.env, incremental=True)
+
+    self.assertEqual(self._read_tree(), saved)
+    self.assertEqual(self.mock_issue_generic_request.call_count, 2)
+    self.assertCountEqual(
+        self._restorecon_log(),
+        [
+            f'{self.app_data}/databases/app.db',
+            f'{self.app_data}/shared_prefs/prefs.xml',
+        ],
+    )
+
+  def test_incremental_restore_without_changes_is_one_round_trip(self):
+    self._write('databases/app.db', 'rows')
+    app_snapshot.save_snapshot('app', self.env)
+    self.mock_issue_generic_request.reset_mock()
+
+    app_snapshot.restore_snapshot('app', self.env, incremental=True)
+
+    self.mock_issue_generic_request.assert_called_once()
+
+  def test_incremental_restore_without_manifest_is_full(self):
+    self._write('databases/app.db', 'rows')
+    app_snapshot.save_snapshot('app', self.env)
+    saved = self._read_tree()
+    os.remove(self.snapshot + '.manifest')
+    self._write('databases/app.db', 'more rows')
+
+    app_snapshot.restore_snapshot('app', self.env, incremental=True)
+
+    self.assertEqual(self._read_tree(), saved)
+
+  def test_diff_manifests(self):
+    snapshot = app_snapshot.Manifest(
+        files={
+            './a': app_snapshot.FileEntry(1, 'x'),
+            './d/b': app_snapshot.FileEntry(1, 'y'),
+        },
+        directories=frozenset({'.', './d'}),
+    )
+    current = app_snapshot.Manifest(
+        files={
+            './a': app_snapshot.FileEntry(1, 'x'),
+            './c': app_snapshot.FileEntry(1, 'z'),
+            './e/f/g': app_snapshot.FileEntry(1, 'z'),
+        },
+        directories=frozenset({'.', './e', './e/f'}),
+    )
+
+    self.assertEqual(
+        app_snapshot.diff_manifests(snapshot, current),
+        app_snapshot.SnapshotDelta(
+            changed=('./d/b',),
+            removed=('./c',),
+            removed_directories=('./e',),
+            added_directories=('./d',),
+        ),
+    )
+
+  def test_parse_manifest(self):
+    output = (
+        'dir .\n'
+        'dir ./my dir\n'
+        'size 5 ./my dir/a b\n'
+        'd41d8cd98f00b204e9800998ecf8427e  ./my dir/a b\n'
+    )
+
+    self.assertEqual(
+        app_snapshot.parse_manifest(output),
+        app_snapshot.Manifest(
+            files={
+                './my dir/a b': app_snapshot.FileEntry(
+                    5, 'd41d8cd98f00b204e9800998ecf8427e'
+                )
+            },
+            directories=frozenset({'.', './my dir'}),
+        ),
+    )
+
+
+if __name__ == '__main__':
+  absltest.main()
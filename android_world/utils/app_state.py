@@ -0,0 +1,238 @@
+# Copyright 2025 The android_world Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tracks which apps may have changed since their snapshot was restored.
+
+Tasks restore the snapshots of their apps both when they are initialized and
+when they are torn down, so consecutive tasks on the same app restore it twice
+with nothing in between. AndroidWorldController can keep an AppStateTracker so
+that the second restore is skipped:
+
+  tracker = app_state.tracker_for(env.controller)
+  for app_name in tracker.dirty_apps(app_names, env.controller):
+    app_snapshot.restore_snapshot(app_name, env.controller)
+  tracker.mark_clean(app_names, env.controller)
+
+An app is clean once restored and until any of these happen:
+
+  * a task declares that it uses the app, with `mark_dirty`;
+  * the app shows up in the recent tasks, i.e. it was brought to the
+    foreground;
+  * the fingerprint of its data directory changes. The fingerprint hashes the
+    inode, size, modification and change times of every file. Tasks move the
+    device clock backwards, so times are compared for equality rather than
+    against the time of the restore.
+
+Checking costs one adb round trip for all the apps believed clean, instead of
+one restore per app.
+
+Tracking is off by default, since a change it misses leaves a modified app to
+the next task; enable it with
+AndroidWorldController.enable_app_state_tracking.
+"""
+
+from collections.abc import Iterable
+import re
+import shlex
+import threading
+from typing import Any, Optional
+
+from android_env import env_interface
+from android_world.env import adb_utils
+from android_world.utils import file_utils
+
+# Package of each task in `dumpsys activity recents`.
+_RECENT_PACKAGE = re.compile(r"realActivity=\{?([\w.]+)/")
+
+
+def _package_name(app_name: str) -> str:
+  return adb_utils.extract_package_name(adb_utils.get_adb_activity(app_name))
+
+
+def _app_data_path(app_name: str) -> str:
+  return file_utils.convert_to_posix_path(
+      "/data/data/", _package_name(app_name)
+  )
+
+
+def fingerprint_command(directory_path: str) -> str:
+  """Returns a shell command printing a hash of the metadata of a tree."""
+  return (
+      f"cd {shlex.quote(directory_path)} && find . -exec stat -c"
+      " '%i %s %y %z %n' {} + 2>/dev/null | md5sum"
+  )
+
+
+def parse_recent_packages(output: str) -> set[str]:
+  """Returns the packages of the tasks in `dumpsys activity recents`."""
+  return set(_RECENT_PACKAGE.findall(output))
+
+
+class AppStateTracker:
+  """Apps of a device whose data matches their snapshot.
+
+  Attributes:
+    hits: Number of restores skipped, as the app was clean.
+    misses: Number of apps found dirty, that had to be restored.
+  """
+
+  def __init__(self):
+    self._lock = threading.Lock()
+    # Fingerprint of the data of each clean app, right after its restore.
+    self._fingerprints: dict[str, str] = {}
+    self.hits = 0
+    self.misses = 0
+
+  def mark_dirty(self, app_names: Iterable[str]) -> None:
+    """Records that the apps may be modified, e.g. as a task uses them."""
+    with self._lock:
+      for app_name in app_names:
+        self._fingerprints.pop(app_name, None)
+
+  def mark_clean(
+      self,
+      app_names: Iterable[str],
+      env: env_interface.AndroidEnvInterface,
+  ) -> None:
+    """Records that the data of the apps was just restored.
+
+    Args:
+      app_names: The restored apps.
+      env: The environment.
+    """
+    app_names = list(app_names)
+    if not app_names:
+      return
+    fingerprints = self._fingerprint(app_names, env)
+    with self._lock:
+      for app_name in app_names:
+        if fingerprints.get(app_name) is None:
+          self._fingerprints.pop(app_name, None)
+        else:
+          self._fingerprints[app_name] = fingerprints[app_name]
+
+  def dirty_apps(
+      self,
+      app_names: Iterable[str],
+      env: env_interface.AndroidEnvInterface,
+  ) -> list[str]:
+    """Returns the apps that may differ from their snapshot, in order.
+
+    Apps believed clean are checked on the device, in one round trip. Updates
+    `hits` and `misses`.
+
+    Args:
+      app_names: The apps to restore.
+      env: The environment.
+    """
+    app_names = list(dict.fromkeys(app_names))
+    with self._lock:
+      known = {
+          app_name: self._fingerprints[app_name]
+          for app_name in app_names
+          if app_name in self._fingerprints
+      }
+    changed = set()
+    if known:
+      changed = self._changed_apps(known, env)
+    dirty = [
+        app_name
+        for app_name in app_names
+        if app_name not in known or app_name in changed
+    ]
+    with self._lock:
+      for app_name in changed:
+        self._fingerprints.pop(app_name, None)
+      self.hits += len(app_names) - len(dirty)
+      self.misses += len(dirty)
+    return dirty
+
+  def reset(self) -> None:
+    """Forgets all apps, e.g. after the device was wiped or reloaded."""
+    with self._lock:
+      self._fingerprints.clear()
+
+  def as_dict(self) -> dict[str, Any]:
+    """Returns the counters, e.g. to log them with the episode results."""
+    with self._lock:
+      return {
+          "hits": self.hits,
+          "misses": self.misses,
+          "clean_apps": sorted(self._fingerprints),
+      }
+
+  def _fingerprint(
+      self,
+      app_names: list[str],
+      env: env_interface.AndroidEnvInterface,
+  ) -> dict[str, Optional[str]]:
+    """Returns the fingerprint of each app's data; None if unreadable."""
+    commands = adb_utils.CommandBatch(env)
+    indices = {
+        app_name: commands.add(_fingerprint_of(app_name))
+        for app_name in app_names
+    }
+    result = commands.run()
+    return {
+        app_name: _parse_fingerprint(result[index])
+        for app_name, index in indices.items()
+    }
+
+  def _changed_apps(
+      self,
+      fingerprints: dict[str, str],
+      env: env_interface.AndroidEnvInterface,
+  ) -> set[str]:
+    """Returns the apps that ran or whose data changed since marked clean."""
+    commands = adb_utils.CommandBatch(env)
+    recents = commands.add("dumpsys activity recents")
+    indices = {
+        app_name: commands.add(_fingerprint_of(app_name))
+        for app_name in fingerprints
+    }
+    result = commands.run()
+    if result[recents].ok:
+      recent_packages = parse_recent_packages(
+          result[recents].output.decode(errors="replace")
+      )
+    else:
+      # Without the recent tasks, any app may have run.
+      return set(fingerprints)
+    changed = set()
+    for app_name, index in indices.items():
+      if (
+          _package_name(app_name) in recent_packages
+          or _parse_fingerprint(result[index]) != fingerprints[app_name]
+      ):
+        changed.add(app_name)
+    return changed
+
+
+def _fingerprint_of(app_name: str) -> str:
+  return fingerprint_command(_app_data_path(app_name))
+
+
+def _parse_fingerprint(
+    command_result: adb_utils.BatchCommandResult,
+) -> Optional[str]:
+  output = command_result.output.decode(errors="replace").split()
+  if not command_result.ok or not output:
+    return None
+  return output[0]
+
+
+def tracker_for(env: Any) -> Optional[AppStateTracker]:
+  """Returns the AppStateTracker of `env`, if it keeps one."""
+  tracker = getattr(env, "app_state_tracker", None)
+  return tracker if isinstance(tracker, AppStateTracker) else None
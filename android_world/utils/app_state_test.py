@@ -0,0 +1,161 @@
+# Copyright 2025 The android_world Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import subprocess
+import tempfile
+from unittest import mock
+
+from absl.testing import absltest
+from android_env import env_interface
+from android_env.proto import adb_pb2
+from android_world.env import adb_utils
+from android_world.utils import app_state
+
+# `dumpsys activity recents` prints the tasks listed in $ROOT/recents.
+_FAKE_DUMPSYS = """#!/bin/sh
+cat "$ROOT/recents" 2>/dev/null || true
+"""
+
+
+class AppStateTrackerTest(absltest.TestCase):
+
+  def setUp(self):
+    super().setUp()
+    self.root = self.enter_context(tempfile.TemporaryDirectory())
+    for app_name in ('a', 'b'):
+      os.makedirs(os.path.join(self.root, 'data', app_name, 'databases'))
+      self._write(app_name, 'databases/app.db', 'rows')
+    bin_dir = os.path.join(self.root, 'bin')
+    os.mkdir(bin_dir)
+    dumpsys = os.path.join(bin_dir, 'dumpsys')
+    with open(dumpsys, 'w') as f:
+      f.write(_FAKE_DUMPSYS)
+    os.chmod(dumpsys, 0o755)
+    self.shell_env = dict(
+        os.environ,
+        ROOT=self.root,
+        PATH=bin_dir + os.pathsep + os.environ['PATH'],
+    )
+
+    self.env = mock.create_autospec(env_interface.AndroidEnvInterface)
+    self.mock_issue_generic_request = self.enter_context(
+        mock.patch.object(
+            adb_utils,
+            'issue_generic_request',
+            side_effect=self._run_locally,
+        )
+    )
+    self.enter_context(
+        mock.patch.object(
+            app_state,
+            '_app_data_path',
+            side_effect=lambda app_name: os.path.join(
+                self.root, 'data', app_name
+            ),
+        )
+    )
+    self.enter_context(
+        mock.patch.object(
+            app_state,
+            '_package_name',
+            side_effect=lambda app_name: f'com.example.{app_name}',
+        )
+    )
+    self.tracker = app_state.AppStateTracker()
+
+  def _run_locally(self, args, env, timeout_sec=None):
+    del env, timeout_sec
+    result = subprocess.run(
+        ['sh', '-c', ' '.join(args[1:])],
+        capture_output=True,
+        check=False,
+        env=self.shell_env,
+    )
+    return adb_pb2.AdbResponse(
+        status=adb_pb2.AdbResponse.Status.OK,
+        generic=adb_pb2.AdbResponse.GenericResponse(output=result.stdout),
+    )
+
+  def _write(self, app_name, path, contents):
+    with open(os.path.join(self.root, 'data', app_name, path), 'w') as f:
+      f.write(contents)
+
+  def test_unknown_apps_are_dirty_without_device_check(self):
+    self.assertEqual(self.tracker.dirty_apps(['a', 'b'], self.env), ['a', 'b'])
+    self.mock_issue_generic_request.assert_not_called()
+    self.assertEqual(self.tracker.misses, 2)
+
+  def test_clean_apps_are_skipped_in_one_round_trip(self):
+    self.tracker.mark_clean(['a', 'b'], self.env)
+    self.mock_issue_generic_request.reset_mock()
+
+    self.assertEqual(self.tracker.dirty_apps(['a', 'b'], self.env), [])
+    self.mock_issue_generic_request.assert_called_once()
+    self.assertEqual(
+        self.tracker.as_dict(),
+        {'hits': 2, 'misses': 0, 'clean_apps': ['a', 'b']},
+    )
+
+  def test_changed_data_is_dirty(self):
+    self.tracker.mark_clean(['a', 'b'], self.env)
+    self._write('b', 'databases/app.db-wal', 'wal')
+
+    self.assertEqual(self.tracker.dirty_apps(['a', 'b'], self.env), ['b'])
+    self.assertEqual(self.tracker.dirty_apps(['b'], self.env), ['b'])
+
+  def test_rewrite_with_same_size_is_dirty(self):
+    self.tracker.mark_clean(['a'], self.env)
+    path = os.path.join(self.root, 'data', 'a', 'databases', 'app.db')
+    stat = os.stat(path)
+    self._write('a', 'databases/app.db', 'ROWS')
+    # Even when the clock went backwards, the modification time differs.
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns - 10**9))
+
+    self.assertEqual(self.tracker.dirty_apps(['a'], self.env), ['a'])
+
+  def test_apps_in_recents_are_dirty(self):
+    self.tracker.mark_clean(['a', 'b'], self.env)
+    with open(os.path.join(self.root, 'recents'), 'w') as f:
+      f.write('  * Recent #0: Task{1 #5 type=standard A=10101:com.example.a}\n')
+      f.write('    realActivity={com.example.a/.MainActivity}\n')
+
+    self.assertEqual(self.tracker.dirty_apps(['a', 'b'], self.env), ['a'])
+
+  def test_declared_apps_are_dirty(self):
+    self.tracker.mark_clean(['a', 'b'], self.env)
+    self.tracker.mark_dirty(['a'])
+
+    self.assertEqual(self.tracker.dirty_apps(['a', 'b'], self.env), ['a'])
+
+  def test_parse_recent_packages(self):
+    output = (
+        'realActivity={com.google.android.apps.nexuslauncher/.Launcher}\n'
+        'realActivity=com.android.settings/.Settings\n'
+    )
+
+    self.assertEqual(
+        app_state.parse_recent_packages(output),
+        {'com.google.android.apps.nexuslauncher', 'com.android.settings'},
+    )
+
+  def test_tracker_for(self):
+    env = mock.Mock(app_state_tracker=self.tracker)
+
+    self.assertIs(app_state.tracker_for(env), self.tracker)
+    self.assertIsNone(app_state.tracker_for(mock.Mock()))
+
+
+if __name__ == '__main__':
+  absltest.main()
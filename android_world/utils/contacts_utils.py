@@ -17,11 +17,11 @@
 import dataclasses
 import re
 import time
-from typing import Iterator
 
 from android_world.env import actuation
 from android_world.env import adb_utils
 from android_world.env import android_world_controller
+from android_world.env import content_provider
 
 
 def clean_phone_number(phone_number: str) -> str:
@@ -88,23 +88,15 @@ def list_contacts(
   Returns:
     A list of all contact names and numbers present on the device.
   """
-  intent_command = (
-      "content query --uri content://contacts/phones/ --projection"
-      " display_name:number"
+  rows = content_provider.query(
+      env, "content://contacts/phones/", columns=("display_name", "number")
   )
-  adb_command = ["shell", intent_command]
-
-  def parse(adb_output: str) -> Iterator[Contact]:
-    for match in re.finditer(r"display_name=(.*), number=(.*)", adb_output):
-      yield Contact(match.group(1), clean_phone_number(match.group(2)))
-
-  return list(
-      parse(
-          adb_utils.issue_generic_request(
-              adb_command, env
-          ).generic.output.decode("utf-8")
+  return [
+      Contact(
+          row["display_name"] or "", clean_phone_number(row["number"] or "")
       )
-  )
+      for row in rows
+  ]
 
 
 def clear_contacts(env: android_world_controller.AndroidWorldController):
@@ -53,7 +53,7 @@ class TestContactsUtils(absltest.TestCase):
   def test_list_contacts(self, unused_mock_click_element, mock_generic_request):
     """Test listing all contacts."""
     mock_env = mock.create_autospec(env_interface.AndroidEnvInterface)
-    adb_response = adb_pb2.AdbResponse()
+    adb_response = adb_pb2.AdbResponse(status=adb_pb2.AdbResponse.Status.OK)
     adb_response.generic.output = """
       Row: 0 display_name=Jane Doe, number=1 (234) 567-89
       Row: 0 display_name=Chen, number=98765
@@ -110,18 +110,8 @@ def toggle_auto_settings(
     env: AndroidEnv instance.
     toggle: Whether to enable or disable the settings.
   """
-  adb_utils.put_settings(
-      adb_pb2.AdbRequest.SettingsRequest.Namespace.GLOBAL,
-      'auto_time',
-      toggle.value,
-      env,
-  )
-  adb_utils.put_settings(
-      adb_pb2.AdbRequest.SettingsRequest.Namespace.GLOBAL,
-      'auto_time_zone',
-      toggle.value,
-      env,
-  )
+  with adb_utils.batch(env) as commands:
+    _toggle_auto_settings(commands, toggle)
 
 
 def setup_datetime(env: env_interface.AndroidEnvInterface) -> None:
@@ -136,9 +126,10 @@ def setup_datetime(env: env_interface.AndroidEnvInterface) -> None:
     env: AndroidEnv instance.
   """
   adb_utils.set_root_if_needed(env)
-  toggle_auto_settings(env, Toggle.OFF)
-  _enable_24_hour_format(env)
-  _set_timezone_to_utc(env)
+  with adb_utils.batch(env) as commands:
+    _toggle_auto_settings(commands, Toggle.OFF)
+    _enable_24_hour_format(commands)
+    _set_timezone_to_utc(commands)
 
 
 def set_datetime(
@@ -183,24 +174,38 @@ def advance_system_time(
   )
 
 
-def _enable_24_hour_format(env: env_interface.AndroidEnvInterface) -> None:
+def _toggle_auto_settings(
+    commands: adb_utils.CommandBatch, toggle: Toggle
+) -> None:
+  """Queues the automatic date, time, and timezone settings."""
+  commands.put_settings(
+      adb_pb2.AdbRequest.SettingsRequest.Namespace.GLOBAL,
+      'auto_time',
+      toggle.value,
+  )
+  commands.put_settings(
+      adb_pb2.AdbRequest.SettingsRequest.Namespace.GLOBAL,
+      'auto_time_zone',
+      toggle.value,
+  )
+
+
+def _enable_24_hour_format(commands: adb_utils.CommandBatch) -> None:
   """Sets to 24-hour time format to be consistent and region-independent."""
-  adb_utils.put_settings(
+  commands.put_settings(
       adb_pb2.AdbRequest.SettingsRequest.Namespace.SYSTEM,
       'time_12_24',
       '24',
-      env,
   )
 
 
-def _set_timezone_to_utc(env: env_interface.AndroidEnvInterface) -> None:
+def _set_timezone_to_utc(commands: adb_utils.CommandBatch) -> None:
   """Sets the Android device's timezone to UTC.
 
   Args:
-      env: An instance of AndroidEnv interface.
+      commands: The batch to queue the command in.
   """
-  adb_command = ['shell', 'service', 'call', 'alarm', '3', 's16', 'UTC']
-  adb_utils.issue_generic_request(adb_command, env)
+  commands.add(['service', 'call', 'alarm', '3', 's16', 'UTC'])
 
 
 def _set_datetime(
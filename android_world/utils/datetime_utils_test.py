@@ -27,35 +27,25 @@ from android_world.utils import datetime_utils
 @mock.patch.object(adb_utils, 'issue_generic_request')
 class AdbDatetimeManagerTest(absltest.TestCase):
 
-  @mock.patch.object(adb_utils, 'put_settings')
+  @mock.patch.object(adb_utils.CommandBatch, 'run')
+  @mock.patch.object(adb_utils.CommandBatch, 'add')
   def test_setup_datetime_environment(
-      self, mock_put_settings, unused_mock_issue_generic_request
+      self, mock_add, mock_run, unused_mock_issue_generic_request
   ):
     env_mock = mock.create_autospec(env_interface.AndroidEnvInterface)
 
     datetime_utils.setup_datetime(env_mock)
 
-    expected_calls = [
-        mock.call(
-            adb_pb2.AdbRequest.SettingsRequest.Namespace.GLOBAL,
-            'auto_time',
-            '0',
-            env_mock,
-        ),
-        mock.call(
-            adb_pb2.AdbRequest.SettingsRequest.Namespace.GLOBAL,
-            'auto_time_zone',
-            '0',
-            env_mock,
-        ),
-        mock.call(
-            adb_pb2.AdbRequest.SettingsRequest.Namespace.SYSTEM,
-            'time_12_24',
-            '24',
-            env_mock,
-        ),
-    ]
-    mock_put_settings.assert_has_calls(expected_calls, any_order=False)
+    mock_add.assert_has_calls(
+        [
+            mock.call(['settings', 'put', 'global', 'auto_time', '0']),
+            mock.call(['settings', 'put', 'global', 'auto_time_zone', '0']),
+            mock.call(['settings', 'put', 'system', 'time_12_24', '24']),
+            mock.call(['service', 'call', 'alarm', '3', 's16', 'UTC']),
+        ],
+        any_order=False,
+    )
+    mock_run.assert_called_once()
 
   def test_advance_system_time(self, mock_issue_generic_request):
     env_mock = mock.create_autospec(env_interface.AndroidEnvInterface)
@@ -0,0 +1,222 @@
+# Copyright 2025 The android_world Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""A fake emulator, whose state is a dict, for testing snapshot resets.
+
+The fake is itself a SnapshotService, and can also serve its snapshots over
+the emulator console protocol or the gRPC snapshot service, to test the real
+clients against it:
+
+  emulator = fake_emulator.FakeEmulator({'sms': []})
+  with emulator.serve_console() as port:
+    service = emulator_snapshots.ConsoleSnapshotService(port)
+    service.save('baseline')
+"""
+
+from collections.abc import Callable, Iterator
+from concurrent import futures
+import contextlib
+import copy
+import socketserver
+import threading
+import time
+from typing import Any, Optional
+
+from android_env.proto import snapshot_service_pb2
+from android_env.proto import snapshot_service_pb2_grpc
+from android_world.env import emulator_snapshots
+import grpc
+
+
+class FakeEmulator(emulator_snapshots.SnapshotService):
+  """Keeps snapshots of a dict standing for the emulator's state.
+
+  Attributes:
+    state: The current state; tests mutate it to emulate tasks.
+    snapshots: Saved copies of the state, by snapshot id.
+    calls: The (method, snapshot id) of every call, in order.
+  """
+
+  name = 'fake_emulator'
+
+  def __init__(
+      self,
+      state: Optional[dict[str, Any]] = None,
+      save_sec: float = 0.0,
+      load_sec: float = 0.0,
+      sleep: Callable[[float], None] = time.sleep,
+  ):
+    """Initializes the fake.
+
+    Args:
+      state: The initial state.
+      save_sec: Simulated latency of saving a snapshot.
+      load_sec: Simulated latency of loading a snapshot.
+      sleep: Sleeps for the simulated latencies; injectable for tests.
+    """
+    self.state = state if state is not None else {}
+    self.snapshots: dict[str, dict[str, Any]] = {}
+    self.calls: list[tuple[str, str]] = []
+    self._save_sec = save_sec
+    self._load_sec = load_sec
+    self._sleep = sleep
+    self._lock = threading.Lock()
+
+  def save(self, snapshot_id: str) -> None:
+    with self._lock:
+      self.calls.append(('save', snapshot_id))
+      self._sleep(self._save_sec)
+      self.snapshots[snapshot_id] = copy.deepcopy(self.state)
+
+  def load(self, snapshot_id: str) -> None:
+    with self._lock:
+      self.calls.append(('load', snapshot_id))
+      if snapshot_id not in self.snapshots:
+        raise RuntimeError(f'Snapshot {snapshot_id} not found.')
+      self._sleep(self._load_sec)
+      self.state = copy.deepcopy(self.snapshots[snapshot_id])
+
+  def list_snapshots(self) -> list[str]:
+    with self._lock:
+      return list(self.snapshots)
+
+  def delete(self, snapshot_id: str) -> None:
+    with self._lock:
+      self.calls.append(('delete', snapshot_id))
+      self.snapshots.pop(snapshot_id, None)
+
+  def console_reply(self, command: str) -> str:
+    """Returns the console's answer to `command`, status line included."""
+    words = command.split()
+    try:
+      if words[:2] != ['avd', 'snapshot'] or len(words) < 3:
+        raise RuntimeError(f'unknown command: {command}')
+      action, args = words[2], words[3:]
+      if action == 'list':
+        rows = ''.join(
+            f'--  {snapshot_id}  1.0G 2023-10-15 15:34:00 00:00:10.000\r\n'
+            for snapshot_id in self.list_snapshots()
+        )
+        return (
+            'List of snapshots present on all disks:\r\n'
+            'ID        TAG                 VM SIZE                DATE'
+            '     VM CLOCK\r\n'
+            f'{rows}OK\r\n'
+        )
+      if action in ('save', 'load', 'delete') and len(args) == 1:
+        getattr(self, action)(args[0])
+        return 'OK\r\n'
+      raise RuntimeError(f'bad arguments: {command}')
+    except RuntimeError as error:
+      return f'KO: {error}\r\n'
+
+  @contextlib.contextmanager
+  def serve_console(self, auth_token: Optional[str] = None) -> Iterator[int]:
+    """Serves the emulator console protocol on localhost.
+
+    Args:
+      auth_token: The token clients must send with `auth` first, if any.
+
+    Yields:
+      The console port.
+    """
+    emulator = self
+
+    class Handler(socketserver.StreamRequestHandler):
+
+      def handle(self):
+        self.wfile.write(b'Android Console: type \'help\' for help\r\nOK\r\n')
+        authenticated = auth_token is None
+        for line in self.rfile:
+          command = line.decode().strip()
+          if command.startswith('auth '):
+            authenticated = command.split(' ', 1)[1] == auth_token
+            reply = 'OK\r\n' if authenticated else 'KO: bad auth token\r\n'
+          elif not authenticated:
+            reply = 'KO: authentication required\r\n'
+          else:
+            reply = emulator.console_reply(command)
+          self.wfile.write(reply.encode())
+
+    server = socketserver.ThreadingTCPServer(('localhost', 0), Handler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+      yield server.server_address[1]
+    finally:
+      server.shutdown()
+      server.server_close()
+
+  @contextlib.contextmanager
+  def serve_grpc(self) -> Iterator[int]:
+    """Serves the gRPC snapshot service on localhost.
+
+    Yields:
+      The gRPC port.
+    """
+    server = grpc.server(futures.ThreadPoolExecutor(max_workers=2))
+    snapshot_service_pb2_grpc.add_SnapshotServiceServicer_to_server(
+        _SnapshotServicer(self), server
+    )
+    port = server.add_secure_port(
+        'localhost:0', grpc.local_server_credentials()
+    )
+    server.start()
+    try:
+      yield port
+    finally:
+      server.stop(grace=None)
+
+
+class _SnapshotServicer(snapshot_service_pb2_grpc.SnapshotServiceServicer):
+  """Serves the snapshots of a FakeEmulator over gRPC."""
+
+  def __init__(self, emulator: FakeEmulator):
+    self._emulator = emulator
+
+  def _call(
+      self, method: Callable[[str], None], snapshot_id: str
+  ) -> snapshot_service_pb2.SnapshotPackage:
+    try:
+      method(snapshot_id)
+    except RuntimeError as error:
+      return snapshot_service_pb2.SnapshotPackage(
+          snapshot_id=snapshot_id, success=False, err=str(error).encode()
+      )
+    return snapshot_service_pb2.SnapshotPackage(
+        snapshot_id=snapshot_id, success=True
+    )
+
+  def SaveSnapshot(self, request, context):  # pylint: disable=invalid-name
+    del context
+    return self._call(self._emulator.save, request.snapshot_id)
+
+  def LoadSnapshot(self, request, context):  # pylint: disable=invalid-name
+    del context
+    return self._call(self._emulator.load, request.snapshot_id)
+
+  def DeleteSnapshot(self, request, context):  # pylint: disable=invalid-name
+    del context
+    return self._call(self._emulator.delete, request.snapshot_id)
+
+  def ListSnapshots(self, request, context):  # pylint: disable=invalid-name
+    del request, context
+    return snapshot_service_pb2.SnapshotList(
+        snapshots=[
+            snapshot_service_pb2.SnapshotDetails(snapshot_id=snapshot_id)
+            for snapshot_id in self._emulator.list_snapshots()
+        ]
+    )
+
@@ -15,11 +15,13 @@
 """Utils for testing file util logic."""
 
 import contextlib
+import fnmatch
 import os
 import shutil
 import tempfile
 
 from android_env import env_interface
+from android_world.env import adb_utils
 from android_world.utils import file_utils
 
 
@@ -28,15 +30,27 @@ def mock_tmp_directory_from_device(
     device_path: str,
     env: env_interface.AndroidEnvInterface,
     timeout_sec: float | None,
+    bulk: bool = False,
+    pattern: str | None = None,
 ):
   """Mocks `file_utils.tmp_directory_from_device` for unit testing."""
-  del env, timeout_sec
+  del env, timeout_sec, bulk
   with tempfile.TemporaryDirectory() as tmp_dir:
     parent_dir = file_utils.convert_to_posix_path(
         tmp_dir, os.path.split(os.path.split(device_path)[0])[1]
     )
+
+    def ignore(directory: str, names: list[str]) -> set[str]:
+      return {
+          name
+          for name in names
+          if pattern is not None
+          and os.path.isfile(os.path.join(directory, name))
+          and not fnmatch.fnmatch(name, pattern)
+      }
+
     try:
-      shutil.copytree(device_path, parent_dir)
+      shutil.copytree(device_path, parent_dir, ignore=ignore)
       yield parent_dir
 
     finally:
@@ -48,6 +62,7 @@ def mock_copy_data_to_device(
     remote_db_path: str,
     env: env_interface.AndroidEnvInterface,
     timeout_sec: float | None = None,
+    batch: adb_utils.CommandBatch | None = None,
 ):
   """Mocks the behavior of file_utils.copy_data_to_device for testing purposes.
 
@@ -59,8 +74,9 @@ def mock_copy_data_to_device(
     remote_db_path: The file path on the simulated remote device.
     env: The Android environment interface (unused in the mock).
     timeout_sec: Optional timeout in seconds (unused in the mock).
+    batch: Optional batch for permission changes (unused in the mock).
   """
-  del env, timeout_sec
+  del env, timeout_sec, batch
   os.makedirs(os.path.dirname(remote_db_path), exist_ok=True)
   shutil.copy(local_db_path, remote_db_path)
 
@@ -17,13 +17,18 @@
 import contextlib
 import dataclasses
 import datetime
+import fnmatch
+import io
 import os
 import pathlib
+import posixpath
 import random
+import shlex
 import shutil
 import string
+import tarfile
 import tempfile
-from typing import Iterator
+from typing import Collection, Iterator
 from typing import Optional
 
 from absl import logging
@@ -57,6 +62,9 @@ def convert_to_posix_path(*args):
   return str(pathlib.Path(*args).as_posix())
 
 
+# Device location for archives pushed by `push_files`.
+_DEVICE_TMP_DIRECTORY = "/data/local/tmp"
+
 # Local temporary location for files copied to or from the device.
 TMP_LOCAL_LOCATION = convert_to_posix_path(
     get_local_tmp_directory(), "android_world"
@@ -311,18 +319,111 @@ def check_directory_exists(
   return check_file_exists(path, env, bash_file_test="-d")
 
 
+def _pull_files(
+    device_path: str,
+    local_directory: str,
+    env: env_interface.AndroidEnvInterface,
+    timeout_sec: Optional[float],
+    pattern: Optional[str],
+) -> None:
+  """Pulls the regular files of a directory with one adb pull per file."""
+  if not check_directory_exists(device_path, env):
+    raise FileNotFoundError(f"{device_path} does not exist.")
+  files = get_file_list_with_metadata(device_path, env, timeout_sec)
+  for file in files:
+    if pattern is not None and not fnmatch.fnmatch(file.file_name, pattern):
+      continue
+    pull_response = env.execute_adb_call(
+        adb_pb2.AdbRequest(
+            pull=adb_pb2.AdbRequest.Pull(path=file.full_path),
+            timeout_sec=timeout_sec,
+        )
+    )
+    adb_utils.check_ok(pull_response)
+    with open(
+        convert_to_posix_path(local_directory, file.file_name), "wb"
+    ) as f:
+      f.write(pull_response.pull.content)
+
+
+def _tar_command(device_path: str, pattern: Optional[str]) -> str:
+  """Returns a command streaming the regular files of a directory as tar."""
+  # xargs may split long file lists over several tar archives, which are
+  # read back to back.
+  return (
+      f"cd {shlex.quote(device_path)} && find . -maxdepth 1 -type f"
+      f" -name {shlex.quote(pattern or '*')} -print0"
+      " | xargs -0 tar -cf - 2>/dev/null"
+  )
+
+
+def _unpack_regular_files(
+    archive: bytes, local_directory: str, pattern: Optional[str]
+) -> None:
+  """Writes the regular files of a tar archive to `local_directory`."""
+  with tarfile.open(
+      fileobj=io.BytesIO(archive), mode="r:", ignore_zeros=True
+  ) as tar:
+    for member in tar:
+      # Only files directly in the directory, e.g. `./a.db` or `a.db`.
+      file_name = posixpath.normpath(member.name)
+      if not member.isfile() or "/" in file_name:
+        continue
+      if pattern is not None and not fnmatch.fnmatch(file_name, pattern):
+        continue
+      with tar.extractfile(member) as src, open(
+          convert_to_posix_path(local_directory, file_name), "wb"
+      ) as dst:
+        shutil.copyfileobj(src, dst)
+
+
+def _pull_files_as_tar(
+    device_path: str,
+    local_directory: str,
+    env: env_interface.AndroidEnvInterface,
+    timeout_sec: Optional[float],
+    pattern: Optional[str],
+) -> None:
+  """Pulls the regular files of a directory as one tar stream."""
+  response = adb_utils.issue_generic_request(
+      ["exec-out", _tar_command(device_path, pattern)], env, timeout_sec
+  )
+  adb_utils.check_ok(response, f"Failed to pull {device_path}.")
+  archive = response.generic.output
+  # Nothing is streamed if the directory is missing or no file matches.
+  if not archive:
+    if not check_directory_exists(device_path, env):
+      raise FileNotFoundError(f"{device_path} does not exist.")
+    return
+  try:
+    _unpack_regular_files(archive, local_directory, pattern)
+  except tarfile.TarError as e:
+    raise RuntimeError(f"Failed to unpack {device_path}: {e}") from e
+
+
 @contextlib.contextmanager
 def tmp_directory_from_device(
     device_path: str,
     env: env_interface.AndroidEnvInterface,
     timeout_sec: Optional[float] = None,
+    bulk: bool = False,
+    pattern: Optional[str] = None,
 ):
   """Copy a directory from the device to a local temporary directory using ADB.
 
+  Only the regular files directly in the directory are copied. By default,
+  each file is pulled with its own adb call. With `bulk`, the files are
+  streamed as a single tar archive with `adb exec-out` and unpacked in
+  memory, which saves a round trip per file.
+
   Args:
     device_path: The path of the directory on the Android device.
     env: The Android environment interface.
     timeout_sec: A timeout for the ADB operations.
+    bulk: Whether to stream the files as one tar archive.
+    pattern: If set, only files whose name matches this glob are copied, e.g.
+      `accounting.db*` for a database and its `-wal` and `-shm` files. With
+      `bulk`, files are filtered on the device.
 
   Yields:
     A temporary folder that contains files copied from the device that is
@@ -340,23 +441,10 @@ def tmp_directory_from_device(
 
   adb_utils.set_root_if_needed(env, timeout_sec)
 
-  if not check_directory_exists(device_path, env):
-    raise FileNotFoundError(f"{device_path} does not exist.")
   try:
     os.makedirs(tmp_directory, exist_ok=True)
-    files = get_file_list_with_metadata(device_path, env, timeout_sec)
-    for file in files:
-      pull_response = env.execute_adb_call(
-          adb_pb2.AdbRequest(
-              pull=adb_pb2.AdbRequest.Pull(path=file.full_path),
-              timeout_sec=timeout_sec,
-          )
-      )
-      adb_utils.check_ok(pull_response)
-      with open(
-          convert_to_posix_path(tmp_directory, file.file_name), "wb"
-      ) as f:
-        f.write(pull_response.pull.content)
+    pull = _pull_files_as_tar if bulk else _pull_files
+    pull(device_path, tmp_directory, env, timeout_sec, pattern)
 
     yield tmp_directory
 
@@ -423,8 +511,21 @@ def copy_file_to_device(
     remote_file_path: str,
     env: env_interface.AndroidEnvInterface,
     timeout_sec: Optional[float] = None,
+    batch: Optional[adb_utils.CommandBatch] = None,
 ) -> adb_pb2.AdbResponse:
-  """Copies a local file to a remote file."""
+  """Copies a local file to a remote file.
+
+  Args:
+    local_file_path: The path of the file on the local file system.
+    remote_file_path: The destination path on the Android device.
+    env: The Android environment interface.
+    timeout_sec: A timeout for the ADB operation.
+    batch: If given, the permission change after the push is queued in this
+      batch instead of being issued right away.
+
+  Returns:
+    The response to the push.
+  """
   with open(local_file_path, "rb") as f:
     file_contents = f.read()
     push_request = adb_pb2.AdbRequest(
@@ -439,9 +540,12 @@ def copy_file_to_device(
   # escaped.
   escaped_path = remote_file_path.replace(" ", r"\ ").replace("'", r"\'")
 
-  adb_utils.issue_generic_request(
-      ["shell", "chmod", "777", escaped_path], env
-  )
+  if batch is not None:
+    batch.add(["chmod", "777", escaped_path])
+  else:
+    adb_utils.issue_generic_request(
+        ["shell", "chmod", "777", escaped_path], env
+    )
   return push_response
 
 
@@ -450,14 +554,19 @@ def copy_data_to_device(
     remote_path: str,
     env: env_interface.AndroidEnvInterface,
     timeout_sec: Optional[float] = None,
+    batch: Optional[adb_utils.CommandBatch] = None,
 ) -> adb_pb2.AdbResponse:
   """Copy a file or directory to the device from the local file system using ADB.
 
+  Directories are pushed as one tar stream; see `push_files`.
+
   Args:
     local_path: The path of the file or directory on the local file system.
     remote_path: The destination path on the Android device.
     env: The Android environment interface.
     timeout_sec: A timeout for the ADB operation.
+    batch: If given, permission changes, and the extraction of directories,
+      are queued in this batch; otherwise they run right after the push.
 
   Returns:
     A response object containing the ADB operation result.
@@ -465,6 +574,7 @@ def copy_data_to_device(
   Raises:
     FileNotFoundError: If the local file or directory does not exist. Or if
       remote path does not exist.
+    RuntimeError: If a directory could not be extracted on the device.
   """
   if not os.path.exists(local_path):
     raise FileNotFoundError(f"{local_path} does not exist.")
@@ -475,20 +585,142 @@ def copy_data_to_device(
       remote_path = convert_to_posix_path(
           remote_path, os.path.basename(local_path)
       )
-    return copy_file_to_device(local_path, remote_path, env, timeout_sec)
-
-  # Copying a directory over, push every file separately.
-  for file_path in os.listdir(local_path):
-    current_response = copy_file_to_device(
-        convert_to_posix_path(local_path, file_path),
-        convert_to_posix_path(remote_path, os.path.basename(file_path)),
-        env,
-        timeout_sec,
+    return copy_file_to_device(
+        local_path, remote_path, env, timeout_sec, batch=batch
     )
-    if current_response.status != adb_pb2.AdbResponse.OK:
-      return current_response
-    response = current_response
 
+  # Copying a directory over, as one tar stream.
+  entries = sorted(os.listdir(local_path))
+  if not entries:
+    return response
+  return push_files(
+      [convert_to_posix_path(local_path, entry) for entry in entries],
+      remote_path,
+      env,
+      timeout_sec,
+      batch=batch,
+  )
+
+
+def _owned_by_root(info: tarfile.TarInfo) -> tarfile.TarInfo:
+  """Drops the local owner, so that root extracts files as its own."""
+  info.uid = info.gid = 0
+  info.uname = info.gname = ""
+  return info
+
+
+def _tar_archive(local_paths: Collection[str]) -> bytes:
+  """Returns a tar archive of files and directories, by their base names."""
+  buffer = io.BytesIO()
+  with tarfile.open(fileobj=buffer, mode="w") as tar:
+    for path in local_paths:
+      tar.add(
+          path,
+          arcname=os.path.basename(os.path.normpath(path)),
+          filter=_owned_by_root,
+      )
+  return buffer.getvalue()
+
+
+def _unpack_command(
+    remote_archive: str,
+    remote_directory: str,
+    names: Collection[str],
+    mode: Optional[str],
+    owner: Optional[str],
+    restorecon: bool,
+) -> str:
+  """Returns a command extracting an archive and fixing its files."""
+  targets = " ".join(
+      shlex.quote(convert_to_posix_path(remote_directory, name))
+      for name in names
+  )
+  # Running as root, tar would restore the archive's owners, which fails on
+  # FUSE-backed storage such as /storage/emulated/0; `owner` sets them instead.
+  steps = [
+      f"mkdir -p {shlex.quote(remote_directory)}",
+      f"tar -xof {shlex.quote(remote_archive)} -C"
+      f" {shlex.quote(remote_directory)}",
+  ]
+  if mode is not None:
+    steps.append(f"chmod -R {mode} {targets}")
+  if owner is not None:
+    steps.append(f"chown -R {shlex.quote(owner)} {targets}")
+  if restorecon:
+    steps.append(f"restorecon -R {targets}")
+  return (
+      f"{' && '.join(steps)}; status=$?;"
+      f" rm -f {shlex.quote(remote_archive)}; exit $status"
+  )
+
+
+def push_files(
+    local_paths: Collection[str],
+    remote_directory: str,
+    env: env_interface.AndroidEnvInterface,
+    timeout_sec: Optional[float] = None,
+    mode: Optional[str] = "777",
+    owner: Optional[str] = None,
+    restorecon: bool = False,
+    batch: Optional[adb_utils.CommandBatch] = None,
+) -> adb_pb2.AdbResponse:
+  """Pushes files and directories into a remote directory as one tar stream.
+
+  The files are archived in memory and pushed with a single adb call. One
+  shell command then extracts them, and fixes their permissions, owner and
+  SELinux labels, so that the cost in round trips does not depend on the
+  number of files.
+
+  Args:
+    local_paths: Files and directories to push; directories are pushed
+      recursively. Each lands in `remote_directory` under its base name.
+    remote_directory: The destination directory, created if missing.
+    env: The Android environment interface.
+    timeout_sec: A timeout for the push.
+    mode: Mode given to the pushed files, as for `chmod`; kept from the local
+      files if None.
+    owner: Owner given to the pushed files, as for `chown`, e.g.
+      `u0_a123:u0_a123`.
+    restorecon: Whether to restore the default SELinux labels of the files.
+    batch: If given, the extraction is queued in this batch instead of being
+      issued right away.
+
+  Returns:
+    The response to the push.
+
+  Raises:
+    RuntimeError: If the files could not be extracted on the device.
+  """
+  remote_archive = convert_to_posix_path(
+      _DEVICE_TMP_DIRECTORY,
+      "push_"
+      + "".join(random.choices(string.ascii_lowercase + string.digits, k=12))
+      + ".tar",
+  )
+  response = env.execute_adb_call(
+      adb_pb2.AdbRequest(
+          push=adb_pb2.AdbRequest.Push(
+              content=_tar_archive(local_paths), path=remote_archive
+          ),
+          timeout_sec=timeout_sec,
+      )
+  )
+  if response.status != adb_pb2.AdbResponse.OK:
+    return response
+  command = _unpack_command(
+      remote_archive,
+      remote_directory,
+      [os.path.basename(os.path.normpath(path)) for path in local_paths],
+      mode,
+      owner,
+      restorecon,
+  )
+  if batch is not None:
+    batch.add(command)
+  else:
+    commands = adb_utils.batch(env)
+    commands.add(command)
+    commands.run().check_ok(f"Failed to push files to {remote_directory}.")
   return response
 
 
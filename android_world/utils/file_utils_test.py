@@ -15,6 +15,7 @@
 import datetime
 import os
 import shutil
+import subprocess
 import tempfile
 from unittest import mock
 
@@ -135,6 +136,63 @@ class FilesTest(parameterized.TestCase):
       ):
         pass
 
+  def _run_exec_out_locally(self, args, env, timeout_sec=None):
+    """Runs `exec-out` commands on the host, as if it was the device."""
+    del env, timeout_sec
+    if args[0] != 'exec-out':
+      return adb_pb2.AdbResponse(
+          status=adb_pb2.AdbResponse.Status.OK,
+          generic=adb_pb2.AdbResponse.GenericResponse(output=b'root'),
+      )
+    result = subprocess.run(
+        ['sh', '-c', args[1]], capture_output=True, check=False
+    )
+    return adb_pb2.AdbResponse(
+        status=adb_pb2.AdbResponse.Status.OK,
+        generic=adb_pb2.AdbResponse.GenericResponse(output=result.stdout),
+    )
+
+  def test_tmp_directory_from_device_bulk(self):
+    device_dir = self.enter_context(tempfile.TemporaryDirectory())
+    os.mkdir(os.path.join(device_dir, 'subdir'))
+    for name in ('app.db', 'app.db-wal', 'other.db', 'subdir/app.db-x'):
+      create_file_with_contents(
+          os.path.join(device_dir, name), name.encode()
+      )
+    self.mock_issue_generic_request.side_effect = self._run_exec_out_locally
+
+    with file_utils.tmp_directory_from_device(
+        device_dir, self.mock_env, bulk=True, pattern='app.db*'
+    ) as tmp_directory:
+      self.assertCountEqual(os.listdir(tmp_directory), ['app.db', 'app.db-wal'])
+      with open(os.path.join(tmp_directory, 'app.db-wal'), 'rb') as f:
+        self.assertEqual(f.read(), b'app.db-wal')
+
+    self.mock_env.execute_adb_call.assert_not_called()
+    # Root check and the tar stream.
+    self.assertEqual(self.mock_issue_generic_request.call_count, 2)
+    self.assertFalse(os.path.exists(tmp_directory))
+
+  @mock.patch.object(file_utils, 'check_directory_exists')
+  def test_tmp_directory_from_device_bulk_without_matches(
+      self, mock_check_directory_exists
+  ):
+    device_dir = self.enter_context(tempfile.TemporaryDirectory())
+    self.mock_issue_generic_request.side_effect = self._run_exec_out_locally
+    mock_check_directory_exists.return_value = True
+
+    with file_utils.tmp_directory_from_device(
+        device_dir, self.mock_env, bulk=True, pattern='app.db*'
+    ) as tmp_directory:
+      self.assertEmpty(os.listdir(tmp_directory))
+
+    mock_check_directory_exists.return_value = False
+    with self.assertRaises(FileNotFoundError):
+      with file_utils.tmp_directory_from_device(
+          '/nonexistent/dir', self.mock_env, bulk=True
+      ):
+        pass
+
   def test_copy_data_to_device_copies_file(self):
     """Test if copy_data_to_device correctly copies a single file."""
     file_contents = b'test file contents'
@@ -142,12 +200,11 @@ class FilesTest(parameterized.TestCase):
     self.mock_env.execute_adb_call.return_value = mock_response
     temp_dir = tempfile.mkdtemp()
     file_name = 'file1.txt'
-    create_file_with_contents(
-        file_utils.convert_to_posix_path(temp_dir, file_name), file_contents
-    )
+    local_file = file_utils.convert_to_posix_path(temp_dir, file_name)
+    create_file_with_contents(local_file, file_contents)
 
     response = file_utils.copy_data_to_device(
-        temp_dir, '/remote/dir', self.mock_env
+        local_file, '/remote/dir', self.mock_env
     )
     self.mock_env.execute_adb_call.assert_has_calls(
         [
@@ -168,42 +225,109 @@ class FilesTest(parameterized.TestCase):
 
     self.assertEqual(response, mock_response)
 
+  def _push_locally(self, request):
+    """Writes pushed files on the host, as if it was the device."""
+    with open(request.push.path, 'wb') as f:
+      f.write(request.push.content)
+    return adb_pb2.AdbResponse(status=adb_pb2.AdbResponse.Status.OK)
+
+  def _run_shell_locally(self, args, env, timeout_sec=None):
+    del env, timeout_sec
+    result = subprocess.run(
+        ['sh', '-c', args[1]], capture_output=True, check=False
+    )
+    return adb_pb2.AdbResponse(
+        status=adb_pb2.AdbResponse.Status.OK,
+        generic=adb_pb2.AdbResponse.GenericResponse(output=result.stdout),
+    )
+
+  def _fake_device(self) -> str:
+    """Runs pushes and shell commands on the host; returns the tmp dir."""
+    device_tmp = self.enter_context(tempfile.TemporaryDirectory())
+    self.enter_context(
+        mock.patch.object(file_utils, '_DEVICE_TMP_DIRECTORY', device_tmp)
+    )
+    self.mock_env.execute_adb_call.side_effect = self._push_locally
+    self.mock_issue_generic_request.side_effect = self._run_shell_locally
+    return device_tmp
+
   def test_copy_data_to_device_copies_full_dir(self):
-    """Test if copy_data_to_device correctly copies data from a directory."""
-    file_contents = b'test file contents'
-    mock_response = adb_pb2.AdbResponse(status=adb_pb2.AdbResponse.Status.OK)
-    self.mock_env.execute_adb_call.return_value = mock_response
-    temp_dir = tempfile.mkdtemp()
-    file_names = ['file1.txt', 'file2.txt']
-    for file_name in file_names:
+    """Test if copy_data_to_device copies a directory as one tar stream."""
+    device_tmp = self._fake_device()
+    local_dir = self.enter_context(tempfile.TemporaryDirectory())
+    os.mkdir(os.path.join(local_dir, 'subdir'))
+    for file_name in ('file1.txt', 'file2.txt', 'subdir/file3.txt'):
       create_file_with_contents(
-          file_utils.convert_to_posix_path(temp_dir, file_name), file_contents
+          os.path.join(local_dir, file_name), file_name.encode()
       )
+    remote_dir = os.path.join(
+        self.enter_context(tempfile.TemporaryDirectory()), 'remote'
+    )
 
     response = file_utils.copy_data_to_device(
-        temp_dir, '/remote/dir', self.mock_env
+        local_dir, remote_dir, self.mock_env
     )
-    calls = []
-    for file_name in file_names:
-      calls.append(
-          mock.call(
-              adb_pb2.AdbRequest(
-                  push=adb_pb2.AdbRequest.Push(
-                      content=file_contents,
-                      path=file_utils.convert_to_posix_path(
-                          '/remote/dir/', file_name
-                      ),
-                  ),
-                  timeout_sec=None,
-              )
-          )
+
+    self.assertEqual(response.status, adb_pb2.AdbResponse.Status.OK)
+    self.mock_env.execute_adb_call.assert_called_once()
+    self.mock_issue_generic_request.assert_called_once()
+    self.assertCountEqual(
+        os.listdir(remote_dir), ['file1.txt', 'file2.txt', 'subdir']
+    )
+    remote_file = os.path.join(remote_dir, 'subdir', 'file3.txt')
+    with open(remote_file, 'rb') as f:
+      self.assertEqual(f.read(), b'subdir/file3.txt')
+    self.assertEqual(os.stat(remote_file).st_mode & 0o777, 0o777)
+    # The archive is removed once extracted.
+    self.assertEmpty(os.listdir(device_tmp))
+
+  def test_push_files_queues_fixes_in_batch(self):
+    self._fake_device()
+    local_dir = self.enter_context(tempfile.TemporaryDirectory())
+    local_file = os.path.join(local_dir, "it's a.txt")
+    create_file_with_contents(local_file, b'a')
+    remote_dir = self.enter_context(tempfile.TemporaryDirectory())
+
+    with adb_utils.batch(self.mock_env) as commands:
+      file_utils.push_files(
+          [local_file],
+          remote_dir,
+          self.mock_env,
+          mode='640',
+          batch=commands,
       )
-    self.mock_env.execute_adb_call.assert_has_calls(
-        calls,
-        any_order=True,
+      self.assertFalse(os.path.exists(os.path.join(remote_dir, "it's a.txt")))
+
+    commands.result.check_ok()
+    self.assertEqual(
+        os.stat(os.path.join(remote_dir, "it's a.txt")).st_mode & 0o777, 0o640
     )
 
-    self.assertEqual(response, mock_response)
+  def test_push_files_does_not_restore_archive_owners(self):
+    self._fake_device()
+    local_file = os.path.join(
+        self.enter_context(tempfile.TemporaryDirectory()), 'a.txt'
+    )
+    create_file_with_contents(local_file, b'a')
+    remote_dir = self.enter_context(tempfile.TemporaryDirectory())
+
+    file_utils.push_files([local_file], remote_dir, self.mock_env)
+
+    script = self.mock_issue_generic_request.call_args.args[0][1]
+    self.assertIn('tar -xof ', script)
+    self.assertTrue(os.path.exists(os.path.join(remote_dir, 'a.txt')))
+
+  def test_push_files_raises_if_extraction_fails(self):
+    self._fake_device()
+    local_file = os.path.join(
+        self.enter_context(tempfile.TemporaryDirectory()), 'a.txt'
+    )
+    create_file_with_contents(local_file, b'a')
+
+    with self.assertRaises(RuntimeError):
+      file_utils.push_files(
+          [local_file], '/proc/not/writable', self.mock_env
+      )
 
   def test_copy_data_to_device_file_not_found(self):
     """Test if copy_data_to_device handles errors."""
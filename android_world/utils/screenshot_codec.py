@@ -0,0 +1,274 @@
+# Copyright 2025 The android_world Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Binary encodings for transporting screenshots over HTTP.
+
+Screenshots are sent as a single binary body plus a few headers describing the
+array, instead of a JSON list of integers. Supported encodings are raw `uint8`
+bytes (cheapest to encode, largest on the wire), lossless PNG and lossy
+JPEG/WebP. Frames can optionally be downscaled before encoding.
+"""
+
+import base64
+import dataclasses
+import enum
+from typing import Any, Mapping, Optional
+
+import cv2
+import numpy as np
+
+
+class Encoding(enum.Enum):
+  """Wire format of an encoded screenshot."""
+
+  RAW = 'raw'
+  PNG = 'png'
+  JPEG = 'jpeg'
+  WEBP = 'webp'
+
+
+MEDIA_TYPES = {
+    Encoding.RAW: 'application/octet-stream',
+    Encoding.PNG: 'image/png',
+    Encoding.JPEG: 'image/jpeg',
+    Encoding.WEBP: 'image/webp',
+}
+
+# Headers attached to every encoded screenshot.
+HEADER_ENCODING = 'X-Screenshot-Encoding'
+HEADER_SHAPE = 'X-Screenshot-Shape'
+HEADER_DTYPE = 'X-Screenshot-Dtype'
+# Shape of the frame on the device, before any downscaling.
+HEADER_ORIGINAL_SHAPE = 'X-Screenshot-Original-Shape'
+
+DEFAULT_QUALITY = 90
+
+_LOSSY_ENCODINGS = (Encoding.JPEG, Encoding.WEBP)
+_CV2_EXTENSIONS = {
+    Encoding.PNG: '.png',
+    Encoding.JPEG: '.jpg',
+    Encoding.WEBP: '.webp',
+}
+
+
+@dataclasses.dataclass(frozen=True)
+class EncodedScreenshot:
+  """A screenshot encoded for transport.
+
+  Attributes:
+    data: The encoded bytes.
+    encoding: The encoding used for `data`.
+    shape: Shape of the (possibly downscaled) array that `data` decodes to.
+    original_shape: Shape of the frame before downscaling.
+  """
+
+  data: bytes
+  encoding: Encoding
+  shape: tuple[int, ...]
+  original_shape: tuple[int, ...]
+
+  @property
+  def media_type(self) -> str:
+    return MEDIA_TYPES[self.encoding]
+
+  @property
+  def headers(self) -> dict[str, str]:
+    """Returns the HTTP headers describing this screenshot."""
+    return {
+        HEADER_ENCODING: self.encoding.value,
+        HEADER_SHAPE: _format_shape(self.shape),
+        HEADER_DTYPE: 'uint8',
+        HEADER_ORIGINAL_SHAPE: _format_shape(self.original_shape),
+    }
+
+  def to_json_dict(self) -> dict[str, Any]:
+    """Returns a JSON-serializable form, for embedding in JSON responses."""
+    return {
+        'data': base64.b64encode(self.data).decode('ascii'),
+        'headers': self.headers,
+    }
+
+
+def _format_shape(shape: tuple[int, ...]) -> str:
+  return ','.join(str(d) for d in shape)
+
+
+def _parse_shape(value: str) -> tuple[int, ...]:
+  return tuple(int(d) for d in value.split(','))
+
+
+def parse_encoding(value: str) -> Encoding:
+  """Parses an encoding name, accepting common aliases like "jpg".
+
+  Args:
+    value: The encoding name or media type.
+
+  Returns:
+    The matching encoding.
+
+  Raises:
+    ValueError: If the value does not name a supported encoding.
+  """
+  value = value.strip().lower()
+  if value == 'jpg':
+    value = Encoding.JPEG.value
+  for encoding, media_type in MEDIA_TYPES.items():
+    if value in (encoding.value, media_type):
+      return encoding
+  raise ValueError(
+      f'Unsupported screenshot encoding: {value}. Must be one of'
+      f' {[e.value for e in Encoding]}.'
+  )
+
+
+def negotiate_encoding(
+    accept_header: Optional[str], default: Encoding = Encoding.PNG
+) -> Encoding:
+  """Picks an encoding from an HTTP Accept header.
+
+  The first supported media type, in order of preference given by the client's
+  q-values, is chosen. Wildcards and unknown types fall back to `default`.
+
+  Args:
+    accept_header: Value of the Accept header, if any.
+    default: Encoding to use when nothing more specific is requested.
+
+  Returns:
+    The negotiated encoding.
+  """
+  if not accept_header:
+    return default
+  candidates = []
+  for position, part in enumerate(accept_header.split(',')):
+    fields = part.strip().split(';')
+    media_type = fields[0].strip().lower()
+    q = 1.0
+    for param in fields[1:]:
+      key, _, value = param.strip().partition('=')
+      if key == 'q':
+        try:
+          q = float(value)
+        except ValueError:
+          q = 0.0
+    candidates.append((-q, position, media_type))
+  for neg_q, _, media_type in sorted(candidates):
+    if neg_q == 0:
+      continue
+    try:
+      return parse_encoding(media_type)
+    except ValueError:
+      continue
+  return default
+
+
+def _downscale(pixels: np.ndarray, scale: float) -> np.ndarray:
+  """Downscales an image by `scale`, using area interpolation."""
+  if not 0 < scale <= 1:
+    raise ValueError(f'Scale must be in (0, 1], got {scale}.')
+  if scale == 1:
+    return pixels
+  height, width = pixels.shape[:2]
+  new_size = (max(1, round(width * scale)), max(1, round(height * scale)))
+  return cv2.resize(pixels, new_size, interpolation=cv2.INTER_AREA)
+
+
+def encode(
+    pixels: np.ndarray,
+    encoding: Encoding = Encoding.PNG,
+    quality: int = DEFAULT_QUALITY,
+    scale: float = 1.0,
+) -> EncodedScreenshot:
+  """Encodes an RGB screenshot for transport.
+
+  Args:
+    pixels: RGB (or single channel) screenshot.
+    encoding: The encoding to use.
+    quality: Quality in [1, 100] for lossy encodings; ignored otherwise.
+    scale: Downscale factor in (0, 1] applied before encoding.
+
+  Returns:
+    The encoded screenshot.
+
+  Raises:
+    ValueError: If the arguments are invalid or encoding fails.
+  """
+  if not 1 <= quality <= 100:
+    raise ValueError(f'Quality must be in [1, 100], got {quality}.')
+  original_shape = tuple(pixels.shape)
+  pixels = _downscale(np.asarray(pixels, dtype=np.uint8), scale)
+  shape = tuple(pixels.shape)
+
+  if encoding == Encoding.RAW:
+    data = np.ascontiguousarray(pixels).tobytes()
+  else:
+    if pixels.ndim == 3 and pixels.shape[2] == 3:
+      pixels = cv2.cvtColor(pixels, cv2.COLOR_RGB2BGR)
+    params = []
+    if encoding == Encoding.JPEG:
+      params = [cv2.IMWRITE_JPEG_QUALITY, quality]
+    elif encoding == Encoding.WEBP:
+      params = [cv2.IMWRITE_WEBP_QUALITY, quality]
+    elif encoding == Encoding.PNG:
+      # Level 1 is several times faster than the default with a small size
+      # penalty; screenshots are mostly flat UI so they compress well anyway.
+      params = [cv2.IMWRITE_PNG_COMPRESSION, 1]
+    ok, buffer = cv2.imencode(_CV2_EXTENSIONS[encoding], pixels, params)
+    if not ok:
+      raise ValueError(f'Failed to encode screenshot as {encoding.value}.')
+    data = buffer.tobytes()
+
+  return EncodedScreenshot(
+      data=data,
+      encoding=encoding,
+      shape=shape,
+      original_shape=original_shape,
+  )
+
+
+def decode(data: bytes, headers: Mapping[str, str]) -> np.ndarray:
+  """Decodes an encoded screenshot into an RGB `uint8` array.
+
+  Args:
+    data: The encoded bytes.
+    headers: The headers produced by `EncodedScreenshot.headers`. Lookups are
+      done case-insensitively when `headers` supports it (e.g. `requests`).
+
+  Returns:
+    The decoded screenshot.
+
+  Raises:
+    ValueError: If the data cannot be decoded.
+  """
+  encoding = parse_encoding(headers[HEADER_ENCODING])
+  shape = _parse_shape(headers[HEADER_SHAPE])
+
+  if encoding == Encoding.RAW:
+    return np.frombuffer(data, dtype=np.uint8).reshape(shape)
+
+  flag = cv2.IMREAD_UNCHANGED
+  pixels = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), flag)
+  if pixels is None:
+    raise ValueError(f'Failed to decode {encoding.value} screenshot.')
+  if pixels.ndim == 3 and pixels.shape[2] == 3:
+    pixels = cv2.cvtColor(pixels, cv2.COLOR_BGR2RGB)
+  return pixels.reshape(shape)
+
+
+def decode_json_dict(value: Mapping[str, Any]) -> np.ndarray:
+  """Decodes a screenshot produced by `EncodedScreenshot.to_json_dict`."""
+  return decode(base64.b64decode(value['data']), value['headers'])
+
+
+def is_lossless(encoding: Encoding) -> bool:
+  return encoding not in _LOSSY_ENCODINGS
@@ -0,0 +1,129 @@
+# Copyright 2025 The android_world Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from absl.testing import absltest
+from absl.testing import parameterized
+from android_world.utils import screenshot_codec
+import numpy as np
+
+
+def _make_screenshot(height: int = 64, width: int = 32) -> np.ndarray:
+  """Returns a screenshot-like image made of flat colored bands."""
+  pixels = np.zeros((height, width, 3), dtype=np.uint8)
+  pixels[: height // 2] = (255, 0, 0)
+  pixels[height // 2 :, : width // 2] = (0, 128, 255)
+  pixels[height // 2 :, width // 2 :] = (20, 200, 40)
+  return pixels
+
+
+class ScreenshotCodecTest(parameterized.TestCase):
+
+  @parameterized.parameters(
+      screenshot_codec.Encoding.RAW, screenshot_codec.Encoding.PNG
+  )
+  def test_lossless_round_trip(self, encoding):
+    pixels = _make_screenshot()
+
+    encoded = screenshot_codec.encode(pixels, encoding)
+    decoded = screenshot_codec.decode(encoded.data, encoded.headers)
+
+    self.assertTrue(screenshot_codec.is_lossless(encoding))
+    self.assertEqual(decoded.dtype, np.uint8)
+    np.testing.assert_array_equal(decoded, pixels)
+
+  @parameterized.parameters(
+      screenshot_codec.Encoding.JPEG, screenshot_codec.Encoding.WEBP
+  )
+  def test_lossy_round_trip_is_close(self, encoding):
+    pixels = _make_screenshot()
+
+    encoded = screenshot_codec.encode(pixels, encoding, quality=95)
+    decoded = screenshot_codec.decode(encoded.data, encoded.headers)
+
+    self.assertEqual(decoded.shape, pixels.shape)
+    # Checks the mean error only; block artifacts appear at color edges.
+    error = np.abs(decoded.astype(int) - pixels.astype(int)).mean()
+    self.assertLess(error, 8)
+
+  def test_downscale_reports_both_shapes(self):
+    pixels = _make_screenshot(height=64, width=32)
+
+    encoded = screenshot_codec.encode(
+        pixels, screenshot_codec.Encoding.RAW, scale=0.5
+    )
+    decoded = screenshot_codec.decode(encoded.data, encoded.headers)
+
+    self.assertEqual(decoded.shape, (32, 16, 3))
+    self.assertEqual(
+        encoded.headers[screenshot_codec.HEADER_ORIGINAL_SHAPE], '64,32,3'
+    )
+    self.assertEqual(encoded.headers[screenshot_codec.HEADER_SHAPE], '32,16,3')
+
+  def test_json_dict_round_trip(self):
+    pixels = _make_screenshot()
+
+    encoded = screenshot_codec.encode(pixels, screenshot_codec.Encoding.PNG)
+    decoded = screenshot_codec.decode_json_dict(encoded.to_json_dict())
+
+    np.testing.assert_array_equal(decoded, pixels)
+
+  def test_raw_is_smaller_than_json(self):
+    pixels = _make_screenshot()
+
+    encoded = screenshot_codec.encode(pixels, screenshot_codec.Encoding.RAW)
+
+    self.assertLess(len(encoded.data), len(str(pixels.tolist())))
+
+  @parameterized.parameters(
+      dict(quality=0, scale=1.0),
+      dict(quality=101, scale=1.0),
+      dict(quality=90, scale=0.0),
+      dict(quality=90, scale=1.5),
+  )
+  def test_invalid_arguments_raise(self, quality, scale):
+    with self.assertRaises(ValueError):
+      screenshot_codec.encode(
+          _make_screenshot(),
+          screenshot_codec.Encoding.JPEG,
+          quality=quality,
+          scale=scale,
+      )
+
+  @parameterized.parameters(
+      ('png', screenshot_codec.Encoding.PNG),
+      ('JPG', screenshot_codec.Encoding.JPEG),
+      ('image/webp', screenshot_codec.Encoding.WEBP),
+      ('application/octet-stream', screenshot_codec.Encoding.RAW),
+  )
+  def test_parse_encoding(self, value, expected):
+    self.assertEqual(screenshot_codec.parse_encoding(value), expected)
+
+  def test_parse_unknown_encoding_raises(self):
+    with self.assertRaises(ValueError):
+      screenshot_codec.parse_encoding('gif')
+
+  @parameterized.parameters(
+      (None, screenshot_codec.Encoding.PNG),
+      ('*/*', screenshot_codec.Encoding.PNG),
+      ('image/webp', screenshot_codec.Encoding.WEBP),
+      ('image/png;q=0.5, image/jpeg', screenshot_codec.Encoding.JPEG),
+      ('text/html, application/octet-stream', screenshot_codec.Encoding.RAW),
+      ('image/jpeg;q=0, image/gif', screenshot_codec.Encoding.PNG),
+  )
+  def test_negotiate_encoding(self, accept, expected):
+    self.assertEqual(screenshot_codec.negotiate_encoding(accept), expected)
+
+
+if __name__ == '__main__':
+  absltest.main()
@@ -16,7 +16,7 @@
 
 import random
 import time
-from typing import Any
+from typing import Any, Collection, Optional
 from unittest import mock
 
 from absl.testing import absltest
@@ -226,7 +226,11 @@ class FakeAsyncEnv(interface.AsyncAndroidEnv):
         ui_elements=[],
     )
 
-  def get_state(self, wait_to_stabilize: bool = False) -> interface.State:
+  def get_state(
+      self,
+      wait_to_stabilize: bool = False,
+      components: Optional[Collection[str]] = None,
+  ) -> interface.State:
     return interface.State(
         pixels=(np.random.rand(10, 10, 3) * 255).astype(np.uint8),
         forest=mock.MagicMock(),
@@ -251,3 +255,11 @@ class FakeAsyncEnv(interface.AsyncAndroidEnv):
   @property
   def logical_screen_size(self) -> tuple[int, int]:
     return (100, 100)
+
+  @property
+  def orientation(self) -> int:
+    return adb_utils.get_orientation(self.controller)
+
+  @property
+  def physical_frame_boundary(self) -> tuple[int, int, int, int]:
+    return adb_utils.get_physical_frame_boundary(self.controller)
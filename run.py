@@ -36,6 +36,7 @@ from android_world.agents import m3a
 from android_world.agents import random_agent
 from android_world.agents import seeact
 from android_world.agents import t3a
+from android_world.env import emulator_snapshots
 from android_world.env import env_launcher
 from android_world.env import interface
 
@@ -130,6 +131,23 @@ _OUTPUT_PATH = flags.DEFINE_string(
 # Agent specific.
 _AGENT_NAME = flags.DEFINE_string('agent_name', 'm3a_gpt4v', help='Agent name.')
 
+_EMULATOR_SNAPSHOT_RESET = flags.DEFINE_boolean(
+    'emulator_snapshot_reset',
+    False,
+    'Whether to reset the device for each task by loading a quickboot snapshot'
+    ' of its starting state, saved the first time the state is reached,'
+    ' instead of restoring app data file by file. Requires an emulator; the'
+    ' snapshots are deleted at the end of the run.',
+)
+
+_TRACK_APP_STATE = flags.DEFINE_boolean(
+    'track_app_state',
+    False,
+    'Whether to skip restoring the snapshot of an app whose data has not'
+    ' changed since it was last restored. Saves a restore per app shared by'
+    ' consecutive tasks, but an undetected change leaks into the next task.',
+)
+
 _FIXED_TASK_SEED = flags.DEFINE_boolean(
     'fixed_task_seed',
     False,
@@ -213,6 +231,15 @@ def _main() -> None:
   )
   suite.suite_family = _SUITE_FAMILY.value
 
+  reset_backend = None
+  if _EMULATOR_SNAPSHOT_RESET.value:
+    reset_backend = emulator_snapshots.EmulatorSnapshotReset(
+        env.controller.snapshot_service()
+    )
+    env.controller.set_reset_backend(reset_backend)
+  if _TRACK_APP_STATE.value:
+    env.controller.enable_app_state_tracking()
+
   agent = _get_agent(env, _SUITE_FAMILY.value)
 
   if _SUITE_FAMILY.value.startswith('miniwob'):
@@ -240,6 +267,8 @@ def _main() -> None:
       f'Finished running agent {_AGENT_NAME.value} on {_SUITE_FAMILY.value}'
       f' family. Wrote to {checkpoint_dir}.'
   )
+  if reset_backend is not None:
+    reset_backend.forget()
   env.close()
 
 
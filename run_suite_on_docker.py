@@ -28,12 +28,14 @@ environment. You'll need to implement your agent logic to interact with the
 environment.
 """
 
+import dataclasses
 import json
 import logging
 import time
 from typing import Any
 
 from android_world.env import json_action
+from android_world.utils import screenshot_codec
 import numpy as np
 import pydantic
 import requests
@@ -49,6 +51,23 @@ class Response(pydantic.BaseModel):
   message: str
 
 
+@dataclasses.dataclass(frozen=True)
+class StepResult:
+  """Observation returned after executing an action.
+
+  Attributes:
+    pixels: RGB screenshot taken after the UI settled.
+    ui_elements: UI elements as dicts; see representation_utils.UIElement.
+    foreground_activity: The activity in the foreground after the action.
+    step_time_sec: Server-side time spent executing and settling.
+  """
+
+  pixels: np.ndarray[Any, Any]
+  ui_elements: list[dict[str, Any]]
+  foreground_activity: str
+  step_time_sec: float
+
+
 class AndroidEnvClient:
   """Client for interacting with the Android environment server."""
 
@@ -68,16 +87,52 @@ class AndroidEnvClient:
     return Response(**response.json())
 
   def get_screenshot(
-      self, wait_to_stabilize: bool = False
+      self,
+      wait_to_stabilize: bool = False,
+      encoding: str = "png",
+      quality: int = screenshot_codec.DEFAULT_QUALITY,
+      scale: float = 1.0,
   ) -> np.ndarray[Any, Any]:
-    """Gets the current screenshot of the environment."""
+    """Gets the current screenshot of the environment.
+
+    The screenshot is fetched from the binary endpoint and decoded directly
+    into a `uint8` array. Servers without the binary endpoint fall back to the
+    JSON endpoint, in which case `encoding`, `quality` and `scale` are ignored.
+
+    Args:
+      wait_to_stabilize: Whether to wait for the screen to stabilize.
+      encoding: One of "raw", "png", "jpeg" or "webp".
+      quality: Quality in [1, 100] for "jpeg" and "webp".
+      scale: Server-side downscale factor in (0, 1].
+
+    Returns:
+      The RGB screenshot.
+    """
+    response = requests.get(
+        f"{self.base_url}/screenshot/binary",
+        params={
+            "wait_to_stabilize": wait_to_stabilize,
+            "encoding": encoding,
+            "quality": quality,
+            "scale": scale,
+        },
+    )
+    if response.status_code == 404:
+      return self._get_screenshot_json(wait_to_stabilize)
+    response.raise_for_status()
+    return screenshot_codec.decode(response.content, response.headers)
+
+  def _get_screenshot_json(
+      self, wait_to_stabilize: bool
+  ) -> np.ndarray[Any, Any]:
+    """Gets the screenshot from the legacy JSON endpoint."""
     response = requests.get(
         f"{self.base_url}/screenshot",
         params={"wait_to_stabilize": wait_to_stabilize},
     )
     response.raise_for_status()
     image = response.json()
-    return np.array(image["pixels"])
+    return np.array(image["pixels"], dtype=np.uint8)
 
   def execute_action(
       self,
@@ -91,6 +146,69 @@ class AndroidEnvClient:
     response.raise_for_status()
     return Response(**response.json())
 
+  def step(
+      self,
+      action: json_action.JSONAction,
+      wait_to_stabilize: bool = True,
+      stability_timeout_sec: float = 6.0,
+      encoding: str = "png",
+      quality: int = screenshot_codec.DEFAULT_QUALITY,
+      scale: float = 1.0,
+      include_ui_elements: bool = True,
+  ) -> StepResult:
+    """Executes an action and returns the next observation in one request.
+
+    Servers without the /step endpoint fall back to /execute_action followed
+    by a fixed wait and a screenshot; UI elements and the foreground activity
+    are then left empty.
+
+    Args:
+      action: The action to execute.
+      wait_to_stabilize: Whether the server waits for the UI to settle.
+      stability_timeout_sec: Maximum time the server waits for the UI to settle.
+      encoding: One of "raw", "png", "jpeg" or "webp".
+      quality: Quality in [1, 100] for "jpeg" and "webp".
+      scale: Server-side downscale factor in (0, 1].
+      include_ui_elements: Whether to return UI elements.
+
+    Returns:
+      The observation after the action.
+    """
+    print(f"Executing action: {action.json_str()}")
+    response = requests.post(
+        f"{self.base_url}/step",
+        json={
+            "action": json.loads(action.json_str()),
+            "wait_to_stabilize": wait_to_stabilize,
+            "stability_timeout_sec": stability_timeout_sec,
+            "encoding": encoding,
+            "quality": quality,
+            "scale": scale,
+            "include_ui_elements": include_ui_elements,
+        },
+    )
+    if response.status_code == 404:
+      start = time.time()
+      self.execute_action(action)
+      time.sleep(2)
+      return StepResult(
+          pixels=self.get_screenshot(
+              encoding=encoding, quality=quality, scale=scale
+          ),
+          ui_elements=[],
+          foreground_activity="",
+          step_time_sec=time.time() - start,
+      )
+    response.raise_for_status()
+    result = response.json()
+    observation = result["observation"]
+    return StepResult(
+        pixels=screenshot_codec.decode_json_dict(observation["screenshot"]),
+        ui_elements=observation["ui_elements"],
+        foreground_activity=observation["foreground_activity"],
+        step_time_sec=result["step_time_sec"],
+    )
+
   def get_suite_task_list(self, max_index: int) -> list[str]:
     """Gets the list of tasks in the suite."""
     response = requests.get(
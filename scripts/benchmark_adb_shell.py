@@ -0,0 +1,93 @@
+# Copyright 2025 The android_world Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Benchmarks per-command latency of adb shell commands.
+
+Compares adb_utils.issue_generic_request spawning one adb process per command
+against running the same commands in a persistent shell session (see
+adb_shell.py), on a running emulator.
+
+python scripts/benchmark_adb_shell.py --console_port=5554
+"""
+
+from collections.abc import Sequence
+import statistics
+import time
+from typing import Callable
+
+from absl import app
+from absl import flags
+from android_world.env import adb_utils
+from android_world.env import android_world_controller
+
+_ADB_PATH = flags.DEFINE_string(
+    'adb_path', android_world_controller.DEFAULT_ADB_PATH, 'Path to adb.'
+)
+_CONSOLE_PORT = flags.DEFINE_integer(
+    'console_port', 5554, 'Console port of the emulator.'
+)
+_GRPC_PORT = flags.DEFINE_integer('grpc_port', 8554, 'gRPC port of the emulator.')
+_REPEATS = flags.DEFINE_integer('repeats', 20, 'Repetitions per command.')
+
+# Commands typical of task initialization.
+_COMMANDS = (
+    ['shell', 'true'],
+    ['shell', 'settings', 'get', 'global', 'airplane_mode_on'],
+    ['shell', 'ls', '/sdcard'],
+    ['shell', 'pm', 'path', 'com.android.settings'],
+    ['shell', 'dumpsys', 'window', '|', 'grep', 'mCurrentRotation'],
+)
+
+
+def _time_ms(fn: Callable[[], object], repeats: int) -> float:
+  """Returns the median latency of `fn` in milliseconds."""
+  timings = []
+  for _ in range(repeats):
+    start = time.perf_counter()
+    fn()
+    timings.append((time.perf_counter() - start) * 1000)
+  return statistics.median(timings)
+
+
+def main(argv: Sequence[str]) -> None:
+  if len(argv) > 1:
+    raise app.UsageError('Too many command-line arguments.')
+
+  controller = android_world_controller.get_controller(
+      console_port=_CONSOLE_PORT.value,
+      adb_path=_ADB_PATH.value,
+      grpc_port=_GRPC_PORT.value,
+  )
+  print(f'{"command":<48} {"spawn":>10} {"persistent":>12} {"speedup":>8}')
+  for command in _COMMANDS:
+    controller.disable_persistent_shell()
+    spawn = _time_ms(
+        lambda c=command: adb_utils.issue_generic_request(c, controller),
+        _REPEATS.value,
+    )
+    shell = controller.enable_persistent_shell()
+    persistent = _time_ms(
+        lambda c=command: adb_utils.issue_generic_request(c, controller),
+        _REPEATS.value,
+    )
+    print(
+        f'{" ".join(command[1:])[:48]:<48} {spawn:>7.1f} ms'
+        f' {persistent:>9.1f} ms {spawn / persistent:>7.1f}x'
+    )
+  print(f'Persistent shell: {shell.stats}')
+  controller.close()
+
+
+if __name__ == '__main__':
+  app.run(main)
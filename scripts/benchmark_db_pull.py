@@ -0,0 +1,106 @@
+# Copyright 2025 The android_world Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Benchmarks pulling app databases from the device.
+
+Compares file_utils.tmp_directory_from_device pulling each file of a database
+directory with its own adb call against streaming the database and its `-wal`
+and `-shm` files as one tar archive, on a running emulator with the apps
+installed and opened once.
+
+python scripts/benchmark_db_pull.py --console_port=5554
+"""
+
+from collections.abc import Sequence
+import os
+import statistics
+import time
+from typing import Callable
+
+from absl import app
+from absl import flags
+from android_world.env import android_world_controller
+from android_world.utils import file_utils
+
+_ADB_PATH = flags.DEFINE_string(
+    'adb_path', android_world_controller.DEFAULT_ADB_PATH, 'Path to adb.'
+)
+_CONSOLE_PORT = flags.DEFINE_integer(
+    'console_port', 5554, 'Console port of the emulator.'
+)
+_GRPC_PORT = flags.DEFINE_integer('grpc_port', 8554, 'gRPC port of the emulator.')
+_REPEATS = flags.DEFINE_integer('repeats', 10, 'Repetitions per database.')
+
+# Databases read by the Broccoli, Expense and Tasks validators.
+_DATABASES = {
+    'broccoli': '/data/data/com.flauschcode.broccoli/databases/broccoli',
+    'expense': '/data/data/com.arduia.expense/databases/accounting.db',
+    'tasks': '/data/data/org.tasks/databases/database',
+}
+
+
+def _time_ms(fn: Callable[[], object], repeats: int) -> float:
+  """Returns the median latency of `fn` in milliseconds."""
+  timings = []
+  for _ in range(repeats):
+    start = time.perf_counter()
+    fn()
+    timings.append((time.perf_counter() - start) * 1000)
+  return statistics.median(timings)
+
+
+def _pull(
+    db_path: str,
+    env: android_world_controller.AndroidWorldController,
+    bulk: bool,
+) -> int:
+  """Pulls the directory of `db_path`, returning the number of files."""
+  directory, file_name = os.path.split(db_path)
+  with file_utils.tmp_directory_from_device(
+      directory, env, bulk=bulk, pattern=f'{file_name}*' if bulk else None
+  ) as local_directory:
+    return len(os.listdir(local_directory))
+
+
+def main(argv: Sequence[str]) -> None:
+  if len(argv) > 1:
+    raise app.UsageError('Too many command-line arguments.')
+
+  controller = android_world_controller.get_controller(
+      console_port=_CONSOLE_PORT.value,
+      adb_path=_ADB_PATH.value,
+      grpc_port=_GRPC_PORT.value,
+  )
+  print(
+      f'{"database":<10} {"files":>11} {"per-file":>11} {"tar":>10}'
+      f' {"speedup":>8}'
+  )
+  for name, db_path in _DATABASES.items():
+    n_files = _pull(db_path, controller, bulk=False)
+    n_matching = _pull(db_path, controller, bulk=True)
+    per_file = _time_ms(
+        lambda p=db_path: _pull(p, controller, bulk=False), _REPEATS.value
+    )
+    tar = _time_ms(
+        lambda p=db_path: _pull(p, controller, bulk=True), _REPEATS.value
+    )
+    print(
+        f'{name:<10} {n_matching:>4} of {n_files:<4} {per_file:>8.1f} ms'
+        f' {tar:>7.1f} ms {per_file / tar:>7.1f}x'
+    )
+  controller.close()
+
+
+if __name__ == '__main__':
+  app.run(main)
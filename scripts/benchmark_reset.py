@@ -0,0 +1,107 @@
+# Copyright 2025 The android_world Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Benchmarks resetting the device for tasks, file by file or from snapshots.
+
+For each task, compares the reset TaskEval.initialize_task does by default,
+setting the device time and restoring app snapshots, against loading a
+quickboot snapshot of the task's baseline with EmulatorSnapshotReset. The
+first snapshot reset of a baseline prepares it file by file and saves it; its
+latency is reported separately. Run on an emulator with the apps set up:
+
+python scripts/benchmark_reset.py --console_port=5554 --grpc_port=8554 \
+    --tasks=ExpenseDeleteMultiple,MarkorCreateNote,SimpleSmsReply
+"""
+
+from collections.abc import Sequence
+import statistics
+import time
+from typing import Callable
+
+from absl import app
+from absl import flags
+from android_world import registry
+from android_world.env import android_world_controller
+from android_world.env import emulator_snapshots
+from android_world.env import env_launcher
+
+_ADB_PATH = flags.DEFINE_string(
+    'adb_path', android_world_controller.DEFAULT_ADB_PATH, 'Path to adb.'
+)
+_CONSOLE_PORT = flags.DEFINE_integer(
+    'console_port', 5554, 'Console port of the emulator.'
+)
+_GRPC_PORT = flags.DEFINE_integer('grpc_port', 8554, 'gRPC port of the emulator.')
+_TASKS = flags.DEFINE_list(
+    'tasks',
+    ['ExpenseDeleteMultiple', 'MarkorCreateNote', 'SimpleSmsReply'],
+    'Tasks to reset the device for.',
+)
+_REPEATS = flags.DEFINE_integer('repeats', 5, 'Resets per task and backend.')
+
+
+def _time_ms(fn: Callable[[], object], repeats: int) -> float:
+  """Returns the median latency of `fn` in milliseconds."""
+  timings = []
+  for _ in range(repeats):
+    start = time.perf_counter()
+    fn()
+    timings.append((time.perf_counter() - start) * 1000)
+  return statistics.median(timings)
+
+
+def main(argv: Sequence[str]) -> None:
+  if len(argv) > 1:
+    raise app.UsageError('Too many command-line arguments.')
+
+  env = env_launcher.load_and_setup_env(
+      console_port=_CONSOLE_PORT.value,
+      adb_path=_ADB_PATH.value,
+      grpc_port=_GRPC_PORT.value,
+  )
+  controller = env.controller
+  task_registry = registry.TaskRegistry().get_registry(
+      registry.TaskRegistry.ANDROID_WORLD_FAMILY
+  )
+  snapshots = emulator_snapshots.EmulatorSnapshotReset(
+      controller.snapshot_service(), max_baselines=len(_TASKS.value)
+  )
+  print(
+      f'{"task":<28} {"file":>10} {"snapshot":>10} {"speedup":>8}'
+      f' {"first":>10}'
+  )
+  for name in _TASKS.value:
+    task_type = task_registry[name]
+    task = task_type(task_type.generate_random_params())
+    # pylint: disable=protected-access
+    controller.set_reset_backend(None)
+    file_ms = _time_ms(lambda t=task: t._reset_device(env), _REPEATS.value)
+    controller.set_reset_backend(snapshots)
+    first_ms = _time_ms(lambda t=task: t._reset_device(env), 1)
+    snapshot_ms = _time_ms(
+        lambda t=task: t._reset_device(env), _REPEATS.value
+    )
+    # pylint: enable=protected-access
+    print(
+        f'{name:<28} {file_ms:>7.0f} ms {snapshot_ms:>7.0f} ms'
+        f' {file_ms / snapshot_ms:>7.1f}x {first_ms:>7.0f} ms'
+    )
+  print(f'Snapshot reset stats: {snapshots.stats.as_dict()}')
+  snapshots.forget()
+  controller.set_reset_backend(None)
+  env.close()
+
+
+if __name__ == '__main__':
+  app.run(main)
@@ -0,0 +1,82 @@
+# Copyright 2025 The android_world Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Benchmarks the screen capture backends against a running emulator.
+
+Measures the median capture latency of every backend in screen_capture.py at
+each downscale factor, and reports the fastest backend per factor. Pass the
+winner to AndroidWorldController.set_capture_backend, or call
+select_fastest_capture_backend at startup to pick it automatically.
+
+python scripts/benchmark_screen_capture.py --console_port=5554 \
+    --grpc_port=8554 --scales=1.0,0.5,0.25
+"""
+
+from collections.abc import Sequence
+
+from absl import app
+from absl import flags
+from android_world.env import android_world_controller
+from android_world.env import screen_capture
+
+_ADB_PATH = flags.DEFINE_string(
+    'adb_path', android_world_controller.DEFAULT_ADB_PATH, 'Path to adb.'
+)
+_CONSOLE_PORT = flags.DEFINE_integer(
+    'console_port', 5554, 'Console port of the emulator.'
+)
+_GRPC_PORT = flags.DEFINE_integer('grpc_port', 8554, 'gRPC port of the emulator.')
+_SCALES = flags.DEFINE_list('scales', ['1.0', '0.5'], 'Downscale factors.')
+_GRPC_FORMATS = flags.DEFINE_list(
+    'grpc_formats',
+    ['RGB888', 'PNG'],
+    'Image formats to request from the emulator over gRPC.',
+)
+_REPEATS = flags.DEFINE_integer('repeats', 10, 'Captures per measurement.')
+
+
+def main(argv: Sequence[str]) -> None:
+  if len(argv) > 1:
+    raise app.UsageError('Too many command-line arguments.')
+
+  controller = android_world_controller.get_controller(
+      console_port=_CONSOLE_PORT.value,
+      adb_path=_ADB_PATH.value,
+      grpc_port=_GRPC_PORT.value,
+  )
+  backends = controller.capture_backends()
+  backends = [
+      b for b in backends if b.name != screen_capture.EmulatorGrpcBackend.name
+  ]
+  for image_format in _GRPC_FORMATS.value:
+    backend = screen_capture.EmulatorGrpcBackend.connect(
+        _GRPC_PORT.value, image_format=image_format
+    )
+    backend.name = f'{backend.name}:{image_format}'
+    backends.append(backend)
+
+  print(f'{"scale":>6} {"backend":<24} {"latency":>10}')
+  for scale in _SCALES.value:
+    options = screen_capture.CaptureOptions(scale=float(scale))
+    fastest, latencies = screen_capture.select_fastest(
+        backends, options, num_samples=_REPEATS.value
+    )
+    for name, latency in sorted(latencies.items(), key=lambda item: item[1]):
+      print(f'{scale:>6} {name:<24} {latency * 1000:>7.1f} ms')
+    print(f'{scale:>6} fastest: {fastest.name}')
+  controller.close()
+
+
+if __name__ == '__main__':
+  app.run(main)
@@ -0,0 +1,177 @@
+# Copyright 2025 The android_world Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Benchmarks screenshot transport encodings.
+
+Compares the legacy JSON pixel list against the binary encodings in
+screenshot_codec.py, reporting payload size and encode/decode latency.
+
+Offline, using a screenshot saved to disk (or a synthetic frame):
+
+python scripts/benchmark_screenshot_transport.py --image=/tmp/screen.png
+
+Against a running server, measuring the full HTTP round trip:
+
+python scripts/benchmark_screenshot_transport.py \
+    --server_url=http://localhost:5000
+"""
+
+from collections.abc import Sequence
+import json
+import statistics
+import time
+from typing import Callable
+
+from absl import app
+from absl import flags
+from android_world.utils import screenshot_codec
+import cv2
+import numpy as np
+import requests
+
+_IMAGE = flags.DEFINE_string(
+    'image',
+    None,
+    'Path to a screenshot to benchmark. A synthetic 1080x2400 frame is used if'
+    ' not set.',
+)
+_SERVER_URL = flags.DEFINE_string(
+    'server_url',
+    None,
+    'If set, benchmarks the HTTP endpoints of a running android_server.',
+)
+_REPEATS = flags.DEFINE_integer('repeats', 5, 'Repetitions per measurement.')
+_QUALITY = flags.DEFINE_integer('quality', 80, 'Quality for JPEG and WebP.')
+_SCALES = flags.DEFINE_list('scales', ['1.0', '0.5'], 'Downscale factors.')
+
+
+def _synthetic_screenshot(height: int = 2400, width: int = 1080) -> np.ndarray:
+  """Returns a frame resembling a UI: flat regions, text-like noise rows."""
+  rng = np.random.default_rng(0)
+  pixels = np.full((height, width, 3), 245, dtype=np.uint8)
+  pixels[:200] = (33, 150, 243)
+  for top in range(300, height - 100, 160):
+    pixels[top : top + 120, 40 : width - 40] = 255
+    text = rng.integers(0, 2, size=(30, width // 2), dtype=np.uint8) * 200
+    pixels[top + 40 : top + 70, 80 : 80 + width // 2] = text[..., None]
+  return pixels
+
+
+def _load_screenshot() -> np.ndarray:
+  if not _IMAGE.value:
+    return _synthetic_screenshot()
+  pixels = cv2.imread(_IMAGE.value, cv2.IMREAD_COLOR)
+  if pixels is None:
+    raise ValueError(f'Could not read image {_IMAGE.value}.')
+  return cv2.cvtColor(pixels, cv2.COLOR_BGR2RGB)
+
+
+def _time_ms(fn: Callable[[], object], repeats: int) -> float:
+  """Returns the median latency of `fn` in milliseconds."""
+  timings = []
+  for _ in range(repeats):
+    start = time.perf_counter()
+    fn()
+    timings.append((time.perf_counter() - start) * 1000)
+  return statistics.median(timings)
+
+
+def _print_row(name: str, size: int, encode_ms: float, decode_ms: float):
+  print(
+      f'{name:<18} {size / 1e6:>10.3f} MB {encode_ms:>10.1f} ms'
+      f' {decode_ms:>10.1f} ms'
+  )
+
+
+def _benchmark_offline(pixels: np.ndarray, repeats: int) -> None:
+  """Measures encode and decode cost for each encoding in-process."""
+  print(f'Frame shape: {pixels.shape}')
+  print(f'{"encoding":<18} {"size":>13} {"encode":>13} {"decode":>13}')
+
+  json_body = json.dumps({'pixels': pixels.tolist()})
+  _print_row(
+      'json (legacy)',
+      len(json_body),
+      _time_ms(lambda: json.dumps({'pixels': pixels.tolist()}), repeats),
+      _time_ms(
+          lambda: np.array(json.loads(json_body)['pixels'], dtype=np.uint8),
+          repeats,
+      ),
+  )
+
+  for scale in (float(s) for s in _SCALES.value):
+    for encoding in screenshot_codec.Encoding:
+      encode = lambda e=encoding, s=scale: screenshot_codec.encode(
+          pixels, e, quality=_QUALITY.value, scale=s
+      )
+      encoded = encode()
+      _print_row(
+          f'{encoding.value} x{scale:g}',
+          len(encoded.data),
+          _time_ms(encode, repeats),
+          _time_ms(
+              lambda e=encoded: screenshot_codec.decode(e.data, e.headers),
+              repeats,
+          ),
+      )
+
+
+def _benchmark_server(url: str, repeats: int) -> None:
+  """Measures full HTTP round trips, including capture on the server."""
+  print(f'{"endpoint":<18} {"size":>13} {"round trip":>13}')
+
+  def fetch_json() -> int:
+    response = requests.get(
+        f'{url}/screenshot', params={'wait_to_stabilize': False}
+    )
+    response.raise_for_status()
+    np.array(response.json()['pixels'], dtype=np.uint8)
+    return len(response.content)
+
+  def fetch_binary(encoding: str, scale: float) -> int:
+    response = requests.get(
+        f'{url}/screenshot/binary',
+        params={
+            'encoding': encoding,
+            'quality': _QUALITY.value,
+            'scale': scale,
+        },
+    )
+    response.raise_for_status()
+    screenshot_codec.decode(response.content, response.headers)
+    return len(response.content)
+
+  size = fetch_json()
+  latency = _time_ms(fetch_json, repeats)
+  print(f'{"json (legacy)":<18} {size / 1e6:>10.3f} MB {latency:>10.1f} ms')
+  for scale in (float(s) for s in _SCALES.value):
+    for encoding in screenshot_codec.Encoding:
+      fetch = lambda e=encoding.value, s=scale: fetch_binary(e, s)
+      size = fetch()
+      latency = _time_ms(fetch, repeats)
+      name = f'{encoding.value} x{scale:g}'
+      print(f'{name:<18} {size / 1e6:>10.3f} MB {latency:>10.1f} ms')
+
+
+def main(argv: Sequence[str]) -> None:
+  if len(argv) > 1:
+    raise app.UsageError('Too many command-line arguments.')
+  if _SERVER_URL.value:
+    _benchmark_server(_SERVER_URL.value, _REPEATS.value)
+  else:
+    _benchmark_offline(_load_screenshot(), _REPEATS.value)
+
+
+if __name__ == '__main__':
+  app.run(main)
@@ -0,0 +1,166 @@
+# Copyright 2025 The android_world Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Benchmarks converting a11y forests to UI elements.
+
+Compares representation_utils.forest_to_ui_elements, which builds a UIElement
+per node, against the columnar UIElementTable, reporting per-step conversion
+time and the memory retained by the result.
+
+Forests captured from a device are read from serialized
+AndroidAccessibilityForest protos, e.g. written with
+
+  with open('/tmp/forest.pb', 'wb') as f:
+    f.write(env.controller.get_a11y_forest().SerializeToString())
+
+python scripts/benchmark_ui_element_table.py --forests=/tmp/forest.pb
+
+Without --forests, synthetic forests of --num_nodes nodes are used.
+"""
+
+from collections.abc import Sequence
+import gc
+import statistics
+import time
+import tracemalloc
+from typing import Callable
+
+from absl import app
+from absl import flags
+from android_env.proto.a11y import android_accessibility_forest_pb2
+from android_world.env import representation_utils
+
+_FORESTS = flags.DEFINE_list(
+    'forests', [], 'Paths to serialized AndroidAccessibilityForest protos.'
+)
+_NUM_NODES = flags.DEFINE_list(
+    'num_nodes',
+    ['100', '500', '2000'],
+    'Node counts of synthetic forests, used if --forests is not set.',
+)
+_REPEATS = flags.DEFINE_integer('repeats', 20, 'Repetitions per measurement.')
+_SCREEN_SIZE = (1080, 2400)
+
+
+def _synthetic_forest(
+    num_nodes: int,
+) -> android_accessibility_forest_pb2.AndroidAccessibilityForest:
+  """Returns a forest resembling a long list: rows of a few leaf nodes."""
+  forest = android_accessibility_forest_pb2.AndroidAccessibilityForest()
+  window = forest.windows.add()
+  root = window.tree.nodes.add()
+  root.unique_id = 0
+  root.class_name = 'android.widget.FrameLayout'
+  root.package_name = 'com.google.android.apps.messaging'
+  root.is_visible_to_user = True
+  for i in range(1, num_nodes):
+    node = window.tree.nodes.add()
+    node.unique_id = i
+    root.child_ids.append(i)
+    node.class_name = ('android.widget.TextView', 'android.widget.ImageView')[
+        i % 2
+    ]
+    node.package_name = root.package_name
+    node.view_id_resource_name = f'com.google.android.apps.messaging:id/f{i % 7}'
+    node.text = f'Conversation {i}' if i % 2 else ''
+    node.content_description = '' if i % 2 else f'Avatar {i}'
+    node.is_visible_to_user = True
+    node.is_clickable = i % 3 == 0
+    node.is_enabled = True
+    top = (i // 3) * 60
+    node.bounds_in_screen.left = (i % 3) * 360
+    node.bounds_in_screen.right = (i % 3) * 360 + 360
+    node.bounds_in_screen.top = top
+    node.bounds_in_screen.bottom = top + 60
+  return forest
+
+
+def _load_forests() -> list[
+    tuple[str, android_accessibility_forest_pb2.AndroidAccessibilityForest]
+]:
+  if not _FORESTS.value:
+    return [
+        (f'synthetic-{n}', _synthetic_forest(int(n)))
+        for n in _NUM_NODES.value
+    ]
+  forests = []
+  for path in _FORESTS.value:
+    forest = android_accessibility_forest_pb2.AndroidAccessibilityForest()
+    with open(path, 'rb') as f:
+      forest.ParseFromString(f.read())
+    forests.append((path, forest))
+  return forests
+
+
+def _time_ms(fn: Callable[[], object], repeats: int) -> float:
+  """Returns the median latency of `fn` in milliseconds."""
+  timings = []
+  for _ in range(repeats):
+    start = time.perf_counter()
+    fn()
+    timings.append((time.perf_counter() - start) * 1000)
+  return statistics.median(timings)
+
+
+def _retained_kb(fn: Callable[[], object]) -> float:
+  """Returns the memory retained by the result of `fn`, in KB."""
+  gc.collect()
+  tracemalloc.start()
+  result = fn()
+  retained, _ = tracemalloc.get_traced_memory()
+  tracemalloc.stop()
+  del result
+  return retained / 1024
+
+
+def main(argv: Sequence[str]) -> None:
+  if len(argv) > 1:
+    raise app.UsageError('Too many command-line arguments.')
+
+  def to_list(forest):
+    return representation_utils.forest_to_ui_elements(
+        forest, exclude_invisible_elements=True, screen_size=_SCREEN_SIZE
+    )
+
+  def to_table(forest):
+    return representation_utils.forest_to_ui_element_table(
+        forest, exclude_invisible_elements=True, screen_size=_SCREEN_SIZE
+    )
+
+  def to_table_materialized(forest):
+    table = to_table(forest)
+    table.to_list()
+    return table
+
+  print(
+      f'{"forest":<24} {"elements":>8} {"method":<20} {"time":>10}'
+      f' {"memory":>11}'
+  )
+  for name, forest in _load_forests():
+    num_elements = len(to_table(forest))
+    for method, convert in (
+        ('list', to_list),
+        ('table', to_table),
+        ('table+materialize', to_table_materialized),
+    ):
+      latency = _time_ms(lambda c=convert: c(forest), _REPEATS.value)
+      memory = _retained_kb(lambda c=convert: c(forest))
+      print(
+          f'{name[-24:]:<24} {num_elements:>8} {method:<20}'
+          f' {latency:>7.2f} ms {memory:>8.1f} KB'
+      )
+
+
+if __name__ == '__main__':
+  app.run(main)
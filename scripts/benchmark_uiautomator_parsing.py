@@ -0,0 +1,185 @@
+# Copyright 2025 The android_world Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Benchmarks converting uiautomator dumps to UI elements.
+
+Compares representation_utils.xml_dump_to_ui_elements, which streams the XML
+with iterparse, against the previous converter, which built the full tree and
+a nested dict before walking it recursively. Reports the median conversion
+time and the peak memory used while converting.
+
+Dumps captured from a device can be passed in, e.g. written with
+
+  with open('/tmp/window_dump.xml', 'w') as f:
+    f.write(adb_utils.uiautomator_dump(env.controller))
+
+python scripts/benchmark_uiautomator_parsing.py --dumps=/tmp/window_dump.xml
+
+Without --dumps, synthetic dumps of --num_nodes nodes are used.
+"""
+
+from collections.abc import Sequence
+import gc
+import statistics
+import time
+import tracemalloc
+from typing import Callable
+import xml.etree.ElementTree as ET
+
+from absl import app
+from absl import flags
+from android_world.env import representation_utils
+
+_DUMPS = flags.DEFINE_list('dumps', [], 'Paths to uiautomator XML dumps.')
+_NUM_NODES = flags.DEFINE_list(
+    'num_nodes',
+    ['100', '1000', '10000'],
+    'Node counts of synthetic dumps, used if --dumps is not set.',
+)
+_REPEATS = flags.DEFINE_integer('repeats', 20, 'Repetitions per measurement.')
+
+
+def _synthetic_dump(num_nodes: int) -> str:
+  """Returns a dump resembling a long list: rows of a few leaf nodes."""
+  rows = []
+  for i in range(1, num_nodes):
+    top = (i // 3) * 60
+    left = (i % 3) * 360
+    rows.append(
+        f'<node index="{i}" text="Conversation {i}" resource-id='
+        f'"com.google.android.apps.messaging:id/f{i % 7}" class='
+        '"android.widget.TextView" package="com.google.android.apps.messaging"'
+        f' content-desc="" checkable="false" checked="false" clickable='
+        f'"{str(i % 3 == 0).lower()}" enabled="true" focusable="false"'
+        ' focused="false" scrollable="false" long-clickable="false"'
+        ' password="false" selected="false"'
+        f' bounds="[{left},{top}][{left + 360},{top + 60}]" />'
+    )
+  return (
+      "<?xml version='1.0' encoding='UTF-8' standalone='yes' ?>"
+      '<hierarchy rotation="0"><node index="0" class='
+      '"android.widget.FrameLayout" package="com.google.android.apps.messaging"'
+      ' bounds="[0,0][1080,2400]">'
+      + ''.join(rows)
+      + '</node></hierarchy>'
+  )
+
+
+def _load_dumps() -> list[tuple[str, str]]:
+  if not _DUMPS.value:
+    return [
+        (f'synthetic-{n}', _synthetic_dump(int(n))) for n in _NUM_NODES.value
+    ]
+  dumps = []
+  for path in _DUMPS.value:
+    with open(path) as f:
+      dumps.append((path, f.read()))
+  return dumps
+
+
+def _recursive_xml_dump_to_ui_elements(
+    xml_string: str,
+) -> list[representation_utils.UIElement]:
+  """The converter before streaming, kept as the baseline."""
+
+  def parse_node(node):
+    result = node.attrib
+    result['children'] = [parse_node(child) for child in node]
+    return result
+
+  parsed_hierarchy = parse_node(ET.fromstring(xml_string))
+  ui_elements = []
+
+  def process_node(node, is_root):
+    bounds = node.get('bounds')
+    if bounds:
+      x_min, y_min, x_max, y_max = map(
+          int, bounds.strip('[]').replace('][', ',').split(',')
+      )
+      bbox = representation_utils.BoundingBox(x_min, x_max, y_min, y_max)
+    else:
+      bbox = None
+    ui_element = representation_utils.UIElement(
+        text=node.get('text'),
+        content_description=node.get('content-desc'),
+        class_name=node.get('class'),
+        bbox=bbox,
+        bbox_pixels=bbox,
+        is_checked=node.get('checked') == 'true',
+        is_checkable=node.get('checkable') == 'true',
+        is_clickable=node.get('clickable') == 'true',
+        is_enabled=node.get('enabled') == 'true',
+        is_focused=node.get('focused') == 'true',
+        is_focusable=node.get('focusable') == 'true',
+        is_long_clickable=node.get('long-clickable') == 'true',
+        is_scrollable=node.get('scrollable') == 'true',
+        is_selected=node.get('selected') == 'true',
+        package_name=node.get('package'),
+        resource_id=node.get('resource-id'),
+        is_visible=True,
+    )
+    if not is_root:
+      ui_elements.append(ui_element)
+    for child in node.get('children', []):
+      process_node(child, is_root=False)
+
+  process_node(parsed_hierarchy, is_root=True)
+  return ui_elements
+
+
+def _time_ms(fn: Callable[[], object], repeats: int) -> float:
+  """Returns the median latency of `fn` in milliseconds."""
+  timings = []
+  for _ in range(repeats):
+    start = time.perf_counter()
+    fn()
+    timings.append((time.perf_counter() - start) * 1000)
+  return statistics.median(timings)
+
+
+def _peak_kb(fn: Callable[[], object]) -> float:
+  """Returns the peak memory allocated while running `fn`, in KB."""
+  gc.collect()
+  tracemalloc.start()
+  fn()
+  _, peak = tracemalloc.get_traced_memory()
+  tracemalloc.stop()
+  return peak / 1024
+
+
+def main(argv: Sequence[str]) -> None:
+  if len(argv) > 1:
+    raise app.UsageError('Too many command-line arguments.')
+
+  print(
+      f'{"dump":<24} {"elements":>8} {"method":<10} {"time":>10} {"peak":>11}'
+  )
+  for name, xml_dump in _load_dumps():
+    expected = _recursive_xml_dump_to_ui_elements(xml_dump)
+    if representation_utils.xml_dump_to_ui_elements(xml_dump) != expected:
+      raise ValueError(f'Converters disagree on {name}.')
+    for method, convert in (
+        ('recursive', _recursive_xml_dump_to_ui_elements),
+        ('streaming', representation_utils.xml_dump_to_ui_elements),
+    ):
+      latency = _time_ms(lambda c=convert: c(xml_dump), _REPEATS.value)
+      peak = _peak_kb(lambda c=convert: c(xml_dump))
+      print(
+          f'{name[-24:]:<24} {len(expected):>8} {method:<10}'
+          f' {latency:>7.2f} ms {peak:>8.1f} KB'
+      )
+
+
+if __name__ == '__main__':
+  app.run(main)
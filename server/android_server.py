@@ -18,7 +18,10 @@ This server exposes endpoints to control an Android emulator, execute tasks,
 and manage task execution on AndroidWorld tasks.
 """
 
+import asyncio
 import contextlib
+import dataclasses
+import time
 import typing
 from typing import Any
 
@@ -27,6 +30,7 @@ from android_world import suite_utils
 from android_world.env import env_launcher
 from android_world.env import interface
 from android_world.env import json_action
+from android_world.utils import screenshot_codec
 import fastapi
 import pydantic
 import uvicorn
@@ -39,6 +43,30 @@ class StateResponse(pydantic.BaseModel):
   ui_elements: list[Any]
 
 
+class StepRequest(pydantic.BaseModel):
+  """Pydantic model for /step requests.
+
+  Attributes:
+    action: The JSONAction to execute, as a dict.
+    wait_to_stabilize: Whether to wait for the UI to settle after the action.
+    stability_timeout_sec: Maximum time to wait for the UI to settle.
+    encoding: Screenshot encoding; see screenshot_codec.Encoding.
+    quality: Quality in [1, 100] for lossy encodings.
+    scale: Screenshot downscale factor in (0, 1].
+    include_ui_elements: Whether to return UI elements in the observation.
+  """
+
+  action: dict[str, Any]
+  wait_to_stabilize: bool = True
+  stability_timeout_sec: float = pydantic.Field(default=6.0, ge=0.0)
+  encoding: str = "png"
+  quality: int = pydantic.Field(
+      default=screenshot_codec.DEFAULT_QUALITY, ge=1, le=100
+  )
+  scale: float = pydantic.Field(default=1.0, gt=0.0, le=1.0)
+  include_ui_elements: bool = True
+
+
 @contextlib.asynccontextmanager
 async def lifespan(fast_api_app: fastapi.FastAPI):
   """Manages the lifecycle of the Android environment and task suite."""
@@ -64,6 +92,10 @@ async def lifespan(fast_api_app: fastapi.FastAPI):
 
 
 app = fastapi.FastAPI(lifespan=lifespan)
+
+# Serializes the blocking calls into the environment, which run in worker
+# threads so that they do not block the event loop; see _run_blocking.
+_env_lock = asyncio.Lock()
 suite_router = fastapi.APIRouter(prefix="/suite", tags=["suite"])
 task_router = fastapi.APIRouter(prefix="/task", tags=["task"])
 
@@ -86,10 +118,30 @@ AndroidSuite = typing.Annotated[
 ]
 
 
+async def _run_blocking(
+    fn: typing.Callable[..., typing.Any], *args: Any, **kwargs: Any
+) -> Any:
+  """Runs a blocking environment call in a worker thread.
+
+  The event loop stays free to serve other requests, e.g. /health, meanwhile.
+  Calls are serialized since the environment is not thread safe.
+
+  Args:
+    fn: The blocking function.
+    *args: Positional arguments for `fn`.
+    **kwargs: Keyword arguments for `fn`.
+
+  Returns:
+    What `fn` returns.
+  """
+  async with _env_lock:
+    return await asyncio.to_thread(fn, *args, **kwargs)
+
+
 @app.post("/reset")
 async def reset(go_home: bool, app_android_env: AndroidEnv):
   """Resets the Android environment, optionally returning to the home screen."""
-  app_android_env.reset(go_home=go_home)
+  await _run_blocking(app_android_env.reset, go_home=go_home)
   return {
       "status": "success",
       "message": f"Environment reset with go_home={go_home}.",
@@ -99,20 +151,133 @@ async def reset(go_home: bool, app_android_env: AndroidEnv):
 @app.get("/screenshot")
 async def get_screenshot(wait_to_stabilize: bool, app_android_env: AndroidEnv):
   """Captures and returns the current screenshot of the Android environment."""
-  state = app_android_env.get_state(wait_to_stabilize=wait_to_stabilize)
+  state = await _run_blocking(
+      app_android_env.get_state,
+      wait_to_stabilize=wait_to_stabilize,
+      components={interface.PIXELS},
+  )
   return {"pixels": state.pixels.tolist()}
 
 
+@app.get("/screenshot/binary")
+async def get_screenshot_binary(
+    request: fastapi.Request,
+    app_android_env: AndroidEnv,
+    wait_to_stabilize: bool = False,
+    encoding: str | None = None,
+    quality: int = screenshot_codec.DEFAULT_QUALITY,
+    scale: float = 1.0,
+):
+  """Returns the current screenshot as a single binary body.
+
+  The encoding is taken from the `encoding` query parameter if given, otherwise
+  it is negotiated from the Accept header (raw `application/octet-stream`,
+  `image/png`, `image/jpeg` or `image/webp`). The array shape is returned in
+  the `X-Screenshot-*` headers; see screenshot_codec.py.
+  """
+  if encoding is not None:
+    try:
+      chosen_encoding = screenshot_codec.parse_encoding(encoding)
+    except ValueError as exc:
+      raise fastapi.HTTPException(status_code=400, detail=str(exc)) from exc
+  else:
+    chosen_encoding = screenshot_codec.negotiate_encoding(
+        request.headers.get("accept")
+    )
+  if not 1 <= quality <= 100 or not 0 < scale <= 1:
+    raise fastapi.HTTPException(
+        status_code=400,
+        detail="quality must be in [1, 100] and scale must be in (0, 1].",
+    )
+  state = await _run_blocking(
+      app_android_env.get_state,
+      wait_to_stabilize=wait_to_stabilize,
+      components={interface.PIXELS},
+  )
+  encoded = await asyncio.to_thread(
+      screenshot_codec.encode,
+      state.pixels,
+      chosen_encoding,
+      quality=quality,
+      scale=scale,
+  )
+  return fastapi.Response(
+      content=encoded.data,
+      media_type=encoded.media_type,
+      headers=encoded.headers,
+  )
+
+
 @app.post("/execute_action")
 async def execute_action(
     action_dict: dict[str, typing.Any], app_android_env: AndroidEnv
 ):
   """Executes a given JSON-formatted action in the Android environment."""
   action = json_action.JSONAction(**action_dict)
-  app_android_env.execute_action(action)
+  await _run_blocking(app_android_env.execute_action, action)
   return {"status": "success", "message": f"Action {action} executed."}
 
 
+@app.post("/step")
+async def step(step_request: StepRequest, app_android_env: AndroidEnv):
+  """Executes an action, waits for the UI to settle and returns the result.
+
+  This replaces a client-side sequence of /execute_action, a fixed sleep and
+  /screenshot with a single round trip. Terminal `status` actions are not
+  followed by a wait since no further observation is needed.
+
+  The screenshot is encoded while the foreground activity is queried.
+  """
+  try:
+    encoding = screenshot_codec.parse_encoding(step_request.encoding)
+  except ValueError as exc:
+    raise fastapi.HTTPException(status_code=400, detail=str(exc)) from exc
+  action = json_action.JSONAction(**step_request.action)
+  components = {interface.PIXELS}
+  if step_request.include_ui_elements:
+    components.add(interface.UI_ELEMENTS)
+
+  start = time.time()
+  state = await _run_blocking(
+      app_android_env.step,
+      action,
+      wait_to_stabilize=(
+          step_request.wait_to_stabilize
+          and action.action_type != json_action.STATUS
+      ),
+      stability_timeout=step_request.stability_timeout_sec,
+      components=components,
+  )
+  step_time_sec = time.time() - start
+
+  async with _env_lock:
+    screenshot, foreground_activity = await asyncio.gather(
+        asyncio.to_thread(
+            screenshot_codec.encode,
+            state.pixels,
+            encoding,
+            quality=step_request.quality,
+            scale=step_request.scale,
+        ),
+        app_android_env.controller.async_adb.get_current_activity(),
+    )
+  ui_elements = (
+      [dataclasses.asdict(element) for element in state.ui_elements]
+      if step_request.include_ui_elements
+      else []
+  )
+  return {
+      "status": "success",
+      "message": f"Action {action} executed.",
+      "step_time_sec": step_time_sec,
+      "observation": {
+          "screenshot": screenshot.to_json_dict(),
+          "ui_elements": ui_elements,
+          "foreground_activity": foreground_activity or "",
+      },
+  }
+
+
 @suite_router.get("/task_list")
 async def suite_task_list(max_index: int, app_suite: AndroidSuite):
   """Returns a list of task keys from the current suite, up to max_index."""
@@ -165,7 +330,9 @@ async def initialize_task(
     app_suite: AndroidSuite,
 ):
   """Initializes a specific task in the Android environment."""
-  app_suite[task_type][task_idx].initialize_task(app_android_env)
+  await _run_blocking(
+      app_suite[task_type][task_idx].initialize_task, app_android_env
+  )
   return {
       "status": "success",
       "message": f"Task {task_type} {task_idx} initialized.",
@@ -180,7 +347,7 @@ async def tear_down_task(
     app_suite: AndroidSuite,
 ):
   """Tears down a specific task in the Android environment."""
-  app_suite[task_type][task_idx].tear_down(app_android_env)
+  await _run_blocking(app_suite[task_type][task_idx].tear_down, app_android_env)
   return {
       "status": "success",
       "message": f"Task {task_type} {task_idx} torn down.",
@@ -196,7 +363,9 @@ async def get_task_score(
 ):
   """Gets the success status (score) of a specific task."""
   return {
-      "score": app_suite[task_type][task_idx].is_successful(app_android_env)
+      "score": await _run_blocking(
+          app_suite[task_type][task_idx].is_successful, app_android_env
+      )
   }
 
 
@@ -223,7 +392,7 @@ async def get_task_max_steps(
 @app.post("/close")
 async def close(app_android_env: AndroidEnv):
   """Closes the Android environment."""
-  app_android_env.close()
+  await _run_blocking(app_android_env.close)
   return {"status": "success"}
 
 